@@ -0,0 +1,71 @@
+"""
+Concurrency benchmark for the AWS service layer.
+
+Fires N concurrent medkit-style calls (get_user + query) against the local
+stub server and compares the old inline boto3 calls with the executor-backed
+clients. Usage:
+
+    python -m benchmarks.bench_aws_concurrency --requests 200 --delay 0.05
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.stub_server import configure_environment, start_stub_server
+
+
+async def run_blocking(cognito, dynamo, requests: int):
+    """Simulates the previous behaviour: boto3 called on the event loop"""
+
+    async def one():
+        user = cognito.client.get_user(AccessToken="token")
+        dynamo.client.query(
+            TableName=dynamo.table_name,
+            KeyConditionExpression="user_sub = :user_sub",
+            ExpressionAttributeValues={":user_sub": {"S": user["Username"]}},
+        )
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+
+
+async def run_async(cognito, dynamo, requests: int):
+    """Runs the same workload through the non-blocking service methods"""
+
+    async def one():
+        user = await cognito.get_current_user(token="token")
+        await dynamo.get_medicines_by_user_sub(user["user_sub"])
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+
+
+def main():
+    """Runs both variants and prints throughput"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = start_stub_server(delay=args.delay)
+    configure_environment(server)
+
+    # pylint: disable=C0415
+    from src.modules.services.aws.cognito_service import CognitoClient
+    from src.modules.services.aws.dynamodb_service import DynamoDBClient
+    from src.modules.utils.aws_helpers import shutdown_aws_executor
+
+    cognito, dynamo = CognitoClient(), DynamoDBClient()
+    for name, runner in (("blocking", run_blocking), ("executor", run_async)):
+        started = time.perf_counter()
+        asyncio.run(runner(cognito, dynamo, args.requests))
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:>9}: {args.requests} requests in {elapsed:.2f}s "
+            f"({args.requests / elapsed:.1f} req/s)"
+        )
+    shutdown_aws_executor()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Benchmark for the memory-mapped medicine catalog.
+
+Generates a catalog CSV of synthetic multi-word names, compiles it, then
+replays the prefixes a user produces while typing and reports per-keystroke
+autocomplete latency next to a linear scan over the names held in a list,
+plus lookup and normalize latency. Finally a few forked processes touch the
+whole index and report how much of it each one is charged for (Linux PSS):
+the mapped pages are shared, so that share shrinks as processes are added.
+
+    python -m benchmarks.bench_catalog --entries 200000 --processes 4
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_load import MEDICINE_TYPES, percentile
+from src.modules.services.catalog.medicine_catalog import MedicineCatalog, build_catalog
+from src.modules.utils.text_helpers import normalize_medicine_name
+
+SYLLABLES = ("am", "ox", "ci", "lin", "para", "ceta", "mol", "ibu", "pro", "fen", "dol", "zep", "ran", "tid", "ine")
+STRENGTHS = ("", " 100 mg", " 250 mg", " 500 mg", " 1 g", " forte", " junior", " retard")
+TYPED_WORDS = ("paracetamol 500", "ibu forte", "amox", "lin 250 mg", "z")
+
+
+def write_source(path: str, entries: int) -> list[tuple[str, str]]:
+    """Writes `entries` distinct generated medicines; returns them"""
+    rng = random.Random(7)
+    rows, names = [], set()
+    while len(rows) < entries:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        name = word.capitalize() + rng.choice(STRENGTHS)
+        if name.lower() in names:
+            continue
+        names.add(name.lower())
+        rows.append((name, rng.choice(MEDICINE_TYPES)))
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(("medicine_name", "medicine_type"))
+        writer.writerows(rows)
+    return rows
+
+
+def scan_complete(keys: list[tuple[str, list[str], tuple]], query: str, limit: int) -> list:
+    """Baseline: every word of the query prefixes a word of the name, by linear scan"""
+    words = normalize_medicine_name(query).split()
+    starting, containing = [], []
+    for key, name_words, row in keys:
+        if all(any(name_word.startswith(word) for name_word in name_words) for word in words):
+            (starting if key.startswith(words[0]) else containing).append(row)
+            if len(starting) >= limit:
+                break
+    return (starting + containing)[:limit]
+
+
+def timed(function, queries) -> list[float]:
+    """Sorted per-call seconds"""
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        function(query)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    """Prints p50, p99 and max in microseconds"""
+    print(
+        f"{label:>28}: p50 {percentile(timings, 0.50) * 1e6:8.1f} us, "
+        f"p99 {percentile(timings, 0.99) * 1e6:8.1f} us, max {timings[-1] * 1e6:8.1f} us"
+    )
+
+
+def proportional_kib(index_path: str) -> int:
+    """This process's proportional share (PSS) of the mapped index, in KiB"""
+    pss, inside = 0, False
+    with open("/proc/self/smaps", encoding="utf-8") as file:
+        for line in file:
+            fields = line.split()
+            if "-" in fields[0] and len(fields) >= 5 and ":" in fields[3]:
+                # A mapping header; the path, when there is one, comes last
+                inside = fields[-1] == index_path
+            elif inside and fields[0] == "Pss:":
+                pss += int(fields[1])
+    return pss
+
+
+def touch_and_measure(index_path: str, ready, go, results):
+    """Reads every page of the index, waits for the others, then reports its share"""
+    catalog = MedicineCatalog(index_path)
+    for offset in range(0, len(catalog._map), 4096):  # pylint: disable=W0212
+        catalog._map[offset]  # pylint: disable=W0104,W0212
+    ready.wait()
+    go.wait()
+    results.put(proportional_kib(index_path))
+    # Stay mapped until every process has measured
+    ready.wait()
+    catalog.close()
+
+
+def measure_sharing(index_path: str, processes: int):
+    """Forks `processes` readers and prints the index size each is charged for"""
+    if not os.path.exists("/proc/self/smaps"):
+        print("sharing: /proc/self/smaps not available, skipped")
+        return
+    context = multiprocessing.get_context("fork")
+    ready, go, results = context.Barrier(processes + 1), context.Barrier(processes + 1), context.Queue()
+    workers = [
+        context.Process(target=touch_and_measure, args=(index_path, ready, go, results)) for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    ready.wait()
+    go.wait()
+    shares = [results.get() for _ in workers]
+    ready.wait()
+    for worker in workers:
+        worker.join()
+    size_kib = os.path.getsize(index_path) // 1024
+    print(
+        f"sharing: {processes} processes mapped the {size_kib} KiB index, each charged "
+        f"{sum(shares) / len(shares):.0f} KiB (PSS), {sum(shares)} KiB in total"
+    )
+
+
+def main():
+    """Times compile, autocomplete, lookup and normalize, then measures page sharing"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--processes", type=int, default=4, help="forked readers for the sharing check")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = os.path.join(directory, "catalog.csv")
+        index_path = os.path.join(directory, "catalog.csv.idx")
+        rows = write_source(source_path, args.entries)
+
+        started = time.perf_counter()
+        entries = build_catalog(source_path, index_path)
+        print(
+            f"compile: {time.perf_counter() - started:.2f} s for {entries} entries, "
+            f"{os.path.getsize(index_path) / 2**20:.1f} MiB"
+        )
+        started = time.perf_counter()
+        catalog = MedicineCatalog(index_path)
+        print(f"open: {(time.perf_counter() - started) * 1e3:.3f} ms")
+
+        keys = sorted(
+            (normalize_medicine_name(name), normalize_medicine_name(name).split(), (name, medicine_type))
+            for name, medicine_type in rows
+        )
+        keystrokes = [word[:length] for word in TYPED_WORDS for length in range(1, len(word) + 1)]
+        # Enough repetitions for a stable p99
+        queries = keystrokes * max(1, 2000 // len(keystrokes))
+        report("autocomplete (mmap index)", timed(lambda query: catalog.complete(query, args.limit), queries))
+        report("autocomplete (list scan)", timed(lambda query: scan_complete(keys, query, args.limit), keystrokes))
+
+        rng = random.Random(11)
+        names = [rng.choice(rows)[0] for _ in range(2000)]
+        report("lookup", timed(lambda name: catalog.lookup(name.upper()), names))
+        report("normalize", timed(lambda name: catalog.normalize(name.lower(), "TABLET"), names))
+        catalog.close()
+
+        measure_sharing(index_path, args.processes)
+
+
+if __name__ == "__main__":
+    main()
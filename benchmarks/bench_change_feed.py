@@ -0,0 +1,144 @@
+"""
+Benchmark for the live update change feed.
+
+Opens many idle streams in-process (as the SSE endpoint does, minus the
+socket), measures the memory each one holds, then publishes changes and
+measures how long it takes until every stream of the user has read them.
+A share of the streams never read, to show their queues stay bounded:
+
+    python -m benchmarks.bench_change_feed --streams 10000 --users 2000
+    python -m benchmarks.bench_change_feed --streams 2000 --changes 5000 --stalled 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+
+def configure_environment():
+    """Selects the fake backend; must run before the app modules are imported"""
+    os.environ.update(
+        {
+            "AWS_BACKEND": "fake",
+            "AWS_REGION": "us-east-1",
+            "DYNAMO_DB_TABLE_NAME": "bench-table",
+            "CHANGE_FEED_MAX_CONNECTIONS": str(10**9),
+            "CHANGE_FEED_MAX_CONNECTIONS_PER_USER": str(10**9),
+            "CHANGE_FEED_HEARTBEAT": "3600",
+        }
+    )
+
+
+async def run(args) -> dict:
+    """Opens the streams, publishes the changes and returns the measurements"""
+    # pylint: disable=C0415
+    from src.modules.dependencies import get_change_feed
+    from src.modules.models.records.change import UPDATE, MedicineChange
+
+    feed = get_change_feed()
+    rng = random.Random(args.seed)
+    users = [f"user-{number:06d}" for number in range(args.users)]
+    # user_sub -> times at which each reading stream got the current change
+    received: dict[str, list[float]] = {user_sub: [] for user_sub in users}
+    delivered = {user_sub: asyncio.Event() for user_sub in users}
+    readers = {user_sub: 0 for user_sub in users}
+
+    async def read(user_sub: str, stream):
+        async for chunk in stream:
+            if chunk.startswith(b"id:"):
+                received[user_sub].append(time.perf_counter())
+                if len(received[user_sub]) == readers[user_sub]:
+                    delivered[user_sub].set()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks, stalled = [], []
+    for number in range(args.streams):
+        user_sub = users[number % args.users]
+        subscription, replayed = feed.subscribe(user_sub)
+        if rng.random() < args.stalled:
+            # Opened but never read, like a client that stopped reading its socket
+            stalled.append(subscription)
+            continue
+        readers[user_sub] += 1
+        tasks.append(asyncio.create_task(read(user_sub, feed.stream(subscription, replayed))))
+    # Let every reader park on its queue
+    await asyncio.sleep(0.1)
+    per_stream = (tracemalloc.get_traced_memory()[0] - before) / args.streams
+    tracemalloc.stop()
+
+    item = {
+        "user_sub": {"S": ""},
+        "medicine_id": {"S": "bench"},
+        "medicine_name": {"S": "Bench medicine"},
+        "medicine_type": {"S": "pill"},
+        "quantity": {"N": "10"},
+        "expiration_date": {"S": "2030-01"},
+        "version": {"N": "1"},
+    }
+    publish, fan_out = [], []
+    for number in range(args.changes):
+        user_sub = rng.choice(users)
+        if not readers[user_sub]:
+            continue
+        received[user_sub].clear()
+        delivered[user_sub].clear()
+        item["user_sub"] = {"S": user_sub}
+        item["quantity"] = {"N": str(number)}
+        started = time.perf_counter()
+        feed.on_change(MedicineChange(UPDATE, user_sub, "bench", item))
+        publish.append(time.perf_counter() - started)
+        await delivered[user_sub].wait()
+        fan_out.append(max(received[user_sub]) - started)
+
+    largest_backlog = max((subscription.queue.qsize() for subscription in stalled), default=0)
+    feed.close()
+    await asyncio.gather(*tasks)
+    return {
+        "streams": args.streams,
+        "stalled": len(stalled),
+        "bytes_per_stream": per_stream,
+        "publish_us": statistics.median(publish) * 1e6 if publish else 0.0,
+        "fan_out_p50_ms": statistics.median(fan_out) * 1e3 if fan_out else 0.0,
+        "fan_out_max_ms": max(fan_out) * 1e3 if fan_out else 0.0,
+        "largest_stalled_backlog": largest_backlog,
+        "queue_size": feed.env.change_feed_queue_size,
+        "overflows": feed.stats()["overflows"],
+    }
+
+
+def main():
+    """Runs the benchmark and prints the results"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--changes", type=int, default=2_000)
+    parser.add_argument("--stalled", type=float, default=0.1, help="share of streams that never read")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    configure_environment()
+    import logging  # pylint: disable=C0415
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = asyncio.run(run(args))
+    print(
+        f"{results['streams']} streams ({results['stalled']} never read), "
+        f"{results['bytes_per_stream'] / 1024:.1f} KiB per idle stream"
+    )
+    print(
+        f"publish {results['publish_us']:.0f} us per change, fan-out to every reader "
+        f"p50 {results['fan_out_p50_ms']:.2f} ms, max {results['fan_out_max_ms']:.2f} ms"
+    )
+    print(
+        f"stalled streams hold at most {results['largest_stalled_backlog']} queued events "
+        f"(limit {results['queue_size']}); {results['overflows']} backlogs replaced by a resync"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Benchmark for FIFO dispensing across stock lots.
+
+Seeds products with several lots each into the in-process AWS fake (with a
+per-call latency standing in for DynamoDB), then runs concurrent workers
+dispensing small quantities, either all from one hot product or spread over
+many. Each run reports served dispenses per second, latency, conflicts and
+AWS round trips per dispense, next to a client-side baseline that plans the
+same way and adjusts the lots one by one. Afterwards every product is audited for
+FIFO order (emptied lots before at most one partial one) and for units
+that left the lots without being dispensed:
+
+    python -m benchmarks.bench_dispense --workers 32 --dispenses 2000
+    python -m benchmarks.bench_dispense --lots 20 --quantity 20 --max-quantity 30 --summaries
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from benchmarks.bench_load import MEDICINE_TYPES, percentile
+
+
+def configure_environment(latency: float, summaries: bool):
+    """Selects the fake backend; must run before the app modules are imported"""
+    os.environ.update(
+        {
+            "AWS_BACKEND": "fake",
+            "FAKE_AWS_LATENCY": str(latency),
+            "FAKE_AWS_LATENCY_JITTER": "0",
+            "AWS_REGION": "us-east-1",
+            "DYNAMO_DB_TABLE_NAME": "bench-table",
+            "AWS_MAX_WORKERS": "64",
+        }
+    )
+    if summaries:
+        os.environ["DYNAMO_DB_SUMMARY_TABLE_NAME"] = "bench-summaries"
+    else:
+        os.environ.pop("DYNAMO_DB_SUMMARY_TABLE_NAME", None)
+
+
+def seed(dynamo_db_client, user_sub: str, products: int, lots: int, quantity: int) -> dict[str, int]:
+    """Loads `lots` lots of each product; returns the dispensable units per product"""
+    # pylint: disable=C0415
+    from src.modules.models.records.medicine import Medicine, current_month, format_month
+
+    rng = random.Random(user_sub)
+    month = current_month()
+    items, units = [], {}
+    for product in range(products):
+        name, medicine_type = f"Product {product}", MEDICINE_TYPES[product % len(MEDICINE_TYPES)]
+        units[name] = 0
+        for lot in range(lots):
+            # One lot in five is already expired and must never be dispensed
+            expired = lot % 5 == 4
+            expiry = month - rng.randint(1, 12) if expired else month + rng.randint(0, 36)
+            medicine = Medicine(
+                user_sub=user_sub,
+                medicine_id=f"{product:05d}-{lot:03d}",
+                medicine_name=name,
+                medicine_type=medicine_type,
+                quantity=quantity,
+                expiration_date=format_month(expiry),
+                expiration_month=expiry,
+                version=1,
+            )
+            items.append(medicine.to_dynamodb())
+            units[name] += 0 if expired else quantity
+    dynamo_db_client.client.load_items(dynamo_db_client.table_name, items)
+    return units
+
+
+def outcomes() -> dict[str, float]:
+    """Current dispense attempt counts by outcome"""
+    from src.modules.services.observability.metrics import dispense_attempts  # pylint: disable=C0415
+
+    counts = {}
+    for line in dispense_attempts.samples():
+        series, _, value = line.rpartition(" ")
+        counts[series.split('outcome="')[1].rstrip('"}')] = float(value)
+    return counts
+
+
+async def dispense_manually(dynamo_db_client, dispense_input) -> dict:
+    """Baseline: query the lots, then adjust them one at a time, earliest expiry first"""
+    # pylint: disable=C0415,W0212
+    from src.modules.models.inputs.app_inputs import QuantityAdjustmentInput
+    from src.modules.models.records.lot import plan_fifo, stock_key
+    from src.modules.models.records.medicine import Medicine, current_month
+
+    key = stock_key(dispense_input.medicine_name, dispense_input.medicine_type)
+    lots, _ = await dynamo_db_client._stock_lots(dispense_input.user_sub, key)
+    plan = plan_fifo([Medicine.from_dynamodb(item) for item in lots.values()], dispense_input.quantity, current_month())
+    if plan is None:
+        return {"error": "Not enough stock", "status_code": 409}
+    for lot, taken in plan:
+        response = await dynamo_db_client.adjust_quantity(
+            QuantityAdjustmentInput(user_sub=dispense_input.user_sub, medicine_id=lot.medicine_id, delta=-taken)
+        )
+        if "error" in response:
+            # Units already taken from earlier lots stay taken
+            return response
+    return {"dispensed": dispense_input.quantity}
+
+
+async def drive(dynamo_db_client, user_sub: str, names: list[str], args, manual: bool) -> dict:
+    """Runs `args.dispenses` dispenses over `args.workers` workers"""
+    from src.modules.models.inputs.app_inputs import DispenseInput  # pylint: disable=C0415
+
+    rng = random.Random(3)
+    remaining = iter(range(args.dispenses))
+    latencies, served, refused, failed, dispensed = [], 0, 0, 0, 0
+    calls_before = sum(dynamo_db_client.client.calls.values())
+    outcomes_before = outcomes()
+
+    async def worker():
+        nonlocal served, refused, failed, dispensed
+        for _ in remaining:
+            name = rng.choice(names)
+            dispense_input = DispenseInput(
+                user_sub=user_sub,
+                medicine_name=name,
+                medicine_type=MEDICINE_TYPES[int(name.split()[1]) % len(MEDICINE_TYPES)],
+                quantity=rng.randint(1, args.max_quantity),
+            )
+            started = time.perf_counter()
+            if manual:
+                response = await dispense_manually(dynamo_db_client, dispense_input)
+            else:
+                response = await dynamo_db_client.dispense_fifo(dispense_input)
+            latencies.append(time.perf_counter() - started)
+            if "error" not in response:
+                served += 1
+                dispensed += response["dispensed"]
+            elif "Not enough stock" in response["error"]:
+                refused += 1
+            else:
+                failed += 1
+
+    started = time.perf_counter()
+    async with asyncio.TaskGroup() as group:
+        for _ in range(args.workers):
+            group.create_task(worker())
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    conflicts = outcomes().get("conflict", 0.0) - outcomes_before.get("conflict", 0.0)
+    return {
+        # Only dispenses that went through count as throughput
+        "per_second": served / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p95_ms": percentile(latencies, 0.95) * 1e3,
+        "mean_ms": statistics.fmean(latencies) * 1e3,
+        "conflicts": 0 if manual else int(conflicts),
+        "calls": (sum(dynamo_db_client.client.calls.values()) - calls_before) / args.dispenses,
+        "refused": refused,
+        "failed": failed,
+        "dispensed": dispensed,
+    }
+
+
+async def audit(dynamo_db_client, user_sub: str, units: dict[str, int], full: int) -> tuple[int, list[str]]:
+    """
+    Units that left the lots, and the products whose lots break FIFO order
+    (emptied lots, at most one partial, then full ones) or lost expired stock.
+    """
+    from src.modules.models.records.medicine import Medicine, current_month  # pylint: disable=C0415
+
+    month = current_month()
+    # Straight from the table, not the inventory cache
+    dynamo_db_client.inventory_cache.invalidate(user_sub)
+    medicines = [Medicine.from_dynamodb(item) for item in await dynamo_db_client.get_medicines_by_user_sub(user_sub)]
+    taken, broken = 0, []
+    for name in units:
+        lots = [medicine for medicine in medicines if medicine.medicine_name == name]
+        ordered = [
+            lot.quantity
+            for lot in sorted(lots, key=lambda lot: (lot.expiration_month, lot.medicine_id))
+            if lot.expiration_month >= month
+        ]
+        taken += units[name] - sum(ordered)
+        emptied = ordered.count(0)
+        if (
+            ordered[:emptied] != [0] * emptied
+            or any(quantity != full for quantity in ordered[emptied + 1:])
+            or any(lot.quantity != full for lot in lots if lot.expiration_month < month)
+        ):
+            broken.append(name)
+    return taken, broken
+
+
+async def run(args):
+    """Seeds one user per scenario, then times the transactional and the manual dispense"""
+    from src.modules.dependencies import get_dynamo_db_client  # pylint: disable=C0415
+
+    dynamo_db_client = get_dynamo_db_client()
+    scenarios = [("hot", 1), ("spread", args.products)]
+    print(
+        f"{'scenario':<18} {'ok/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'conflicts':>9} "
+        f"{'calls/disp':>10} {'refused':>7} {'failed':>6} {'lost':>5} {'not FIFO':>8}"
+    )
+    for scenario, products in scenarios:
+        for manual in (False, True):
+            user_sub = f"{scenario}-{'manual' if manual else 'fifo'}"
+            units = seed(dynamo_db_client, user_sub, products, args.lots, args.quantity)
+            if dynamo_db_client.summary_table_name:
+                await dynamo_db_client.rebuild_inventory_summary(user_sub)
+            # Both variants read the lots from the inventory cache, as after a medkit page load
+            await dynamo_db_client.get_medicines_by_user_sub(user_sub)
+            result = await drive(dynamo_db_client, user_sub, sorted(units), args, manual)
+            taken, broken = await audit(dynamo_db_client, user_sub, units, args.quantity)
+            # Units taken from lots by dispenses that then failed
+            lost = taken - result["dispensed"]
+            label = f"{scenario} {'manual' if manual else 'transaction'}"
+            print(
+                f"{label:<18} {result['per_second']:>7.0f} {result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f} "
+                f"{result['conflicts']:>9} {result['calls']:>10.2f} {result['refused']:>7} "
+                f"{result['failed']:>6} {lost:>5} {len(broken):>8}"
+            )
+            if not manual and (lost or broken):
+                raise SystemExit(f"{user_sub}: {lost} units lost, FIFO broken for {broken}")
+    print("transactional runs: FIFO order held and every unit was dispensed exactly once")
+
+
+def main():
+    """Runs the benchmark and prints the results"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20, help="products in the spread scenario")
+    parser.add_argument("--lots", type=int, default=10, help="lots per product")
+    parser.add_argument("--quantity", type=int, default=1000, help="units per lot")
+    parser.add_argument("--max-quantity", type=int, default=10, help="largest single dispense")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--dispenses", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.005, help="fake latency per call, seconds")
+    parser.add_argument("--summaries", action="store_true", help="maintain inventory summaries too")
+    args = parser.parse_args()
+
+    configure_environment(args.latency, args.summaries)
+    import logging  # pylint: disable=C0415
+
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark for building the expiry index and its digests at table scale.
+
+Items are generated lazily, the way a scan streams them, across many users
+with expiration months spread over ten years. Reports build throughput,
+peak traced memory (only items within the horizon are retained) and the
+time to produce every user's digest:
+
+    python -m benchmarks.bench_expiry_index --items 1000000 --users 50000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Iterator
+
+from src.modules.models.records.medicine import current_month, format_month
+from src.modules.services.alerts.expiry_index import ExpiryIndex
+
+
+def iter_items(count: int, users: int) -> Iterator[dict]:
+    """Yields DynamoDB wire-format items, as projected by the index scan"""
+    month = current_month()
+    for index in range(count):
+        yield {
+            "user_sub": {"S": f"user-{random.randrange(users)}"},
+            "medicine_id": {"S": f"medicine-{index}"},
+            "medicine_name": {"S": f"Medicine {index % 5000}"},
+            "quantity": {"N": str(random.randint(0, 500))},
+            "expiration_date": {"S": format_month(month + random.randint(-24, 96))},
+        }
+
+
+def main():
+    """Builds the index from generated items and renders all digests"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--horizon", type=int, default=3)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    index = ExpiryIndex(args.horizon)
+    started = time.perf_counter()
+    for item in iter_items(args.items, args.users):
+        index.add_item(item)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    digests = sum(1 for _ in index.digests())
+    digest_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"build: {args.items} items in {build_seconds:.1f}s "
+        f"({args.items / build_seconds:,.0f} items/s), {len(index)} indexed"
+    )
+    print(f"digests: {digests} users in {digest_seconds:.2f}s")
+    print(f"peak traced memory: {peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
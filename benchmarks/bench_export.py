@@ -0,0 +1,153 @@
+"""
+Benchmark for streaming inventory exports.
+
+Seeds one user's inventory into the in-process AWS fake, then streams the
+export in every format, with and without gzip, discarding the bytes as a
+client download would. Reports rows/s and output size; with --memory the
+peak allocated while streaming is traced too (slower), and should stay
+flat as --items grows:
+
+    python -m benchmarks.bench_export --items 1000000 --memory
+    python -m benchmarks.bench_export --items 200000 --formats csv --page-size 500
+"""
+
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import os
+import random
+import time
+import tracemalloc
+
+from benchmarks.bench_load import random_medicine
+
+
+def configure_environment(latency: float):
+    """Selects the fake backend; must run before the app modules are imported"""
+    os.environ.update(
+        {
+            "AWS_BACKEND": "fake",
+            "FAKE_AWS_LATENCY": str(latency),
+            "FAKE_AWS_LATENCY_JITTER": "0",
+            "AWS_REGION": "us-east-1",
+            "DYNAMO_DB_TABLE_NAME": "bench-table",
+        }
+    )
+
+
+def seed(items: int, user_sub: str, batch: int = 50_000):
+    """Loads `items` medicines for one user into the fake, in batches"""
+    # pylint: disable=C0415
+    import uuid
+
+    from src.modules.dependencies import get_dynamo_db_client
+    from src.modules.models.inputs.app_inputs import MedicineInput
+    from src.modules.models.records.medicine import Medicine
+
+    rng = random.Random(1)
+    dynamo_db_client = get_dynamo_db_client()
+    for first in range(0, items, batch):
+        dynamo_db_client.client.load_items(
+            dynamo_db_client.table_name,
+            [
+                Medicine.from_input(
+                    MedicineInput(user_sub=user_sub, **random_medicine(rng, index)), str(uuid.uuid4())
+                ).to_dynamodb()
+                for index in range(first, min(items, first + batch))
+            ],
+        )
+    return dynamo_db_client
+
+
+def count_rows(export_format: str, compressed: bool, head: bytes, tail_rows: int) -> int:
+    """Rows in an export kept in memory (only used with --verify)"""
+    # pylint: disable=C0415
+    from src.modules.services.export.columnar import iter_columnar_rows
+
+    data = gzip.decompress(head) if compressed else head
+    if export_format == "columnar":
+        return sum(1 for _ in iter_columnar_rows(io.BytesIO(data)))
+    return data.count(b"\n") - tail_rows
+
+
+async def run(dynamo_db_client, user_sub: str, export_format: str, compressed: bool, args) -> dict:
+    """Streams one export and measures it"""
+    from src.modules.services.export.inventory_export import stream_inventory_export  # pylint: disable=C0415
+
+    kept = bytearray() if args.verify else None
+    size = chunks = 0
+    if args.memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    async for chunk in stream_inventory_export(
+        dynamo_db_client, user_sub, export_format, compressed, page_size=args.page_size or None
+    ):
+        size += len(chunk)
+        chunks += 1
+        if kept is not None:
+            kept += chunk
+    elapsed = time.perf_counter() - started
+    peak = None
+    if args.memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    result = {
+        "format": export_format + (".gz" if compressed else ""),
+        "seconds": elapsed,
+        "rows_per_second": args.items / elapsed if elapsed else 0.0,
+        "megabytes": size / 2**20,
+        "chunks": chunks,
+        "peak_megabytes": None if peak is None else peak / 2**20,
+    }
+    if kept is not None:
+        # The csv header line is not a row
+        rows = count_rows(export_format, compressed, bytes(kept), 1 if export_format == "csv" else 0)
+        if rows != args.items:
+            raise SystemExit(f"{result['format']}: exported {rows} rows, expected {args.items}")
+    return result
+
+
+def main():
+    """Seeds the fake, streams every requested export and prints a table"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--formats", default="csv,ndjson,columnar")
+    parser.add_argument("--page-size", type=int, default=0, help="Query Limit, 0 for 1 MB pages")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake AWS latency per page, seconds")
+    parser.add_argument("--no-gzip", action="store_true", help="skip the gzip variants")
+    parser.add_argument("--memory", action="store_true", help="trace peak memory while streaming")
+    parser.add_argument("--verify", action="store_true", help="keep the output and check the row count")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    configure_environment(args.latency)
+    # pylint: disable=C0415
+    import logging
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    user_sub = "bench-user"
+    started = time.perf_counter()
+    dynamo_db_client = seed(args.items, user_sub)
+    print(f"seeded {args.items} medicines in {time.perf_counter() - started:.1f}s")
+
+    results = []
+    print(f"{'format':>12} {'seconds':>8} {'rows/s':>10} {'MB':>8} {'chunks':>7} {'peak MB':>8}")
+    for export_format in args.formats.split(","):
+        for compressed in (False,) if args.no_gzip else (False, True):
+            row = asyncio.run(run(dynamo_db_client, user_sub, export_format, compressed, args))
+            results.append(row)
+            print(
+                f"{row['format']:>12} {row['seconds']:>8.2f} {row['rows_per_second']:>10.0f} "
+                f"{row['megabytes']:>8.1f} {row['chunks']:>7} "
+                + ("-" if row["peak_megabytes"] is None else f"{row['peak_megabytes']:.1f}").rjust(8)
+            )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"arguments": vars(args), "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark for keystroke search over one large inventory.
+
+Builds an InventoryIndex over generated items once, then replays the
+prefixes a user produces while typing, with and without filters, and
+reports per-query latency for one visible page:
+
+    python -m benchmarks.bench_inventory_search --items 20000 --page-size 50
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_medicine_model import make_items
+from src.modules.services.search.inventory_index import (
+    InventoryIndex,
+    SearchQuery,
+    parse_sort,
+)
+
+TYPED_WORDS = ("medicine 1234", "med 99", "m", "tab")
+
+
+def main():
+    """Times index build and typed-prefix queries"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    started = time.perf_counter()
+    index = InventoryIndex(items)
+    print(f"build: {(time.perf_counter() - started) * 1e3:.1f} ms for {len(index)} items")
+
+    scenarios = {
+        "name prefix": lambda text: SearchQuery(q=text),
+        "prefix + expired, by expiration": lambda text: SearchQuery(
+            q=text, expired_only=True, sort=parse_sort("expiration")
+        ),
+        "prefix + quantity >= 100, by -quantity": lambda text: SearchQuery(
+            q=text, min_quantity=100, sort=parse_sort("-quantity")
+        ),
+    }
+    for name, build_query in scenarios.items():
+        timings = []
+        for word in TYPED_WORDS:
+            for length in range(1, len(word) + 1):
+                query = build_query(word[:length])
+                started = time.perf_counter()
+                index.search(query, 0, args.page_size)
+                timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(
+            f"{name:>40}: median {statistics.median(timings) * 1e3:6.2f} ms, "
+            f"max {timings[-1] * 1e3:6.2f} ms over {len(timings)} keystrokes"
+        )
+
+
+if __name__ == "__main__":
+    main()
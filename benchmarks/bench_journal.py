@@ -0,0 +1,273 @@
+"""
+Benchmark for the audit journal.
+
+First times concurrent quantity adjustments against the in-process AWS fake
+(with a per-call latency standing in for DynamoDB) with and without the
+journal, which turns each write into a transaction with its event, and
+checks that every write was journaled. Then builds
+a long history for one user (inserts, adjustments, edits and deletes),
+recording the table at checkpoints, and rebuilds the inventory as of each
+checkpoint from the nearest snapshot plus its tail, and by replaying the
+whole journal. Every rebuild must match the recorded table:
+
+    python -m benchmarks.bench_journal --workers 32 --writes 2000
+    python -m benchmarks.bench_journal --history 20000 --snapshot-every 500
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+from benchmarks.bench_load import MEDICINE_TYPES, percentile
+
+
+def configure_environment(latency: float):
+    """Selects the fake backend; must run before the app modules are imported"""
+    os.environ.update(
+        {
+            "AWS_BACKEND": "fake",
+            "FAKE_AWS_LATENCY": str(latency),
+            "FAKE_AWS_LATENCY_JITTER": "0",
+            "AWS_REGION": "us-east-1",
+            "DYNAMO_DB_TABLE_NAME": "bench-table",
+            "DYNAMO_DB_JOURNAL_TABLE_NAME": "bench-journal",
+            "AWS_MAX_WORKERS": "64",
+        }
+    )
+    os.environ.pop("DYNAMO_DB_SUMMARY_TABLE_NAME", None)
+
+
+def seed(dynamo_db_client, user_sub: str, count: int) -> list[str]:
+    """Loads `count` medicines straight into the fake; returns their ids"""
+    # pylint: disable=C0415
+    from src.modules.models.records.medicine import Medicine, current_month, format_month
+
+    items = []
+    for index in range(count):
+        expiry = format_month(current_month() + index % 24)
+        items.append(
+            Medicine(
+                user_sub=user_sub,
+                medicine_id=f"{index:06d}",
+                medicine_name=f"Medicine {index}",
+                medicine_type=MEDICINE_TYPES[index % len(MEDICINE_TYPES)],
+                quantity=100,
+                expiration_date=expiry,
+                expiration_month=current_month() + index % 24,
+                version=1,
+            ).to_dynamodb()
+        )
+    dynamo_db_client.client.load_items(dynamo_db_client.table_name, items)
+    return [item["medicine_id"]["S"] for item in items]
+
+
+def journal_keys(dynamo_db_client, user_sub: str) -> list[str]:
+    """Sort keys of the user's journal, straight from the fake"""
+    table = dynamo_db_client.client.tables[dynamo_db_client.journal_table_name]
+    return list(table.sort_keys.get(user_sub, []))
+
+
+async def time_writes(dynamo_db_client, user_sub: str, ids: list[str], args) -> dict:
+    """Runs `args.writes` quantity adjustments over `args.workers` workers"""
+    from src.modules.models.inputs.app_inputs import QuantityAdjustmentInput  # pylint: disable=C0415
+
+    remaining = iter(range(args.writes))
+    latencies = []
+
+    async def worker():
+        for number in remaining:
+            adjustment = QuantityAdjustmentInput(
+                user_sub=user_sub, medicine_id=ids[number % len(ids)], delta=1
+            )
+            started = time.perf_counter()
+            response = await dynamo_db_client.adjust_quantity(adjustment)
+            latencies.append(time.perf_counter() - started)
+            if "error" in response:
+                raise SystemExit(f"adjustment failed: {response}")
+
+    started = time.perf_counter()
+    async with asyncio.TaskGroup() as group:
+        for _ in range(args.workers):
+            group.create_task(worker())
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "per_second": args.writes / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p95_ms": percentile(latencies, 0.95) * 1e3,
+        "mean_ms": statistics.fmean(latencies) * 1e3,
+    }
+
+
+async def write_path(args):
+    """Write latency with and without the journal"""
+    # pylint: disable=C0415
+    from src.modules.config.journal_settings import JournalSettings
+    from src.modules.services.aws.dynamodb_service import DynamoDBClient
+    from src.modules.services.journal.audit_journal import AuditJournal
+
+    print(f"{'writes':<16} {'ok/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'mean ms':>8} {'journaled':>9} {'txns':>6}")
+    for journaled in (False, True):
+        dynamo_db_client = DynamoDBClient()
+        journal = None
+        if journaled:
+            journal = AuditJournal(dynamo_db_client, JournalSettings(journal_snapshot_every=10**9))
+        else:
+            journal_table_name, dynamo_db_client.journal_table_name = dynamo_db_client.journal_table_name, None
+        user_sub = "journal-on" if journaled else "journal-off"
+        ids = seed(dynamo_db_client, user_sub, args.medicines)
+        transactions_before = dynamo_db_client.client.calls.get("TransactWriteItems", 0)
+        result = await time_writes(dynamo_db_client, user_sub, ids, args)
+        if journal is not None:
+            await journal.close()
+        else:
+            # Only to look the events up
+            dynamo_db_client.journal_table_name = journal_table_name
+        events = len(journal_keys(dynamo_db_client, user_sub))
+        transactions = dynamo_db_client.client.calls.get("TransactWriteItems", 0) - transactions_before
+        label = "with journal" if journaled else "without journal"
+        print(
+            f"{label:<16} {result['per_second']:>7.0f} {result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f} "
+            f"{result['mean_ms']:>8.2f} {events:>9} {transactions:>6}"
+        )
+        if journaled and events != args.writes:
+            raise SystemExit(f"{args.writes - events} writes were not journaled")
+
+
+async def build_history(dynamo_db_client, journal, user_sub: str, args) -> list[tuple[datetime, dict]]:
+    """Writes a journaled history from an empty inventory; returns (time, table contents) checkpoints"""
+    # pylint: disable=C0415
+    from src.modules.models.inputs.app_inputs import (
+        MedicineInput,
+        QuantityAdjustmentInput,
+        UpdateMedicineInput,
+    )
+
+    rng = random.Random(5)
+    table = dynamo_db_client.client.tables[dynamo_db_client.table_name]
+    ids = []
+    for number in range(args.medicines):
+        response = await dynamo_db_client.insert_medicine(
+            MedicineInput(
+                user_sub=user_sub,
+                medicine_name=f"Medicine {number}",
+                medicine_type=MEDICINE_TYPES[number % len(MEDICINE_TYPES)],
+                quantity=100,
+                expiration_date="2030-01",
+            )
+        )
+        ids.append(response["medicine_id"])
+    checkpoints = []
+    every = max(1, args.history // args.checkpoints)
+    for number in range(1, args.history + 1):
+        roll = rng.random()
+        if roll < 0.05 or not ids:
+            response = await dynamo_db_client.insert_medicine(
+                MedicineInput(
+                    user_sub=user_sub,
+                    medicine_name=f"Restock {number}",
+                    medicine_type=rng.choice(MEDICINE_TYPES),
+                    quantity=rng.randint(1, 100),
+                    expiration_date="2030-01",
+                )
+            )
+            ids.append(response["medicine_id"])
+        elif roll < 0.08:
+            response = await dynamo_db_client.delete_medicine(user_sub, ids.pop(rng.randrange(len(ids))))
+        elif roll < 0.20:
+            response = await dynamo_db_client.edit_medicine(
+                UpdateMedicineInput(user_sub=user_sub, medicine_id=rng.choice(ids), medicine_name=f"Renamed {number}")
+            )
+        else:
+            response = await dynamo_db_client.adjust_quantity(
+                QuantityAdjustmentInput(user_sub=user_sub, medicine_id=rng.choice(ids), delta=rng.randint(1, 5))
+            )
+        if "error" in response:
+            raise SystemExit(f"history write failed: {response}")
+        if number % every == 0:
+            checkpoints.append((datetime.now(timezone.utc), copy.deepcopy(table.partitions.get(user_sub, {}))))
+            # Lets the journal snapshot between writes, as in the app
+            await asyncio.sleep(0)
+    return checkpoints
+
+
+async def point_in_time(args):
+    """Rebuilds the inventory at each checkpoint, from snapshots and from the whole journal"""
+    # pylint: disable=C0415,W0212
+    from src.modules.config.journal_settings import JournalSettings
+    from src.modules.services.aws.dynamodb_service import DynamoDBClient
+    from src.modules.services.journal.audit_journal import AuditJournal
+
+    dynamo_db_client = DynamoDBClient()
+    journal = AuditJournal(
+        dynamo_db_client,
+        JournalSettings(journal_snapshot_every=args.snapshot_every, journal_snapshot_lag=0.05),
+    )
+    user_sub = "history"
+    # History is written without latency, the rebuilds are timed with it
+    dynamo_db_client.client.latency.seconds = 0
+    started = time.perf_counter()
+    checkpoints = await build_history(dynamo_db_client, journal, user_sub, args)
+    while journal._snapshots:
+        await asyncio.sleep(0.05)
+    keys = journal_keys(dynamo_db_client, user_sub)
+    snapshots = len({key.rsplit("#", 1)[0] for key in keys if key.startswith("s#")})
+    print(
+        f"\nhistory: {args.history} writes over {args.medicines} medicines in {time.perf_counter() - started:.1f} s, "
+        f"{len(keys) - snapshots} journal items, {snapshots} snapshots"
+    )
+    dynamo_db_client.client.latency.seconds = args.latency
+
+    print(f"{'rebuild':<16} {'p50 ms':>7} {'max ms':>7} {'events':>8} {'calls':>6} {'mismatches':>10}")
+    for use_snapshots in (True, False):
+        timings, replayed, calls, mismatches = [], [], [], 0
+        for at, expected in checkpoints:
+            calls_before = sum(dynamo_db_client.client.calls.values())
+            started = time.perf_counter()
+            state, rebuilt = await journal.inventory_as_of(user_sub, at, use_snapshots=use_snapshots)
+            timings.append(time.perf_counter() - started)
+            calls.append(sum(dynamo_db_client.client.calls.values()) - calls_before)
+            replayed.append(rebuilt["events_replayed"])
+            mismatches += state.items != expected
+        timings.sort()
+        label = "snapshot + tail" if use_snapshots else "full replay"
+        print(
+            f"{label:<16} {percentile(timings, 0.5) * 1e3:>7.1f} {timings[-1] * 1e3:>7.1f} "
+            f"{statistics.fmean(replayed):>8.0f} {statistics.fmean(calls):>6.1f} {mismatches:>10}"
+        )
+        if mismatches:
+            raise SystemExit(f"{label}: {mismatches} of {len(checkpoints)} rebuilds differ from the table")
+    print("both rebuilds matched the table at every checkpoint")
+
+
+def main():
+    """Runs the benchmark and prints the results"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--medicines", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=20000, help="writes in the rebuilt history")
+    parser.add_argument("--checkpoints", type=int, default=20)
+    parser.add_argument("--snapshot-every", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.005, help="fake latency per call, seconds")
+    args = parser.parse_args()
+
+    configure_environment(args.latency)
+    import logging  # pylint: disable=C0415
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    async def run():
+        await write_path(args)
+        await point_in_time(args)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
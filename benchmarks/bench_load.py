@@ -0,0 +1,248 @@
+"""
+End-to-end load benchmark against the in-process AWS fake.
+
+Runs the real app (lifespan included) with AWS_BACKEND=fake, seeds users
+and inventories straight into the fake, then drives a weighted mix of
+/medkit, /add_medicine, /edit_medicine and login requests at a fixed
+concurrency through an in-process ASGI transport. Reports throughput and
+p50/p95/p99 latency per operation; no network or AWS account is involved:
+
+    python -m benchmarks.bench_load --users 50 --inventory 500 --concurrency 32
+    python -m benchmarks.bench_load --mix medkit=1 --page-size 0 --latency 0.02
+    python -m benchmarks.bench_load --duration 30 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import uuid
+
+# Scenarios and the status each one answers with on success
+EXPECTED_STATUS = {"medkit": 200, "add": 303, "edit": 303, "login": 302}
+DEFAULT_MIX = "medkit=60,add=15,edit=15,login=10"
+PASSWORD = "Bench-passw0rd"
+MEDICINE_TYPES = ("pill", "syrup", "drops", "ointment", "injection")
+
+
+def configure_environment(latency: float, jitter: float):
+    """Selects the fake backend; must run before the app is imported"""
+    os.environ.update(
+        {
+            "AWS_BACKEND": "fake",
+            "FAKE_AWS_LATENCY": str(latency),
+            "FAKE_AWS_LATENCY_JITTER": str(jitter),
+            "AWS_REGION": "us-east-1",
+            "DYNAMO_DB_TABLE_NAME": "bench-table",
+            "APP_CLIENT_ID": "bench",
+            "APP_CLIENT_SECRET": "bench",
+            # Every request comes from one address, and alerts would add scans
+            "AUTH_RATE_LIMIT_ENABLED": "false",
+            "EXPIRY_ALERTS_ENABLED": "false",
+        }
+    )
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """Parses 'medkit=60,add=15' into scenario weights"""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in EXPECTED_STATUS:
+            raise SystemExit(f"Unknown scenario {name!r}, expected one of {sorted(EXPECTED_STATUS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def random_medicine(rng: random.Random, index: int) -> dict:
+    """Form fields of a plausible medicine"""
+    return {
+        "medicine_name": f"Medicine {rng.choice('ABCDEFGHIJ')}{index}",
+        "medicine_type": rng.choice(MEDICINE_TYPES),
+        "quantity": rng.randint(0, 200),
+        "expiration_date": f"{rng.randint(2024, 2029)}-{rng.randint(1, 12):02d}",
+    }
+
+
+def seed(users: int, inventory: int, rng: random.Random) -> list[dict]:
+    """Creates users with tokens and inventories directly in the fakes"""
+    # pylint: disable=C0415
+    from src.modules.dependencies import get_cognito_client, get_dynamo_db_client
+    from src.modules.models.inputs.app_inputs import MedicineInput
+    from src.modules.models.records.medicine import Medicine
+
+    cognito = get_cognito_client().client
+    dynamo_db_client = get_dynamo_db_client()
+    accounts = []
+    for number in range(users):
+        email = f"user{number}@bench.local"
+        user_sub = cognito.add_user(email, PASSWORD)
+        items = [
+            Medicine.from_input(
+                MedicineInput(user_sub=user_sub, **random_medicine(rng, index)), str(uuid.uuid4())
+            ).to_dynamodb()
+            for index in range(inventory)
+        ]
+        dynamo_db_client.client.load_items(dynamo_db_client.table_name, items)
+        accounts.append(
+            {
+                "email": email,
+                "cookie": f"session_token={cognito.issue_token(user_sub)}",
+                "medicine_ids": [item["medicine_id"]["S"] for item in items],
+            }
+        )
+    return accounts
+
+
+async def run_scenario(client, name: str, account: dict, rng: random.Random, page_size: int):
+    """Issues one request of a scenario and returns its status code"""
+    headers = {"Cookie": account["cookie"]}
+    if name == "medkit":
+        params = {"page_size": page_size} if page_size else {}
+        response = await client.get("/medkit", params=params, headers=headers)
+    elif name == "add":
+        response = await client.post(
+            "/add_medicine", data=random_medicine(rng, rng.randint(0, 10**6)), headers=headers
+        )
+    elif name == "edit":
+        if not account["medicine_ids"]:
+            return EXPECTED_STATUS["edit"]
+        response = await client.post(
+            "/edit_medicine",
+            data={
+                "medicine_id": rng.choice(account["medicine_ids"]),
+                **random_medicine(rng, rng.randint(0, 10**6)),
+            },
+            headers=headers,
+        )
+    else:
+        response = await client.post(
+            "/submit-login", data={"email": account["email"], "password": PASSWORD}
+        )
+    return response.status_code
+
+
+async def drive(app, accounts, mix, args) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    """Runs the workload; returns latencies and errors per scenario, and wall time"""
+    import httpx  # pylint: disable=C0415
+
+    names, weights = list(mix), list(mix.values())
+    latencies: dict[str, list[float]] = {name: [] for name in names}
+    errors: dict[str, int] = {name: 0 for name in names}
+    remaining = args.requests
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    async def worker(worker_id: int):
+        nonlocal remaining
+        rng = random.Random(args.seed + worker_id)
+        while True:
+            if deadline is not None:
+                if time.monotonic() >= deadline:
+                    return
+            else:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+            name = rng.choices(names, weights)[0]
+            account = rng.choice(accounts)
+            started = time.perf_counter()
+            try:
+                status = await run_scenario(client, name, account, rng, args.page_size)
+            except Exception:  # pylint: disable=W0718
+                status = None
+            latencies[name].append(time.perf_counter() - started)
+            if status != EXPECTED_STATUS[name]:
+                errors[name] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Let the background warm-up finish before measuring
+            await asyncio.sleep(0.2)
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(number) for number in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def report(latencies, errors, elapsed: float) -> dict:
+    """Prints a table per scenario and returns the same numbers as a dict"""
+    results = {}
+    print(f"{'scenario':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    everything = sorted(value for values in latencies.values() for value in values)
+    rows = [(name, sorted(values)) for name, values in latencies.items()] + [("total", everything)]
+    for name, values in rows:
+        row = {
+            "requests": len(values),
+            "errors": sum(errors.values()) if name == "total" else errors[name],
+            "throughput": len(values) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "max_ms": (values[-1] if values else 0.0) * 1000,
+        }
+        results[name] = row
+        print(
+            f"{name:>8} {row['requests']:>9} {row['errors']:>7} {row['throughput']:>9.1f} "
+            f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+        )
+    return results
+
+
+def main():
+    """Seeds the fake, runs the workload and prints the report"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--inventory", type=int, default=200, help="medicines per user")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=None, help="seconds, overrides --requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--page-size", type=int, default=50, help="0 renders the whole inventory")
+    parser.add_argument("--latency", type=float, default=0.005, help="fake AWS latency, seconds")
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    configure_environment(args.latency, args.jitter)
+    # pylint: disable=C0415
+    import logging
+
+    from src.main import app
+    from src.modules.dependencies import get_cognito_client, get_dynamo_db_client
+
+    # Per-request info logs would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    mix = parse_mix(args.mix)
+    started = time.perf_counter()
+    accounts = seed(args.users, args.inventory, random.Random(args.seed))
+    print(
+        f"seeded {args.users} users x {args.inventory} medicines in "
+        f"{time.perf_counter() - started:.1f}s; concurrency {args.concurrency}, "
+        f"AWS latency {args.latency * 1000:.0f}+{args.jitter * 1000:.0f} ms"
+    )
+    latencies, errors, elapsed = asyncio.run(drive(app, accounts, mix, args))
+    results = report(latencies, errors, elapsed)
+    calls = {**get_dynamo_db_client().client.calls, **get_cognito_client().client.calls}
+    print("AWS calls: " + ", ".join(f"{name} {count}" for name, count in sorted(calls.items())))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"arguments": vars(args), "elapsed": elapsed, "results": results, "aws_calls": calls}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
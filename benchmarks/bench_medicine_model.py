@@ -0,0 +1,102 @@
+"""
+Micro-benchmark for deserializing DynamoDB items on the medkit path.
+
+Compares the previous per-row dict building (datetime.strptime per item,
+quantity kept as a string) with Medicine.from_dynamodb, reporting the
+per-item cost and the memory retained at the given inventory size:
+
+    python -m benchmarks.bench_medicine_model --items 100000
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from src.modules.models.records.medicine import Medicine
+
+
+def make_items(count: int) -> list[dict]:
+    """Generates DynamoDB wire-format items with realistic month spread"""
+    return [
+        {
+            "user_sub": {"S": "bench-user"},
+            "medicine_id": {"S": str(uuid.uuid4())},
+            "medicine_name": {"S": f"Medicine {index}"},
+            "medicine_type": {"S": random.choice(("tablet", "syrup", "ointment"))},
+            "quantity": {"N": str(random.randint(0, 500))},
+            "expiration_date": {
+                "S": f"{random.randint(2020, 2030)}-{random.randint(1, 12):02d}"
+            },
+        }
+        for index in range(count)
+    ]
+
+
+def legacy_rows(items: list[dict]) -> list[dict]:
+    """The dict building get_medkit used before the Medicine record"""
+
+    def parse_date(date_str):
+        try:
+            return datetime.strptime(date_str, "%Y-%m").date().replace(day=1)
+        except ValueError:
+            return None
+
+    today = datetime.now().date().replace(day=1)
+    return [
+        {
+            "medicine_name": item.get("medicine_name", {}).get("S", "Unknown"),
+            "medicine_type": item.get("medicine_type", {}).get("S", "Unknown"),
+            "quantity": item.get("quantity", {}).get("N", "0"),
+            "expiration_date": item.get("expiration_date", {}).get("S", "N/A"),
+            "medicine_id": item.get("medicine_id", {}).get("S", ""),
+            "is_expired": parse_date(item.get("expiration_date", {}).get("S", "N/A")) < today,
+        }
+        for item in items
+    ]
+
+
+def medicine_rows(items: list[dict]) -> list[Medicine]:
+    """The current deserialization path, including is_expired evaluation"""
+    rows = [Medicine.from_dynamodb(item) for item in items]
+    for row in rows:
+        _ = row.is_expired
+    return rows
+
+
+def measure(name: str, build, items: list[dict]):
+    """Prints per-item time and retained memory for one builder"""
+    gc.collect()
+    started = time.perf_counter()
+    build(items)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    rows = build(items)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+
+    print(
+        f"{name:>8}: {elapsed * 1e6 / len(items):6.2f} us/item, "
+        f"{retained / 2**20:7.1f} MiB retained for {len(items)} items"
+    )
+
+
+def main():
+    """Runs both builders over the same generated items"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100_000)
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    measure("legacy", legacy_rows, items)
+    measure("Medicine", medicine_rows, items)
+
+
+if __name__ == "__main__":
+    main()
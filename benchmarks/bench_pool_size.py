@@ -0,0 +1,72 @@
+"""
+Load test for the boto3 connection pool size.
+
+Runs the same burst of concurrent DynamoDB queries against the local stub
+server with different AWS_MAX_POOL_CONNECTIONS values and prints the
+throughput for each:
+
+    python -m benchmarks.bench_pool_size --requests 400 --pools 2,8,16,32,64
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.stub_server import configure_environment, start_stub_server
+
+
+async def burst(client, table_name: str, requests: int):
+    """Fires `requests` concurrent queries through the shared executor"""
+    # pylint: disable=C0415
+    from src.modules.utils.aws_helpers import call_aws
+
+    await asyncio.gather(
+        *(
+            call_aws(
+                client.query,
+                TableName=table_name,
+                KeyConditionExpression="user_sub = :user_sub",
+                ExpressionAttributeValues={":user_sub": {"S": "bench-user"}},
+            )
+            for _ in range(requests)
+        )
+    )
+
+
+def main():
+    """Measures throughput for each pool size"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--pools", default="2,8,16,32,64")
+    args = parser.parse_args()
+
+    server = start_stub_server(delay=args.delay)
+    configure_environment(server)
+
+    # pylint: disable=C0415
+    from src.modules.config.aws_settings import DynamoDBSettings
+    from src.modules.services.aws.client_factory import get_aws_client
+    from src.modules.utils import aws_helpers
+
+    for pool_size in (int(size) for size in args.pools.split(",")):
+        # Give the executor as many threads as sockets so the pool is the limit
+        settings = DynamoDBSettings(aws_max_pool_connections=pool_size)
+        aws_helpers.shutdown_aws_executor()
+        aws_helpers.get_aws_executor(max_workers=pool_size)
+        client = get_aws_client("dynamodb", settings)
+
+        asyncio.run(burst(client, settings.table_name, pool_size))  # warm the pool
+        started = time.perf_counter()
+        asyncio.run(burst(client, settings.table_name, args.requests))
+        elapsed = time.perf_counter() - started
+        print(
+            f"pool={pool_size:>3}: {args.requests} requests in {elapsed:.2f}s "
+            f"({args.requests / elapsed:.1f} req/s)"
+        )
+    aws_helpers.shutdown_aws_executor()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
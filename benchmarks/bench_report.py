@@ -0,0 +1,122 @@
+"""
+Benchmark for the cross-user inventory report.
+
+Seeds many users' inventories into the in-process AWS fake (with a per-call
+latency standing in for DynamoDB's page read time) and builds the report
+sequentially and with parallel segments, then once more paced to a read
+capacity budget. Reports wall time, items/s and the projected time for a
+10M-item table at the same rate:
+
+    python -m benchmarks.bench_report --items 500000 --users 5000
+    python -m benchmarks.bench_report --configs 1x1,8x8,32x16 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.bench_load import MEDICINE_TYPES
+
+PROJECTED_ITEMS = 10_000_000
+
+
+def configure_environment(latency: float):
+    """Selects the fake backend; must run before the app modules are imported"""
+    os.environ.update(
+        {
+            "AWS_BACKEND": "fake",
+            "FAKE_AWS_LATENCY": str(latency),
+            "FAKE_AWS_LATENCY_JITTER": "0",
+            "AWS_REGION": "us-east-1",
+            "DYNAMO_DB_TABLE_NAME": "bench-table",
+            "AWS_MAX_WORKERS": "64",
+        }
+    )
+
+
+def seed(items: int, users: int, batch: int = 50_000):
+    """Loads `items` medicines spread over `users` into the fake"""
+    from src.modules.dependencies import get_dynamo_db_client  # pylint: disable=C0415
+
+    rng = random.Random(1)
+    dynamo_db_client = get_dynamo_db_client()
+    for first in range(0, items, batch):
+        dynamo_db_client.client.load_items(
+            dynamo_db_client.table_name,
+            [
+                {
+                    "user_sub": {"S": f"user-{index % users:06d}"},
+                    "medicine_id": {"S": f"{index:012d}"},
+                    "medicine_name": {"S": f"Medicine {index}"},
+                    "medicine_type": {"S": rng.choice(MEDICINE_TYPES)},
+                    "quantity": {"N": str(rng.randint(0, 200))},
+                    "expiration_date": {"S": f"{rng.randint(2022, 2029)}-{rng.randint(1, 12):02d}"},
+                    "version": {"N": "1"},
+                }
+                for index in range(first, min(items, first + batch))
+            ],
+        )
+    return dynamo_db_client
+
+
+def main():
+    """Seeds the fake and times the report for each configuration"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument(
+        "--configs", default="1x1,4x4,16x8,32x16", help="segments x concurrency, comma separated"
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="fake latency per page, seconds")
+    parser.add_argument(
+        "--max-read-units", type=float, default=300.0,
+        help="budget for one extra paced run with the last config, 0 to skip",
+    )
+    args = parser.parse_args()
+
+    configure_environment(args.latency)
+    # pylint: disable=C0415
+    import logging
+
+    from src.modules.config.report_settings import ReportSettings
+    from src.modules.services.reporting.inventory_report import build_inventory_report
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    dynamo_db_client = seed(args.items, args.users)
+    print(f"seeded {args.items} medicines for {args.users} users in {time.perf_counter() - started:.1f}s")
+
+    runs = [(config, 0.0) for config in args.configs.split(",")]
+    if args.max_read_units:
+        runs.append((runs[-1][0], args.max_read_units))
+    print(f"{'segments':>8} {'workers':>7} {'RCU/s cap':>9} {'seconds':>8} {'items/s':>9} {'RCU/s':>8} {'10M est':>8}")
+    baseline = None
+    for config, max_read_units in runs:
+        segments, _, concurrency = config.partition("x")
+        settings = ReportSettings(
+            report_scan_segments=int(segments),
+            report_scan_concurrency=int(concurrency or segments),
+            report_scan_page_size=args.page_size,
+            report_max_read_units=max_read_units,
+        )
+        started = time.perf_counter()
+        report = asyncio.run(build_inventory_report(dynamo_db_client, settings))
+        elapsed = time.perf_counter() - started
+        if report.totals().medicines != args.items or report.users != args.users:
+            raise SystemExit(f"{config}: report counted {report.totals().medicines} items, {report.users} users")
+        baseline = baseline or elapsed
+        rate = args.items / elapsed
+        print(
+            f"{settings.report_scan_segments:>8} {settings.report_scan_concurrency:>7} "
+            f"{max_read_units or '-':>9} {elapsed:>8.2f} {rate:>9.0f} "
+            f"{report.consumed_capacity / elapsed:>8.0f} {PROJECTED_ITEMS / rate / 60:>7.1f}m"
+            + ("" if elapsed == baseline else f"  x{baseline / elapsed:.1f}")
+        )
+
+
+if __name__ == "__main__":
+    main()
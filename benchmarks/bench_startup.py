@@ -0,0 +1,81 @@
+"""
+Import-time benchmark and regression gate for the app module.
+
+Imports `src.main` in fresh interpreters under `python -X importtime`,
+reports the median total and the slowest first-party modules, and exits
+non-zero if the median exceeds `--max-ms` or if a module that must stay
+lazy (boto3/botocore by default) is imported:
+
+    python -m benchmarks.bench_startup --runs 5 --max-ms 1500
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Loaded on first client use, see services/aws/client_factory.py
+LAZY_MODULES = ("boto3", "botocore")
+
+
+def import_profile(module: str) -> dict[str, tuple[int, int]]:
+    """Imports `module` in a fresh interpreter; returns name -> (self us, cumulative us)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def main() -> int:
+    """Runs the benchmark and applies the gates"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="src.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument("--lazy", default=",".join(LAZY_MODULES))
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [profile[args.module][1] / 1000 for profile in profiles]
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.0f} ms, min {min(totals):.0f} ms")
+
+    first_party = sorted(
+        (
+            (self_us, name)
+            for name, (self_us, _) in profiles[-1].items()
+            if name.startswith("src.")
+        ),
+        reverse=True,
+    )
+    for self_us, name in first_party[:10]:
+        print(f"  {self_us / 1000:7.1f} ms self  {name}")
+
+    failed = False
+    eager = [
+        name
+        for name in profiles[-1]
+        if name.split(".")[0] in {lazy for lazy in args.lazy.split(",") if lazy}
+    ]
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(sorted(eager)[:5])}")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"FAIL: median {median:.0f} ms exceeds {args.max_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
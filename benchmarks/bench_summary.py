@@ -0,0 +1,174 @@
+"""
+Benchmark for the per-user inventory summaries.
+
+Seeds one user per inventory size into the in-process AWS fake (with a
+per-call latency standing in for DynamoDB) and compares the dashboard read
+from the summary item with the full partition query it replaces, in time
+and read capacity. Then times inserts with and without the summary
+transaction, and checks the maintained summaries against a recount:
+
+    python -m benchmarks.bench_summary --sizes 100,1000,10000,50000
+    python -m benchmarks.bench_summary --latency 0.005 --writes 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from benchmarks.bench_load import MEDICINE_TYPES
+
+
+def configure_environment(latency: float):
+    """Selects the fake backend; must run before the app modules are imported"""
+    os.environ.update(
+        {
+            "AWS_BACKEND": "fake",
+            "FAKE_AWS_LATENCY": str(latency),
+            "FAKE_AWS_LATENCY_JITTER": "0",
+            "AWS_REGION": "us-east-1",
+            "DYNAMO_DB_TABLE_NAME": "bench-table",
+            "DYNAMO_DB_SUMMARY_TABLE_NAME": "bench-summaries",
+        }
+    )
+
+
+def random_item(rng: random.Random, user_sub: str, index: int) -> dict:
+    """One seeded medicine record"""
+    return {
+        "user_sub": {"S": user_sub},
+        "medicine_id": {"S": f"{index:012d}"},
+        "medicine_name": {"S": f"Medicine {index}"},
+        "medicine_type": {"S": rng.choice(MEDICINE_TYPES)},
+        "quantity": {"N": str(rng.randint(0, 200))},
+        "expiration_date": {"S": f"{rng.randint(2022, 2029)}-{rng.randint(1, 12):02d}"},
+        "version": {"N": "1"},
+    }
+
+
+async def time_reads(dynamo_db_client, user_sub: str, repeats: int) -> dict:
+    """Dashboard figures from the summary item vs. from a full partition query"""
+    # pylint: disable=C0415
+    from src.modules.models.records.medicine import Medicine
+    from src.modules.models.records.summary import SUMMARY_FIELDS, InventorySummary
+    from src.modules.utils.aws_helpers import call_aws
+
+    summary_times, query_times = [], []
+    summary_units = query_units = 0.0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        response = await call_aws(
+            dynamo_db_client.client.get_item,
+            TableName=dynamo_db_client.summary_table_name,
+            Key={"user_sub": {"S": user_sub}},
+        )
+        from_summary = InventorySummary.from_dynamodb(response["Item"])
+        summary_times.append(time.perf_counter() - started)
+        summary_units = response.get("ConsumedCapacity", {}).get("CapacityUnits", 0.0)
+
+        started = time.perf_counter()
+        recounted = InventorySummary(user_sub)
+        query_units = 0.0
+        start_key = None
+        while True:
+            page = await dynamo_db_client._query_medicines(  # pylint: disable=W0212
+                user_sub, start_key=start_key, projection=sorted(SUMMARY_FIELDS)
+            )
+            query_units += page.get("ConsumedCapacity", {}).get("CapacityUnits", 0.0)
+            for item in page.get("Items", []):
+                recounted.add(Medicine.from_dynamodb(item))
+            if not (start_key := page.get("LastEvaluatedKey")):
+                break
+        query_times.append(time.perf_counter() - started)
+        if not from_summary.same_totals(recounted):
+            raise SystemExit(f"{user_sub}: summary differs from the recount")
+    return {
+        "summary_ms": statistics.median(summary_times) * 1e3,
+        "query_ms": statistics.median(query_times) * 1e3,
+        "summary_units": summary_units,
+        "query_units": query_units,
+    }
+
+
+async def time_inserts(dynamo_db_client, user_sub: str, writes: int, with_summary: bool) -> float:
+    """Median insert latency in ms, with or without the summary transaction"""
+    from src.modules.models.inputs.app_inputs import MedicineInput  # pylint: disable=C0415
+
+    summary_table_name = dynamo_db_client.summary_table_name
+    dynamo_db_client.summary_table_name = summary_table_name if with_summary else None
+    rng = random.Random(2)
+    times = []
+    try:
+        for number in range(writes):
+            medicine_input = MedicineInput(
+                user_sub=user_sub,
+                medicine_name=f"Written {number}",
+                medicine_type=rng.choice(MEDICINE_TYPES),
+                quantity=rng.randint(0, 200),
+                expiration_date=f"{rng.randint(2022, 2029)}-{rng.randint(1, 12):02d}",
+            )
+            started = time.perf_counter()
+            response = await dynamo_db_client.insert_medicine(medicine_input)
+            times.append(time.perf_counter() - started)
+            if "error" in response:
+                raise SystemExit(response["error"])
+    finally:
+        dynamo_db_client.summary_table_name = summary_table_name
+    return statistics.median(times) * 1e3
+
+
+async def run(args):
+    """Seeds the inventories, then times reads and writes"""
+    # pylint: disable=C0415
+    from src.modules.dependencies import get_dynamo_db_client
+
+    dynamo_db_client = get_dynamo_db_client()
+    rng = random.Random(1)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    index = 0
+    for size in sizes:
+        user_sub = f"user-{size}"
+        items = [random_item(rng, user_sub, index + number) for number in range(size)]
+        index += size
+        dynamo_db_client.client.load_items(dynamo_db_client.table_name, items)
+        # Seeded items bypass the write paths; count them in once
+        await dynamo_db_client.rebuild_inventory_summary(user_sub)
+
+    print(f"{'medicines':>9} {'summary ms':>10} {'query ms':>9} {'summary RCU':>11} {'query RCU':>9}")
+    for size in sizes:
+        reads = await time_reads(dynamo_db_client, f"user-{size}", args.repeats)
+        print(
+            f"{size:>9} {reads['summary_ms']:>10.2f} {reads['query_ms']:>9.2f} "
+            f"{reads['summary_units']:>11.1f} {reads['query_units']:>9.1f}"
+        )
+
+    plain = await time_inserts(dynamo_db_client, "writer-plain", args.writes, False)
+    transactional = await time_inserts(dynamo_db_client, "writer-summary", args.writes, True)
+    print(f"insert p50: {plain:.2f} ms plain, {transactional:.2f} ms with the summary transaction")
+
+    stored, recounted = await dynamo_db_client.rebuild_inventory_summary("writer-summary", write=False)
+    if not stored.same_totals(recounted):
+        raise SystemExit("maintained summary drifted from the recount")
+    print(f"maintained summary matches a recount of {recounted.medicine_count} medicines")
+
+
+def main():
+    """Runs the benchmark and prints the results"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="inventory sizes, comma separated")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005, help="fake latency per call, seconds")
+    args = parser.parse_args()
+
+    configure_environment(args.latency)
+    import logging  # pylint: disable=C0415
+
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Requests/sec scaling of the gunicorn profile from 1 to N workers.
+
+For each worker count, starts `gunicorn -c src/gunicorn_conf.py` against the
+local AWS stub, drives it from several load processes with keep-alive
+connections for a fixed duration, and reports throughput and the speedup
+over one worker. Run it on a host with at least N free cores (plus some for
+the load generators), otherwise the workers only compete for the same CPU:
+
+    python -m benchmarks.bench_worker_scaling --workers 1,2,4 --duration 10
+    python -m benchmarks.bench_worker_scaling --path /medkit --path /api/v1/medicines
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.stub_server import configure_environment, start_stub_server
+from src.modules.utils.worker_helpers import available_cpus
+
+
+def free_port() -> int:
+    """Asks the OS for an unused local port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    """Starts gunicorn with `workers` workers and waits until it answers"""
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "BIND": f"127.0.0.1:{port}",
+        "EXPIRY_ALERTS_ENABLED": "false",
+    }
+    # Per-run shared files, so runs do not see each other's counters
+    for name, suffix in (
+        ("INVENTORY_CACHE_GENERATIONS_PATH", "generations"),
+        ("EXPIRY_ALERT_LOCK_PATH", "lock"),
+    ):
+        env[name] = f"/tmp/bench-worker-scaling-{port}.{suffix}"
+    process = subprocess.Popen(  # pylint: disable=R1732
+        [sys.executable, "-m", "gunicorn", "-c", "src/gunicorn_conf.py", "src.main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/login", timeout=1).status_code == 200:
+                # Let every worker finish booting before measuring
+                time.sleep(1 + workers * 0.2)
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"gunicorn with {workers} workers did not start")
+
+
+def stop_server(process: subprocess.Popen):
+    """Graceful shutdown through SIGTERM, then lifespan shutdown in each worker"""
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def drive(base_url: str, paths: list[str], connections: int, duration: float) -> tuple[int, int]:
+    """Keeps `connections` requests in flight for `duration` seconds; returns (ok, errors)"""
+    ok = errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, cookies={"session_token": "bench"}, timeout=10
+    ) as client:
+
+        async def loop(offset: int):
+            nonlocal ok, errors
+            count = offset
+            while time.monotonic() < deadline:
+                try:
+                    response = await client.get(paths[count % len(paths)])
+                    if response.status_code < 500:
+                        ok += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                count += 1
+
+        await asyncio.gather(*(loop(offset) for offset in range(connections)))
+    return ok, errors
+
+
+def load_process(base_url, paths, connections, duration, results):
+    """Entry point of one load generator process"""
+    results.put(asyncio.run(drive(base_url, paths, connections, duration)))
+
+
+def measure(port: int, paths: list[str], clients: int, connections: int, duration: float):
+    """Runs the load generators in parallel and returns (req/s, errors)"""
+    results = multiprocessing.Queue()
+    base_url = f"http://127.0.0.1:{port}"
+    processes = [
+        multiprocessing.Process(
+            target=load_process, args=(base_url, paths, connections, duration, results)
+        )
+        for _ in range(clients)
+    ]
+    for process in processes:
+        process.start()
+    totals = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    ok = sum(result[0] for result in totals)
+    return ok / duration, sum(result[1] for result in totals)
+
+
+def main():
+    """Measures every worker count and prints a scaling table"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", default=None, help="comma separated, default 1..CPUs")
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--clients", type=int, default=None, help="load processes")
+    parser.add_argument("--connections", type=int, default=32, help="per load process")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--delay", type=float, default=0.005, help="stub AWS latency")
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    counts = (
+        [int(count) for count in args.workers.split(",")]
+        if args.workers
+        else list(range(1, cpus + 1))
+    )
+    paths = args.paths or ["/login"]
+    clients = args.clients or max(1, cpus // 2)
+    server = start_stub_server(delay=args.delay)
+    configure_environment(server)
+    print(f"{cpus} CPUs available, {clients} load processes x {args.connections} connections")
+    if max(counts) > cpus:
+        print("note: more workers than CPUs, expect flat scaling beyond that point")
+
+    baseline = None
+    for workers in counts:
+        port = free_port()
+        process = start_server(workers, port)
+        try:
+            throughput, errors = measure(port, paths, clients, args.connections, args.duration)
+        finally:
+            stop_server(process)
+        baseline = baseline or throughput
+        print(
+            f"{workers:>3} workers: {throughput:9.1f} req/s  "
+            f"x{throughput / baseline:4.2f}  errors {errors}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
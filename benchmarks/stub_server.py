@@ -0,0 +1,58 @@
+"""Local stub of the AWS JSON endpoints used by the benchmarks"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubAwsHandler(BaseHTTPRequestHandler):
+    """Answers every AWS JSON-protocol call after a fixed delay"""
+
+    delay: float = 0.05
+
+    def do_POST(self):  # pylint: disable=C0103
+        """Returns an empty, well-formed response for the requested operation"""
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.delay)
+        target = self.headers.get("X-Amz-Target", "")
+        body = {}
+        if target.endswith(".Query") or target.endswith(".Scan"):
+            body = {"Items": [], "Count": 0, "ScannedCount": 0}
+        elif target.endswith(".GetUser"):
+            body = {"Username": "stub-user-sub", "UserAttributes": []}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-amz-json-1.0")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        """Silences per-request logging"""
+
+
+def start_stub_server(delay: float = 0.05, port: int = 0) -> ThreadingHTTPServer:
+    """Starts the stub server on a background thread and returns it"""
+    handler = type("Handler", (StubAwsHandler,), {"delay": delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def configure_environment(server: ThreadingHTTPServer):
+    """Points the AWS settings at the stub server"""
+    import os  # pylint: disable=C0415
+
+    os.environ.update(
+        {
+            "AWS_ACCESS_KEY_ID": "stub",
+            "AWS_SECRET_ACCESS_KEY": "stub",
+            "AWS_REGION": "us-east-1",
+            "AWS_ENDPOINT_URL": f"http://127.0.0.1:{server.server_address[1]}",
+            "DYNAMO_DB_TABLE_NAME": "stub-table",
+            "APP_CLIENT_ID": "stub",
+            "APP_CLIENT_SECRET": "stub",
+        }
+    )
@@ -11,9 +11,11 @@ module "pharma_tracker_pool" {
 }
 
 module "tablets_table" {
-  source     = "./modules/dynamo_db"
-  table_name = "MedicineTable-${var.env}"
-  tag        = var.tag
+  source             = "./modules/dynamo_db"
+  table_name         = "MedicineTable-${var.env}"
+  summary_table_name = "MedicineSummaryTable-${var.env}"
+  journal_table_name = "MedicineJournalTable-${var.env}"
+  tag                = var.tag
 }
 
 module "pharma_tracker_repo" {
@@ -12,6 +12,74 @@ resource "aws_dynamodb_table" "pharma_tracker_table" {
     name = "medicine_id"
     type = "S"
   }
+  attribute {
+    name = "expiration_date"
+    type = "S"
+  }
+  attribute {
+    name = "medicine_name_key"
+    type = "S"
+  }
+
+  # Expiry lookups ("expired", "expiring before YYYY-MM") per user
+  global_secondary_index {
+    name            = var.expiration_index_name
+    hash_key        = "user_sub"
+    range_key       = "expiration_date"
+    projection_type = "ALL"
+  }
+
+  # Name-ordered listing and prefix search on the normalized name
+  global_secondary_index {
+    name            = var.name_index_name
+    hash_key        = "user_sub"
+    range_key       = "medicine_name_key"
+    projection_type = "ALL"
+  }
+
+  tags = {
+    Project = var.tag
+  }
+}
+
+# Per-user inventory totals, written in the same transaction as the medicines
+resource "aws_dynamodb_table" "pharma_tracker_summary_table" {
+  name         = var.summary_table_name
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "user_sub"
+
+  attribute {
+    name = "user_sub"
+    type = "S"
+  }
+
+  tags = {
+    Project = var.tag
+  }
+}
+
+# Append-only audit journal: per user, events and snapshots in sort key order
+resource "aws_dynamodb_table" "pharma_tracker_journal_table" {
+  name         = var.journal_table_name
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "user_sub"
+  range_key    = "event_key"
+
+  attribute {
+    name = "user_sub"
+    type = "S"
+  }
+  attribute {
+    name = "event_key"
+    type = "S"
+  }
+
+  # Audit history must survive an accidental table deletion
+  deletion_protection_enabled = true
+
+  point_in_time_recovery {
+    enabled = true
+  }
 
   tags = {
     Project = var.tag
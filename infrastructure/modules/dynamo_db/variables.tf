@@ -4,4 +4,22 @@ variable "table_name" {
 }
 variable "tag" {
   type = string
-}
\ No newline at end of file
+}
+variable "expiration_index_name" {
+  type        = string
+  description = "Name of the GSI keyed by user_sub and expiration_date"
+  default     = "expiration_date_index"
+}
+variable "name_index_name" {
+  type        = string
+  description = "Name of the GSI keyed by user_sub and medicine_name_key"
+  default     = "medicine_name_index"
+}
+variable "summary_table_name" {
+  type        = string
+  description = "Name of the DynamoDB table holding per-user inventory summaries"
+}
+variable "journal_table_name" {
+  type        = string
+  description = "Name of the DynamoDB table holding the per-user audit journal"
+}
@@ -0,0 +1,61 @@
+// Suggests reference catalog medicines while a name is typed into the
+// add-medicine form, and fills in the type of the one picked.
+(function () {
+    "use strict";
+
+    var input = document.querySelector("input[data-catalog-type]");
+    var list = input && document.getElementById(input.getAttribute("list"));
+    if (!input || !list || !window.fetch) {
+        return;
+    }
+    var typeInput = document.getElementById(input.dataset.catalogType);
+    var types = {};
+    var timer = null;
+    var pending = null;
+
+    function show(items) {
+        list.replaceChildren();
+        types = {};
+        items.forEach(function (item) {
+            var option = document.createElement("option");
+            option.value = item.medicine_name;
+            if (item.medicine_type) {
+                option.label = item.medicine_type;
+            }
+            types[item.medicine_name] = item.medicine_type;
+            list.appendChild(option);
+        });
+    }
+
+    function suggest() {
+        var query = input.value.trim();
+        if (!query) {
+            show([]);
+            return;
+        }
+        // Only the latest keystroke's answer is shown
+        if (pending) {
+            pending.abort();
+        }
+        pending = new AbortController();
+        fetch("/catalog/autocomplete?q=" + encodeURIComponent(query), {
+            credentials: "same-origin",
+            signal: pending.signal,
+        })
+            .then(function (response) {
+                return response.ok ? response.json() : { items: [] };
+            })
+            .then(function (body) {
+                show(body.items);
+            })
+            .catch(function () {});
+    }
+
+    input.addEventListener("input", function () {
+        if (typeInput && types[input.value] && !typeInput.value) {
+            typeInput.value = types[input.value];
+        }
+        clearTimeout(timer);
+        timer = setTimeout(suggest, 120);
+    });
+})();
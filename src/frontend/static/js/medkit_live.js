@@ -0,0 +1,82 @@
+// Patches the medkit list in place from the /medkit/events stream, so edits
+// made on other terminals show up without reloading the page.
+(function () {
+    "use strict";
+
+    var list = document.getElementById("medicine-list");
+    var template = document.getElementById("medicine-item-template");
+    if (!list || !template || !window.EventSource) {
+        return;
+    }
+    var items = list.querySelector("ul");
+    var emptyNote = list.querySelector(".empty-note");
+    var notice = document.getElementById("live-notice");
+    // Only a page showing the whole, unfiltered inventory can take new rows
+    var complete = list.dataset.complete === "true";
+    var nextKey = 0;
+
+    function showNotice() {
+        notice.hidden = false;
+    }
+
+    function findItem(medicineId) {
+        return items.querySelector('li[data-medicine-id="' + CSS.escape(medicineId) + '"]');
+    }
+
+    function fill(item, medicine) {
+        item.dataset.medicineId = medicine.medicine_id;
+        item.querySelectorAll("[data-field]").forEach(function (element) {
+            element.textContent = medicine[element.dataset.field];
+        });
+        item.querySelectorAll("input[name]").forEach(function (input) {
+            // Leave half-typed edits alone
+            if (input.name in medicine && (input.type === "hidden" || input !== document.activeElement)) {
+                input.value = medicine[input.name];
+            }
+        });
+        item.querySelector("[data-expiration]").classList.toggle("expired", medicine.is_expired);
+        item.querySelector("[data-expired-note]").hidden = !medicine.is_expired;
+    }
+
+    function upsert(medicine) {
+        var item = findItem(medicine.medicine_id);
+        if (!item) {
+            if (!complete) {
+                showNotice();
+                return;
+            }
+            nextKey += 1;
+            var markup = template.innerHTML.replace(/__key__/g, "live-" + nextKey);
+            var holder = document.createElement("ul");
+            holder.innerHTML = markup;
+            item = holder.firstElementChild;
+            items.appendChild(item);
+            emptyNote.hidden = true;
+        }
+        fill(item, medicine);
+    }
+
+    function remove(medicineId) {
+        var item = findItem(medicineId);
+        if (item) {
+            item.remove();
+        }
+        emptyNote.hidden = items.children.length > 0;
+    }
+
+    var url = "/medkit/events";
+    if (list.dataset.liveCursor) {
+        url += "?last_event_id=" + encodeURIComponent(list.dataset.liveCursor);
+    }
+    var source = new EventSource(url);
+    source.addEventListener("upsert", function (event) {
+        upsert(JSON.parse(event.data));
+    });
+    source.addEventListener("delete", function (event) {
+        remove(JSON.parse(event.data).medicine_id);
+    });
+    source.addEventListener("resync", function () {
+        // Events were missed; the list can no longer be trusted
+        showNotice();
+    });
+})();
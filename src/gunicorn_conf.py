@@ -0,0 +1,67 @@
+"""
+Gunicorn configuration for multi-worker serving:
+
+    gunicorn -c src/gunicorn_conf.py src.main:app
+
+Each worker is a uvicorn event loop running the app's lifespan. The app is
+imported once in the master (preload_app) and forked, so workers share the
+imported code; AWS clients are created per worker after the fork.
+"""
+
+import os
+import tempfile
+
+from src.modules.services.catalog.medicine_catalog import load_catalog
+from src.modules.utils.worker_helpers import default_worker_count
+
+bind = os.getenv("BIND", "0.0.0.0:80")
+worker_class = "uvicorn.workers.UvicornWorker"
+# WEB_CONCURRENCY, else one worker per CPU allowed by the cgroup quota/affinity
+workers = default_worker_count()
+preload_app = True
+# Seconds a worker gets to finish in-flight requests and run lifespan shutdown
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+accesslog = os.getenv("ACCESS_LOG") or None
+
+# Settings are read at import, so the shared paths must be in the environment
+# before the app is preloaded. /dev/shm keeps the counters in memory.
+_shared_directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+if workers > 1:
+    os.environ.setdefault(
+        "INVENTORY_CACHE_GENERATIONS_PATH",
+        os.path.join(_shared_directory, "pharmatracker-inventory-generations"),
+    )
+    os.environ.setdefault(
+        "EXPIRY_ALERT_LOCK_PATH",
+        os.path.join(_shared_directory, "pharmatracker-expiry-alerts.lock"),
+    )
+    os.environ.setdefault(
+        "RATE_LIMIT_STATE_PATH",
+        os.path.join(_shared_directory, "pharmatracker-rate-limits"),
+    )
+
+
+def on_starting(server):
+    """Logs the effective worker setup and compiles the medicine catalog, once, from the master"""
+    server.log.info(
+        "Starting %s workers (generations: %s, expiry alert lock: %s, rate limits: %s)",
+        server.cfg.workers,
+        os.getenv("INVENTORY_CACHE_GENERATIONS_PATH") or "off",
+        os.getenv("EXPIRY_ALERT_LOCK_PATH") or "off",
+        os.getenv("RATE_LIMIT_STATE_PATH") or "per worker",
+    )
+    # Compiled once here so workers only map the index
+    catalog = load_catalog()
+    if catalog is not None:
+        server.log.info("Medicine catalog: %s entries in %s", len(catalog), catalog.path)
+        catalog.close()
+
+
+def on_exit(server):  # pylint: disable=W0613
+    """Removes the shared generations and rate limit files; a restart starts with empty caches"""
+    for name in ("INVENTORY_CACHE_GENERATIONS_PATH", "RATE_LIMIT_STATE_PATH"):
+        path = os.getenv(name)
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -1,39 +1,134 @@
 """Main entrypoint for the app"""
 
 # General
+import asyncio
 import logging
+import math
 from contextlib import asynccontextmanager
 from functools import wraps
-from datetime import datetime
+from urllib.parse import urlencode
 
 # FastAPI
-from fastapi import FastAPI, Request, Form, status
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import Depends, FastAPI, Request, Form, File, Query, UploadFile, status
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+)
 
 # Pydantic
 from pydantic import ValidationError
 
 # Internal
 from src.modules.models.inputs.app_inputs import (
+    DispenseInput,
     LoginInput,
     RegisterInput,
     MedicineInput,
+    QuantityAdjustmentInput,
     UpdateMedicineInput,
 )
+from src.modules.models.records.medicine import Medicine
+from src.modules.config.alert_settings import ExpiryAlertSettings
+from src.modules.config.aws_settings import BaseAwsSettings
+from src.modules.config.catalog_settings import CatalogSettings
+from src.modules.dependencies import (
+    get_auth_rate_limiter,
+    get_change_feed,
+    get_cognito_client,
+    get_dynamo_db_client,
+    get_expiry_alerts,
+    get_inventory_search,
+    get_medicine_catalog,
+    initialized,
+    warm_up,
+)
+from src.modules.routers import api_v1
+from src.modules.config.frontend_settings import FrontendSettings
 from src.modules.services.aws.cognito_service import CognitoClient
-from src.modules.services.aws.dynamodb_service import DynamoDBClient
+from src.modules.services.aws.dynamodb_service import BATCH_WRITE_SIZE, DynamoDBClient
+from src.modules.services.observability.instrumentation import MetricsMiddleware
+from src.modules.services.observability.metrics import (
+    cache_entries,
+    cache_hit_ratio,
+    change_feed_connections,
+    registry,
+)
+from src.modules.services.observability.tracing import exporter
+from src.modules.services.export.inventory_export import EXPORT_FORMATS, export_response
+from src.modules.services.realtime.change_feed import ChangeFeed, event_stream_response
+from src.modules.services.rendering.compression import SelectiveGZipMiddleware
+from src.modules.services.rendering.page_cache import PageCache
+from src.modules.services.rendering.static_files import (
+    STATIC_DIRECTORY,
+    CachedStaticFiles,
+    precompress_static,
+)
+from src.modules.services.rendering.templates import build_templates, precompile_templates
+from src.modules.services.search.inventory_index import SearchQuery, parse_sort
+from src.modules.services.search.inventory_search import InventorySearch
+from src.modules.services.security.rate_limiter import AuthRateLimiter
+from src.modules.utils.aws_helpers import shutdown_aws_executor
+from src.modules.utils.import_helpers import iter_import_rows
 
 
 # App configuration
 
+async def start_background_services():
+    """
+    Creates the AWS clients off the event loop, so the app accepts requests
+    immediately, then starts the expiry alert scheduler.
+    """
+    if BaseAwsSettings().aws_warm_up:
+        try:
+            await asyncio.to_thread(warm_up)
+            logger.info({"message": "AWS clients ready"})
+        except Exception as e:  # pylint: disable=W0718
+            # Surfaced again, per request, by the first route that needs the client
+            logger.error({"message": "AWS client warm-up failed", "error": str(e)})
+            return
+    try:
+        # Maps the catalog, compiling it if the CSV changed, before the first keystroke
+        await asyncio.to_thread(get_medicine_catalog)
+    except Exception as e:  # pylint: disable=W0718
+        logger.error({"message": "Medicine catalog failed to load", "error": str(e)})
+    try:
+        alerts_enabled = ExpiryAlertSettings().expiry_alerts_enabled
+    except ValidationError as e:
+        logger.error({"message": "Expiry alerts not started", "error": str(e)})
+        return
+    if alerts_enabled:
+        expiry_alerts = await asyncio.to_thread(get_expiry_alerts)
+        expiry_alerts.start()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):  # pylint: disable=W0613, W0621
     """Manages the startup and shutdown of the FastAPI application."""
-    print("Application has started")
+    if frontend_settings.production:
+        compiled = precompile_templates(templates)
+        logger.info({"message": f"Precompiled {compiled} templates"})
+    if frontend_settings.static_precompress:
+        try:
+            precompress_static()
+        except OSError as e:
+            # Read-only images still serve uncompressed (or gzipped per request)
+            logger.warning({"message": "Static precompression skipped", "error": str(e)})
+    logger.info({"message": "Application has started"})
+    background_startup = asyncio.create_task(start_background_services())
     yield
-    print("Application is shutting down")
+    logger.info({"message": "Application is shutting down"})
+    background_startup.cancel()
+    if change_feed := initialized("change_feed"):
+        change_feed.close()
+    if expiry_alerts := initialized("expiry_alerts"):
+        await expiry_alerts.stop()
+    if audit_journal := initialized("audit_journal"):
+        await audit_journal.close()
+    shutdown_aws_executor()
+    if exporter.enabled:
+        exporter.flush()
 
 
 logging.basicConfig(level=logging.INFO)
@@ -41,12 +136,22 @@ logger = logging.getLogger(__name__)
 
 
 app = FastAPI(lifespan=lifespan)
-templates = Jinja2Templates(directory="src/frontend/templates")
-app.mount("/static", StaticFiles(directory="src/frontend/static"), name="static")
-
+frontend_settings = FrontendSettings()
+templates = build_templates(frontend_settings)
+# Rendered once: these pages are the same for every user
+page_cache = PageCache(templates, enabled=frontend_settings.production)
+app.mount(
+    "/static",
+    CachedStaticFiles(directory=STATIC_DIRECTORY, max_age=frontend_settings.static_max_age),
+    name="static",
+)
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1000)
+# Outermost, so timings include compression
+app.add_middleware(MetricsMiddleware)
+app.include_router(api_v1.router)
 
-cognito_client = CognitoClient()
-dynamo_db_client = DynamoDBClient()
+# Upper bound on per-row errors echoed back by /import_medicines
+MAX_IMPORT_ERRORS = 1000
 
 
 def login_required(func):
@@ -66,7 +171,8 @@ def login_required(func):
             return RedirectResponse(
                 url="/login", status_code=status.HTTP_307_TEMPORARY_REDIRECT
             )
-        if "error" in cognito_client.get_current_user(token=token):
+        current_user = await get_cognito_client().get_current_user(token=token)
+        if "error" in current_user:
             redirect = RedirectResponse(
                 url="/login", status_code=status.HTTP_307_TEMPORARY_REDIRECT
             )
@@ -74,21 +180,49 @@ def login_required(func):
                 key="session_token", httponly=True, samesite="strict"
             )
             return redirect
+        # Resolved once here, handlers read it from request.state
+        request.state.user_sub = current_user["user_sub"]
         return await func(*args, **kwargs)
 
     return decorated_function
 
 
+def rate_limited_response(request: Request, template: str, wait: float):
+    """Re-renders an auth form with a 429 and a Retry-After header"""
+    retry_after = max(1, math.ceil(min(wait, 3600)))
+    return templates.TemplateResponse(
+        template,
+        {
+            "request": request,
+            "error_message": f"Too many attempts, try again in {retry_after} seconds",
+        },
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
 ### GET Endpoints ###
 
 @app.get("/", response_class=HTMLResponse)
 @login_required
-async def get_root(request: Request):
-    """Displays the login page."""
+async def get_root(
+    request: Request,
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+):
+    """
+    Displays the dashboard with the user's inventory summary, read with a
+    single GetItem. Without summaries the page is the same for every user.
+    """
+    summary = await dynamo_db_client.get_inventory_summary(request.state.user_sub)
+    if isinstance(summary, dict):
+        logger.warning({"message": "Inventory summary unavailable", "error": summary["error"]})
+        summary = None
+    if summary is None:
+        return page_cache.response(request, "index.html", {"success_message": "Welcome "})
     return templates.TemplateResponse(
         "index.html",
-        {"request": request, "success_message": "Welcome "}
-        )
+        {"request": request, "success_message": "Welcome ", "summary": summary.to_json()},
+    )
 
 
 @app.get("/login", response_class=HTMLResponse)
@@ -96,7 +230,7 @@ async def read_login(request: Request):
     """Displays the login page."""
     if request.cookies.get("session_token"):
         return RedirectResponse(url="/", status_code=status.HTTP_307_TEMPORARY_REDIRECT)
-    return templates.TemplateResponse("login.html", {"request": request})
+    return page_cache.response(request, "login.html")
 
 
 @app.get("/register", response_class=HTMLResponse)
@@ -104,61 +238,248 @@ async def read_register(request: Request):
     """Displays the registration page."""
     if request.cookies.get("session_token"):
         return RedirectResponse(url="/", status_code=status.HTTP_307_TEMPORARY_REDIRECT)
-    return templates.TemplateResponse("register.html", {"request": request})
+    return page_cache.response(request, "register.html")
 
 
 @app.get("/medkit", response_class=HTMLResponse)
 @login_required
-async def get_medkit(request: Request):
-    """Displays the medkit page with the list of medicines."""
+async def get_medkit(
+    request: Request,
+    page_size: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    page: int = Query(1, ge=1),
+    q: str | None = None,
+    medicine_type: str | None = None,
+    expired: bool = False,
+    min_quantity: int | None = Query(None, ge=0),
+    max_quantity: int | None = Query(None, ge=0),
+    sort: str | None = None,
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+    inventory_search: InventorySearch = Depends(get_inventory_search),
+    change_feed: ChangeFeed = Depends(get_change_feed),
+):
+    """
+    Displays the medkit page with the list of medicines.
+    Searching, filtering and sorting run on the user's in-memory index;
+    with `page_size` set only one page is rendered. A `cursor` (from older
+    links) pages straight through DynamoDB in name order instead.
+    """
 
-    token = request.cookies.get("session_token")
-    user_sub = cognito_client.get_current_user(token=token).get("user_sub")
+    user_sub = request.state.user_sub
+    # Taken before reading, so the live stream replays writes made meanwhile
+    live_cursor = change_feed.cursor(user_sub)
 
-    medicine_list = await dynamo_db_client.get_medicines_by_user_sub(user_sub)
+    if cursor:
+        result = await dynamo_db_client.get_medicines_page(
+            user_sub, page_size or 50, cursor, by_name=True
+        )
+        if "error" in result:
+            return templates.TemplateResponse(
+                "medkit.html",
+                {"request": request, "error_message": result["error"]},
+                status_code=result["status_code"],
+            )
+        return templates.TemplateResponse(
+            "medkit.html",
+            {
+                "request": request,
+                "medicines": [Medicine.from_dynamodb(item) for item in result["items"]],
+                "page_size": page_size or 50,
+                "next_cursor": result["next_cursor"],
+                "live_cursor": live_cursor,
+            },
+        )
 
-    def parse_date(date_str):
-        try:
-            return datetime.strptime(date_str, "%Y-%m").date().replace(day=1)
-        except ValueError:
-            return None
+    filters = {
+        "q": q or "",
+        "medicine_type": medicine_type or "",
+        "expired": expired,
+        "min_quantity": min_quantity,
+        "max_quantity": max_quantity,
+        "sort": sort or "",
+    }
+    try:
+        query = SearchQuery(
+            q=q,
+            medicine_type=medicine_type,
+            expired_only=expired,
+            min_quantity=min_quantity,
+            max_quantity=max_quantity,
+            sort=parse_sort(sort),
+        )
+    except ValueError as val_err:
+        return templates.TemplateResponse(
+            "medkit.html",
+            {"request": request, "error_message": str(val_err), "filters": filters},
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
 
-    today = datetime.now().date().replace(day=1)  # Get today's date
+    offset = (page - 1) * page_size if page_size else 0
+    result = await inventory_search.search(user_sub, query, offset, page_size)
+    if "error" in result:
+        return templates.TemplateResponse(
+            "medkit.html",
+            {"request": request, "error_message": result["error"], "filters": filters},
+            status_code=result["status_code"],
+        )
 
-    medicine = [
+    # Query string for page links, without empty filters
+    page_query = urlencode(
         {
-            "medicine_name": item.get("medicine_name", {}).get("S", "Unknown"),
-            "medicine_type": item.get("medicine_type", {}).get("S", "Unknown"),
-            "quantity": item.get("quantity", {}).get("N", "0"),
-            "expiration_date": item.get("expiration_date", {}).get("S", "N/A"),
-            "medicine_id": item.get("medicine_id", {}).get("S", ""),
-            "is_expired": parse_date(item.get("expiration_date", {}).get("S", "N/A")) < today  # Compare dates
+            key: value
+            for key, value in {
+                **filters,
+                "expired": "true" if expired else "",
+                "page_size": page_size,
+            }.items()
+            if value not in (None, "")
         }
-        for item in medicine_list
-    ]
-    
-    sorted_medicine = sorted(medicine, key=lambda x: x['medicine_name'].lower())
-
+    )
     return templates.TemplateResponse(
-        "medkit.html", {"request": request, "medicines": sorted_medicine}
+        "medkit.html",
+        {
+            "request": request,
+            "medicines": result["items"],
+            "total": result["total"],
+            "filters": filters,
+            "page": page,
+            "page_size": page_size,
+            "page_query": page_query,
+            "has_next": page_size is not None and offset + page_size < result["total"],
+            "live_cursor": live_cursor,
+        },
     )
 
 
+@app.get("/medkit/events")
+@login_required
+async def get_medkit_events(
+    request: Request,
+    last_event_id: str | None = None,
+    change_feed: ChangeFeed = Depends(get_change_feed),
+):
+    """
+    Streams the user's medicine changes as Server-Sent Events (upsert,
+    delete, resync) so open medkit pages patch rows in place.
+    """
+    result = change_feed.subscribe(
+        request.state.user_sub, request.headers.get("Last-Event-ID") or last_event_id
+    )
+    if isinstance(result, dict):
+        return JSONResponse(
+            {"error": result["error"]},
+            status_code=result["status_code"],
+            headers={"Retry-After": "30"},
+        )
+    return event_stream_response(change_feed, *result)
+
+
+@app.get("/catalog/autocomplete")
+@login_required
+async def get_catalog_autocomplete(
+    request: Request,  # pylint: disable=W0613
+    q: str = Query("", max_length=200),
+):
+    """Suggests catalog medicines for the add-medicine form as the user types."""
+    catalog = get_medicine_catalog()
+    if catalog is None:
+        return JSONResponse({"items": []})
+    entries = catalog.complete(q, CatalogSettings().catalog_autocomplete_limit)
+    return JSONResponse(
+        {"items": [entry.to_json() for entry in entries]},
+        headers={"Cache-Control": "private, max-age=300"},
+    )
+
+
+@app.get("/export")
+@login_required
+async def export_inventory(
+    request: Request,
+    export_format: str = Query("csv", alias="format"),
+    compressed: bool = Query(False, alias="gzip"),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+):
+    """Downloads the whole inventory as csv, ndjson or columnar, optionally gzipped."""
+    if export_format not in EXPORT_FORMATS:
+        return templates.TemplateResponse(
+            "medkit.html",
+            {
+                "request": request,
+                "error_message": f"Export format must be one of: {', '.join(EXPORT_FORMATS)}",
+            },
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return export_response(
+        dynamo_db_client, request.state.user_sub, export_format, compressed
+    )
+
 
 @app.get("/about", response_class=HTMLResponse)
 @login_required
 async def get_about(request: Request):
     """Displays the login page."""
-    return templates.TemplateResponse("about.html", {"request": request})
+    return page_cache.response(request, "about.html")
+
+
+@app.get("/cache-stats")
+@login_required
+async def get_cache_stats(request: Request) -> JSONResponse:  # pylint: disable=W0613
+    """Reports cache hit rates and memory use, coalesced Cognito lookups, rate limiter and live stream counters."""
+    # Only clients that already exist; reporting must not create them
+    cognito_client = initialized("cognito_client")
+    dynamo_db_client = initialized("dynamo_db_client")
+    return JSONResponse(
+        {
+            "token_cache": cognito_client.token_cache.stats() if cognito_client else {},
+            "inventory_cache": dynamo_db_client.inventory_cache.stats() if dynamo_db_client else {},
+            "user_lookups": cognito_client.user_lookups.stats() if cognito_client else {},
+            "auth_rate_limits": (
+                rate_limiter.stats() if (rate_limiter := initialized("auth_rate_limiter")) else {}
+            ),
+            "change_feed": (
+                change_feed.stats() if (change_feed := initialized("change_feed")) else {}
+            ),
+        }
+    )
+
+
+def collect_cache_metrics():
+    """Copies cache counters into gauges right before a scrape"""
+    # Scrapes must not create clients
+    if cognito_client := initialized("cognito_client"):
+        token_stats = cognito_client.token_cache.stats()
+        cache_hit_ratio.set(token_stats["hit_rate"], cache="token")
+        cache_entries.set(token_stats["size"], cache="token")
+    if dynamo_db_client := initialized("dynamo_db_client"):
+        inventory_stats = dynamo_db_client.inventory_cache.stats()
+        cache_hit_ratio.set(inventory_stats["hit_rate"], cache="inventory")
+        cache_entries.set(inventory_stats.get("entries", 0), cache="inventory")
+    if change_feed := initialized("change_feed"):
+        change_feed_connections.set(change_feed.connections)
+
+
+registry.add_collector(collect_cache_metrics)
+
+
+@app.get("/metrics")
+async def get_metrics() -> PlainTextResponse:
+    """Exposes latency, AWS and cache metrics in Prometheus text format."""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
 
 
 ### POST Endpoints ###
 
 @app.post("/logout")
-async def logout() -> RedirectResponse:
+async def logout(
+    request: Request,
+    cognito_client: CognitoClient = Depends(get_cognito_client),
+) -> RedirectResponse:
     """
     Clears cookies, logs out user.
     """
+    cognito_client.forget_token(request.cookies.get("session_token"))
     redirect = RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
     redirect.delete_cookie(
         key="session_token",
@@ -172,7 +493,9 @@ async def logout() -> RedirectResponse:
 async def submit_login(
     request: Request,
     email: str = Form(...),
-    password: str = Form(...)
+    password: str = Form(...),
+    cognito_client: CognitoClient = Depends(get_cognito_client),
+    rate_limiter: AuthRateLimiter = Depends(get_auth_rate_limiter),
 ) -> RedirectResponse or templates.TemplateResponse:  # type: ignore
     """Handles login submission."""
     try:
@@ -180,6 +503,9 @@ async def submit_login(
         login_input = LoginInput(
             email=email, password=password
             )
+        # Throttle before spending Cognito quota
+        if wait := rate_limiter.check_login(rate_limiter.client_ip(request), login_input.email):
+            return rate_limited_response(request, "login.html", wait)
         # Attempt to authorize user
         response = await cognito_client.auth_user(
             login_input.email, login_input.password
@@ -224,7 +550,9 @@ async def submit_register(
     request: Request,
     email: str = Form(...),
     password: str = Form(...),
-    confirm_password: str = Form(...)
+    confirm_password: str = Form(...),
+    cognito_client: CognitoClient = Depends(get_cognito_client),
+    rate_limiter: AuthRateLimiter = Depends(get_auth_rate_limiter),
 ) -> templates.TemplateResponse:        # type: ignore
     """Handles user account creation"""
     try:
@@ -232,6 +560,11 @@ async def submit_register(
         register_input = RegisterInput(
             email=email, password=password, confirm_password=confirm_password
         )
+        # Throttle before spending Cognito quota
+        if wait := rate_limiter.check_register(
+            rate_limiter.client_ip(request), register_input.email
+        ):
+            return rate_limited_response(request, "register.html", wait)
 
         # Attempt to register the user
         response = await cognito_client.create_user_account(
@@ -271,17 +604,18 @@ async def submit_register(
 
 
 @app.post("/add_medicine", response_class=HTMLResponse)
+@login_required
 async def add_medicine(
     request: Request,
     medicine_name: str = Form(...),
     medicine_type: str = Form(...),
     quantity: int = Form(...),
     expiration_date: str = Form(...),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
 ):
     """Handles medicine form submition"""
 
-    token = request.cookies.get('session_token')
-    user_sub = cognito_client.get_current_user(token=token).get("user_sub")
+    user_sub = request.state.user_sub
     try:
         medicine_input = MedicineInput(
             user_sub=user_sub,
@@ -290,7 +624,13 @@ async def add_medicine(
             quantity=quantity,
             expiration_date=expiration_date,
         )
-        await dynamo_db_client.insert_medicine(medicine_input)
+        response = await dynamo_db_client.insert_medicine(medicine_input)
+        if "error" in response:
+            return templates.TemplateResponse(
+                "medkit.html",
+                {"request": request, "error_message": response["error"]},
+                status_code=response["status_code"],
+            )
         logger.info({"message": ".main(DynamoDBClient) - Medicine data uploaded", "status_code": 200})
         return RedirectResponse(url="/medkit", status_code=status.HTTP_303_SEE_OTHER)
 # TODO: Correct error handling
@@ -313,15 +653,22 @@ async def add_medicine(
         )
 
 @app.post("/delete_medicine", response_class=HTMLResponse)
+@login_required
 async def delete_medicine(
     request: Request,
-    medicine_id: str = Form(...)
+    medicine_id: str = Form(...),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
 ):
     """Deletes selected medicine record"""
-    token = request.cookies.get('session_token')
-    user_sub = cognito_client.get_current_user(token=token).get("user_sub")
+    user_sub = request.state.user_sub
     try:
-        await dynamo_db_client.delete_medicine(user_sub, medicine_id)
+        response = await dynamo_db_client.delete_medicine(user_sub, medicine_id)
+        if "error" in response:
+            return templates.TemplateResponse(
+                "medkit.html",
+                {"request": request, "error_message": response["error"]},
+                status_code=response["status_code"],
+            )
         logger.info({"message": ".main(DynamoDBClient) - Medicine record deleted", "status_code": 200})
         return RedirectResponse(url="/medkit", status_code=status.HTTP_303_SEE_OTHER)
     except ValidationError as val_err:
@@ -338,18 +685,20 @@ async def delete_medicine(
 
 
 @app.post("/edit_medicine", response_class=HTMLResponse)
+@login_required
 async def edit_medicine(
     request: Request,
     medicine_id: str = Form(...),
     medicine_name: str = Form(...),
     medicine_type: str = Form(...),
     quantity: int = Form(...),
-    expiration_date: str = Form(...)
+    expiration_date: str = Form(...),
+    version: int | None = Form(None),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
 ):
     """Handles edit medicine form submition"""
 
-    token = request.cookies.get('session_token')
-    user_sub = cognito_client.get_current_user(token=token).get("user_sub")
+    user_sub = request.state.user_sub
     try:
         update_medicine_input = UpdateMedicineInput(
             medicine_id=medicine_id,
@@ -357,9 +706,16 @@ async def edit_medicine(
             medicine_name=medicine_name,
             medicine_type=medicine_type,
             quantity=quantity,
-            expiration_date=expiration_date
+            expiration_date=expiration_date,
+            version=version
         )
-        await dynamo_db_client.edit_medicine(update_medicine_input)
+        response = await dynamo_db_client.edit_medicine(update_medicine_input)
+        if "error" in response:
+            return templates.TemplateResponse(
+                "medkit.html",
+                {"request": request, "error_message": response["error"]},
+                status_code=response["status_code"],
+            )
         logger.info({"message": ".main(DynamoDBClient) - Medicine data edited", "status_code": 200})
         return RedirectResponse(url="/medkit", status_code=status.HTTP_303_SEE_OTHER)
 # TODO: Correct error handling
@@ -380,3 +736,164 @@ async def edit_medicine(
             {"request": request, "error_message": str(e)},
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+
+
+@app.post("/adjust_quantity", response_class=HTMLResponse)
+@login_required
+async def adjust_quantity(
+    request: Request,
+    medicine_id: str = Form(...),
+    delta: int = Form(...),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+):
+    """Handles dispensing (negative delta) and restocking (positive delta)"""
+
+    user_sub = request.state.user_sub
+    try:
+        adjustment = QuantityAdjustmentInput(
+            user_sub=user_sub, medicine_id=medicine_id, delta=delta
+        )
+        response = await dynamo_db_client.adjust_quantity(adjustment)
+        if "error" in response:
+            return templates.TemplateResponse(
+                "medkit.html",
+                {"request": request, "error_message": response["error"]},
+                status_code=response["status_code"],
+            )
+        logger.info({"message": ".main(DynamoDBClient) - Medicine quantity adjusted", "status_code": 200})
+        return RedirectResponse(url="/medkit", status_code=status.HTTP_303_SEE_OTHER)
+    except ValidationError as val_err:
+        return templates.TemplateResponse(
+            "medkit.html",
+            {
+                "request": request,
+                "error_message": str(val_err.errors()[0]["msg"])
+                .replace("Value error, ", "")
+                .strip(),
+            },
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    except Exception as e:
+        return templates.TemplateResponse(
+            "medkit.html",
+            {"request": request, "error_message": str(e)},
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@app.post("/dispense", response_class=HTMLResponse)
+@login_required
+async def dispense(
+    request: Request,
+    medicine_name: str = Form(...),
+    medicine_type: str = Form(...),
+    quantity: int = Form(...),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+):
+    """Handles dispensing a medicine across its lots, earliest expiry first"""
+
+    user_sub = request.state.user_sub
+    try:
+        dispense_input = DispenseInput(
+            user_sub=user_sub,
+            medicine_name=medicine_name,
+            medicine_type=medicine_type,
+            quantity=quantity,
+        )
+        response = await dynamo_db_client.dispense_fifo(dispense_input)
+        if "error" in response:
+            return templates.TemplateResponse(
+                "medkit.html",
+                {"request": request, "error_message": response["error"]},
+                status_code=response["status_code"],
+            )
+        logger.info({"message": ".main(DynamoDBClient) - Medicine dispensed", "status_code": 200})
+        return RedirectResponse(url="/medkit", status_code=status.HTTP_303_SEE_OTHER)
+    except ValidationError as val_err:
+        return templates.TemplateResponse(
+            "medkit.html",
+            {
+                "request": request,
+                "error_message": str(val_err.errors()[0]["msg"])
+                .replace("Value error, ", "")
+                .strip(),
+            },
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    except Exception as e:
+        return templates.TemplateResponse(
+            "medkit.html",
+            {"request": request, "error_message": str(e)},
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@app.post("/import_medicines")
+@login_required
+async def import_medicines(
+    request: Request,
+    file: UploadFile = File(...),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> JSONResponse:
+    """
+    Bulk-imports medicine records from a CSV or JSON upload.
+    Rows are validated as they are read and written in batches of 25,
+    so memory stays bounded regardless of file size.
+    """
+    user_sub = request.state.user_sub
+    report = {"imported": 0, "failed": 0, "errors": []}
+    window = BATCH_WRITE_SIZE * dynamo_db_client.env.batch_write_concurrency
+    pending = []
+    try:
+        for row_number, row in iter_import_rows(file.file, file.filename):
+            try:
+                pending.append((row_number, MedicineInput(user_sub=user_sub, **row)))
+            except ValidationError as val_err:
+                _report_import_error(
+                    report,
+                    row_number,
+                    str(val_err.errors()[0]["msg"]).replace("Value error, ", "").strip(),
+                )
+            if len(pending) >= window:
+                await _write_import_window(dynamo_db_client, pending, report)
+                pending = []
+        await _write_import_window(dynamo_db_client, pending, report)
+    except ValueError as e:
+        _report_import_error(report, None, str(e))
+        return JSONResponse(report, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    finally:
+        await file.close()
+
+    logger.info({"message": ".main(DynamoDBClient) - Medicine import finished", "imported": report["imported"], "failed": report["failed"]})
+    return JSONResponse(report)
+
+
+async def _write_import_window(
+    dynamo_db_client: DynamoDBClient, pending: list, report: dict
+):
+    """Writes validated import rows as concurrent 25-item batches"""
+    batches = [
+        pending[start:start + BATCH_WRITE_SIZE]
+        for start in range(0, len(pending), BATCH_WRITE_SIZE)
+    ]
+    responses = await asyncio.gather(
+        *(
+            dynamo_db_client.batch_insert_medicines([row[1] for row in batch])
+            for batch in batches
+        )
+    )
+    for batch, response in zip(batches, responses):
+        if "error" in response:
+            for row_number, _ in batch:
+                _report_import_error(report, row_number, response["error"])
+            continue
+        report["imported"] += response["written"]
+        for index in response["failed"]:
+            _report_import_error(report, batch[index][0], "Write throttled, retry this row")
+
+
+def _report_import_error(report: dict, row_number: int | None, message: str):
+    """Records a failed import row, keeping the error list bounded"""
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_IMPORT_ERRORS:
+        report["errors"].append({"row": row_number, "error": message})
@@ -0,0 +1,51 @@
+"""Configuration module for expiry alerts"""
+
+import os
+from pydantic import model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+class ExpiryAlertSettings(BaseSettings):
+    """Settings for the expiry index and the digest scheduler"""
+
+    expiry_alerts_enabled: bool = os.getenv("EXPIRY_ALERTS_ENABLED", "false").lower() == "true"
+    # Months ahead of the current month kept in the index; expired items are only counted
+    expiry_alert_horizon_months: int = int(os.getenv("EXPIRY_ALERT_HORIZON_MONTHS", "3"))
+    # Seconds between digest runs, and between full index rebuilds from a table scan
+    expiry_alert_digest_interval: float = float(os.getenv("EXPIRY_ALERT_DIGEST_INTERVAL", "86400"))
+    expiry_alert_rebuild_interval: float = float(
+        os.getenv("EXPIRY_ALERT_REBUILD_INTERVAL", "21600")
+    )
+    expiry_alert_scan_segments: int = int(os.getenv("EXPIRY_ALERT_SCAN_SEGMENTS", "4"))
+    expiry_alert_scan_page_size: int = int(os.getenv("EXPIRY_ALERT_SCAN_PAGE_SIZE", "1000"))
+    # Absolute path of the file keeping the time of the last digest run across
+    # restarts and deploys, on a volume that outlives the container. Required
+    # with EXPIRY_ALERTS_ENABLED
+    expiry_alert_state_path: str | None = os.getenv("EXPIRY_ALERT_STATE_PATH") or None
+    # With several workers, only the one holding this lock file runs the scheduler
+    expiry_alert_lock_path: str | None = os.getenv("EXPIRY_ALERT_LOCK_PATH")
+    # One of: log, file, smtp
+    expiry_alert_notifier: str = os.getenv("EXPIRY_ALERT_NOTIFIER", "log")
+    expiry_alert_file_path: str = os.getenv("EXPIRY_ALERT_FILE_PATH", "expiry_digests.jsonl")
+    smtp_host: str = os.getenv("SMTP_HOST", "localhost")
+    smtp_port: int = int(os.getenv("SMTP_PORT", "25"))
+    smtp_sender: str = os.getenv("SMTP_SENDER", "alerts@pharmatracker.local")
+    smtp_recipient: str = os.getenv("SMTP_RECIPIENT", "pharmacy@pharmatracker.local")
+
+    model_config = SettingsConfigDict(case_sensitive=True)
+
+    @model_validator(mode="after")
+    def check_state_path(self) -> "ExpiryAlertSettings":
+        """Model validator for a digest state file that survives deploys"""
+        path = self.expiry_alert_state_path
+        if path is not None and not os.path.isabs(path):
+            raise ValueError(
+                "EXPIRY_ALERT_STATE_PATH must be an absolute path on a volume that outlives the container."
+            )
+        if self.expiry_alerts_enabled and path is None:
+            raise ValueError("EXPIRY_ALERT_STATE_PATH is required when EXPIRY_ALERTS_ENABLED is set.")
+        return self
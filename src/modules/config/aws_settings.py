@@ -14,6 +14,22 @@ class BaseAwsSettings(BaseSettings):
     aws_access_key_id: str | None = os.getenv("AWS_ACCESS_KEY_ID")
     aws_secret_access_key: str | None = os.getenv("AWS_SECRET_ACCESS_KEY")
     aws_region: str | None = os.getenv("AWS_REGION")
+    aws_endpoint_url: str | None = os.getenv("AWS_ENDPOINT_URL")
+    aws_max_workers: int = int(os.getenv("AWS_MAX_WORKERS", "16"))
+    # botocore client tuning, shared by every service client
+    aws_max_pool_connections: int = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "32"))
+    aws_connect_timeout: float = float(os.getenv("AWS_CONNECT_TIMEOUT", "2"))
+    aws_read_timeout: float = float(os.getenv("AWS_READ_TIMEOUT", "5"))
+    aws_retry_mode: str = os.getenv("AWS_RETRY_MODE", "standard")
+    aws_max_attempts: int = int(os.getenv("AWS_MAX_ATTEMPTS", "3"))
+    aws_tcp_keepalive: bool = os.getenv("AWS_TCP_KEEPALIVE", "true").lower() == "true"
+    # Create clients in the background at startup instead of on first request
+    aws_warm_up: bool = os.getenv("AWS_WARM_UP", "true").lower() == "true"
+    # "aws", or "fake" for the in-process DynamoDB/Cognito stand-in (local runs, benchmarks)
+    aws_backend: str = os.getenv("AWS_BACKEND", "aws")
+    # Seconds of latency the fake adds to every call, plus up to `jitter` more
+    fake_aws_latency: float = float(os.getenv("FAKE_AWS_LATENCY", "0"))
+    fake_aws_latency_jitter: float = float(os.getenv("FAKE_AWS_LATENCY_JITTER", "0"))
 
     model_config = SettingsConfigDict(case_sensitive=True)
 
@@ -24,10 +40,24 @@ class CognitoSettings(BaseAwsSettings):
     user_pool_id: str | None = os.getenv("USER_POOL_ID")
     app_client_id: str | None = os.getenv("APP_CLIENT_ID")
     app_client_secret: str | None = os.getenv("APP_CLIENT_SECRET")
+    token_cache_max_size: int = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+    token_cache_ttl: float = float(os.getenv("TOKEN_CACHE_TTL", "300"))
 
     model_config = SettingsConfigDict(case_sensitive=True)
 
 class DynamoDBSettings(BaseAwsSettings):
     """Settings for DynamoDB Client"""
     table_name: str | None = os.getenv("DYNAMO_DB_TABLE_NAME")
+    expiration_index_name: str = os.getenv(
+        "DYNAMO_DB_EXPIRATION_INDEX", "expiration_date_index"
+    )
+    name_index_name: str = os.getenv("DYNAMO_DB_NAME_INDEX", "medicine_name_index")
+    # Per-user inventory aggregates, updated in the same transaction as each write
+    summary_table_name: str | None = os.getenv("DYNAMO_DB_SUMMARY_TABLE_NAME")
+    # Append-only audit journal of every write; unset disables it
+    journal_table_name: str | None = os.getenv("DYNAMO_DB_JOURNAL_TABLE_NAME") or None
+    batch_write_concurrency: int = int(os.getenv("BATCH_WRITE_CONCURRENCY", "4"))
+    batch_write_max_retries: int = int(os.getenv("BATCH_WRITE_MAX_RETRIES", "6"))
+    # Replans of a FIFO dispense whose lots another write changed first
+    dispense_max_attempts: int = int(os.getenv("DISPENSE_MAX_ATTEMPTS", "8"))
     model_config = SettingsConfigDict(case_sensitive=True)
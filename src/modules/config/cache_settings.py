@@ -0,0 +1,25 @@
+"""Configuration module for application caches"""
+
+import os
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+class InventoryCacheSettings(BaseSettings):
+    """Settings for the per-user inventory cache"""
+
+    # One of: memory, redis, none
+    inventory_cache_backend: str = os.getenv("INVENTORY_CACHE_BACKEND", "memory")
+    inventory_cache_max_users: int = int(os.getenv("INVENTORY_CACHE_MAX_USERS", "1000"))
+    inventory_cache_ttl: float = float(os.getenv("INVENTORY_CACHE_TTL", "300"))
+    redis_url: str | None = os.getenv("REDIS_URL")
+    # Shared counters file that keeps per-worker memory caches coherent; set by
+    # src/gunicorn_conf.py for multi-worker serving
+    inventory_cache_generations_path: str | None = os.getenv(
+        "INVENTORY_CACHE_GENERATIONS_PATH"
+    )
+
+    model_config = SettingsConfigDict(case_sensitive=True)
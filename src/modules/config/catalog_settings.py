@@ -0,0 +1,22 @@
+"""Configuration module for the reference medicine catalog"""
+
+import os
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+class CatalogSettings(BaseSettings):
+    """Settings for the medicine catalog behind autocomplete and name normalization"""
+
+    # CSV with a medicine_name and an optional medicine_type column; unset disables the catalog
+    medicine_catalog_path: str | None = os.getenv("MEDICINE_CATALOG_PATH") or None
+    # Compiled index shared by every worker through the page cache; default: <catalog>.idx
+    medicine_catalog_index_path: str | None = os.getenv("MEDICINE_CATALOG_INDEX_PATH") or None
+    # Rewrite names and types that match the catalog to its spelling on insert and edit
+    catalog_normalize_names: bool = os.getenv("CATALOG_NORMALIZE_NAMES", "false").lower() == "true"
+    catalog_autocomplete_limit: int = int(os.getenv("CATALOG_AUTOCOMPLETE_LIMIT", "10"))
+
+    model_config = SettingsConfigDict(case_sensitive=True)
@@ -0,0 +1,27 @@
+"""Configuration module for template rendering and static assets"""
+
+import os
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+class FrontendSettings(BaseSettings):
+    """Settings for template compilation, page caching and static files"""
+
+    # production: precompiled templates, cached pages; development: reload on change
+    render_mode: str = os.getenv("RENDER_MODE", "production")
+    # Defaults to a per-user directory under the system temp dir
+    template_bytecode_cache_dir: str | None = os.getenv("TEMPLATE_BYTECODE_CACHE_DIR")
+    # max-age for /static URLs without the ?v= fingerprint added by static_url()
+    static_max_age: int = int(os.getenv("STATIC_MAX_AGE", "3600"))
+    static_precompress: bool = os.getenv("STATIC_PRECOMPRESS", "true").lower() == "true"
+
+    model_config = SettingsConfigDict(case_sensitive=True)
+
+    @property
+    def production(self) -> bool:
+        """True unless RENDER_MODE=development"""
+        return self.render_mode.lower() != "development"
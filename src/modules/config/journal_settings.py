@@ -0,0 +1,21 @@
+"""Configuration module for the audit journal"""
+
+import os
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+class JournalSettings(BaseSettings):
+    """Settings for the append-only audit journal (DYNAMO_DB_JOURNAL_TABLE_NAME)"""
+
+    # Events of a user journaled by a worker before it snapshots that user's inventory
+    journal_snapshot_every: int = int(os.getenv("JOURNAL_SNAPSHOT_EVERY", "500"))
+    # Seconds a snapshot stays behind the present, so every write in flight at that time has committed
+    journal_snapshot_lag: float = float(os.getenv("JOURNAL_SNAPSHOT_LAG", "60"))
+    # Days of history compaction keeps rebuildable; older events and snapshots are deleted
+    journal_retention_days: int = int(os.getenv("JOURNAL_RETENTION_DAYS", "2555"))
+
+    model_config = SettingsConfigDict(case_sensitive=True)
@@ -0,0 +1,21 @@
+"""Configuration module for metrics and tracing"""
+
+import os
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+class ObservabilitySettings(BaseSettings):
+    """Settings for latency metrics and span export"""
+
+    service_name: str = os.getenv("OTEL_SERVICE_NAME", "pharmatracker")
+    # Append OTLP/JSON span batches to this file
+    trace_export_path: str | None = os.getenv("TRACE_EXPORT_PATH")
+    # Or POST them to an OTLP/HTTP collector, e.g. http://localhost:4318/v1/traces
+    trace_export_endpoint: str | None = os.getenv("TRACE_EXPORT_ENDPOINT")
+    trace_queue_size: int = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+
+    model_config = SettingsConfigDict(case_sensitive=True)
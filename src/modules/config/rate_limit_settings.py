@@ -0,0 +1,34 @@
+"""Configuration module for rate limiting of the auth endpoints"""
+
+import os
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+class RateLimitSettings(BaseSettings):
+    """Token bucket limits for login and registration attempts"""
+
+    auth_rate_limit_enabled: bool = os.getenv("AUTH_RATE_LIMIT_ENABLED", "true").lower() == "true"
+    # Sustained attempts per minute and burst size, per client IP and per email
+    login_ip_per_minute: float = float(os.getenv("LOGIN_IP_PER_MINUTE", "20"))
+    login_ip_burst: int = int(os.getenv("LOGIN_IP_BURST", "10"))
+    login_email_per_minute: float = float(os.getenv("LOGIN_EMAIL_PER_MINUTE", "5"))
+    login_email_burst: int = int(os.getenv("LOGIN_EMAIL_BURST", "5"))
+    register_ip_per_minute: float = float(os.getenv("REGISTER_IP_PER_MINUTE", "5"))
+    register_ip_burst: int = int(os.getenv("REGISTER_IP_BURST", "5"))
+    register_email_per_minute: float = float(os.getenv("REGISTER_EMAIL_PER_MINUTE", "2"))
+    register_email_burst: int = int(os.getenv("REGISTER_EMAIL_BURST", "3"))
+    # Buckets kept per limiter; the least recently used key is dropped beyond this
+    rate_limit_max_keys: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    # Shared file holding the buckets of every worker on the host; set by
+    # src/gunicorn_conf.py for multi-worker serving. Unset, each worker has its own
+    rate_limit_state_path: str | None = os.getenv("RATE_LIMIT_STATE_PATH") or None
+    # Take the client IP from X-Forwarded-For; only behind a trusted proxy
+    rate_limit_trust_forwarded: bool = (
+        os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+    )
+
+    model_config = SettingsConfigDict(case_sensitive=True)
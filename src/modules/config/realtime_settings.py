@@ -0,0 +1,29 @@
+"""Configuration module for live medkit updates"""
+
+import os
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+class RealtimeSettings(BaseSettings):
+    """Settings for the per-user change feed served over Server-Sent Events"""
+
+    # Events buffered per connection before a slow reader is told to resync
+    change_feed_queue_size: int = int(os.getenv("CHANGE_FEED_QUEUE_SIZE", "64"))
+    change_feed_max_connections: int = int(os.getenv("CHANGE_FEED_MAX_CONNECTIONS", "10000"))
+    change_feed_max_connections_per_user: int = int(
+        os.getenv("CHANGE_FEED_MAX_CONNECTIONS_PER_USER", "20")
+    )
+    # Recent events kept per user (for up to CHANGE_FEED_REPLAY_USERS users) to resume reconnects
+    change_feed_replay_events: int = int(os.getenv("CHANGE_FEED_REPLAY_EVENTS", "64"))
+    change_feed_replay_users: int = int(os.getenv("CHANGE_FEED_REPLAY_USERS", "10000"))
+    # Seconds between keep-alive comments on an idle stream, and before a stream is recycled
+    change_feed_heartbeat: float = float(os.getenv("CHANGE_FEED_HEARTBEAT", "15"))
+    change_feed_max_stream_seconds: float = float(os.getenv("CHANGE_FEED_MAX_STREAM_SECONDS", "900"))
+    # Seconds between checks for writes made by other workers (shared generations only)
+    change_feed_poll_interval: float = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "1"))
+
+    model_config = SettingsConfigDict(case_sensitive=True)
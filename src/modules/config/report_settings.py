@@ -0,0 +1,21 @@
+"""Configuration module for cross-user admin reports"""
+
+import os
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+class ReportSettings(BaseSettings):
+    """Settings for the parallel table scan behind admin reports"""
+
+    # Scan segments, and how many of them are read at once
+    report_scan_segments: int = int(os.getenv("REPORT_SCAN_SEGMENTS", "16"))
+    report_scan_concurrency: int = int(os.getenv("REPORT_SCAN_CONCURRENCY", "8"))
+    report_scan_page_size: int = int(os.getenv("REPORT_SCAN_PAGE_SIZE", "1000"))
+    # Average read capacity units per second the scan may consume; 0 means unlimited
+    report_max_read_units: float = float(os.getenv("REPORT_MAX_READ_UNITS", "0"))
+
+    model_config = SettingsConfigDict(case_sensitive=True)
@@ -0,0 +1,131 @@
+"""
+Shared service clients used by the HTML routes and the JSON API.
+
+Clients are created on first use rather than at import, so importing the
+app stays cheap and a missing setting surfaces when the client is needed
+(or at warm-up) instead of at import time. Routes receive them through
+FastAPI `Depends`, e.g. `client: DynamoDBClient = Depends(get_dynamo_db_client)`.
+"""
+
+import os
+import threading
+from typing import Callable, TypeVar
+
+from src.modules.config.catalog_settings import CatalogSettings
+from src.modules.services.alerts.expiry_alerts import ExpiryAlertEngine
+from src.modules.services.aws.cognito_service import CognitoClient
+from src.modules.services.aws.dynamodb_service import DynamoDBClient
+from src.modules.services.catalog.medicine_catalog import MedicineCatalog, load_catalog
+from src.modules.services.journal.audit_journal import AuditJournal
+from src.modules.services.realtime.change_feed import ChangeFeed
+from src.modules.services.search.inventory_search import InventorySearch
+from src.modules.services.security.rate_limiter import AuthRateLimiter
+
+T = TypeVar("T")
+
+_lock = threading.RLock()
+_instances: dict[str, object] = {}
+
+
+def _get_or_create(name: str, factory: Callable[[], T]) -> T:
+    """
+    Returns the shared instance, creating it once even under concurrent
+    first use. A factory may return None for a disabled service.
+    """
+    if name not in _instances:
+        with _lock:
+            if name not in _instances:
+                _instances[name] = factory()
+    return _instances[name]
+
+
+def get_cognito_client() -> CognitoClient:
+    """Shared Cognito client"""
+    return _get_or_create("cognito_client", CognitoClient)
+
+
+def get_dynamo_db_client() -> DynamoDBClient:
+    """Shared DynamoDB client"""
+    return _get_or_create("dynamo_db_client", _create_dynamo_db_client)
+
+
+def _create_dynamo_db_client() -> DynamoDBClient:
+    """
+    DynamoDB client, spelling names the catalog's way when
+    CATALOG_NORMALIZE_NAMES is set, with the audit journal's snapshots when
+    the journal table is.
+    """
+    client = DynamoDBClient()
+    if CatalogSettings().catalog_normalize_names:
+        catalog = get_medicine_catalog()
+        if catalog is not None:
+            client.name_normalizer = catalog.normalize
+    if client.journal_table_name:
+        # Subscribed before the client is handed out, so every write counts towards snapshots
+        _instances["audit_journal"] = AuditJournal(client)
+    return client
+
+
+def get_audit_journal() -> AuditJournal | None:
+    """Audit journal of the shared DynamoDB client, None when DYNAMO_DB_JOURNAL_TABLE_NAME is unset"""
+    get_dynamo_db_client()
+    return _instances.get("audit_journal")
+
+
+def get_medicine_catalog() -> MedicineCatalog | None:
+    """Memory-mapped medicine catalog, None when MEDICINE_CATALOG_PATH is unset"""
+    return _get_or_create("medicine_catalog", load_catalog)
+
+
+def get_expiry_alerts() -> ExpiryAlertEngine:
+    """
+    Expiry alert engine, subscribed to the shared DynamoDB client. Only
+    start_background_services creates it, when EXPIRY_ALERTS_ENABLED is set.
+    """
+    return _get_or_create(
+        "expiry_alerts", lambda: ExpiryAlertEngine(get_dynamo_db_client())
+    )
+
+
+def get_inventory_search() -> InventorySearch:
+    """Per-user search indexes over the shared DynamoDB client's cache"""
+    return _get_or_create(
+        "inventory_search", lambda: InventorySearch(get_dynamo_db_client())
+    )
+
+
+def get_change_feed() -> ChangeFeed:
+    """Live update streams, subscribed to the shared DynamoDB client"""
+    return _get_or_create("change_feed", lambda: ChangeFeed(get_dynamo_db_client()))
+
+
+def get_auth_rate_limiter() -> AuthRateLimiter:
+    """Per-IP and per-email limits for the login and registration forms"""
+    return _get_or_create("auth_rate_limiter", AuthRateLimiter)
+
+
+def warm_up():
+    """
+    Creates every client up front, loading the botocore service models.
+    Blocking: call it from a worker thread.
+    """
+    get_cognito_client()
+    get_dynamo_db_client()
+    get_inventory_search()
+
+
+def initialized(name: str):
+    """Returns an instance only if it was already created, e.g. for metrics"""
+    return _instances.get(name)
+
+
+def reset():
+    """Forgets every instance so the next use creates fresh ones"""
+    global _lock  # pylint: disable=W0603
+    # A lock held by another thread at fork time would never be released
+    _lock = threading.RLock()
+    _instances.clear()
+
+
+# Clients hold pooled connections, a forked worker must build its own
+os.register_at_fork(after_in_child=reset)
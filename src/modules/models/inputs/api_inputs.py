@@ -0,0 +1,36 @@
+"""Module for JSON API request bodies"""
+
+from pydantic import BaseModel
+
+
+class MedicineRequest(BaseModel):
+    """Request body for creating or replacing a medicine record"""
+
+    medicine_name: str
+    medicine_type: str
+    quantity: int
+    expiration_date: str
+
+
+class MedicinePatchRequest(BaseModel):
+    """Request body for a partial, optionally version-checked update"""
+
+    medicine_name: str | None = None
+    medicine_type: str | None = None
+    quantity: int | None = None
+    expiration_date: str | None = None
+    version: int | None = None
+
+
+class QuantityRequest(BaseModel):
+    """Request body for an atomic quantity change"""
+
+    delta: int
+
+
+class DispenseRequest(BaseModel):
+    """Request body for dispensing a medicine from its earliest-expiring lots"""
+
+    medicine_name: str
+    medicine_type: str
+    quantity: int
@@ -54,7 +54,59 @@ class MedicineInput(BaseModel):
         return self
 
 
-class UpdateMedicineInput(MedicineInput):
-    """Input model for updating medicine records"""
+class UpdateMedicineInput(BaseModel):
+    """
+    Input model for updating medicine records.
+    Fields left as None are not written; `version` is the record version
+    the client last saw and turns the update into a conditional write.
+    """
 
+    user_sub: str
     medicine_id: str
+    medicine_name: str | None = None
+    medicine_type: str | None = None
+    quantity: int | None = None
+    expiration_date: str | None = None
+    version: int | None = None
+
+    @model_validator(mode="after")
+    def check_exp_date_regex(self) -> "UpdateMedicineInput":
+        """Model validator for expiration date format"""
+        if self.expiration_date is not None and not re.match(
+            r"^\d{4}-\d{2}$", self.expiration_date
+        ):
+            raise ValueError("Expiration date must be in 'YYYY-MM' format.")
+        return self
+
+
+class QuantityAdjustmentInput(BaseModel):
+    """Input model for atomic dispensing (negative) or restocking (positive)"""
+
+    user_sub: str
+    medicine_id: str
+    delta: int
+
+    @model_validator(mode="after")
+    def check_delta(self) -> "QuantityAdjustmentInput":
+        """Model validator for a non-zero delta"""
+        if self.delta == 0:
+            raise ValueError("Quantity change must not be zero.")
+        return self
+
+
+class DispenseInput(BaseModel):
+    """Input model for dispensing a medicine across its lots, earliest expiry first"""
+
+    user_sub: str
+    medicine_name: str
+    medicine_type: str
+    quantity: int
+
+    @model_validator(mode="after")
+    def check_quantity(self) -> "DispenseInput":
+        """Model validator for a positive quantity and a named medicine"""
+        if self.quantity <= 0:
+            raise ValueError("Quantity to dispense must be positive.")
+        if not self.medicine_name.strip() or not self.medicine_type.strip():
+            raise ValueError("Medicine name and type are required.")
+        return self
@@ -0,0 +1,20 @@
+"""Module for medicine change events published by the write paths"""
+
+from dataclasses import dataclass
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+
+@dataclass(slots=True, frozen=True)
+class MedicineChange:
+    """
+    A committed write to one medicine. `item` is the new DynamoDB attribute
+    map for inserts and updates, and None for deletes.
+    """
+
+    action: str
+    user_sub: str
+    medicine_id: str
+    item: dict | None = None
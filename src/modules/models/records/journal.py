@@ -0,0 +1,198 @@
+"""
+Module for audit journal records.
+
+Each user's journal is one partition of the journal table, in sort key
+order. Events are keyed `e#<time>#<id>` and snapshots of the whole
+inventory `s#<time>#<part>`, with fixed-width UTC times, so a range of
+time is a range of keys for both.
+"""
+
+import json
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from src.modules.models.records.change import DELETE
+from src.modules.models.records.medicine import Medicine
+
+EVENT_PREFIX = "e#"
+SNAPSHOT_PREFIX = "s#"
+
+# Action of events recording quantities added to medicines rather than their records
+ADJUST = "adjust"
+
+# Sorts after every id and part suffix, to bound a key range by time alone
+KEY_END = "~"
+
+# Compressed snapshot bytes per item, well under DynamoDB's 400 KB item limit
+SNAPSHOT_PART_BYTES = 300_000
+
+_INSTANT_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+def format_instant(at: datetime) -> str:
+    """Fixed-width UTC time, so keys sort in time order; naive times are taken as UTC"""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc)
+    return at.strftime(_INSTANT_FORMAT)
+
+
+def parse_instant(text: str) -> datetime:
+    """Inverse of format_instant"""
+    return datetime.strptime(text, _INSTANT_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def event_key(at: datetime, event_id: str) -> str:
+    """Sort key of an event"""
+    return f"{EVENT_PREFIX}{format_instant(at)}#{event_id}"
+
+
+def snapshot_key(at: datetime, part: int) -> str:
+    """Sort key of one part of a snapshot"""
+    return f"{SNAPSHOT_PREFIX}{format_instant(at)}#{part:04d}"
+
+
+def new_event(
+    user_sub: str,
+    action: str,
+    medicine_id: str,
+    item: dict | None = None,
+    quantities: dict[str, int] | None = None,
+) -> "JournalEvent":
+    """An event keyed by the time now"""
+    return JournalEvent(
+        user_sub,
+        event_key(datetime.now(timezone.utc), uuid.uuid4().hex),
+        action,
+        medicine_id,
+        item,
+        quantities,
+    )
+
+
+def key_instant(key: str) -> datetime:
+    """The time in an event or snapshot key"""
+    return parse_instant(key.split("#")[1])
+
+
+def _version(item: dict) -> int:
+    return int(item.get("version", {}).get("N", "0"))
+
+
+@dataclass(slots=True, frozen=True)
+class JournalEvent:
+    """
+    One committed write. `item` is the medicine as it was stored by the
+    write, None for deletes and adjustments. Adjustments and dispenses ADD
+    to quantities without reading the records, so their events hold the
+    quantity added to each medicine (`quantities`, medicine_id -> amount)
+    instead; `medicine_id` is then the first of them.
+    """
+
+    user_sub: str
+    event_key: str
+    action: str
+    medicine_id: str
+    item: dict | None = None
+    quantities: dict[str, int] | None = None
+
+    @property
+    def recorded_at(self) -> datetime:
+        return key_instant(self.event_key)
+
+    @classmethod
+    def from_dynamodb(cls, item: dict) -> "JournalEvent":
+        """Builds an event from a journal table item"""
+        return cls(
+            user_sub=item["user_sub"]["S"],
+            event_key=item["event_key"]["S"],
+            action=item["action"]["S"],
+            medicine_id=item["medicine_id"]["S"],
+            item=item["item"]["M"] if "item" in item else None,
+            quantities=(
+                {medicine_id: int(value["N"]) for medicine_id, value in item["quantities"]["M"].items()}
+                if "quantities" in item
+                else None
+            ),
+        )
+
+    def to_dynamodb(self) -> dict:
+        """Serializes the event into a journal table item"""
+        record = {
+            "user_sub": {"S": self.user_sub},
+            "event_key": {"S": self.event_key},
+            "action": {"S": self.action},
+            "medicine_id": {"S": self.medicine_id},
+        }
+        if self.item is not None:
+            record["item"] = {"M": self.item}
+        if self.quantities is not None:
+            record["quantities"] = {
+                "M": {medicine_id: {"N": str(amount)} for medicine_id, amount in self.quantities.items()}
+            }
+        return record
+
+    def to_json(self) -> dict:
+        """Returns the event as a JSON-ready dict"""
+        return {
+            "event_id": self.event_key[len(EVENT_PREFIX):],
+            "recorded_at": self.event_key.split("#")[1],
+            "user_sub": self.user_sub,
+            "action": self.action,
+            "medicine_id": self.medicine_id,
+            "medicine": None if self.item is None else Medicine.from_dynamodb(self.item).to_json(),
+            "quantities": self.quantities,
+        }
+
+
+@dataclass(slots=True)
+class InventoryState:
+    """
+    A user's medicines rebuilt from a snapshot and the events after it.
+    A record only replaces a lower version, and a deleted medicine stays
+    deleted, so records of one medicine that share a moment (e.g. journaled
+    by different workers) replay in any order. Adjustments commute with
+    each other; an adjustment and an edit of the same medicine committed
+    within the same moment replay in key order, which may not be the order
+    they committed in.
+    """
+
+    items: dict[str, dict] = field(default_factory=dict)
+    deleted: set[str] = field(default_factory=set)
+
+    def apply(self, event: JournalEvent):
+        """Applies one event"""
+        if event.action == DELETE:
+            self.items.pop(event.medicine_id, None)
+            self.deleted.add(event.medicine_id)
+        elif event.action == ADJUST:
+            # Each adjustment ADDs to the quantity and bumps the version
+            for medicine_id, amount in event.quantities.items():
+                if (current := self.items.get(medicine_id)) is not None:
+                    self.items[medicine_id] = {
+                        **current,
+                        "quantity": {"N": str(int(current.get("quantity", {}).get("N", "0")) + amount)},
+                        "version": {"N": str(_version(current) + 1)},
+                    }
+        elif event.medicine_id not in self.deleted:
+            current = self.items.get(event.medicine_id)
+            if current is None or _version(event.item) >= _version(current):
+                self.items[event.medicine_id] = event.item
+
+    def medicines(self) -> list[Medicine]:
+        """The medicines, in medicine_id order like a query of the table"""
+        return [Medicine.from_dynamodb(self.items[medicine_id]) for medicine_id in sorted(self.items)]
+
+
+def encode_snapshot(items: dict[str, dict]) -> list[bytes]:
+    """Compresses an inventory into the binary parts of a snapshot"""
+    data = zlib.compress(
+        json.dumps([items[medicine_id] for medicine_id in sorted(items)], separators=(",", ":")).encode()
+    )
+    return [data[start : start + SNAPSHOT_PART_BYTES] for start in range(0, len(data), SNAPSHOT_PART_BYTES)]
+
+
+def decode_snapshot(parts: list[bytes]) -> dict[str, dict]:
+    """Inverse of encode_snapshot: medicine_id -> DynamoDB item"""
+    return {item["medicine_id"]["S"]: item for item in json.loads(zlib.decompress(b"".join(parts)))}
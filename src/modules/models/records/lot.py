@@ -0,0 +1,70 @@
+"""
+Module for stock lots.
+
+A lot is a medicine record: stock that arrives in batches is stored as one
+row per batch, each with its own quantity and expiration date, and rows of
+the same medicine share the normalized name and type. Keeping lots as
+ordinary rows means search, export, expiry alerts and the inventory
+summary see every batch with its own expiry.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable
+
+from src.modules.models.records.medicine import Medicine
+from src.modules.utils.text_helpers import normalize_medicine_name
+
+
+def stock_key(medicine_name: str, medicine_type: str) -> tuple[str, str]:
+    """Identifies the medicine a lot belongs to, ignoring case and spacing"""
+    return normalize_medicine_name(medicine_name), normalize_medicine_name(medicine_type)
+
+
+def dispensable_lots(lots: Iterable[Medicine], month: int) -> list[Medicine]:
+    """
+    Lots that can be dispensed in `month`, earliest expiry first. Expired
+    and empty lots are skipped; lots without a valid expiry come last.
+    """
+    return sorted(
+        (
+            lot
+            for lot in lots
+            if lot.quantity > 0 and (lot.expiration_month is None or lot.expiration_month >= month)
+        ),
+        key=lambda lot: (lot.expiration_month is None, lot.expiration_month or 0, lot.medicine_id),
+    )
+
+
+def plan_fifo(lots: Iterable[Medicine], quantity: int, month: int) -> list[tuple[Medicine, int]] | None:
+    """
+    Splits `quantity` over the lots, earliest-expiring first, as
+    (lot, units taken) pairs. Returns None if there is not enough stock.
+    """
+    plan = []
+    remaining = quantity
+    for lot in dispensable_lots(lots, month):
+        if not remaining:
+            break
+        taken = min(lot.quantity, remaining)
+        plan.append((lot, taken))
+        remaining -= taken
+    return None if remaining else plan
+
+
+@dataclass(slots=True, frozen=True)
+class LotDraw:
+    """Units taken from one lot by a dispense"""
+
+    medicine_id: str
+    expiration_date: str
+    taken: int
+    remaining: int
+
+    def to_json(self) -> dict:
+        """Returns the draw as a JSON-ready dict"""
+        return {
+            "medicine_id": self.medicine_id,
+            "expiration_date": self.expiration_date,
+            "taken": self.taken,
+            "remaining": self.remaining,
+        }
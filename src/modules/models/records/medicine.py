@@ -0,0 +1,131 @@
+"""Module for the medicine domain record"""
+
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+
+from src.modules.models.inputs.app_inputs import MedicineInput
+from src.modules.utils.text_helpers import normalize_medicine_name
+
+
+@lru_cache(maxsize=4096)
+def parse_month(value: str) -> int | None:
+    """
+    Converts a 'YYYY-MM' string to a month index (year * 12 + month - 1).
+    Memoized: an inventory only ever holds a few hundred distinct months.
+    """
+    if len(value) != 7 or value[4] != "-":
+        return None
+    year, month = value[:4], value[5:]
+    if not (year.isdigit() and month.isdigit()) or not 1 <= int(month) <= 12:
+        return None
+    return int(year) * 12 + int(month) - 1
+
+
+def format_month(index: int) -> str:
+    """Converts a month index back to a 'YYYY-MM' string"""
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def current_month() -> int:
+    """Returns the month index of today's date"""
+    today = date.today()
+    return today.year * 12 + today.month - 1
+
+
+# Fields exposed to API clients, in response order
+PUBLIC_FIELDS = (
+    "medicine_id",
+    "medicine_name",
+    "medicine_type",
+    "quantity",
+    "expiration_date",
+    "is_expired",
+    "version",
+)
+
+# Editable attributes and their DynamoDB types
+EDITABLE_FIELDS = {
+    "medicine_name": "S",
+    "medicine_type": "S",
+    "quantity": "N",
+    "expiration_date": "S",
+}
+
+
+def serialize_fields(values: dict) -> dict:
+    """
+    Serializes a subset of editable fields into DynamoDB attribute values,
+    adding the derived name key whenever the name is present.
+    """
+    attributes = {
+        field: {EDITABLE_FIELDS[field]: str(value)} for field, value in values.items()
+    }
+    if "medicine_name" in values:
+        attributes["medicine_name_key"] = {
+            "S": normalize_medicine_name(values["medicine_name"])
+        }
+    return attributes
+
+
+@dataclass(slots=True)
+class Medicine:
+    """Medicine record as stored in DynamoDB"""
+
+    user_sub: str
+    medicine_id: str
+    medicine_name: str
+    medicine_type: str
+    quantity: int
+    expiration_date: str
+    expiration_month: int | None
+    version: int = 0
+
+    @property
+    def is_expired(self) -> bool:
+        """True if the expiration month is before the current month"""
+        return self.expiration_month is not None and self.expiration_month < current_month()
+
+    @classmethod
+    def from_dynamodb(cls, item: dict) -> "Medicine":
+        """Builds a record from a DynamoDB attribute map"""
+        expiration_date = item["expiration_date"]["S"] if "expiration_date" in item else "N/A"
+        return cls(
+            user_sub=item["user_sub"]["S"] if "user_sub" in item else "",
+            medicine_id=item["medicine_id"]["S"] if "medicine_id" in item else "",
+            medicine_name=item["medicine_name"]["S"] if "medicine_name" in item else "Unknown",
+            medicine_type=item["medicine_type"]["S"] if "medicine_type" in item else "Unknown",
+            quantity=int(item["quantity"]["N"]) if "quantity" in item else 0,
+            expiration_date=expiration_date,
+            expiration_month=parse_month(expiration_date),
+            version=int(item["version"]["N"]) if "version" in item else 0,
+        )
+
+    @classmethod
+    def from_input(cls, medicine_input: MedicineInput, medicine_id: str) -> "Medicine":
+        """Builds a record from a validated input model"""
+        return cls(
+            user_sub=medicine_input.user_sub,
+            medicine_id=medicine_id,
+            medicine_name=medicine_input.medicine_name,
+            medicine_type=medicine_input.medicine_type,
+            quantity=medicine_input.quantity,
+            expiration_date=medicine_input.expiration_date,
+            expiration_month=parse_month(medicine_input.expiration_date),
+            version=1,
+        )
+
+    def to_dynamodb(self) -> dict:
+        """Serializes the record into a DynamoDB attribute map"""
+        return {
+            "user_sub": {"S": self.user_sub},
+            "medicine_id": {"S": self.medicine_id},
+            **serialize_fields(
+                {field: getattr(self, field) for field in EDITABLE_FIELDS}
+            ),
+            "version": {"N": str(self.version)},
+        }
+
+    def to_json(self, fields: tuple[str, ...] = PUBLIC_FIELDS) -> dict:
+        """Returns the selected public fields as a JSON-ready dict"""
+        return {field: getattr(self, field) for field in fields}
@@ -0,0 +1,146 @@
+"""Module for the per-user inventory summary record"""
+
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from src.modules.models.records.medicine import Medicine, current_month, format_month, parse_month
+
+# Medicine fields the summary is computed from; edits of other fields leave it alone
+SUMMARY_FIELDS = frozenset({"medicine_type", "quantity", "expiration_date"})
+
+# Counters are flat top-level attributes: DynamoDB can ADD to an attribute
+# that does not exist yet, but not to a key of a map that does not exist
+TYPE_COUNT_PREFIX = "type_count#"
+TYPE_QUANTITY_PREFIX = "type_quantity#"
+EXPIRY_MONTH_PREFIX = "expiry_month#"
+
+
+@dataclass(slots=True)
+class InventorySummary:
+    """
+    Aggregates of one user's inventory, kept in the summary table. Medicines
+    are counted per expiration month rather than as expired/not expired, so
+    the expired count and the next expiry stay correct as months pass
+    without rewriting the item.
+    """
+
+    user_sub: str
+    medicine_count: int = 0
+    total_quantity: int = 0
+    type_count: dict[str, int] = field(default_factory=dict)
+    type_quantity: dict[str, int] = field(default_factory=dict)
+    # month index -> medicines expiring that month
+    expiry_months: dict[int, int] = field(default_factory=dict)
+    version: int = 0
+
+    @classmethod
+    def from_dynamodb(cls, item: dict) -> "InventorySummary":
+        """Builds a summary from a DynamoDB attribute map, dropping zero counters"""
+        summary = cls(
+            user_sub=item["user_sub"]["S"],
+            medicine_count=int(item.get("medicine_count", {}).get("N", "0")),
+            total_quantity=int(item.get("total_quantity", {}).get("N", "0")),
+            version=int(item.get("summary_version", {}).get("N", "0")),
+        )
+        for name, value in item.items():
+            if "N" not in value or not (number := int(value["N"])):
+                continue
+            if name.startswith(TYPE_COUNT_PREFIX):
+                summary.type_count[name[len(TYPE_COUNT_PREFIX):]] = number
+            elif name.startswith(TYPE_QUANTITY_PREFIX):
+                summary.type_quantity[name[len(TYPE_QUANTITY_PREFIX):]] = number
+            elif name.startswith(EXPIRY_MONTH_PREFIX):
+                month = parse_month(name[len(EXPIRY_MONTH_PREFIX):])
+                if month is not None:
+                    summary.expiry_months[month] = number
+        return summary
+
+    @classmethod
+    def from_medicines(cls, user_sub: str, medicines: Iterable[Medicine]) -> "InventorySummary":
+        """Computes a summary from scratch"""
+        summary = cls(user_sub)
+        for medicine in medicines:
+            summary.add(medicine)
+        return summary
+
+    def add(self, medicine: Medicine, sign: int = 1):
+        """Counts a medicine in (sign 1) or out of (sign -1) the summary"""
+        self.medicine_count += sign
+        self.total_quantity += sign * medicine.quantity
+        self._bump(self.type_count, medicine.medicine_type, sign)
+        self._bump(self.type_quantity, medicine.medicine_type, sign * medicine.quantity)
+        if medicine.expiration_month is not None:
+            self._bump(self.expiry_months, medicine.expiration_month, sign)
+
+    @staticmethod
+    def _bump(counters: dict, key, amount: int):
+        if not amount:
+            return
+        if total := counters.get(key, 0) + amount:
+            counters[key] = total
+        else:
+            del counters[key]
+
+    def counters(self) -> dict[str, int]:
+        """The summary as attribute name -> value, without zero counters"""
+        values = {
+            "medicine_count": self.medicine_count,
+            "total_quantity": self.total_quantity,
+            **{TYPE_COUNT_PREFIX + name: count for name, count in self.type_count.items()},
+            **{TYPE_QUANTITY_PREFIX + name: total for name, total in self.type_quantity.items()},
+            **{
+                EXPIRY_MONTH_PREFIX + format_month(month): count
+                for month, count in self.expiry_months.items()
+            },
+        }
+        return {name: value for name, value in values.items() if value}
+
+    def to_dynamodb(self) -> dict:
+        """Serializes the summary into a DynamoDB attribute map"""
+        return {
+            "user_sub": {"S": self.user_sub},
+            "medicine_count": {"N": str(self.medicine_count)},
+            "total_quantity": {"N": str(self.total_quantity)},
+            **{name: {"N": str(value)} for name, value in self.counters().items()},
+            "summary_version": {"N": str(self.version)},
+        }
+
+    def same_totals(self, other: "InventorySummary") -> bool:
+        """True if both summaries hold the same counters, whatever their versions"""
+        return self.counters() == other.counters()
+
+    def expired(self, month: int | None = None) -> int:
+        """Medicines whose expiration month is before `month` (default: this month)"""
+        month = current_month() if month is None else month
+        return sum(count for expiry, count in self.expiry_months.items() if expiry < month)
+
+    def next_expiry_month(self, month: int | None = None) -> int | None:
+        """Earliest expiration month from `month` (default: this month) on"""
+        month = current_month() if month is None else month
+        return min((expiry for expiry in self.expiry_months if expiry >= month), default=None)
+
+    def to_json(self) -> dict:
+        """Returns the dashboard figures as a JSON-ready dict"""
+        next_expiry = self.next_expiry_month()
+        return {
+            "medicine_count": self.medicine_count,
+            "total_quantity": self.total_quantity,
+            "quantity_by_type": dict(sorted(self.type_quantity.items())),
+            "count_by_type": dict(sorted(self.type_count.items())),
+            "expired": self.expired(),
+            "next_expiry_month": format_month(next_expiry) if next_expiry is not None else None,
+            "next_expiry_count": self.expiry_months.get(next_expiry, 0),
+        }
+
+
+def summary_deltas(user_sub: str, old: Medicine | None, new: Medicine | None) -> dict[str, int]:
+    """
+    Counter changes for replacing `old` with `new` (either may be None for
+    an insert or delete), as attribute name -> amount to ADD.
+    """
+    delta = InventorySummary(user_sub)
+    if new is not None:
+        delta.add(new)
+    if old is not None:
+        delta.add(old, -1)
+    return delta.counters()
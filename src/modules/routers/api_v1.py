@@ -0,0 +1,519 @@
+"""Versioned JSON API for medicine inventory"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from src.modules.config.catalog_settings import CatalogSettings
+from src.modules.dependencies import (
+    get_change_feed,
+    get_cognito_client,
+    get_dynamo_db_client,
+    get_audit_journal,
+    get_inventory_search,
+    get_medicine_catalog,
+)
+from src.modules.models.inputs.api_inputs import (
+    DispenseRequest,
+    MedicinePatchRequest,
+    MedicineRequest,
+    QuantityRequest,
+)
+from src.modules.models.inputs.app_inputs import (
+    DispenseInput,
+    MedicineInput,
+    QuantityAdjustmentInput,
+    UpdateMedicineInput,
+)
+from src.modules.models.records.medicine import PUBLIC_FIELDS, Medicine, current_month, format_month
+from src.modules.services.aws.cognito_service import CognitoClient
+from src.modules.services.aws.dynamodb_service import DynamoDBClient
+from src.modules.services.catalog.medicine_catalog import MedicineCatalog
+from src.modules.services.journal.audit_journal import AuditJournal
+from src.modules.services.export.inventory_export import EXPORT_FORMATS, export_response
+from src.modules.services.realtime.change_feed import ChangeFeed, event_stream_response
+from src.modules.services.search.inventory_search import InventorySearch
+from src.modules.services.search.inventory_index import SearchQuery, parse_sort
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1", tags=["api-v1"])
+
+# Public fields backed by a stored DynamoDB attribute
+STORED_FIELDS = {
+    "medicine_id": "medicine_id",
+    "medicine_name": "medicine_name",
+    "medicine_type": "medicine_type",
+    "quantity": "quantity",
+    "expiration_date": "expiration_date",
+    "is_expired": "expiration_date",
+    "version": "version",
+}
+
+
+async def get_api_user(
+    authorization: str | None = Header(None),
+    cognito_client: CognitoClient = Depends(get_cognito_client),
+) -> str:
+    """Resolves the bearer token in the Authorization header to a user_sub"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing bearer token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    current_user = await cognito_client.get_current_user(token=token)
+    if "error" in current_user:
+        raise HTTPException(
+            status_code=current_user["status_code"],
+            detail=current_user["error"],
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return current_user["user_sub"]
+
+
+def parse_fields(fields: str | None = Query(None)) -> tuple[str, ...]:
+    """Parses the comma separated `fields` selector"""
+    if not fields:
+        return PUBLIC_FIELDS
+    selected = tuple(
+        dict.fromkeys(field.strip() for field in fields.split(",") if field.strip())
+    )
+    unknown = [field for field in selected if field not in STORED_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    return selected
+
+
+def etag_response(request: Request, payload: dict) -> Response:
+    """Returns the payload as JSON, or 304 if the client already has it"""
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    etag = '"' + hashlib.sha1(body, usedforsecurity=False).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def raise_for_error(response) -> None:
+    """Translates a service error dict into an HTTPException"""
+    if isinstance(response, dict) and "error" in response:
+        raise HTTPException(status_code=response["status_code"], detail=response["error"])
+
+
+def validation_detail(val_err: ValidationError) -> str:
+    """Extracts the first validation message, matching the HTML routes"""
+    return str(val_err.errors()[0]["msg"]).replace("Value error, ", "").strip()
+
+
+@router.get("/medicines")
+async def list_medicines(
+    request: Request,
+    page_size: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    fields: tuple[str, ...] = Depends(parse_fields),
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> Response:
+    """
+    Lists medicines ordered by name. Without `page_size` the whole
+    inventory is returned; with it, one page plus `next_cursor`.
+    """
+    if page_size:
+        projection = sorted({"medicine_id", *(STORED_FIELDS[field] for field in fields)})
+        page = await dynamo_db_client.get_medicines_page(
+            user_sub, page_size, cursor, projection=projection, by_name=True
+        )
+        raise_for_error(page)
+        items, next_cursor = page["items"], page["next_cursor"]
+    else:
+        items = await dynamo_db_client.get_medicines_by_user_sub(user_sub)
+        raise_for_error(items)
+        next_cursor = None
+
+    medicines = sorted(
+        (Medicine.from_dynamodb(item) for item in items),
+        key=lambda medicine: medicine.medicine_name.lower(),
+    )
+    return etag_response(
+        request,
+        {
+            "items": [medicine.to_json(fields) for medicine in medicines],
+            "next_cursor": next_cursor,
+        },
+    )
+
+
+@router.get("/medicines/search")
+async def search_medicines(
+    request: Request,
+    q: str | None = None,
+    medicine_type: str | None = None,
+    expired: bool = False,
+    min_quantity: int | None = Query(None, ge=0),
+    max_quantity: int | None = Query(None, ge=0),
+    sort: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    fields: tuple[str, ...] = Depends(parse_fields),
+    user_sub: str = Depends(get_api_user),
+    inventory_search: InventorySearch = Depends(get_inventory_search),
+) -> Response:
+    """
+    Searches the inventory by name word prefixes and type prefix, with
+    expired/quantity filters and sort keys like `expiration,-quantity`.
+    Returns one page of matches plus the total match count.
+    """
+    try:
+        query = SearchQuery(
+            q=q,
+            medicine_type=medicine_type,
+            expired_only=expired,
+            min_quantity=min_quantity,
+            max_quantity=max_quantity,
+            sort=parse_sort(sort),
+        )
+    except ValueError as val_err:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(val_err)
+        ) from val_err
+    result = await inventory_search.search(user_sub, query, offset, limit)
+    raise_for_error(result)
+    return etag_response(
+        request,
+        {
+            "items": [medicine.to_json(fields) for medicine in result["items"]],
+            "total": result["total"],
+        },
+    )
+
+
+@router.get("/medicines/events")
+async def stream_medicine_events(
+    last_event_id: str | None = Header(None, alias="Last-Event-ID"),
+    user_sub: str = Depends(get_api_user),
+    change_feed: ChangeFeed = Depends(get_change_feed),
+) -> Response:
+    """
+    Server-Sent Events stream of the caller's medicine changes: `upsert`
+    carries the changed medicine, `delete` its id, and `resync` means the
+    client missed events and must reload the list.
+    """
+    result = change_feed.subscribe(user_sub, last_event_id)
+    if isinstance(result, dict):
+        raise HTTPException(
+            status_code=result["status_code"],
+            detail=result["error"],
+            headers={"Retry-After": "30"},
+        )
+    return event_stream_response(change_feed, *result)
+
+
+@router.get("/medicines/export")
+async def export_medicines(
+    export_format: str = Query("ndjson", alias="format"),
+    compressed: bool = Query(False, alias="gzip"),
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> Response:
+    """
+    Streams the whole inventory as csv, ndjson or columnar, optionally as a
+    .gz file, reading DynamoDB page by page so memory use stays constant.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}",
+        )
+    return export_response(dynamo_db_client, user_sub, export_format, compressed)
+
+
+@router.get("/medicines/expiring")
+async def list_expiring_medicines(
+    request: Request,
+    months: int = Query(3, ge=0, le=120),
+    fields: tuple[str, ...] = Depends(parse_fields),
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> Response:
+    """
+    Lists medicines that are expired or expire within `months` months
+    of the current one (0 = this month), soonest first, from the expiry GSI.
+    """
+    items = await dynamo_db_client.get_medicines_expiring_before(
+        user_sub, format_month(current_month() + months + 1)
+    )
+    raise_for_error(items)
+    medicines = sorted(
+        (Medicine.from_dynamodb(item) for item in items),
+        key=lambda medicine: medicine.expiration_date,
+    )
+    return etag_response(
+        request, {"items": [medicine.to_json(fields) for medicine in medicines]}
+    )
+
+
+@router.get("/summary")
+async def get_inventory_summary(
+    request: Request,
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> Response:
+    """
+    Returns the inventory totals: medicines, quantity per type, expired
+    count and next expiry month. Read from the summary item, not the inventory.
+    """
+    summary = await dynamo_db_client.get_inventory_summary(user_sub)
+    if summary is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Inventory summaries are not enabled",
+        )
+    raise_for_error(summary)
+    return etag_response(request, summary.to_json())
+
+
+def require_journal(audit_journal: AuditJournal | None) -> AuditJournal:
+    """The audit journal, or a 404 when it is not enabled"""
+    if audit_journal is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The audit journal is not enabled",
+        )
+    return audit_journal
+
+
+@router.get("/journal")
+async def list_journal_events(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    medicine_id: str | None = None,
+    page_size: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    user_sub: str = Depends(get_api_user),
+    audit_journal: AuditJournal | None = Depends(get_audit_journal),
+) -> JSONResponse:
+    """
+    The audit trail, oldest first: each write with its time, action and the
+    medicine as it was stored, or the quantities it added. Times without an
+    offset are UTC.
+    """
+    page = await require_journal(audit_journal).get_events(
+        user_sub, since, until, medicine_id, page_size, cursor
+    )
+    raise_for_error(page)
+    return JSONResponse(
+        {
+            "items": [event.to_json() for event in page["items"]],
+            "next_cursor": page["next_cursor"],
+        }
+    )
+
+
+@router.get("/inventory/as-of")
+async def get_inventory_as_of(
+    at: datetime,
+    user_sub: str = Depends(get_api_user),
+    audit_journal: AuditJournal | None = Depends(get_audit_journal),
+) -> JSONResponse:
+    """
+    The inventory as it was at `at` (UTC without an offset), rebuilt from
+    the newest journal snapshot before it and the events since.
+    """
+    try:
+        state, rebuilt = await require_journal(audit_journal).inventory_as_of(user_sub, at)
+    except ValueError as e:
+        # Compacted away
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e)) from e
+    return JSONResponse(
+        {**rebuilt, "items": [medicine.to_json() for medicine in state.medicines()]}
+    )
+
+
+@router.get("/catalog/autocomplete")
+async def autocomplete_catalog(
+    q: str = Query(..., max_length=200),
+    limit: int | None = Query(None, ge=1, le=50),
+    user_sub: str = Depends(get_api_user),  # pylint: disable=W0613
+    catalog: MedicineCatalog | None = Depends(get_medicine_catalog),
+) -> JSONResponse:
+    """
+    Typeahead over the reference medicine catalog: names in which every
+    word of `q` starts a word, names starting with `q` first.
+    """
+    if catalog is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The medicine catalog is not configured",
+        )
+    entries = catalog.complete(q, limit or CatalogSettings().catalog_autocomplete_limit)
+    return JSONResponse(
+        {"items": [entry.to_json() for entry in entries]},
+        # The catalog only changes with a deploy
+        headers={"Cache-Control": "private, max-age=300"},
+    )
+
+
+@router.get("/medicines/{medicine_id}")
+async def get_medicine(
+    request: Request,
+    medicine_id: str,
+    fields: tuple[str, ...] = Depends(parse_fields),
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> Response:
+    """Returns a single medicine"""
+    item = await dynamo_db_client.get_medicine(user_sub, medicine_id)
+    raise_for_error(item)
+    return etag_response(request, Medicine.from_dynamodb(item).to_json(fields))
+
+
+@router.post("/medicines", status_code=status.HTTP_201_CREATED)
+async def create_medicine(
+    body: MedicineRequest,
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> JSONResponse:
+    """Creates a medicine and returns it with its new id"""
+    try:
+        medicine_input = MedicineInput(user_sub=user_sub, **body.model_dump())
+    except ValidationError as val_err:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=validation_detail(val_err),
+        ) from val_err
+    # Respelled here too, so the response shows the stored names
+    medicine_input = dynamo_db_client.normalize_names(medicine_input)
+    response = await dynamo_db_client.insert_medicine(medicine_input)
+    raise_for_error(response)
+    logger.info({"message": ".api_v1(DynamoDBClient) - Medicine data uploaded", "status_code": 201})
+    medicine = Medicine.from_input(medicine_input, response["medicine_id"])
+    return JSONResponse(
+        medicine.to_json(),
+        status_code=status.HTTP_201_CREATED,
+        headers={"Location": f"{router.prefix}/medicines/{medicine.medicine_id}"},
+    )
+
+
+@router.put("/medicines/{medicine_id}")
+async def update_medicine(
+    medicine_id: str,
+    body: MedicineRequest,
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> JSONResponse:
+    """Replaces the editable fields of a medicine"""
+    try:
+        update_medicine_input = UpdateMedicineInput(
+            medicine_id=medicine_id, user_sub=user_sub, **body.model_dump()
+        )
+    except ValidationError as val_err:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=validation_detail(val_err),
+        ) from val_err
+    response = await dynamo_db_client.edit_medicine(update_medicine_input)
+    raise_for_error(response)
+    logger.info({"message": ".api_v1(DynamoDBClient) - Medicine data edited", "status_code": 200})
+    return JSONResponse(Medicine.from_dynamodb(response["Attributes"]).to_json())
+
+
+@router.patch("/medicines/{medicine_id}")
+async def patch_medicine(
+    medicine_id: str,
+    body: MedicinePatchRequest,
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> JSONResponse:
+    """
+    Updates only the given fields. With `version`, the write succeeds only
+    if the record is still at that version, otherwise 409 is returned.
+    """
+    try:
+        update_medicine_input = UpdateMedicineInput(
+            medicine_id=medicine_id, user_sub=user_sub, **body.model_dump()
+        )
+    except ValidationError as val_err:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=validation_detail(val_err),
+        ) from val_err
+    response = await dynamo_db_client.edit_medicine(update_medicine_input)
+    raise_for_error(response)
+    logger.info({"message": ".api_v1(DynamoDBClient) - Medicine data edited", "status_code": 200})
+    return JSONResponse(Medicine.from_dynamodb(response["Attributes"]).to_json())
+
+
+@router.post("/medicines/{medicine_id}/quantity")
+async def adjust_medicine_quantity(
+    medicine_id: str,
+    body: QuantityRequest,
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> JSONResponse:
+    """Atomically dispenses (negative delta) or restocks (positive delta)"""
+    try:
+        adjustment = QuantityAdjustmentInput(
+            user_sub=user_sub, medicine_id=medicine_id, delta=body.delta
+        )
+    except ValidationError as val_err:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=validation_detail(val_err),
+        ) from val_err
+    response = await dynamo_db_client.adjust_quantity(adjustment)
+    raise_for_error(response)
+    logger.info({"message": ".api_v1(DynamoDBClient) - Medicine quantity adjusted", "status_code": 200})
+    return JSONResponse(Medicine.from_dynamodb(response["Attributes"]).to_json())
+
+
+@router.post("/dispense")
+async def dispense(
+    body: DispenseRequest,
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> JSONResponse:
+    """Dispenses a medicine across its lots, earliest expiry first, in one transaction"""
+    try:
+        dispense_input = DispenseInput(user_sub=user_sub, **body.model_dump())
+    except ValidationError as val_err:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=validation_detail(val_err),
+        ) from val_err
+    response = await dynamo_db_client.dispense_fifo(dispense_input)
+    raise_for_error(response)
+    logger.info({"message": ".api_v1(DynamoDBClient) - Medicine dispensed", "status_code": 200})
+    return JSONResponse(response)
+
+
+@router.delete("/medicines/{medicine_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_medicine(
+    medicine_id: str,
+    user_sub: str = Depends(get_api_user),
+    dynamo_db_client: DynamoDBClient = Depends(get_dynamo_db_client),
+) -> Response:
+    """Deletes a medicine"""
+    response = await dynamo_db_client.delete_medicine(user_sub, medicine_id)
+    raise_for_error(response)
+    logger.info({"message": ".api_v1(DynamoDBClient) - Medicine record deleted", "status_code": 204})
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,200 @@
+"""Background scheduler that keeps the expiry index fresh and sends digests"""
+
+import asyncio
+import logging
+import os
+import time
+
+from src.modules.config.alert_settings import ExpiryAlertSettings
+from src.modules.models.records.change import MedicineChange
+from src.modules.models.records.medicine import current_month, format_month
+from src.modules.services.alerts.expiry_index import ExpiryIndex
+from src.modules.services.alerts.notifiers import Notifier, build_notifier
+from src.modules.services.aws.dynamodb_service import DynamoDBClient
+from src.modules.utils.worker_helpers import try_lock
+
+logger = logging.getLogger(__name__)
+
+# How often the scheduler wakes up to check its deadlines
+TICK_SECONDS = 60
+
+# Attributes the index needs; everything else stays in DynamoDB
+INDEX_PROJECTION = ["user_sub", "medicine_id", "medicine_name", "quantity", "expiration_date"]
+
+
+class ExpiryAlertEngine:
+    """
+    Maintains an ExpiryIndex across all users. The index is rebuilt from a
+    filtered, segmented table scan at startup, on month rollover and every
+    rebuild interval; in between, DynamoDBClient write events keep it current.
+    """
+
+    def __init__(
+        self,
+        dynamo_db_client: DynamoDBClient,
+        settings: ExpiryAlertSettings | None = None,
+        notifier: Notifier | None = None,
+    ):
+        self.env = settings or ExpiryAlertSettings()
+        self.dynamo_db_client = dynamo_db_client
+        self.notifier = notifier or build_notifier(self.env)
+        self.index = ExpiryIndex(self.env.expiry_alert_horizon_months)
+        self.ready = False
+        self.last_rebuild: float | None = None
+        # Wall-clock time of the last digest run when there is no state file
+        self._last_digest: float | None = None
+        # Writes seen while a rebuild scan is in flight, replayed onto the new index
+        self._pending: list[MedicineChange] | None = None
+        self._task: asyncio.Task | None = None
+        # Open lock file while this process is the scheduling leader
+        self._leader_lock = None
+        dynamo_db_client.add_listener(self.on_change)
+
+    def on_change(self, change: MedicineChange):
+        """DynamoDBClient listener: applies a committed write incrementally"""
+        self.index.apply(change)
+        if self._pending is not None:
+            self._pending.append(change)
+
+    def start(self):
+        """Starts the scheduler on the running event loop"""
+        if self.env.expiry_alerts_enabled and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="expiry-alerts")
+
+    async def stop(self):
+        """Cancels the scheduler and waits for it to exit"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._leader_lock is not None:
+            self._leader_lock.close()
+            self._leader_lock = None
+
+    async def rebuild(self) -> int:
+        """Rebuilds the index from a parallel scan of items up to the horizon"""
+        started = time.monotonic()
+        index = ExpiryIndex(self.env.expiry_alert_horizon_months)
+        self._pending = []
+        try:
+            segments = max(1, self.env.expiry_alert_scan_segments)
+            await asyncio.gather(
+                *(self._scan_segment(index, segment, segments) for segment in range(segments))
+            )
+            for change in self._pending:
+                index.apply(change)
+        finally:
+            self._pending = None
+        self.index = index
+        self.ready = True
+        self.last_rebuild = time.monotonic()
+        logger.info(
+            {
+                "message": "Expiry index rebuilt",
+                "medicines": len(index),
+                "seconds": round(self.last_rebuild - started, 3),
+            }
+        )
+        return len(index)
+
+    async def _scan_segment(self, index: ExpiryIndex, segment: int, segments: int):
+        """Feeds one scan segment into `index`, skipping items beyond the horizon"""
+        async for item in self.dynamo_db_client.scan_medicines(
+            page_size=self.env.expiry_alert_scan_page_size,
+            projection=INDEX_PROJECTION,
+            # 'YYYY-MM' strings sort chronologically
+            filter_expression="expiration_date < :after",
+            filter_values={":after": {"S": format_month(index.cutoff + 1)}},
+            segment=segment if segments > 1 else None,
+            total_segments=segments if segments > 1 else None,
+        ):
+            index.add_item(item)
+
+    async def send_digests(self) -> int:
+        """Sends one digest per user with expired or soon-to-expire medicines"""
+        digests = list(self.index.digests())
+        sent = await asyncio.to_thread(self.notifier.send_all, digests)
+        logger.info({"message": "Expiry digests sent", "users": len(digests), "sent": sent})
+        return sent
+
+    def stats(self) -> dict:
+        """Reports index size per month bucket"""
+        return {"ready": self.ready, **self.index.stats()}
+
+    def _is_leader(self) -> bool:
+        """
+        True if this process should run the scheduler. Without a lock path
+        every process does; with one, only the worker holding the lock, so
+        digests go out once per host. Followers retry on every tick.
+        """
+        if not self.env.expiry_alert_lock_path:
+            return True
+        if self._leader_lock is None:
+            self._leader_lock = try_lock(self.env.expiry_alert_lock_path)
+            if self._leader_lock is not None:
+                logger.info({"message": "Expiry alert scheduler leader", "pid": os.getpid()})
+        return self._leader_lock is not None
+
+    def last_digest(self) -> float | None:
+        """
+        Wall-clock time of the last digest run. Kept in EXPIRY_ALERT_STATE_PATH
+        (required when alerts are enabled), so restarts, deploys and leader
+        changes neither skip nor repeat a digest; in memory without it.
+        """
+        if not self.env.expiry_alert_state_path:
+            return self._last_digest
+        try:
+            with open(self.env.expiry_alert_state_path, encoding="utf-8") as file:
+                return float(file.read())
+        except (OSError, ValueError):
+            return None
+
+    def _record_digest(self, at: float):
+        """Stores the time of a digest run, replacing the state file atomically"""
+        self._last_digest = at
+        path = self.env.expiry_alert_state_path
+        if not path:
+            return
+        try:
+            with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+                file.write(repr(at))
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning({"message": "Expiry digest time not saved", "error": str(e)})
+
+    def _digest_due(self) -> bool:
+        """True once the index is built, if no digest went out within the digest interval"""
+        last = self.last_digest()
+        return self.ready and (last is None or time.time() - last >= self.env.expiry_alert_digest_interval)
+
+    def _rebuild_due(self) -> bool:
+        """True at startup, on month rollover and after the rebuild interval"""
+        return (
+            self.last_rebuild is None
+            or self.index.month != current_month()
+            or time.monotonic() - self.last_rebuild >= self.env.expiry_alert_rebuild_interval
+        )
+
+    async def _run(self):
+        """Scheduler loop; failures are logged and retried on the next tick"""
+        while True:
+            try:
+                if not self._is_leader():
+                    await asyncio.sleep(TICK_SECONDS)
+                    continue
+                if self._rebuild_due():
+                    await self.rebuild()
+                if self._digest_due():
+                    if self.env.expiry_alert_lock_path:
+                        # The index missed the other workers' writes since the last rebuild
+                        await self.rebuild()
+                    started = time.time()
+                    await self.send_digests()
+                    self._record_digest(started)
+            except Exception as e:  # pylint: disable=W0718
+                logger.warning({"message": "Expiry alert run failed", "error": str(e)})
+            await asyncio.sleep(TICK_SECONDS)
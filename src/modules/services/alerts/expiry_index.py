@@ -0,0 +1,136 @@
+"""In-memory index of medicines expiring soon, bucketed by expiration month"""
+
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from src.modules.models.records.change import MedicineChange
+from src.modules.models.records.medicine import (
+    Medicine,
+    current_month,
+    format_month,
+    parse_month,
+)
+
+
+@dataclass(slots=True)
+class ExpiryDigest:
+    """Number of expired medicines and the soon-to-expire medicines of one user"""
+
+    user_sub: str
+    month: str
+    expired: int = 0
+    expiring: list[Medicine] = field(default_factory=list)
+
+    def to_json(self) -> dict:
+        """Returns the digest as a JSON-ready dict"""
+        fields = ("medicine_id", "medicine_name", "quantity", "expiration_date")
+        return {
+            "user_sub": self.user_sub,
+            "month": self.month,
+            "expired": self.expired,
+            "expiring": [medicine.to_json(fields) for medicine in self.expiring],
+        }
+
+
+class ExpiryIndex:
+    """
+    Medicines that expire within `horizon_months` of `month`, bucketed as
+    month -> user_sub -> medicine_id -> Medicine. Expired medicines pile up
+    for as long as users keep them, so only their number per user is held,
+    and items further out are not held at all.
+    """
+
+    def __init__(self, horizon_months: int, month: int | None = None):
+        self.horizon_months = horizon_months
+        self.month = current_month() if month is None else month
+        self._buckets: dict[int, dict[str, dict[str, Medicine]]] = {}
+        # user_sub -> number of expired medicines
+        self._expired: dict[str, int] = {}
+        # (user_sub, medicine_id) -> month, for O(1) moves and removals
+        self._months: dict[tuple[str, str], int] = {}
+
+    @property
+    def cutoff(self) -> int:
+        """Last month index held by the index"""
+        return self.month + self.horizon_months
+
+    def __len__(self) -> int:
+        return len(self._months)
+
+    def add_item(self, item: dict):
+        """Adds or moves a medicine given its DynamoDB attribute map"""
+        user_sub, medicine_id = item["user_sub"]["S"], item["medicine_id"]["S"]
+        self.remove(user_sub, medicine_id)
+        # Check the month before building a record that would be dropped
+        month = parse_month(item["expiration_date"]["S"]) if "expiration_date" in item else None
+        if month is None or month > self.cutoff:
+            return
+        self._months[(user_sub, medicine_id)] = month
+        if month < self.month:
+            self._expired[user_sub] = self._expired.get(user_sub, 0) + 1
+            return
+        medicine = Medicine.from_dynamodb(item)
+        users = self._buckets.setdefault(month, {})
+        users.setdefault(medicine.user_sub, {})[medicine.medicine_id] = medicine
+
+    def remove(self, user_sub: str, medicine_id: str):
+        """Drops a medicine if it is indexed"""
+        month = self._months.pop((user_sub, medicine_id), None)
+        if month is None:
+            return
+        if month < self.month:
+            if self._expired[user_sub] == 1:
+                del self._expired[user_sub]
+            else:
+                self._expired[user_sub] -= 1
+            return
+        users = self._buckets[month]
+        medicines = users[user_sub]
+        del medicines[medicine_id]
+        if not medicines:
+            del users[user_sub]
+            if not users:
+                del self._buckets[month]
+
+    def apply(self, change: MedicineChange):
+        """Applies a committed write incrementally"""
+        if change.item is None:
+            self.remove(change.user_sub, change.medicine_id)
+        else:
+            self.add_item(change.item)
+
+    def digests(self, within_months: int | None = None) -> Iterator[ExpiryDigest]:
+        """Yields one digest per user with expired or soon-to-expire medicines"""
+        last = self._last_month(within_months)
+        month = format_month(self.month)
+        digests = {
+            user_sub: ExpiryDigest(user_sub, month, expired=count) for user_sub, count in self._expired.items()
+        }
+        for bucket in sorted(self._buckets):
+            if bucket > last:
+                break
+            for user_sub, medicines in self._buckets[bucket].items():
+                digest = digests.get(user_sub)
+                if digest is None:
+                    digest = digests[user_sub] = ExpiryDigest(user_sub, month)
+                digest.expiring.extend(medicines.values())
+        yield from digests.values()
+
+    def stats(self) -> dict:
+        """Returns the number of indexed medicines per expiration month"""
+        return {
+            "month": format_month(self.month),
+            "horizon_months": self.horizon_months,
+            "medicines": len(self),
+            "expired": sum(self._expired.values()),
+            "buckets": {
+                format_month(month): sum(len(medicines) for medicines in users.values())
+                for month, users in sorted(self._buckets.items())
+            },
+        }
+
+    def _last_month(self, within_months: int | None) -> int:
+        """Clamps a requested window to what the index holds"""
+        if within_months is None:
+            return self.cutoff
+        return self.month + min(within_months, self.horizon_months)
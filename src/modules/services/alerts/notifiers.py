@@ -0,0 +1,134 @@
+"""Delivery channels for expiry digests"""
+
+import json
+import logging
+import smtplib
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from typing import Iterable
+
+from src.modules.config.alert_settings import ExpiryAlertSettings
+from src.modules.services.alerts.expiry_index import ExpiryDigest
+
+logger = logging.getLogger(__name__)
+
+
+class Notifier(ABC):
+    """Sends expiry digests. Runs on a worker thread, so blocking I/O is fine."""
+
+    @abstractmethod
+    def send(self, digest: ExpiryDigest):
+        """Delivers one digest"""
+
+    def send_all(self, digests: Iterable[ExpiryDigest]) -> int:
+        """Delivers a batch of digests, returning how many went out"""
+        sent = 0
+        for digest in digests:
+            try:
+                self.send(digest)
+                sent += 1
+            except Exception as e:  # pylint: disable=W0718
+                logger.warning(
+                    {
+                        "message": "Expiry digest not sent",
+                        "user_sub": digest.user_sub,
+                        "error": str(e),
+                    }
+                )
+        return sent
+
+
+class LogNotifier(Notifier):
+    """Writes a one-line summary per digest to the application log"""
+
+    def send(self, digest: ExpiryDigest):
+        logger.info(
+            {
+                "message": "Expiry digest",
+                "user_sub": digest.user_sub,
+                "expired": digest.expired,
+                "expiring": len(digest.expiring),
+            }
+        )
+
+
+class FileNotifier(Notifier):
+    """Appends digests as JSON lines to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def send(self, digest: ExpiryDigest):
+        if self._file is not None:
+            self._file.write(json.dumps(digest.to_json()) + "\n")
+            return
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(digest.to_json()) + "\n")
+
+    def send_all(self, digests: Iterable[ExpiryDigest]) -> int:
+        # One open file for the whole run instead of one per digest
+        with open(self.path, "a", encoding="utf-8") as self._file:
+            try:
+                return super().send_all(digests)
+            finally:
+                self._file = None
+
+
+class SmtpNotifier(Notifier):
+    """
+    Minimal SMTP sender: plain connection, no auth or TLS, one message per
+    user to a fixed pharmacy mailbox, since items do not carry user emails.
+    """
+
+    def __init__(self, host: str, port: int, sender: str, recipient: str):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipient = recipient
+        self._smtp: smtplib.SMTP | None = None
+
+    def send(self, digest: ExpiryDigest):
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = self.recipient
+        message["Subject"] = (
+            f"Expiry digest {digest.month} for {digest.user_sub}: "
+            f"{digest.expired} expired, {len(digest.expiring)} expiring soon"
+        )
+        message.set_content(
+            "\n".join(
+                [f"Expired: {digest.expired} medicines"]
+                + [
+                    f"Expiring: {medicine.medicine_name} ({medicine.expiration_date}) "
+                    f"x{medicine.quantity}"
+                    for medicine in digest.expiring
+                ]
+            )
+        )
+        if self._smtp is not None:
+            self._smtp.send_message(message)
+            return
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(message)
+
+    def send_all(self, digests: Iterable[ExpiryDigest]) -> int:
+        # Reuse one connection for the whole run
+        with smtplib.SMTP(self.host, self.port, timeout=10) as self._smtp:
+            try:
+                return super().send_all(digests)
+            finally:
+                self._smtp = None
+
+
+def build_notifier(settings: ExpiryAlertSettings | None = None) -> Notifier:
+    """Creates the notifier selected by EXPIRY_ALERT_NOTIFIER"""
+    settings = settings or ExpiryAlertSettings()
+    kind = settings.expiry_alert_notifier.lower()
+    if kind == "file":
+        return FileNotifier(settings.expiry_alert_file_path)
+    if kind == "smtp":
+        return SmtpNotifier(
+            settings.smtp_host, settings.smtp_port, settings.smtp_sender, settings.smtp_recipient
+        )
+    return LogNotifier()
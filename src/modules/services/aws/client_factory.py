@@ -0,0 +1,94 @@
+"""Shared, fork-safe factory for boto3 service clients"""
+
+import os
+import threading
+from typing import TYPE_CHECKING
+
+from src.modules.config.aws_settings import BaseAwsSettings
+
+if TYPE_CHECKING:
+    from boto3.session import Session
+    from botocore.client import BaseClient
+    from botocore.config import Config
+
+_lock = threading.Lock()
+_sessions: dict[tuple, "Session"] = {}
+_clients: dict[tuple, "BaseClient"] = {}
+
+
+def build_client_config(settings: BaseAwsSettings) -> "Config":
+    """Translates the AWS_* tuning settings into a botocore Config"""
+    # Imported on first use: boto3/botocore add ~150 ms to app import
+    from botocore.config import Config  # pylint: disable=C0415
+
+    return Config(
+        region_name=settings.aws_region,
+        max_pool_connections=settings.aws_max_pool_connections,
+        connect_timeout=settings.aws_connect_timeout,
+        read_timeout=settings.aws_read_timeout,
+        retries={
+            "mode": settings.aws_retry_mode,
+            "total_max_attempts": settings.aws_max_attempts,
+        },
+        tcp_keepalive=settings.aws_tcp_keepalive,
+    )
+
+
+def get_aws_client(service_name: str, settings: BaseAwsSettings) -> "BaseClient":
+    """
+    Returns the process-wide client for a service and credential set.
+    Clients are thread-safe and reused; sessions are only touched under a lock.
+    With AWS_BACKEND=fake, returns the in-process fake for the service instead.
+    """
+    if settings.aws_backend == "fake":
+        # pylint: disable=C0415
+        from src.modules.services.aws.fake.clients import get_fake_client
+
+        return get_fake_client(service_name, settings)
+    session_key = (
+        settings.aws_access_key_id,
+        settings.aws_secret_access_key,
+        settings.aws_region,
+    )
+    client_key = (
+        service_name,
+        *session_key,
+        settings.aws_endpoint_url,
+        settings.aws_max_pool_connections,
+        settings.aws_connect_timeout,
+        settings.aws_read_timeout,
+        settings.aws_retry_mode,
+        settings.aws_max_attempts,
+        settings.aws_tcp_keepalive,
+    )
+    if (client := _clients.get(client_key)) is not None:
+        return client
+    with _lock:
+        if (client := _clients.get(client_key)) is None:
+            session = _sessions.get(session_key)
+            if session is None:
+                from boto3.session import Session  # pylint: disable=C0415
+
+                session = _sessions[session_key] = Session(
+                    aws_access_key_id=settings.aws_access_key_id,
+                    aws_secret_access_key=settings.aws_secret_access_key,
+                    region_name=settings.aws_region,
+                )
+            client = _clients[client_key] = session.client(
+                service_name,
+                endpoint_url=settings.aws_endpoint_url,
+                config=build_client_config(settings),
+            )
+    return client
+
+
+def clear_aws_clients():
+    """Drops every cached session and client"""
+    global _lock  # pylint: disable=W0603
+    _lock = threading.Lock()
+    _sessions.clear()
+    _clients.clear()
+
+
+# Pooled sockets and locks must not be shared with a forked worker
+os.register_at_fork(after_in_child=clear_aws_clients)
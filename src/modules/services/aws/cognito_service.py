@@ -1,9 +1,10 @@
 """AWS Cognito Client class"""
 
-from boto3.session import Session
-
 from src.modules.config.aws_settings import CognitoSettings
-from src.modules.utils.aws_helpers import calculate_secret_hash
+from src.modules.services.aws.client_factory import get_aws_client
+from src.modules.services.cache.single_flight import SingleFlight
+from src.modules.services.cache.token_cache import TokenCache
+from src.modules.utils.aws_helpers import calculate_secret_hash, call_aws
 
 
 class CognitoClient:
@@ -13,21 +14,22 @@ class CognitoClient:
         # Directly initialize with CognitoSettings
         self.env = CognitoSettings()
 
-        # Create a session using the AWS credentials
-        self.session = Session(
-            aws_access_key_id=self.env.aws_access_key_id,
-            aws_secret_access_key=self.env.aws_secret_access_key,
-            region_name=self.env.aws_region,
+        # Shared, pooled client for interacting with AWS Cognito
+        self.client = get_aws_client("cognito-idp", self.env)
+        # Cache of already validated access tokens
+        self.token_cache = TokenCache(
+            max_size=self.env.token_cache_max_size, ttl=self.env.token_cache_ttl
         )
-        # Create a client for interacting with AWS Cognito
-        self.client = self.session.client("cognito-idp")
+        # Concurrent validations of the same token share one GetUser call
+        self.user_lookups = SingleFlight("cognito_get_user")
 
     async def create_user_account(self, email: str, password: str):
         """
         Asynchronously creates a new user account in AWS Cognito.
         """
         try:
-            response = self.client.sign_up(
+            response = await call_aws(
+                self.client.sign_up,
                 ClientId=self.env.app_client_id,
                 SecretHash=calculate_secret_hash(
                     self.env.app_client_id, self.env.app_client_secret, email
@@ -54,7 +56,8 @@ class CognitoClient:
         Authenticates user credentials
         """
         try:
-            response = self.client.initiate_auth(
+            response = await call_aws(
+                self.client.initiate_auth,
                 AuthFlow="USER_PASSWORD_AUTH",
                 AuthParameters={
                     "USERNAME": email,
@@ -72,18 +75,42 @@ class CognitoClient:
             self.client.exceptions.UserNotConfirmedException,
         ):
             return {"error": "Incorrect Username or password!", "status_code": 401}
+        except (
+            self.client.exceptions.LimitExceededException,
+            self.client.exceptions.TooManyRequestsException,
+        ):
+            return {"error": "Too many requests", "status_code": 429}
         except Exception as e:
             return {"error": str(e), "status_code": 500}
 
-    def get_current_user(self, token: str | None):
+    async def get_current_user(self, token: str | None):
         """
         Validates access token. Returns current user
         """
+        if token and (user_sub := self.token_cache.get(token)):
+            return {"user_sub": user_sub}
+        if not token:
+            return await self._validate_token(token)
+        return await self.user_lookups.do(token, lambda: self._validate_token(token))
+
+    async def _validate_token(self, token: str | None):
+        """Asks Cognito who owns `token` and caches the answer"""
         try:
-            response = self.client.get_user(AccessToken=token)
+            response = await call_aws(self.client.get_user, AccessToken=token)
             user_sub = response.get('Username')
+            self.token_cache.remember(token, user_sub)
             return {"user_sub": user_sub}
         except self.client.exceptions.NotAuthorizedException:
             return {"error": "Not Authorized", "status_code": 401}
+        except (
+            self.client.exceptions.LimitExceededException,
+            self.client.exceptions.TooManyRequestsException,
+        ):
+            return {"error": "Too many requests", "status_code": 429}
         except Exception as e:
             return {"error": str(e), "status_code": 500}
+
+    def forget_token(self, token: str | None):
+        """Drops a token from the validation cache, e.g. on logout"""
+        if token:
+            self.token_cache.delete(token)
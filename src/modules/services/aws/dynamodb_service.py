@@ -1,12 +1,75 @@
 """AWS Cognito Client class"""
 
+import asyncio
+import logging
+import random
+import re
 import uuid
-from typing import List
-
-from boto3.session import Session
+from dataclasses import replace
+from datetime import datetime
+from typing import AsyncIterator, Callable, List
 
 from src.modules.config.aws_settings import DynamoDBSettings
-from src.modules.models.inputs.app_inputs import MedicineInput, UpdateMedicineInput
+from src.modules.models.inputs.app_inputs import (
+    DispenseInput,
+    MedicineInput,
+    QuantityAdjustmentInput,
+    UpdateMedicineInput,
+)
+from src.modules.models.records.change import DELETE, INSERT, UPDATE, MedicineChange
+from src.modules.models.records.journal import ADJUST, JournalEvent, new_event
+from src.modules.models.records.lot import LotDraw, dispensable_lots, plan_fifo, stock_key
+from src.modules.models.records.medicine import (
+    EDITABLE_FIELDS,
+    Medicine,
+    current_month,
+    serialize_fields,
+)
+from src.modules.models.records.summary import (
+    SUMMARY_FIELDS,
+    InventorySummary,
+    summary_deltas,
+)
+from src.modules.services.aws.client_factory import get_aws_client
+from src.modules.services.cache.inventory_cache import build_inventory_cache
+from src.modules.services.observability.instrumentation import enable_consumed_capacity
+from src.modules.services.observability.metrics import dispense_attempts
+from src.modules.utils.aws_helpers import (
+    build_projection,
+    call_aws,
+    decode_cursor,
+    encode_cursor,
+)
+from src.modules.utils.text_helpers import normalize_medicine_name
+
+# DynamoDB's per-request limit for BatchWriteItem
+BATCH_WRITE_SIZE = 25
+
+# DynamoDB's per-request limit for TransactWriteItems
+TRANSACT_WRITE_SIZE = 100
+
+MONTH_PATTERN = re.compile(r"^\d{4}-\d{2}$")
+
+# Times a summary-maintaining write is replanned after losing a race
+PINNED_WRITE_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+
+class WriteConflict(Exception):
+    """
+    Conditions of a transaction's writes failed. `failures` maps the index
+    of each failed write to its record as it is now, None if gone.
+    """
+
+    def __init__(self, failures: dict[int, dict | None]):
+        super().__init__("The conditional request failed")
+        self.failures = failures
+
+    @property
+    def item(self) -> dict | None:
+        """Current record of the first failed write"""
+        return next(iter(self.failures.values()))
 
 
 class DynamoDBClient:
@@ -16,58 +79,461 @@ class DynamoDBClient:
         # Directly initialize with DynamoDBSettings
         self.env = DynamoDBSettings()
 
-        # Create a session using the AWS credentials
-        self.session = Session(
-            aws_access_key_id=self.env.aws_access_key_id,
-            aws_secret_access_key=self.env.aws_secret_access_key,
-            region_name=self.env.aws_region,
-        )
-        # Create a client for interacting with AWS DynamoDB
-        self.client = self.session.client("dynamodb")
+        # Shared, pooled client for interacting with AWS DynamoDB
+        self.client = get_aws_client("dynamodb", self.env)
+        enable_consumed_capacity(self.client)
         self.table_name = self.env.table_name
+        # None disables the inventory summaries
+        self.summary_table_name = self.env.summary_table_name
+        # Table of the audit journal, None when it is disabled. Each write
+        # puts its journal event in the same transaction (see AuditJournal)
+        self.journal_table_name = self.env.journal_table_name
+        # Per-user cache of query results, patched by the write methods
+        self.inventory_cache = build_inventory_cache()
+        # Callbacks notified of every committed write, see add_listener
+        self.listeners: List[Callable[[MedicineChange], None]] = []
+        # Maps (name, type) to their reference spelling before writes, e.g.
+        # MedicineCatalog.normalize; None stores names as entered
+        self.name_normalizer: Callable[[str | None, str | None], tuple[str | None, str | None]] | None = None
+
+    @property
+    def _transactional(self) -> bool:
+        """Whether writes commit with their summary changes or journal events in one transaction"""
+        return bool(self.summary_table_name or self.journal_table_name)
+
+    def add_listener(self, listener: Callable[[MedicineChange], None]):
+        """
+        Registers a callback invoked with a MedicineChange after each
+        successful write. Listeners run inline, so they must be cheap.
+        """
+        self.listeners.append(listener)
+
+    def _publish(self, action: str, user_sub: str, medicine_id: str, item: dict | None = None):
+        """Notifies listeners of a committed write; a failing listener never fails the write"""
+        change = MedicineChange(action, user_sub, medicine_id, item)
+        for listener in self.listeners:
+            try:
+                listener(change)
+            except Exception as e:  # pylint: disable=W0718
+                logger.warning({"message": "Change listener failed", "error": str(e)})
+
+    def normalize_names(self, model):
+        """An input with its name and type respelled by name_normalizer, if set"""
+        if self.name_normalizer is None:
+            return model
+        medicine_name, medicine_type = self.name_normalizer(model.medicine_name, model.medicine_type)
+        if (medicine_name, medicine_type) == (model.medicine_name, model.medicine_type):
+            return model
+        return model.model_copy(
+            update={"medicine_name": medicine_name, "medicine_type": medicine_type}
+        )
 
     async def insert_medicine(self, medicine_input: MedicineInput):
         """Insert a new medicine record into the DynamoDB table"""
         # Generate a random UUID for medicine_id
         medicine_id = str(uuid.uuid4())
+        medicine_input = self.normalize_names(medicine_input)
         try:
             # Prepare the item for insertion
-            item = {
-                "user_sub": {"S": medicine_input.user_sub},
-                "medicine_id": {"S": medicine_id},
-                "medicine_name": {"S": medicine_input.medicine_name},
-                "medicine_type": {"S": medicine_input.medicine_type},
-                "quantity": {"N": str(medicine_input.quantity)},
-                "expiration_date": {"S": medicine_input.expiration_date},
-            }
+            item = self._build_medicine_item(medicine_input, medicine_id)
 
-            # Insert the item into the DynamoDB table
-            response = self.client.put_item(TableName=self.table_name, Item=item)
+            if self._transactional:
+                # Counted in the user's summary and journaled in the same transaction
+                response = await self._transact(
+                    [
+                        (
+                            "Put",
+                            {
+                                "TableName": self.table_name,
+                                "Item": item,
+                                "ConditionExpression": "attribute_not_exists(medicine_id)",
+                            },
+                        )
+                    ],
+                    {
+                        medicine_input.user_sub: summary_deltas(
+                            medicine_input.user_sub, None, Medicine.from_dynamodb(item)
+                        )
+                    },
+                    [new_event(medicine_input.user_sub, INSERT, medicine_id, item)],
+                )
+            else:
+                # Insert the item into the DynamoDB table
+                response = await call_aws(
+                    self.client.put_item, TableName=self.table_name, Item=item
+                )
+            self.inventory_cache.upsert_item(medicine_input.user_sub, item)
+            self._publish(INSERT, medicine_input.user_sub, medicine_id, item)
 
-            return response
+            return {**response, "medicine_id": medicine_id}
+        except Exception as e:
+            return {"error": str(e), "status_code": 500}
+
+    async def batch_insert_medicines(self, medicine_inputs: List[MedicineInput]):
+        """
+        Insert up to BATCH_WRITE_SIZE medicine records with one BatchWriteItem call
+        (one transaction, all or nothing, when inventory summaries or the
+        audit journal are kept).
+        Unprocessed items are retried with exponential backoff; the indexes
+        of inputs that still could not be written are returned in `failed`.
+        """
+        if len(medicine_inputs) > BATCH_WRITE_SIZE:
+            return {
+                "error": f"At most {BATCH_WRITE_SIZE} items per batch",
+                "status_code": 422,
+            }
+        index_by_id = {}
+        requests = []
+        for index, medicine_input in enumerate(medicine_inputs):
+            medicine_id = str(uuid.uuid4())
+            index_by_id[medicine_id] = index
+            item = self._build_medicine_item(self.normalize_names(medicine_input), medicine_id)
+            requests.append({"PutRequest": {"Item": item}})
+        items = [request["PutRequest"]["Item"] for request in requests]
+        try:
+            for attempt in range(self.env.batch_write_max_retries + 1):
+                if attempt:
+                    # Exponential backoff with full jitter
+                    await asyncio.sleep(random.uniform(0, 0.05 * 2**attempt))
+                if self._transactional:
+                    await self._transact_batch(requests)
+                    requests = []
+                else:
+                    response = await call_aws(
+                        self.client.batch_write_item,
+                        RequestItems={self.table_name: requests},
+                    )
+                    requests = response.get("UnprocessedItems", {}).get(self.table_name, [])
+                if not requests:
+                    break
+            for user_sub in {row.user_sub for row in medicine_inputs}:
+                self.inventory_cache.invalidate(user_sub)
+            failed = sorted(
+                index_by_id[request["PutRequest"]["Item"]["medicine_id"]["S"]]
+                for request in requests
+            )
+            failed_indexes = set(failed)
+            for index, item in enumerate(items):
+                if index not in failed_indexes:
+                    self._publish(
+                        INSERT, item["user_sub"]["S"], item["medicine_id"]["S"], item
+                    )
+            return {"written": len(medicine_inputs) - len(failed), "failed": failed}
         except Exception as e:
             return {"error": str(e), "status_code": 500}
 
+    async def _transact_batch(self, requests: List[dict]):
+        """
+        Writes a batch of PutRequests together with their summary changes and
+        journal events in one transaction, so either all of them are written
+        or none.
+        """
+        summaries: dict[str, InventorySummary] = {}
+        for request in requests:
+            item = request["PutRequest"]["Item"]
+            user_sub = item["user_sub"]["S"]
+            summaries.setdefault(user_sub, InventorySummary(user_sub)).add(
+                Medicine.from_dynamodb(item)
+            )
+        await self._transact(
+            [
+                (
+                    "Put",
+                    {
+                        "TableName": self.table_name,
+                        "Item": request["PutRequest"]["Item"],
+                        "ConditionExpression": "attribute_not_exists(medicine_id)",
+                    },
+                )
+                for request in requests
+            ],
+            {user_sub: summary.counters() for user_sub, summary in summaries.items()},
+            [
+                new_event(
+                    request["PutRequest"]["Item"]["user_sub"]["S"],
+                    INSERT,
+                    request["PutRequest"]["Item"]["medicine_id"]["S"],
+                    request["PutRequest"]["Item"],
+                )
+                for request in requests
+            ],
+        )
+
+    @staticmethod
+    def _build_medicine_item(medicine_input: MedicineInput, medicine_id: str) -> dict:
+        """Serializes a medicine input into DynamoDB attribute values"""
+        return Medicine.from_input(medicine_input, medicine_id).to_dynamodb()
+
     async def get_medicines_by_user_sub(self, user_sub: str):
         """Query all medicine records for a given user_sub"""
+        if (items := self.inventory_cache.get(user_sub)) is not None:
+            return items
+        generation = self.inventory_cache.generation(user_sub)
         try:
-            # Query the DynamoDB table for items with the specified user_sub
-            response = self.client.query(
+            # Follow LastEvaluatedKey so partitions above 1 MB are not truncated
+            items = [
+                item async for item in self.iter_medicines_by_user_sub(user_sub)
+            ]
+            self.inventory_cache.set(user_sub, items, generation)
+            return items
+        except Exception as e:
+            return {"error": str(e), "status_code": 500}
+
+    async def get_medicine(self, user_sub: str, medicine_id: str):
+        """Fetch a single medicine record, from the inventory cache when possible"""
+        if (items := self.inventory_cache.get(user_sub)) is not None:
+            for item in items:
+                if item["medicine_id"]["S"] == medicine_id:
+                    return item
+            return {"error": "Medicine not found", "status_code": 404}
+        try:
+            response = await call_aws(
+                self.client.get_item,
                 TableName=self.table_name,
-                KeyConditionExpression="user_sub = :user_sub",
-                ExpressionAttributeValues={":user_sub": {"S": user_sub}},
+                Key={"user_sub": {"S": user_sub}, "medicine_id": {"S": medicine_id}},
             )
-            items = response.get("Items", [])
-            return items
+            if "Item" not in response:
+                return {"error": "Medicine not found", "status_code": 404}
+            return response["Item"]
+        except Exception as e:
+            return {"error": str(e), "status_code": 500}
+
+    async def get_medicines_page(
+        self,
+        user_sub: str,
+        page_size: int,
+        cursor: str | None = None,
+        projection: List[str] | None = None,
+        by_name: bool = False,
+    ):
+        """
+        Query a single page of medicine records, resuming from a cursor.
+        With `by_name`, pages come from the name index in alphabetical order.
+        """
+        try:
+            response = await self._query_medicines(
+                user_sub,
+                page_size=page_size,
+                start_key=decode_cursor(cursor),
+                projection=projection,
+                index_name=self.env.name_index_name if by_name else None,
+            )
+            return {
+                "items": response.get("Items", []),
+                "next_cursor": encode_cursor(response.get("LastEvaluatedKey")),
+            }
+        except ValueError as e:
+            return {"error": str(e), "status_code": 400}
+        except Exception as e:
+            return {"error": str(e), "status_code": 500}
+
+    async def get_medicines_expiring_before(self, user_sub: str, month: str):
+        """Query medicine records expiring before `month` (YYYY-MM) via the expiry index"""
+        if not MONTH_PATTERN.match(month):
+            return {"error": "Month must be in 'YYYY-MM' format.", "status_code": 422}
+        try:
+            return [
+                item
+                async for item in self._iter_query(
+                    user_sub,
+                    index_name=self.env.expiration_index_name,
+                    sort_key_condition="expiration_date < :month",
+                    sort_key_values={":month": {"S": month}},
+                )
+            ]
         except Exception as e:
             return {"error": str(e), "status_code": 500}
 
+    async def get_expired_medicines(self, user_sub: str):
+        """Query medicine records that expired before the current month"""
+        return await self.get_medicines_expiring_before(
+            user_sub, datetime.now().strftime("%Y-%m")
+        )
+
+    async def get_medicines_by_name_prefix(self, user_sub: str, prefix: str):
+        """Query medicine records whose normalized name starts with `prefix`"""
+        try:
+            return [
+                item
+                async for item in self._iter_query(
+                    user_sub,
+                    index_name=self.env.name_index_name,
+                    sort_key_condition="begins_with(medicine_name_key, :prefix)",
+                    sort_key_values={":prefix": {"S": normalize_medicine_name(prefix)}},
+                )
+            ]
+        except Exception as e:
+            return {"error": str(e), "status_code": 500}
+
+    async def iter_medicines_by_user_sub(
+        self,
+        user_sub: str,
+        page_size: int | None = None,
+        projection: List[str] | None = None,
+        consistent: bool = False,
+    ) -> AsyncIterator[dict]:
+        """
+        Streams medicine records page by page, following LastEvaluatedKey.
+        Errors propagate to the caller instead of returning an error dict.
+        """
+        async for item in self._iter_query(
+            user_sub, page_size=page_size, projection=projection, consistent=consistent
+        ):
+            yield item
+
+    async def iter_medicine_pages(
+        self,
+        user_sub: str,
+        page_size: int | None = None,
+        projection: List[str] | None = None,
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Streams a user's medicine records one Query page at a time, requesting
+        the next page while the caller works on the current one. At most two
+        pages are held at once. Errors propagate to the caller.
+        """
+        next_page = asyncio.ensure_future(
+            self._query_medicines(user_sub, page_size=page_size, projection=projection)
+        )
+        try:
+            while next_page is not None:
+                response = await next_page
+                next_page = None
+                if start_key := response.get("LastEvaluatedKey"):
+                    next_page = asyncio.ensure_future(
+                        self._query_medicines(
+                            user_sub,
+                            page_size=page_size,
+                            start_key=start_key,
+                            projection=projection,
+                        )
+                    )
+                yield response.get("Items", [])
+        finally:
+            # The consumer stopped early (e.g. the client disconnected)
+            if next_page is not None:
+                next_page.cancel()
+
+    async def _iter_query(self, user_sub: str, **query_args) -> AsyncIterator[dict]:
+        """Yields every item matched by _query_medicines across all pages"""
+        start_key = None
+        while True:
+            response = await self._query_medicines(
+                user_sub, start_key=start_key, **query_args
+            )
+            for item in response.get("Items", []):
+                yield item
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                break
+
+    async def _query_medicines(
+        self,
+        user_sub: str,
+        page_size: int | None = None,
+        start_key: dict | None = None,
+        projection: List[str] | None = None,
+        index_name: str | None = None,
+        sort_key_condition: str | None = None,
+        sort_key_values: dict | None = None,
+        consistent: bool = False,
+    ) -> dict:
+        """Issues one Query call against the user's partition or one of its indexes"""
+        key_condition = "user_sub = :user_sub"
+        if sort_key_condition:
+            key_condition += f" AND {sort_key_condition}"
+        query_kwargs = {
+            "TableName": self.table_name,
+            "KeyConditionExpression": key_condition,
+            "ExpressionAttributeValues": {
+                ":user_sub": {"S": user_sub},
+                **(sort_key_values or {}),
+            },
+            **build_projection(projection),
+        }
+        if index_name:
+            query_kwargs["IndexName"] = index_name
+        if page_size:
+            query_kwargs["Limit"] = page_size
+        if start_key:
+            query_kwargs["ExclusiveStartKey"] = start_key
+        if consistent:
+            query_kwargs["ConsistentRead"] = True
+        return await call_aws(self.client.query, **query_kwargs)
+
+    async def scan_medicines(
+        self,
+        page_size: int | None = None,
+        projection: List[str] | None = None,
+        filter_expression: str | None = None,
+        filter_values: dict | None = None,
+        segment: int | None = None,
+        total_segments: int | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Streams every medicine record of every user, page by page.
+        With `segment`/`total_segments`, only that slice of a parallel scan.
+        Errors propagate to the caller instead of returning an error dict.
+        """
+        async for response in self.scan_medicine_pages(
+            page_size=page_size,
+            projection=projection,
+            filter_expression=filter_expression,
+            filter_values=filter_values,
+            segment=segment,
+            total_segments=total_segments,
+        ):
+            for item in response.get("Items", []):
+                yield item
+
+    async def scan_medicine_pages(
+        self,
+        page_size: int | None = None,
+        projection: List[str] | None = None,
+        filter_expression: str | None = None,
+        filter_values: dict | None = None,
+        segment: int | None = None,
+        total_segments: int | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Like scan_medicines, but yields the raw Scan responses, so callers
+        can see ScannedCount and ConsumedCapacity of every page.
+        """
+        scan_kwargs = {"TableName": self.table_name, **build_projection(projection)}
+        if filter_expression:
+            scan_kwargs["FilterExpression"] = filter_expression
+            scan_kwargs["ExpressionAttributeValues"] = filter_values or {}
+        if page_size:
+            scan_kwargs["Limit"] = page_size
+        if total_segments:
+            scan_kwargs["Segment"] = segment
+            scan_kwargs["TotalSegments"] = total_segments
+        while True:
+            response = await call_aws(self.client.scan, **scan_kwargs)
+            yield response
+            if not (start_key := response.get("LastEvaluatedKey")):
+                break
+            scan_kwargs["ExclusiveStartKey"] = start_key
+
     async def delete_medicine(self, user_sub: str, medicine_id: str):
         """Delete a medicine record from the DynamoDB table"""
         try:
             key = {"user_sub": {"S": user_sub}, "medicine_id": {"S": medicine_id}}
+            if self._transactional:
+                return await self._pinned_write(
+                    user_sub,
+                    medicine_id,
+                    # Already gone: nothing to count out, like a plain DeleteItem
+                    lambda current: {} if current is None else (
+                        "Delete", {"TableName": self.table_name, "Key": key}, None
+                    ),
+                )
             # Delete the item from the DynamoDB table
-            response = self.client.delete_item(TableName=self.table_name, Key=key)
+            response = await call_aws(
+                self.client.delete_item, TableName=self.table_name, Key=key
+            )
+            self.inventory_cache.remove_item(user_sub, medicine_id)
+            self._publish(DELETE, user_sub, medicine_id)
             return response
         except Exception as e:
             return {"error": str(e), "status_code": 500}
@@ -76,40 +542,689 @@ class DynamoDBClient:
     self,
     update_medicine_input: UpdateMedicineInput,
     ):
-        """Edit a medicine record in the DynamoDB table"""
+        """
+        Edit a medicine record in the DynamoDB table.
+        Only fields that are set (and, when the cached copy is at the expected
+        version, actually differ) are written. A `version` makes the write
+        conditional, so concurrent edits fail with 409 instead of overwriting.
+        Changes to counted fields also update the inventory summary, and
+        with the audit journal every edit is pinned to the version it
+        journals.
+        """
+        update_medicine_input = self.normalize_names(update_medicine_input)
+        user_sub = update_medicine_input.user_sub
+        medicine_id = update_medicine_input.medicine_id
+        expected_version = update_medicine_input.version
         try:
-            # Initialize update expression components
-            update_expression_parts: List[str] = []
-            expression_attribute_values = {}
-
-            # Directly map fields to the update expression
-            field_map = {
-                "medicine_name": "S",
-                "medicine_type": "S",
-                "quantity": "N",
-                "expiration_date": "S",
-            }
+            changes = update_medicine_input.model_dump(
+                include=set(EDITABLE_FIELDS), exclude_none=True
+            )
+
+            # Drop unchanged fields when the cached copy is the version the client saw
+            current = self._cached_medicine(user_sub, medicine_id)
+            if current is not None and expected_version is not None:
+                cached = Medicine.from_dynamodb(current)
+                if cached.version == expected_version:
+                    changes = {
+                        field: value
+                        for field, value in changes.items()
+                        if getattr(cached, field) != value
+                    }
+                    if not changes:
+                        return {"Attributes": current}
+            if not changes:
+                return {"error": "Nothing to update", "status_code": 422}
 
-            for field, dynamo_type in field_map.items():
-                value = getattr(update_medicine_input, field)
-                update_expression_parts.append(f"{field} = :{field}")
-                expression_attribute_values[f":{field}"] = {dynamo_type: str(value)}
+            if self.journal_table_name or (
+                self.summary_table_name and SUMMARY_FIELDS & changes.keys()
+            ):
+                return await self._pinned_write(
+                    user_sub,
+                    medicine_id,
+                    lambda current: self._plan_edit(current, changes, expected_version),
+                )
 
-            # Join the update expression parts into a single string
-            update_expression = "SET " + ", ".join(update_expression_parts)
+            update_expression, expression_attribute_values = self._edit_expression(changes)
+
+            # Never recreate a record another session already deleted
+            condition_expression = "attribute_exists(medicine_id)"
+            if expected_version is not None:
+                condition_expression += " AND " + self._version_condition(
+                    expected_version, expression_attribute_values
+                )
 
             # Perform the update operation using DynamoDB API
-            response = self.client.update_item(
+            response = await call_aws(
+                self.client.update_item,
                 TableName=self.table_name,
                 Key={
-                    "user_sub": {"S": update_medicine_input.user_sub},
-                    "medicine_id": {"S": update_medicine_input.medicine_id}
+                    "user_sub": {"S": user_sub},
+                    "medicine_id": {"S": medicine_id}
                 },
                 UpdateExpression=update_expression,
+                ConditionExpression=condition_expression,
+                ExpressionAttributeNames={"#version": "version"},
                 ExpressionAttributeValues=expression_attribute_values,
+                ReturnValues="ALL_NEW",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
             )
+            self.inventory_cache.upsert_item(user_sub, response["Attributes"])
+            self._publish(UPDATE, user_sub, medicine_id, response["Attributes"])
 
             return response
 
+        except self.client.exceptions.ConditionalCheckFailedException as e:
+            return self._condition_failure(
+                e,
+                user_sub,
+                medicine_id,
+                "Medicine was changed on another terminal, reload and retry",
+            )
+        except Exception as e:
+            return {"error": str(e), "status_code": 500}
+
+    @staticmethod
+    def _edit_expression(changes: dict) -> tuple[str, dict]:
+        """UpdateExpression and values setting the changed fields and bumping the version"""
+        # Initialize update expression components
+        update_expression_parts: List[str] = []
+        expression_attribute_values = {":one": {"N": "1"}}
+
+        # Reuse the record serializer for the changed attributes
+        for field, value in serialize_fields(changes).items():
+            update_expression_parts.append(f"{field} = :{field}")
+            expression_attribute_values[f":{field}"] = value
+
+        # Join the update expression parts into a single string
+        update_expression = (
+            "SET " + ", ".join(update_expression_parts) + " ADD #version :one"
+        )
+        return update_expression, expression_attribute_values
+
+    def _plan_edit(self, current: dict | None, changes: dict, expected_version: int | None):
+        """Plans an edit for _pinned_write"""
+        if current is None:
+            return {"error": "Medicine not found", "status_code": 404}
+        version = Medicine.from_dynamodb(current).version
+        if expected_version is not None and version != expected_version:
+            return {
+                "error": "Medicine was changed on another terminal, reload and retry",
+                "status_code": 409,
+                "Item": current,
+            }
+        update_expression, expression_attribute_values = self._edit_expression(changes)
+        request = {
+            "TableName": self.table_name,
+            "Key": {"user_sub": current["user_sub"], "medicine_id": current["medicine_id"]},
+            "UpdateExpression": update_expression,
+            "ExpressionAttributeValues": expression_attribute_values,
+        }
+        new_item = {
+            **current,
+            **serialize_fields(changes),
+            "version": {"N": str(version + 1)},
+        }
+        return "Update", request, new_item
+
+    async def adjust_quantity(self, adjustment: QuantityAdjustmentInput):
+        """
+        Atomically add `delta` to a medicine's quantity (ADD quantity :delta).
+        Dispensing (negative delta) is refused rather than going below zero.
+        """
+        try:
+            if self._transactional:
+                return await self._adjust_in_transaction(adjustment)
+            expression_attribute_values = {
+                ":delta": {"N": str(adjustment.delta)},
+                ":one": {"N": "1"},
+            }
+            condition_expression = "attribute_exists(medicine_id)"
+            if adjustment.delta < 0:
+                condition_expression += " AND quantity >= :needed"
+                expression_attribute_values[":needed"] = {"N": str(-adjustment.delta)}
+
+            response = await call_aws(
+                self.client.update_item,
+                TableName=self.table_name,
+                Key={
+                    "user_sub": {"S": adjustment.user_sub},
+                    "medicine_id": {"S": adjustment.medicine_id},
+                },
+                UpdateExpression="ADD quantity :delta, #version :one",
+                ConditionExpression=condition_expression,
+                ExpressionAttributeNames={"#version": "version"},
+                ExpressionAttributeValues=expression_attribute_values,
+                ReturnValues="ALL_NEW",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+            self.inventory_cache.upsert_item(adjustment.user_sub, response["Attributes"])
+            self._publish(
+                UPDATE, adjustment.user_sub, adjustment.medicine_id, response["Attributes"]
+            )
+            return response
+        except self.client.exceptions.ConditionalCheckFailedException as e:
+            return self._condition_failure(
+                e, adjustment.user_sub, adjustment.medicine_id, "Not enough stock"
+            )
+        except Exception as e:
+            return {"error": str(e), "status_code": 500}
+
+    async def _adjust_in_transaction(self, adjustment: QuantityAdjustmentInput) -> dict:
+        """
+        adjust_quantity when it commits with its summary change or journal
+        event. The write is the same ADD as without them, so concurrent
+        adjustments of a medicine do not conflict with each other; the
+        journal records the delta. Only the medicine type decides which
+        summary counters the delta goes to, so with summaries the write is
+        pinned to the type.
+        """
+        user_sub, medicine_id = adjustment.user_sub, adjustment.medicine_id
+        current = None
+        if self.summary_table_name:
+            current = self._cached_medicine(user_sub, medicine_id)
+            if current is None:
+                current = await self._read_medicine(user_sub, medicine_id)
+        for _ in range(PINNED_WRITE_ATTEMPTS):
+            if self.summary_table_name and current is None:
+                self.inventory_cache.remove_item(user_sub, medicine_id)
+                return {"error": "Medicine not found", "status_code": 404}
+            expression_attribute_values = {
+                ":delta": {"N": str(adjustment.delta)},
+                ":one": {"N": "1"},
+            }
+            condition_expression = "attribute_exists(medicine_id)"
+            deltas = {}
+            if self.summary_table_name:
+                medicine = Medicine.from_dynamodb(current)
+                condition_expression += " AND medicine_type = :medicine_type"
+                expression_attribute_values[":medicine_type"] = {"S": medicine.medicine_type}
+                adjusted = replace(medicine, quantity=medicine.quantity + adjustment.delta)
+                deltas = {user_sub: summary_deltas(user_sub, medicine, adjusted)}
+            if adjustment.delta < 0:
+                condition_expression += " AND quantity >= :needed"
+                expression_attribute_values[":needed"] = {"N": str(-adjustment.delta)}
+            request = {
+                "TableName": self.table_name,
+                "Key": {"user_sub": {"S": user_sub}, "medicine_id": {"S": medicine_id}},
+                "UpdateExpression": "ADD quantity :delta, #version :one",
+                "ConditionExpression": condition_expression,
+                "ExpressionAttributeNames": {"#version": "version"},
+                "ExpressionAttributeValues": expression_attribute_values,
+                "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+            }
+            try:
+                await self._transact(
+                    [("Update", request)],
+                    deltas,
+                    [new_event(user_sub, ADJUST, medicine_id, quantities={medicine_id: adjustment.delta})],
+                )
+            except WriteConflict as conflict:
+                current = conflict.item
+                if current is None:
+                    self.inventory_cache.remove_item(user_sub, medicine_id)
+                    return {"error": "Medicine not found", "status_code": 404}
+                if not self.summary_table_name or (
+                    Medicine.from_dynamodb(current).medicine_type == medicine.medicine_type
+                ):
+                    self.inventory_cache.upsert_item(user_sub, current)
+                    return {"error": "Not enough stock", "status_code": 409, "Item": current}
+                continue
+            # Transactions return no attributes, and other adjustments may have
+            # landed too, so read the committed record back
+            item = await self._read_medicine(user_sub, medicine_id)
+            if item is None:
+                # Deleted right after the adjustment
+                self.inventory_cache.remove_item(user_sub, medicine_id)
+                self._publish(DELETE, user_sub, medicine_id)
+                return {"error": "Medicine not found", "status_code": 404}
+            self.inventory_cache.upsert_item(user_sub, item)
+            self._publish(UPDATE, user_sub, medicine_id, item)
+            return {"Attributes": item}
+        return {
+            "error": "Medicine is being changed on another terminal, retry",
+            "status_code": 409,
+        }
+
+    async def dispense_fifo(self, dispense_input: DispenseInput):
+        """
+        Dispenses `quantity` units of a medicine from its lots (the rows
+        sharing its normalized name and type), earliest expiry first, in one
+        write: a TransactWriteItems call when it spans several lots or the
+        summary. Expired lots are never dispensed. Each lot write ADDs to the
+        quantity on condition the lot still holds the units and is the same
+        lot, so dispenses drawing from one lot at the same time all go
+        through. If a lot ran short first, the dispense backs off and is
+        replanned from a fresh read of the lots. The audit journal records
+        the units taken from each lot in one event.
+        """
+        user_sub = dispense_input.user_sub
+        key = stock_key(dispense_input.medicine_name, dispense_input.medicine_type)
+        try:
+            lots, cached = await self._stock_lots(user_sub, key)
+            for attempt in range(max(1, self.env.dispense_max_attempts)):
+                month = current_month()
+                medicines = [Medicine.from_dynamodb(item) for item in lots.values()]
+                plan = plan_fifo(medicines, dispense_input.quantity, month)
+                if plan is None:
+                    if cached:
+                        # Refused on the cached copy, which may be stale
+                        lots, cached = await self._stock_lots(user_sub, key, use_cache=False)
+                        continue
+                    dispense_attempts.inc(outcome="refused")
+                    if not lots:
+                        return {"error": "Medicine not found", "status_code": 404}
+                    available = sum(lot.quantity for lot in dispensable_lots(medicines, month))
+                    return {
+                        "error": f"Not enough stock, {available} available",
+                        "status_code": 409,
+                    }
+                # One action per lot, plus the summary and the journal event
+                max_lots = TRANSACT_WRITE_SIZE - (2 if self.journal_table_name else 1)
+                if len(plan) > max_lots:
+                    return {
+                        "error": f"A dispense can draw from at most {max_lots} lots",
+                        "status_code": 422,
+                    }
+
+                writes = []
+                summary = InventorySummary(user_sub)
+                for lot, taken in plan:
+                    writes.append(("Update", self._draw_update(lot, taken)))
+                    summary.add(replace(lot, quantity=lot.quantity - taken))
+                    summary.add(lot, -1)
+                try:
+                    items = await self._commit_draws(user_sub, plan, writes, summary)
+                except WriteConflict as conflict:
+                    dispense_attempts.inc(outcome="conflict")
+                    failed = {
+                        plan[index][0].medicine_id: item
+                        for index, item in conflict.failures.items()
+                    }
+                    # Lots that ran short mean other dispenses are draining
+                    # this medicine, so the other lots have likely changed as
+                    # well; back off and take a fresh look at all of them
+                    await asyncio.sleep(random.uniform(0, 0.005 * 2**attempt))
+                    lots, cached = await self._stock_lots(user_sub, key, use_cache=False)
+                    for medicine_id, item in failed.items():
+                        self._merge_lot(user_sub, key, lots, medicine_id, item)
+                    continue
+
+                dispense_attempts.inc(outcome="committed")
+                draws = []
+                for (lot, taken), item in zip(plan, items):
+                    if item is None:
+                        # Deleted right after the dispense
+                        self.inventory_cache.remove_item(user_sub, lot.medicine_id)
+                        self._publish(DELETE, user_sub, lot.medicine_id)
+                        remaining = 0
+                    else:
+                        self.inventory_cache.upsert_item(user_sub, item)
+                        self._publish(UPDATE, user_sub, lot.medicine_id, item)
+                        remaining = Medicine.from_dynamodb(item).quantity
+                    draws.append(LotDraw(lot.medicine_id, lot.expiration_date, taken, remaining))
+                return {
+                    "dispensed": dispense_input.quantity,
+                    "lots": [draw.to_json() for draw in draws],
+                }
+            return {
+                "error": "Stock is being dispensed on another terminal, retry",
+                "status_code": 409,
+            }
         except Exception as e:
             return {"error": str(e), "status_code": 500}
+
+    def _merge_lot(
+        self, user_sub: str, key: tuple[str, str], lots: dict, medicine_id: str, item: dict | None
+    ):
+        """
+        Applies a lot's state returned by a failed condition to the planning
+        copy and the inventory cache. A lot that is gone, or no longer of
+        this medicine, leaves the plan.
+        """
+        if item is None:
+            self.inventory_cache.remove_item(user_sub, medicine_id)
+            lots.pop(medicine_id, None)
+            return
+        self.inventory_cache.upsert_item(user_sub, item)
+        current = Medicine.from_dynamodb(item)
+        if stock_key(current.medicine_name, current.medicine_type) != key:
+            lots.pop(medicine_id, None)
+        elif medicine_id not in lots or (
+            Medicine.from_dynamodb(lots[medicine_id]).version <= current.version
+        ):
+            lots[medicine_id] = item
+
+    async def _commit_draws(
+        self,
+        user_sub: str,
+        plan: list,
+        writes: List[tuple[str, dict]],
+        summary: InventorySummary,
+    ) -> list[dict | None]:
+        """
+        Commits a dispense's lot updates and returns the lots as committed.
+        Drawing from one lot without summaries or journal is a single
+        UpdateItem that returns the new item; anything else is a transaction,
+        with the lots read back. A lot that ran short raises WriteConflict
+        either way.
+        """
+        if len(writes) == 1 and not self._transactional:
+            try:
+                response = await call_aws(
+                    self.client.update_item, **writes[0][1], ReturnValues="ALL_NEW"
+                )
+            except self.client.exceptions.ConditionalCheckFailedException as e:
+                raise WriteConflict({0: e.response.get("Item")}) from e
+            return [response["Attributes"]]
+        await self._transact(
+            writes,
+            {user_sub: summary.counters()},
+            [
+                new_event(
+                    user_sub,
+                    ADJUST,
+                    plan[0][0].medicine_id,
+                    quantities={lot.medicine_id: -taken for lot, taken in plan},
+                )
+            ],
+        )
+        # Transactions return no attributes, and other dispenses may have
+        # drawn from the same lots, so read them back
+        return list(
+            await asyncio.gather(
+                *(self._read_medicine(user_sub, lot.medicine_id) for lot, _ in plan)
+            )
+        )
+
+    def _draw_update(self, lot: Medicine, taken: int) -> dict:
+        """
+        Update request taking `taken` units from a lot. It is pinned to the
+        fields that place the lot in the FIFO order and the summary, not to
+        the version, so it commutes with other draws and restocks.
+        """
+        request = {
+            "TableName": self.table_name,
+            "Key": {"user_sub": {"S": lot.user_sub}, "medicine_id": {"S": lot.medicine_id}},
+            "UpdateExpression": "ADD quantity :taken, #version :one",
+            "ConditionExpression": (
+                "attribute_exists(medicine_id) AND quantity >= :needed"
+                " AND medicine_name = :medicine_name AND medicine_type = :medicine_type"
+                " AND expiration_date = :expiration_date"
+            ),
+            "ExpressionAttributeNames": {"#version": "version"},
+            "ExpressionAttributeValues": {
+                ":taken": {"N": str(-taken)},
+                ":needed": {"N": str(taken)},
+                ":one": {"N": "1"},
+                ":medicine_name": {"S": lot.medicine_name},
+                ":medicine_type": {"S": lot.medicine_type},
+                ":expiration_date": {"S": lot.expiration_date},
+            },
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+        return request
+
+    async def _stock_lots(
+        self, user_sub: str, key: tuple[str, str], use_cache: bool = True
+    ) -> tuple[dict[str, dict], bool]:
+        """
+        A medicine's lots as medicine_id -> item, and whether they came from
+        the inventory cache; otherwise they are queried from the name index.
+        """
+        items = self.inventory_cache.get(user_sub) if use_cache else None
+        cached = items is not None
+        if items is None:
+            items = [
+                item
+                async for item in self._iter_query(
+                    user_sub,
+                    index_name=self.env.name_index_name,
+                    sort_key_condition="medicine_name_key = :name_key",
+                    sort_key_values={":name_key": {"S": key[0]}},
+                )
+            ]
+        lots = {}
+        for item in items:
+            # The stored name key skips other medicines without parsing them
+            name_key = item.get("medicine_name_key", {}).get("S")
+            if name_key is not None and name_key != key[0]:
+                continue
+            medicine = Medicine.from_dynamodb(item)
+            if stock_key(medicine.medicine_name, medicine.medicine_type) == key:
+                lots[medicine.medicine_id] = item
+        return lots, cached
+
+    async def _pinned_write(self, user_sub: str, medicine_id: str, plan) -> dict:
+        """
+        Writes a medicine together with the change to its user's summary and
+        its journal event.
+        The counter deltas depend on the record's current values, so
+        `plan(current)` gets the current item (None if there is none) and
+        returns either a final response or (kind, request, new item or None).
+        The write is conditional on the version it was planned from and is
+        replanned from the newer one when another write got in first.
+        """
+        current = self._cached_medicine(user_sub, medicine_id)
+        fresh = current is None
+        if fresh:
+            current = await self._read_medicine(user_sub, medicine_id)
+        for _ in range(PINNED_WRITE_ATTEMPTS):
+            planned = plan(current)
+            if isinstance(planned, dict):
+                if "error" in planned and not fresh:
+                    # Refused on the cached copy, which may be stale
+                    current, fresh = await self._read_medicine(user_sub, medicine_id), True
+                    continue
+                if current is None:
+                    self.inventory_cache.remove_item(user_sub, medicine_id)
+                else:
+                    self.inventory_cache.upsert_item(user_sub, current)
+                return planned
+
+            kind, request, new_item = planned
+            old = Medicine.from_dynamodb(current)
+            values = request.get("ExpressionAttributeValues", {})
+            request["ConditionExpression"] = (
+                "attribute_exists(medicine_id) AND "
+                + self._version_condition(old.version, values)
+            )
+            request["ExpressionAttributeNames"] = {"#version": "version"}
+            if values:
+                request["ExpressionAttributeValues"] = values
+            request["ReturnValuesOnConditionCheckFailure"] = "ALL_OLD"
+            new = Medicine.from_dynamodb(new_item) if new_item is not None else None
+            try:
+                await self._transact(
+                    [(kind, request)],
+                    {user_sub: summary_deltas(user_sub, old, new)},
+                    [new_event(user_sub, DELETE if new_item is None else UPDATE, medicine_id, new_item)],
+                )
+            except WriteConflict as conflict:
+                current, fresh = conflict.item, True
+                continue
+
+            if new_item is None:
+                self.inventory_cache.remove_item(user_sub, medicine_id)
+                self._publish(DELETE, user_sub, medicine_id)
+                return {}
+            self.inventory_cache.upsert_item(user_sub, new_item)
+            self._publish(UPDATE, user_sub, medicine_id, new_item)
+            return {"Attributes": new_item}
+        return {
+            "error": "Medicine is being changed on another terminal, retry",
+            "status_code": 409,
+        }
+
+    async def _transact(
+        self,
+        writes: List[tuple[str, dict]],
+        deltas: dict[str, dict],
+        events: List[JournalEvent] = (),
+    ) -> dict:
+        """
+        Commits medicine writes, given as (Put/Update/Delete, request), the
+        summary counter changes of each user and their journal `events`
+        (each kept only if its table is configured) in one
+        TransactWriteItems call. A failed condition on a medicine write
+        raises WriteConflict.
+        """
+        actions = [{kind: request} for kind, request in writes]
+        if self.journal_table_name:
+            actions.extend({"Put": self._journal_put(event)} for event in events)
+        if self.summary_table_name:
+            for user_sub, counters in deltas.items():
+                if counters:
+                    actions.append({"Update": self._summary_update(user_sub, counters)})
+        for attempt in range(self.env.batch_write_max_retries + 1):
+            if attempt:
+                # Exponential backoff with full jitter
+                await asyncio.sleep(random.uniform(0, 0.05 * 2**attempt))
+            try:
+                return await call_aws(self.client.transact_write_items, TransactItems=actions)
+            except self.client.exceptions.TransactionCanceledException as e:
+                reasons = e.response.get("CancellationReasons", [])
+                failures = {
+                    index: reason.get("Item")
+                    for index, reason in enumerate(reasons[: len(writes)])
+                    if reason.get("Code") == "ConditionalCheckFailed"
+                }
+                if failures:
+                    raise WriteConflict(failures) from e
+                # Another transaction held one of the items, e.g. the same
+                # user's summary; botocore does not retry these
+                if attempt == self.env.batch_write_max_retries or not any(
+                    reason.get("Code") == "TransactionConflict" for reason in reasons
+                ):
+                    raise
+
+    def _journal_put(self, event: JournalEvent) -> dict:
+        """Put request appending the journal event of a write to its transaction"""
+        return {
+            "TableName": self.journal_table_name,
+            "Item": event.to_dynamodb(),
+            # Events are never overwritten
+            "ConditionExpression": "attribute_not_exists(event_key)",
+        }
+
+    def _summary_update(self, user_sub: str, counters: dict[str, int]) -> dict:
+        """Update request adding `counters` to a user's summary, creating it if missing"""
+        names = {"#summary_version": "summary_version"}
+        values = {":one": {"N": "1"}}
+        parts = []
+        for index, (name, amount) in enumerate(counters.items()):
+            names[f"#c{index}"] = name
+            values[f":c{index}"] = {"N": str(amount)}
+            parts.append(f"#c{index} :c{index}")
+        return {
+            "TableName": self.summary_table_name,
+            "Key": {"user_sub": {"S": user_sub}},
+            "UpdateExpression": "ADD " + ", ".join(parts + ["#summary_version :one"]),
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": values,
+        }
+
+    async def _read_medicine(self, user_sub: str, medicine_id: str) -> dict | None:
+        """Strongly consistent read of one record, None if it does not exist"""
+        response = await call_aws(
+            self.client.get_item,
+            TableName=self.table_name,
+            Key={"user_sub": {"S": user_sub}, "medicine_id": {"S": medicine_id}},
+            ConsistentRead=True,
+        )
+        return response.get("Item")
+
+    async def get_inventory_summary(self, user_sub: str):
+        """
+        Reads a user's summary with a single GetItem, whatever the size of
+        the inventory. Returns None when summaries are disabled. A user
+        without a summary yet, e.g. whose medicines predate the summary
+        table, gets one built from their records.
+        """
+        if not self.summary_table_name:
+            return None
+        try:
+            response = await call_aws(
+                self.client.get_item,
+                TableName=self.summary_table_name,
+                Key={"user_sub": {"S": user_sub}},
+            )
+            if "Item" in response:
+                return InventorySummary.from_dynamodb(response["Item"])
+            _, summary = await self.rebuild_inventory_summary(user_sub)
+            return summary
+        except Exception as e:
+            return {"error": str(e), "status_code": 500}
+
+    async def rebuild_inventory_summary(
+        self, user_sub: str, write: bool = True
+    ) -> tuple[InventorySummary | None, InventorySummary]:
+        """
+        Recounts a user's summary from their medicines and, with `write`,
+        replaces the stored one if it drifted. The replacement is conditional
+        on the summary version read before counting, so a write committed
+        meanwhile makes the recount start over instead of being lost.
+        Returns (stored summary or None, recounted summary); errors propagate.
+        """
+        key = {"user_sub": {"S": user_sub}}
+        for _ in range(PINNED_WRITE_ATTEMPTS):
+            response = await call_aws(
+                self.client.get_item,
+                TableName=self.summary_table_name,
+                Key=key,
+                ConsistentRead=True,
+            )
+            stored = InventorySummary.from_dynamodb(response["Item"]) if "Item" in response else None
+            rebuilt = InventorySummary(user_sub)
+            async for item in self._iter_query(
+                user_sub, projection=sorted(SUMMARY_FIELDS), consistent=True
+            ):
+                rebuilt.add(Medicine.from_dynamodb(item))
+            if not write or (stored is not None and stored.same_totals(rebuilt)):
+                return stored, rebuilt
+
+            stored_version = stored.version if stored is not None else 0
+            rebuilt.version = stored_version + 1
+            condition_kwargs = {"ConditionExpression": "attribute_not_exists(summary_version)"}
+            if stored_version:
+                condition_kwargs = {
+                    "ConditionExpression": "summary_version = :version",
+                    "ExpressionAttributeValues": {":version": {"N": str(stored_version)}},
+                }
+            try:
+                await call_aws(
+                    self.client.put_item,
+                    TableName=self.summary_table_name,
+                    Item=rebuilt.to_dynamodb(),
+                    **condition_kwargs,
+                )
+                return stored, rebuilt
+            except self.client.exceptions.ConditionalCheckFailedException:
+                continue
+        raise RuntimeError(f"Inventory of {user_sub} kept changing during the summary rebuild")
+
+    def _cached_medicine(self, user_sub: str, medicine_id: str) -> dict | None:
+        """Returns the cached item for a medicine without touching DynamoDB"""
+        for item in self.inventory_cache.get(user_sub) or ():
+            if item["medicine_id"]["S"] == medicine_id:
+                return item
+        return None
+
+    @staticmethod
+    def _version_condition(expected_version: int, values: dict) -> str:
+        """Builds the optimistic-concurrency check; legacy items have no version"""
+        if expected_version == 0:
+            return "attribute_not_exists(#version)"
+        values[":expected_version"] = {"N": str(expected_version)}
+        return "#version = :expected_version"
+
+    def _condition_failure(
+        self, error, user_sub: str, medicine_id: str, conflict_message: str
+    ) -> dict:
+        """Maps a failed condition to 404 (item gone) or 409 (item changed)"""
+        current = error.response.get("Item")
+        if current is None:
+            self.inventory_cache.remove_item(user_sub, medicine_id)
+            return {"error": "Medicine not found", "status_code": 404}
+        # Our cached copy is stale, refresh it with what DynamoDB returned
+        self.inventory_cache.upsert_item(user_sub, current)
+        return {"error": conflict_message, "status_code": 409, "Item": current}
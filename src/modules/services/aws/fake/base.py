@@ -0,0 +1,98 @@
+"""Pieces shared by the in-process AWS fakes: errors, client metadata, latency"""
+
+import random
+import threading
+import time
+
+
+class FakeClientError(Exception):
+    """
+    Mirrors botocore's ClientError: carries `response` and formats its
+    message the same way, so the services' error handling works unchanged.
+    """
+
+    def __init__(self, operation_name: str, code: str, message: str, **extra):
+        self.operation_name = operation_name
+        self.response = {
+            "Error": {"Code": code, "Message": message},
+            "ResponseMetadata": {"HTTPStatusCode": 400, "RetryAttempts": 0},
+            **extra,
+        }
+        super().__init__(
+            f"An error occurred ({code}) when calling the {operation_name} operation: {message}"
+        )
+
+
+class FakeExceptions:
+    """
+    Stand-in for `client.exceptions`: any `<Code>` attribute resolves to a
+    FakeClientError subclass, created once per code, for use in except clauses.
+    """
+
+    def __init__(self):
+        self._classes: dict[str, type] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, code: str) -> type:
+        if code.startswith("_"):
+            raise AttributeError(code)
+        with self._lock:
+            if code not in self._classes:
+                self._classes[code] = type(code, (FakeClientError,), {})
+            return self._classes[code]
+
+    def error(self, operation_name: str, code: str, message: str, **extra) -> FakeClientError:
+        """Builds the exception a real client would raise for `code`"""
+        return getattr(self, code)(operation_name, code, message, **extra)
+
+
+class _ServiceModel:
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+
+
+class _Events:
+    def register(self, *_, **__):
+        """botocore event hooks do not apply to the fakes"""
+
+
+class _Meta:
+    def __init__(self, service_name: str):
+        self.service_model = _ServiceModel(service_name)
+        self.events = _Events()
+
+
+class Latency:
+    """Blocking delay injected into every fake call, like a network round trip"""
+
+    def __init__(self, seconds: float = 0.0, jitter: float = 0.0):
+        self.seconds = seconds
+        self.jitter = jitter
+
+    def wait(self):
+        """Sleeps for `seconds` plus up to `jitter` seconds"""
+        delay = self.seconds + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FakeClient:
+    """Base for the fake boto3 clients: `meta`, `exceptions` and latency"""
+
+    service_name = ""
+
+    def __init__(self, latency: Latency | None = None):
+        self.meta = _Meta(self.service_name)
+        self.exceptions = FakeExceptions()
+        self.latency = latency or Latency()
+        self.calls: dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def _begin(self, operation_name: str):
+        """Counts the call and applies the injected latency (outside the lock)"""
+        self.calls[operation_name] = self.calls.get(operation_name, 0) + 1
+        self.latency.wait()
+
+    @staticmethod
+    def _metadata() -> dict:
+        return {"ResponseMetadata": {"HTTPStatusCode": 200, "RetryAttempts": 0}}
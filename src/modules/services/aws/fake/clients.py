@@ -0,0 +1,57 @@
+"""Process-wide fake clients handed out by the client factory when AWS_BACKEND=fake"""
+
+import os
+import threading
+
+from src.modules.config.aws_settings import BaseAwsSettings
+from src.modules.services.aws.fake.base import FakeClient, Latency
+from src.modules.services.aws.fake.cognito import FakeCognito
+from src.modules.services.aws.fake.dynamodb import FakeDynamoDB
+
+_lock = threading.Lock()
+_fakes: dict[str, FakeClient] = {}
+
+
+def get_fake_client(service_name: str, settings: BaseAwsSettings) -> FakeClient:
+    """
+    Returns the fake for a service, shared by every client of this process
+    so data written through one DynamoDBClient is visible to the others.
+    The tables named in the settings are created with the app's key schemas.
+    """
+    with _lock:
+        fake = _fakes.get(service_name)
+        if fake is None:
+            latency = Latency(settings.fake_aws_latency, settings.fake_aws_latency_jitter)
+            if service_name == "dynamodb":
+                fake = FakeDynamoDB(latency)
+            elif service_name == "cognito-idp":
+                fake = FakeCognito(latency)
+            else:
+                raise ValueError(f"No fake available for the {service_name} service")
+            _fakes[service_name] = fake
+    if isinstance(fake, FakeDynamoDB) and (table_name := getattr(settings, "table_name", None)):
+        fake.define_table(
+            table_name,
+            "user_sub",
+            "medicine_id",
+            {
+                settings.expiration_index_name: ("user_sub", "expiration_date"),
+                settings.name_index_name: ("user_sub", "medicine_name_key"),
+            },
+        )
+        if summary_table_name := getattr(settings, "summary_table_name", None):
+            fake.define_table(summary_table_name, "user_sub")
+        if journal_table_name := getattr(settings, "journal_table_name", None):
+            fake.define_table(journal_table_name, "user_sub", "event_key")
+    return fake
+
+
+def reset_fake_clients():
+    """Discards every fake and the data it holds"""
+    global _lock  # pylint: disable=W0603
+    _lock = threading.Lock()
+    _fakes.clear()
+
+
+# A forked worker starts with its own, empty fakes
+os.register_at_fork(after_in_child=reset_fake_clients)
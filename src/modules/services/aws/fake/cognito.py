@@ -0,0 +1,131 @@
+"""In-process stand-in for the Cognito user pool operations the app uses"""
+
+import base64
+import json
+import os
+import time
+import uuid
+
+from src.modules.services.aws.fake.base import FakeClient, Latency
+
+# Lifetime of issued access tokens, as in a default app client
+TOKEN_LIFETIME = 3600
+
+
+def _encode_segment(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+class FakeCognito(FakeClient):
+    """
+    Implements sign_up, initiate_auth (USER_PASSWORD_AUTH) and get_user.
+    Users are confirmed on sign-up since no email is sent. Access tokens
+    are unsigned JWTs carrying `sub` and `exp`, so the token cache can
+    read their expiry like it does for real ones.
+    """
+
+    service_name = "cognito-idp"
+
+    def __init__(self, latency: Latency | None = None, min_password_length: int = 8):
+        super().__init__(latency)
+        self.min_password_length = min_password_length
+        # email -> {"sub", "password", "confirmed"}
+        self.users: dict[str, dict] = {}
+        self.emails: dict[str, str] = {}
+        # access token -> (sub, expires at)
+        self.tokens: dict[str, tuple[str, float]] = {}
+
+    def add_user(self, email: str, password: str, confirmed: bool = True) -> str:
+        """Seeds a user directly and returns its sub"""
+        with self._lock:
+            user = self.users.setdefault(
+                email, {"sub": str(uuid.uuid4()), "password": password, "confirmed": confirmed}
+            )
+            self.emails[user["sub"]] = email
+            return user["sub"]
+
+    def issue_token(self, sub: str, lifetime: float = TOKEN_LIFETIME) -> str:
+        """Creates an access token for `sub` without a sign-in call"""
+        now = time.time()
+        token = ".".join(
+            (
+                _encode_segment({"alg": "none", "kid": "fake"}),
+                _encode_segment(
+                    {
+                        "sub": sub,
+                        "username": sub,
+                        "token_use": "access",
+                        "iat": int(now),
+                        "exp": int(now + lifetime),
+                        "jti": os.urandom(8).hex(),
+                    }
+                ),
+                "fake",
+            )
+        )
+        with self._lock:
+            self.tokens[token] = (sub, now + lifetime)
+        return token
+
+    def sign_up(self, **kwargs) -> dict:
+        """SignUp; enforces a minimum password length and unique usernames"""
+        self._begin("SignUp")
+        email, password = kwargs["Username"], kwargs["Password"]
+        if len(password) < self.min_password_length:
+            raise self.exceptions.error(
+                "SignUp",
+                "InvalidPasswordException",
+                "Password did not conform with policy: Password not long enough",
+            )
+        with self._lock:
+            if email in self.users:
+                raise self.exceptions.error("SignUp", "UsernameExistsException", "User already exists")
+            sub = self.add_user(email, password)
+        return {"UserConfirmed": True, "UserSub": sub, **self._metadata()}
+
+    def initiate_auth(self, **kwargs) -> dict:
+        """InitiateAuth with USER_PASSWORD_AUTH"""
+        self._begin("InitiateAuth")
+        if kwargs.get("AuthFlow") != "USER_PASSWORD_AUTH":
+            raise self.exceptions.error(
+                "InitiateAuth", "InvalidParameterException", "Only USER_PASSWORD_AUTH is supported"
+            )
+        parameters = kwargs.get("AuthParameters", {})
+        user = self.users.get(parameters.get("USERNAME", ""))
+        if user is None or user["password"] != parameters.get("PASSWORD"):
+            raise self.exceptions.error(
+                "InitiateAuth", "NotAuthorizedException", "Incorrect username or password."
+            )
+        if not user["confirmed"]:
+            raise self.exceptions.error("InitiateAuth", "UserNotConfirmedException", "User is not confirmed.")
+        return {
+            "ChallengeParameters": {},
+            "AuthenticationResult": {
+                "AccessToken": self.issue_token(user["sub"]),
+                "ExpiresIn": TOKEN_LIFETIME,
+                "TokenType": "Bearer",
+                "RefreshToken": os.urandom(16).hex(),
+                "IdToken": os.urandom(16).hex(),
+            },
+            **self._metadata(),
+        }
+
+    def get_user(self, **kwargs) -> dict:
+        """GetUser for an access token issued by this fake"""
+        self._begin("GetUser")
+        entry = self.tokens.get(kwargs.get("AccessToken") or "")
+        if entry is None:
+            raise self.exceptions.error("GetUser", "NotAuthorizedException", "Invalid Access Token")
+        sub, expires_at = entry
+        if expires_at <= time.time():
+            raise self.exceptions.error("GetUser", "NotAuthorizedException", "Access Token has expired")
+        email = self.emails.get(sub, "")
+        return {
+            "Username": sub,
+            "UserAttributes": [
+                {"Name": "sub", "Value": sub},
+                {"Name": "email", "Value": email},
+            ],
+            **self._metadata(),
+        }
@@ -0,0 +1,629 @@
+"""In-process stand-in for the DynamoDB operations the app uses"""
+
+import bisect
+import math
+import zlib
+from decimal import Decimal
+
+from src.modules.services.aws.fake.base import FakeClient, Latency
+from src.modules.services.aws.fake.expressions import (
+    ExpressionError,
+    apply_update,
+    evaluate,
+    parse_condition,
+    parse_projection,
+    parse_update,
+)
+
+# DynamoDB stops a Query/Scan page after 1 MB of items read
+MAX_PAGE_BYTES = 1024 * 1024
+
+
+def _key_value(value: dict):
+    """Orderable python value of a key attribute (S, N or B)"""
+    if "S" in value:
+        return value["S"]
+    if "N" in value:
+        return Decimal(value["N"])
+    if "B" in value:
+        return value["B"]
+    raise ExpressionError("Key attributes must be of type S, N or B")
+
+
+def _copy_value(value: dict) -> dict:
+    """Copies an attribute value, recursing into lists and maps"""
+    if "M" in value:
+        return {"M": {name: _copy_value(inner) for name, inner in value["M"].items()}}
+    if "L" in value:
+        return {"L": [_copy_value(inner) for inner in value["L"]]}
+    return dict(value)
+
+
+def _copy_item(item: dict, attributes: list[str] | None = None) -> dict:
+    """Copies an item (or only `attributes` of it), as a real response would"""
+    if attributes is None:
+        return {name: _copy_value(value) for name, value in item.items()}
+    return {name: _copy_value(item[name]) for name in attributes if name in item}
+
+
+def _value_size(value: dict) -> int:
+    """Approximate stored size of an attribute value in bytes"""
+    (type_name, inner), = value.items()
+    if type_name == "M":
+        return 3 + sum(len(name) + _value_size(nested) for name, nested in inner.items())
+    if type_name == "L":
+        return 3 + sum(_value_size(nested) for nested in inner)
+    if type_name in ("SS", "NS", "BS"):
+        return sum(len(member) for member in inner)
+    if type_name in ("BOOL", "NULL"):
+        return 1
+    return len(inner)
+
+
+def item_size(item: dict) -> int:
+    """Approximate item size in bytes, as DynamoDB meters it"""
+    return sum(len(name) + _value_size(value) for name, value in item.items())
+
+
+class FakeTable:
+    """One table: items grouped by partition, each partition sorted by range key"""
+
+    def __init__(self, name: str, hash_key: str, range_key: str | None, indexes: dict):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        # index name -> (hash key, range key)
+        self.indexes = dict(indexes)
+        self.partitions: dict = {}
+        self.sort_keys: dict = {}
+        # Sorted hash key values, the order Scan walks partitions in
+        self.hash_values: list = []
+        self.count = 0
+
+    def key_of(self, item: dict) -> tuple:
+        """(hash, range) python values of an item or a Key map"""
+        if self.hash_key not in item or (self.range_key and self.range_key not in item):
+            raise ExpressionError("The provided key element does not match the schema")
+        return (
+            _key_value(item[self.hash_key]),
+            _key_value(item[self.range_key]) if self.range_key else None,
+        )
+
+    def key_attributes(self, item: dict) -> dict:
+        """The primary key attributes of an item"""
+        names = [self.hash_key] + ([self.range_key] if self.range_key else [])
+        return {name: dict(item[name]) for name in names}
+
+    def get(self, key: tuple) -> dict | None:
+        return self.partitions.get(key[0], {}).get(key[1])
+
+    def put(self, key: tuple, item: dict):
+        partition = self.partitions.get(key[0])
+        if partition is None:
+            partition = self.partitions[key[0]] = {}
+            bisect.insort(self.hash_values, key[0])
+        if key[1] not in partition:
+            bisect.insort(self.sort_keys.setdefault(key[0], []), key[1])
+            self.count += 1
+        partition[key[1]] = item
+
+    def delete(self, key: tuple) -> dict | None:
+        partition = self.partitions.get(key[0])
+        if partition is None or key[1] not in partition:
+            return None
+        item = partition.pop(key[1])
+        keys = self.sort_keys[key[0]]
+        del keys[bisect.bisect_left(keys, key[1])]
+        self.count -= 1
+        if not partition:
+            del self.partitions[key[0]]
+            del self.sort_keys[key[0]]
+            del self.hash_values[bisect.bisect_left(self.hash_values, key[0])]
+        return item
+
+    def ordered(self, hash_value, index_name: str | None) -> list[tuple[tuple, dict]]:
+        """(position, item) pairs of one partition in base-table or index order"""
+        partition = self.partitions.get(hash_value, {})
+        if index_name is None:
+            return [((range_value,), partition[range_value]) for range_value in self.sort_keys.get(hash_value, [])]
+        _, index_range = self.indexes[index_name]
+        entries = [
+            ((_key_value(item[index_range]), range_value), item)
+            for range_value, item in partition.items()
+            # Sparse index: items without the index key are not in it
+            if index_range in item
+        ]
+        entries.sort(key=lambda entry: entry[0])
+        return entries
+
+
+class FakeDynamoDB(FakeClient):
+    """
+    Implements put/get/update/delete_item, query, scan, batch_write_item,
+    batch_get_item and transact_write_items over in-memory tables, with
+    DynamoDB's paging (Limit, 1 MB pages, LastEvaluatedKey), conditional
+    writes and consumed capacity reporting.
+    """
+
+    service_name = "dynamodb"
+
+    def __init__(self, latency: Latency | None = None):
+        super().__init__(latency)
+        self.tables: dict[str, FakeTable] = {}
+
+    def define_table(
+        self,
+        name: str,
+        hash_key: str,
+        range_key: str | None = None,
+        indexes: dict | None = None,
+    ) -> FakeTable:
+        """Creates a table (or returns the existing one) with the given key schema"""
+        with self._lock:
+            if name not in self.tables:
+                self.tables[name] = FakeTable(name, hash_key, range_key, indexes or {})
+            return self.tables[name]
+
+    def load_items(self, table_name: str, items: list[dict]):
+        """Seeds items directly, without latency or capacity accounting"""
+        table = self._table("LoadItems", table_name)
+        with self._lock:
+            for item in items:
+                table.put(table.key_of(item), _copy_item(item))
+
+    # Helpers
+
+    def _table(self, operation: str, name: str) -> FakeTable:
+        table = self.tables.get(name)
+        if table is None:
+            raise self.exceptions.error(
+                operation, "ResourceNotFoundException", f"Requested resource not found: Table: {name} not found"
+            )
+        return table
+
+    def _validation(self, operation: str, message: str):
+        return self.exceptions.error(operation, "ValidationException", message)
+
+    @staticmethod
+    def _capacity(table: FakeTable, size: int, write: bool, kwargs: dict) -> dict:
+        """ConsumedCapacity for a read (4 KB units, eventually consistent) or write (1 KB)"""
+        if kwargs.get("ReturnConsumedCapacity") == "NONE":
+            return {}
+        if write:
+            units = float(max(1, math.ceil(size / 1024)))
+        else:
+            units = max(1, math.ceil(size / 4096)) * (1.0 if kwargs.get("ConsistentRead") else 0.5)
+        return {"ConsumedCapacity": {"TableName": table.name, "CapacityUnits": units}}
+
+    def _check(self, operation: str, kwargs: dict, current: dict | None, condition_key: str = "ConditionExpression"):
+        """Raises ConditionalCheckFailedException if the write's condition does not hold"""
+        expression = kwargs.get(condition_key)
+        if not expression:
+            return
+        tree = parse_condition(
+            expression,
+            kwargs.get("ExpressionAttributeNames"),
+            kwargs.get("ExpressionAttributeValues"),
+        )
+        if evaluate(tree, current or {}):
+            return
+        extra = {}
+        if current is not None and kwargs.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD":
+            extra["Item"] = _copy_item(current)
+        raise self.exceptions.error(
+            operation, "ConditionalCheckFailedException", "The conditional request failed", **extra
+        )
+
+    @staticmethod
+    def _return_values(kwargs: dict, old: dict | None, new: dict | None) -> dict:
+        mode = kwargs.get("ReturnValues", "NONE")
+        if mode == "ALL_OLD" and old is not None:
+            return {"Attributes": _copy_item(old)}
+        if mode == "ALL_NEW" and new is not None:
+            return {"Attributes": _copy_item(new)}
+        if mode in ("UPDATED_NEW", "UPDATED_OLD"):
+            source = new if mode == "UPDATED_NEW" else old
+            if source is not None:
+                changed = [
+                    name
+                    for name in set(old or {}) | set(new or {})
+                    if (old or {}).get(name) != (new or {}).get(name)
+                ]
+                return {"Attributes": _copy_item(source, changed)}
+        return {}
+
+    # Single-item operations
+
+    def put_item(self, **kwargs) -> dict:
+        """PutItem with optional ConditionExpression and ReturnValues=ALL_OLD"""
+        self._begin("PutItem")
+        table = self._table("PutItem", kwargs["TableName"])
+        item = _copy_item(kwargs["Item"])
+        try:
+            key = table.key_of(item)
+            with self._lock:
+                old = table.get(key)
+                self._check("PutItem", kwargs, old)
+                table.put(key, item)
+        except ExpressionError as e:
+            raise self._validation("PutItem", str(e)) from e
+        return {
+            **self._return_values(kwargs, old, None),
+            **self._capacity(table, item_size(item), True, kwargs),
+            **self._metadata(),
+        }
+
+    def get_item(self, **kwargs) -> dict:
+        """GetItem with optional ProjectionExpression"""
+        self._begin("GetItem")
+        table = self._table("GetItem", kwargs["TableName"])
+        try:
+            key = table.key_of(kwargs["Key"])
+        except ExpressionError as e:
+            raise self._validation("GetItem", str(e)) from e
+        with self._lock:
+            item = table.get(key)
+            response = {}
+            if item is not None:
+                response["Item"] = _copy_item(item, self._projection(kwargs))
+        size = item_size(item) if item is not None else 0
+        return {**response, **self._capacity(table, size, False, kwargs), **self._metadata()}
+
+    def delete_item(self, **kwargs) -> dict:
+        """DeleteItem with optional ConditionExpression and ReturnValues=ALL_OLD"""
+        self._begin("DeleteItem")
+        table = self._table("DeleteItem", kwargs["TableName"])
+        try:
+            key = table.key_of(kwargs["Key"])
+            with self._lock:
+                old = table.get(key)
+                self._check("DeleteItem", kwargs, old)
+                table.delete(key)
+        except ExpressionError as e:
+            raise self._validation("DeleteItem", str(e)) from e
+        size = item_size(old) if old is not None else 0
+        return {
+            **self._return_values(kwargs, old, None),
+            **self._capacity(table, size, True, kwargs),
+            **self._metadata(),
+        }
+
+    def update_item(self, **kwargs) -> dict:
+        """UpdateItem: creates the item if missing unless the condition forbids it"""
+        self._begin("UpdateItem")
+        table = self._table("UpdateItem", kwargs["TableName"])
+        try:
+            key = table.key_of(kwargs["Key"])
+            actions = parse_update(
+                kwargs.get("UpdateExpression", ""),
+                kwargs.get("ExpressionAttributeNames"),
+                kwargs.get("ExpressionAttributeValues"),
+            )
+            with self._lock:
+                old = table.get(key)
+                self._check("UpdateItem", kwargs, old)
+                new = _copy_item(old) if old is not None else _copy_item(kwargs["Key"])
+                apply_update(actions, new)
+                table.put(key, new)
+        except ExpressionError as e:
+            raise self._validation("UpdateItem", str(e)) from e
+        return {
+            **self._return_values(kwargs, old, new),
+            **self._capacity(table, item_size(new), True, kwargs),
+            **self._metadata(),
+        }
+
+    # Multi-item reads
+
+    @staticmethod
+    def _projection(kwargs: dict) -> list[str] | None:
+        expression = kwargs.get("ProjectionExpression")
+        if not expression:
+            return None
+        return parse_projection(expression, kwargs.get("ExpressionAttributeNames"))
+
+    def _page(self, operation: str, table: FakeTable, entries, kwargs: dict, position_of) -> dict:
+        """
+        Pages through (position, item) entries the way Query/Scan do: Limit
+        and the 1 MB cap count items read, the filter applies afterwards.
+        """
+        filter_tree = None
+        if kwargs.get("FilterExpression"):
+            filter_tree = parse_condition(
+                kwargs["FilterExpression"],
+                kwargs.get("ExpressionAttributeNames"),
+                kwargs.get("ExpressionAttributeValues"),
+            )
+        projection = self._projection(kwargs)
+        limit = kwargs.get("Limit")
+        if limit is not None and limit < 1:
+            raise self._validation(operation, "Limit must be greater than or equal to 1")
+        items, scanned, read_bytes, last = [], 0, 0, None
+        for position, item in entries:
+            scanned += 1
+            read_bytes += item_size(item)
+            if filter_tree is None or evaluate(filter_tree, item):
+                items.append(_copy_item(item, projection))
+            last = (position, item)
+            if (limit is not None and scanned >= limit) or read_bytes >= MAX_PAGE_BYTES:
+                break
+        else:
+            last = None
+        response = {"Count": len(items), "ScannedCount": scanned}
+        if kwargs.get("Select") != "COUNT":
+            response["Items"] = items
+        if last is not None:
+            response["LastEvaluatedKey"] = position_of(*last)
+        return {**response, **self._capacity(table, read_bytes, False, kwargs), **self._metadata()}
+
+    def query(self, **kwargs) -> dict:
+        """Query on the table or a GSI, in sort-key order (ScanIndexForward=False reverses)"""
+        self._begin("Query")
+        table = self._table("Query", kwargs["TableName"])
+        index_name = kwargs.get("IndexName")
+        if index_name is not None and index_name not in table.indexes:
+            raise self._validation("Query", f"The table does not have the specified index: {index_name}")
+        hash_key = table.indexes[index_name][0] if index_name else table.hash_key
+        forward = kwargs.get("ScanIndexForward", True)
+        try:
+            tree = parse_condition(
+                kwargs["KeyConditionExpression"],
+                kwargs.get("ExpressionAttributeNames"),
+                kwargs.get("ExpressionAttributeValues"),
+            )
+            hash_value = self._partition_value(tree, hash_key)
+
+            def position_of(_, item):
+                key = table.key_attributes(item)
+                if index_name:
+                    for name in table.indexes[index_name]:
+                        key[name] = dict(item[name])
+                return key
+
+            bounds = self._range_bounds(tree, table.range_key) if index_name is None else (None, None)
+            with self._lock:
+                entries = self._query_entries(
+                    table, hash_value, index_name, forward, kwargs.get("ExclusiveStartKey"), bounds
+                )
+                # Items outside the key condition are never read, so they do not count
+                matching = ((position, item) for position, item in entries if evaluate(tree, item))
+                return self._page("Query", table, matching, kwargs, position_of)
+        except ExpressionError as e:
+            raise self._validation("Query", str(e)) from e
+
+    @staticmethod
+    def _query_entries(
+        table: FakeTable, hash_value, index_name, forward: bool, start: dict | None, bounds: tuple = (None, None)
+    ):
+        """
+        Lazily yields (position, item) of a partition in query order, after
+        ExclusiveStartKey. Base-table order comes from the partition's sorted
+        keys, so resuming a page or seeking to the range key `bounds` costs a
+        bisect rather than a full pass.
+        """
+        range_value = _key_value(start[table.range_key]) if start and table.range_key else None
+        if index_name is None:
+            keys = table.sort_keys.get(hash_value, [])
+            partition = table.partitions.get(hash_value, {})
+            low, high = bounds
+            first = bisect.bisect_left(keys, low) if low is not None else 0
+            end = bisect.bisect_right(keys, high) if high is not None else len(keys)
+            if forward:
+                if start:
+                    first = max(first, bisect.bisect_right(keys, range_value))
+                indexes = range(first, end)
+            else:
+                if start:
+                    end = min(end, bisect.bisect_left(keys, range_value))
+                indexes = range(end - 1, first - 1, -1)
+            return (((keys[index],), partition[keys[index]]) for index in indexes)
+        entries = table.ordered(hash_value, index_name)
+        if not forward:
+            entries.reverse()
+        if start:
+            marker = (_key_value(start[table.indexes[index_name][1]]), range_value)
+            if forward:
+                positions = [position for position, _ in entries]
+                entries = entries[bisect.bisect_right(positions, marker):]
+            else:
+                entries = [entry for entry in entries if entry[0] < marker]
+        return iter(entries)
+
+    @staticmethod
+    def _range_bounds(tree: tuple, range_key: str | None) -> tuple:
+        """
+        Inclusive (low, high) range key values a key condition can match,
+        None for an open end. Only narrows the read; the condition still
+        decides which items match.
+        """
+        if range_key is None:
+            return None, None
+        if tree[0] == "and":
+            for side in (tree[1], tree[2]):
+                bounds = FakeDynamoDB._range_bounds(side, range_key)
+                if bounds != (None, None):
+                    return bounds
+            return None, None
+        path = ("path", (range_key,))
+        if tree[0] == "between" and tree[1] == path and tree[2][0] == tree[3][0] == "value":
+            return _key_value(tree[2][1]), _key_value(tree[3][1])
+        if tree[0] == "compare" and tree[2] == path and tree[3][0] == "value":
+            value = _key_value(tree[3][1])
+            return {
+                "=": (value, value),
+                ">": (value, None),
+                ">=": (value, None),
+                "<": (None, value),
+                "<=": (None, value),
+            }.get(tree[1], (None, None))
+        if tree[0] == "function" and tree[1] == "begins_with" and tree[2][0] == path and tree[2][1][0] == "value":
+            return _key_value(tree[2][1][1]), None
+        return None, None
+
+    @staticmethod
+    def _partition_value(tree: tuple, hash_key: str):
+        """Finds the `hash_key = :value` equality a key condition must contain"""
+        if tree[0] == "and":
+            for side in (tree[1], tree[2]):
+                try:
+                    return FakeDynamoDB._partition_value(side, hash_key)
+                except ExpressionError:
+                    continue
+        if (
+            tree[0] == "compare"
+            and tree[1] == "="
+            and tree[2] == ("path", (hash_key,))
+            and tree[3][0] == "value"
+        ):
+            return _key_value(tree[3][1])
+        raise ExpressionError("Query condition missed key schema element: " + hash_key)
+
+    def scan(self, **kwargs) -> dict:
+        """Scan in partition order; Segment/TotalSegments split partitions by hash"""
+        self._begin("Scan")
+        table = self._table("Scan", kwargs["TableName"])
+        segment, total_segments = kwargs.get("Segment"), kwargs.get("TotalSegments")
+        if (segment is None) != (total_segments is None):
+            raise self._validation("Scan", "Segment and TotalSegments must be given together")
+        start = kwargs.get("ExclusiveStartKey")
+        try:
+            start_position = table.key_of(start) if start else None
+            with self._lock:
+                hash_values = table.hash_values
+                first = 0 if start_position is None else bisect.bisect_left(hash_values, start_position[0])
+
+                def entries():
+                    # Partitions do not change while the lock is held
+                    for position in range(first, len(hash_values)):
+                        hash_value = hash_values[position]
+                        if total_segments and zlib.crc32(str(hash_value).encode()) % total_segments != segment:
+                            continue
+                        resume = None
+                        if start_position is not None and hash_value == start_position[0]:
+                            if not table.range_key:
+                                continue
+                            resume = {table.range_key: start[table.range_key]}
+                        for (range_value,), item in self._query_entries(table, hash_value, None, True, resume):
+                            yield (hash_value, range_value), item
+
+                return self._page(
+                    "Scan", table, entries(), kwargs, lambda _, item: table.key_attributes(item)
+                )
+        except ExpressionError as e:
+            raise self._validation("Scan", str(e)) from e
+
+    # Batches and transactions
+
+    def batch_write_item(self, **kwargs) -> dict:
+        """BatchWriteItem of up to 25 put/delete requests; never leaves items unprocessed"""
+        self._begin("BatchWriteItem")
+        requests = kwargs["RequestItems"]
+        if sum(len(table_requests) for table_requests in requests.values()) > 25:
+            raise self._validation("BatchWriteItem", "Too many items requested for the BatchWriteItem call")
+        capacity = []
+        with self._lock:
+            for table_name, table_requests in requests.items():
+                table = self._table("BatchWriteItem", table_name)
+                units = 0.0
+                for request in table_requests:
+                    if "PutRequest" in request:
+                        item = _copy_item(request["PutRequest"]["Item"])
+                        table.put(table.key_of(item), item)
+                        units += max(1, math.ceil(item_size(item) / 1024))
+                    else:
+                        old = table.delete(table.key_of(request["DeleteRequest"]["Key"]))
+                        units += max(1, math.ceil(item_size(old or {}) / 1024))
+                capacity.append({"TableName": table_name, "CapacityUnits": units})
+        return {"UnprocessedItems": {}, "ConsumedCapacity": capacity, **self._metadata()}
+
+    def batch_get_item(self, **kwargs) -> dict:
+        """BatchGetItem of up to 100 keys"""
+        self._begin("BatchGetItem")
+        responses, capacity = {}, []
+        with self._lock:
+            for table_name, request in kwargs["RequestItems"].items():
+                table = self._table("BatchGetItem", table_name)
+                projection = self._projection(request)
+                found, size = [], 0
+                for key in request["Keys"]:
+                    if (item := table.get(table.key_of(key))) is not None:
+                        found.append(_copy_item(item, projection))
+                        size += item_size(item)
+                responses[table_name] = found
+                capacity.append(
+                    {"TableName": table_name, "CapacityUnits": max(1, math.ceil(size / 4096)) * 0.5}
+                )
+        return {"Responses": responses, "UnprocessedKeys": {}, "ConsumedCapacity": capacity, **self._metadata()}
+
+    def transact_write_items(self, **kwargs) -> dict:
+        """
+        All-or-nothing Put/Update/Delete/ConditionCheck across tables. A failed
+        condition cancels the whole transaction with per-item reasons.
+        """
+        self._begin("TransactWriteItems")
+        actions = kwargs["TransactItems"]
+        if len(actions) > 100:
+            raise self._validation("TransactWriteItems", "Member must have length less than or equal to 100")
+        with self._lock:
+            planned, reasons, failed = [], [], False
+            for action in actions:
+                (kind, request), = action.items()
+                table = self._table("TransactWriteItems", request["TableName"])
+                try:
+                    key = table.key_of(request["Item"] if kind == "Put" else request["Key"])
+                    current = table.get(key)
+                    if any(table is other and key == other_key for other, other_key, *_ in planned):
+                        raise self._validation(
+                            "TransactWriteItems",
+                            "Transaction request cannot include multiple operations on one item",
+                        )
+                    self._check("TransactWriteItems", request, current)
+                    if kind == "Put":
+                        new = _copy_item(request["Item"])
+                    elif kind == "Update":
+                        new = _copy_item(current) if current is not None else _copy_item(request["Key"])
+                        apply_update(
+                            parse_update(
+                                request["UpdateExpression"],
+                                request.get("ExpressionAttributeNames"),
+                                request.get("ExpressionAttributeValues"),
+                            ),
+                            new,
+                        )
+                    elif kind == "Delete":
+                        new = None
+                    else:
+                        new = current
+                    planned.append((table, key, kind, new))
+                    reasons.append({"Code": "None"})
+                except self.exceptions.ConditionalCheckFailedException as e:
+                    failed = True
+                    reason = {"Code": "ConditionalCheckFailed", "Message": "The conditional request failed"}
+                    if "Item" in e.response:
+                        reason["Item"] = e.response["Item"]
+                    reasons.append(reason)
+                except ExpressionError as e:
+                    raise self._validation("TransactWriteItems", str(e)) from e
+            if failed:
+                codes = ", ".join(reason["Code"] for reason in reasons)
+                raise self.exceptions.error(
+                    "TransactWriteItems",
+                    "TransactionCanceledException",
+                    f"Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]",
+                    CancellationReasons=reasons,
+                )
+            capacity: dict[str, float] = {}
+            for table, key, kind, new in planned:
+                if kind == "Put" or kind == "Update":
+                    table.put(key, new)
+                elif kind == "Delete":
+                    table.delete(key)
+                # Transactional writes cost two write units per KB
+                units = 2.0 * max(1, math.ceil(item_size(new or {}) / 1024))
+                capacity[table.name] = capacity.get(table.name, 0.0) + units
+        return {
+            "ConsumedCapacity": [
+                {"TableName": name, "CapacityUnits": units} for name, units in capacity.items()
+            ],
+            **self._metadata(),
+        }
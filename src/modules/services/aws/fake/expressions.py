@@ -0,0 +1,390 @@
+"""
+Parser and evaluator for the subset of DynamoDB expressions the app uses.
+
+Conditions (key conditions, filters, condition checks) support comparisons,
+BETWEEN, IN, AND/OR/NOT, parentheses and the functions attribute_exists,
+attribute_not_exists, begins_with, contains and size. Update expressions
+support SET (with `+`/`-`, if_not_exists and list_append), ADD, REMOVE and
+DELETE. Paths may be dotted into maps; list indexes are not supported.
+"""
+
+import re
+from decimal import Decimal
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<op><>|<=|>=|=|<|>|\(|\)|,|\+|-)"
+    r"|(?P<value>:[A-Za-z0-9_]+)"
+    r"|(?P<name>#?[A-Za-z_][A-Za-z0-9_]*(?:\.#?[A-Za-z_][A-Za-z0-9_]*)*))"
+)
+_KEYWORDS = {"AND", "OR", "NOT", "BETWEEN", "IN", "SET", "ADD", "REMOVE", "DELETE"}
+_FUNCTIONS = {
+    "attribute_exists",
+    "attribute_not_exists",
+    "begins_with",
+    "contains",
+    "size",
+    "if_not_exists",
+    "list_append",
+}
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions outside the supported subset (ValidationException)"""
+
+
+def tokenize(expression: str) -> list[tuple[str, str]]:
+    """Splits an expression into (kind, text) tokens"""
+    tokens, position = [], 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise ExpressionError(f"Invalid expression near: {expression[position:]!r}")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "name" and text.upper() in _KEYWORDS:
+            kind, text = "keyword", text.upper()
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser over a token list"""
+
+    def __init__(self, expression: str, names: dict | None, values: dict | None):
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self, offset: int = 0) -> tuple[str, str] | None:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def take(self, kind: str | None = None, text: str | None = None) -> tuple[str, str]:
+        token = self.peek()
+        if token is None or (kind and token[0] != kind) or (text and token[1] != text):
+            raise ExpressionError(f"Expected {text or kind}, got {token}")
+        self.position += 1
+        return token
+
+    def accept(self, kind: str, text: str | None = None) -> bool:
+        token = self.peek()
+        if token is not None and token[0] == kind and (text is None or token[1] == text):
+            self.position += 1
+            return True
+        return False
+
+    def done(self) -> bool:
+        return self.position >= len(self.tokens)
+
+    # Operands
+
+    def path(self) -> tuple:
+        """Resolves #aliases and returns ('path', (part, ...))"""
+        _, text = self.take("name")
+        parts = []
+        for part in text.split("."):
+            if part.startswith("#"):
+                if part not in self.names:
+                    raise ExpressionError(f"Unknown attribute name alias {part}")
+                part = self.names[part]
+            parts.append(part)
+        return ("path", tuple(parts))
+
+    def operand(self) -> tuple:
+        token = self.peek()
+        if token is None:
+            raise ExpressionError("Unexpected end of expression")
+        kind, text = token
+        if kind == "value":
+            self.position += 1
+            if text not in self.values:
+                raise ExpressionError(f"Unknown attribute value {text}")
+            return ("value", self.values[text])
+        if kind == "name" and text in _FUNCTIONS and self.peek(1) == ("op", "("):
+            return self.function()
+        if kind == "name":
+            return self.path()
+        raise ExpressionError(f"Unexpected token {text!r}")
+
+    def function(self) -> tuple:
+        _, name = self.take("name")
+        self.take("op", "(")
+        arguments = [self.operand()]
+        while self.accept("op", ","):
+            arguments.append(self.operand())
+        self.take("op", ")")
+        return ("function", name, arguments)
+
+    # Conditions
+
+    def condition(self) -> tuple:
+        left = self.conjunction()
+        while self.accept("keyword", "OR"):
+            left = ("or", left, self.conjunction())
+        return left
+
+    def conjunction(self) -> tuple:
+        left = self.negation()
+        while self.accept("keyword", "AND"):
+            left = ("and", left, self.negation())
+        return left
+
+    def negation(self) -> tuple:
+        if self.accept("keyword", "NOT"):
+            return ("not", self.negation())
+        return self.comparison()
+
+    def comparison(self) -> tuple:
+        if self.accept("op", "("):
+            inner = self.condition()
+            self.take("op", ")")
+            return inner
+        left = self.operand()
+        if left[0] == "function" and left[1] != "size":
+            return left
+        token = self.peek()
+        if token and token[0] == "op" and token[1] in ("=", "<>", "<", "<=", ">", ">="):
+            self.position += 1
+            return ("compare", token[1], left, self.operand())
+        if self.accept("keyword", "BETWEEN"):
+            low = self.operand()
+            self.take("keyword", "AND")
+            return ("between", left, low, self.operand())
+        if self.accept("keyword", "IN"):
+            self.take("op", "(")
+            options = [self.operand()]
+            while self.accept("op", ","):
+                options.append(self.operand())
+            self.take("op", ")")
+            return ("in", left, options)
+        raise ExpressionError(f"Expected a comparison, got {token}")
+
+    # Updates
+
+    def update(self) -> list[tuple]:
+        actions = []
+        while not self.done():
+            _, clause = self.take("keyword")
+            while True:
+                if clause == "SET":
+                    target = self.path()
+                    self.take("op", "=")
+                    value = self.operand()
+                    token = self.peek()
+                    if token in (("op", "+"), ("op", "-")):
+                        self.position += 1
+                        value = ("arithmetic", token[1], value, self.operand())
+                    actions.append(("SET", target, value))
+                elif clause == "REMOVE":
+                    actions.append(("REMOVE", self.path(), None))
+                elif clause in ("ADD", "DELETE"):
+                    target = self.path()
+                    actions.append((clause, target, self.operand()))
+                else:
+                    raise ExpressionError(f"Unsupported update clause {clause}")
+                if not self.accept("op", ","):
+                    break
+        return actions
+
+
+def parse_condition(expression: str, names: dict | None = None, values: dict | None = None):
+    """Parses a condition, key condition or filter expression into a tree"""
+    parser = _Parser(expression, names, values)
+    tree = parser.condition()
+    if not parser.done():
+        raise ExpressionError(f"Unexpected trailing tokens in {expression!r}")
+    return tree
+
+
+def parse_update(expression: str, names: dict | None = None, values: dict | None = None):
+    """Parses an update expression into a list of (clause, path, value) actions"""
+    return _Parser(expression, names, values).update()
+
+
+def parse_projection(expression: str, names: dict | None = None) -> list[str]:
+    """Returns the top-level attribute names a projection expression selects"""
+    attributes = []
+    for part in expression.split(","):
+        name = part.strip().split(".")[0]
+        attributes.append((names or {}).get(name, name))
+    return attributes
+
+
+# Evaluation
+
+
+def get_path(item: dict, parts: tuple) -> dict | None:
+    """Returns the attribute value at a (possibly nested) path, or None"""
+    value = item.get(parts[0])
+    for part in parts[1:]:
+        if value is None or "M" not in value:
+            return None
+        value = value["M"].get(part)
+    return value
+
+
+def set_path(item: dict, parts: tuple, value: dict | None):
+    """Sets (or with None, removes) the attribute value at a path"""
+    container = item
+    for part in parts[:-1]:
+        nested = container.get(part)
+        if nested is None or "M" not in nested:
+            raise ExpressionError("The document path provided in the update expression is invalid")
+        container = nested["M"]
+    if value is None:
+        container.pop(parts[-1], None)
+    else:
+        container[parts[-1]] = value
+
+
+def _comparable(value: dict | None):
+    """Turns an attribute value into (type, python value) for comparisons"""
+    if value is None:
+        return None
+    if "N" in value:
+        return ("N", Decimal(value["N"]))
+    if "S" in value:
+        return ("S", value["S"])
+    if "B" in value:
+        return ("B", value["B"])
+    if "BOOL" in value:
+        return ("BOOL", value["BOOL"])
+    if "NULL" in value:
+        return ("NULL", None)
+    # Lists, maps and sets compare by their JSON-like form
+    return (next(iter(value)), repr(value))
+
+
+def _resolve(node: tuple, item: dict) -> dict | None:
+    """Evaluates an operand to an attribute value"""
+    kind = node[0]
+    if kind == "value":
+        return node[1]
+    if kind == "path":
+        return get_path(item, node[1])
+    if kind == "function" and node[1] == "size":
+        value = _resolve(node[2][0], item)
+        if value is None:
+            return None
+        (type_name, inner), = value.items()
+        if type_name in ("S", "B"):
+            size = len(inner)
+        elif type_name in ("L", "M", "SS", "NS", "BS"):
+            size = len(inner)
+        else:
+            return None
+        return {"N": str(size)}
+    if kind == "function" and node[1] == "if_not_exists":
+        current = _resolve(node[2][0], item)
+        return current if current is not None else _resolve(node[2][1], item)
+    if kind == "function" and node[1] == "list_append":
+        first, second = (_resolve(argument, item) for argument in node[2])
+        return {"L": (first or {"L": []})["L"] + (second or {"L": []})["L"]}
+    if kind == "arithmetic":
+        left, right = _resolve(node[2], item), _resolve(node[3], item)
+        if left is None or right is None or "N" not in left or "N" not in right:
+            raise ExpressionError("An operand in the update expression has an incorrect data type")
+        result = Decimal(left["N"]) + (Decimal(right["N"]) * (1 if node[1] == "+" else -1))
+        return {"N": _format_number(result)}
+    raise ExpressionError(f"Unsupported operand {node}")
+
+
+def _format_number(number: Decimal) -> str:
+    """Formats a Decimal the way DynamoDB returns numbers"""
+    if number == number.to_integral_value():
+        return str(number.quantize(Decimal(1)))
+    return str(number.normalize())
+
+
+def _compare(operator: str, left, right) -> bool:
+    if left is None or right is None or left[0] != right[0]:
+        # Mismatched or missing operands only satisfy <>
+        return operator == "<>" and left != right
+    if operator == "=":
+        return left[1] == right[1]
+    if operator == "<>":
+        return left[1] != right[1]
+    if left[0] not in ("N", "S", "B"):
+        return False
+    return {
+        "<": left[1] < right[1],
+        "<=": left[1] <= right[1],
+        ">": left[1] > right[1],
+        ">=": left[1] >= right[1],
+    }[operator]
+
+
+def evaluate(tree: tuple, item: dict) -> bool:
+    """Evaluates a parsed condition against an item"""
+    kind = tree[0]
+    if kind == "and":
+        return evaluate(tree[1], item) and evaluate(tree[2], item)
+    if kind == "or":
+        return evaluate(tree[1], item) or evaluate(tree[2], item)
+    if kind == "not":
+        return not evaluate(tree[1], item)
+    if kind == "compare":
+        return _compare(
+            tree[1], _comparable(_resolve(tree[2], item)), _comparable(_resolve(tree[3], item))
+        )
+    if kind == "between":
+        value = _comparable(_resolve(tree[1], item))
+        return _compare(">=", value, _comparable(_resolve(tree[2], item))) and _compare(
+            "<=", value, _comparable(_resolve(tree[3], item))
+        )
+    if kind == "in":
+        value = _comparable(_resolve(tree[1], item))
+        return any(_compare("=", value, _comparable(_resolve(option, item))) for option in tree[2])
+    if kind == "function":
+        name, arguments = tree[1], tree[2]
+        if name == "attribute_exists":
+            return _resolve(arguments[0], item) is not None
+        if name == "attribute_not_exists":
+            return _resolve(arguments[0], item) is None
+        value, operand = (_resolve(argument, item) for argument in arguments)
+        if value is None or operand is None:
+            return False
+        if name == "begins_with":
+            return "S" in value and "S" in operand and value["S"].startswith(operand["S"])
+        if name == "contains":
+            if "S" in value and "S" in operand:
+                return operand["S"] in value["S"]
+            for set_type in ("SS", "NS", "L"):
+                if set_type in value:
+                    members = value[set_type]
+                    needle = operand if set_type == "L" else next(iter(operand.values()))
+                    return needle in members
+            return False
+    raise ExpressionError(f"Unsupported condition {tree}")
+
+
+def apply_update(actions: list[tuple], item: dict):
+    """Applies parsed update actions to an item in place"""
+    # All right-hand sides see the item as it was before the update
+    snapshot = dict(item)
+    for clause, target, value_node in actions:
+        parts = target[1]
+        if clause == "SET":
+            set_path(item, parts, _resolve(value_node, snapshot))
+        elif clause == "REMOVE":
+            set_path(item, parts, None)
+        elif clause == "ADD":
+            operand = _resolve(value_node, snapshot)
+            current = get_path(snapshot, parts)
+            if "N" in operand:
+                base = Decimal(current["N"]) if current and "N" in current else Decimal(0)
+                set_path(item, parts, {"N": _format_number(base + Decimal(operand["N"]))})
+            else:
+                (set_type, members), = operand.items()
+                existing = (current or {}).get(set_type, [])
+                set_path(item, parts, {set_type: existing + [m for m in members if m not in existing]})
+        elif clause == "DELETE":
+            operand = _resolve(value_node, snapshot)
+            current = get_path(snapshot, parts)
+            if current:
+                (set_type, members), = operand.items()
+                remaining = [m for m in current.get(set_type, []) if m not in members]
+                set_path(item, parts, {set_type: remaining} if remaining else None)
@@ -0,0 +1,76 @@
+"""
+DynamoDB data migrations.
+
+Backfills attributes that newer code writes on every insert/edit but that
+older items lack. Safe to re-run; run it once after applying the Terraform
+change that adds the secondary indexes:
+
+    python -m src.modules.services.aws.migrations
+"""
+
+import asyncio
+
+from src.modules.services.aws.dynamodb_service import DynamoDBClient
+from src.modules.utils.aws_helpers import call_aws
+from src.modules.utils.text_helpers import normalize_medicine_name
+
+
+async def backfill_medicine_name_keys(dynamo_db_client: DynamoDBClient, page_size: int = 500):
+    """
+    Writes `medicine_name_key` on items that are missing it or carry a stale one,
+    so they appear in the name index. `expiration_date` needs no backfill:
+    DynamoDB populates the expiry index from the existing attribute.
+    """
+    scanned = updated = 0
+    scan_kwargs = {
+        "TableName": dynamo_db_client.table_name,
+        "ProjectionExpression": "user_sub, medicine_id, medicine_name, medicine_name_key",
+        "Limit": page_size,
+    }
+    while True:
+        response = await call_aws(dynamo_db_client.client.scan, **scan_kwargs)
+        items = response.get("Items", [])
+        scanned += len(items)
+        stale = [
+            item
+            for item in items
+            if "medicine_name" in item
+            and item.get("medicine_name_key", {}).get("S")
+            != normalize_medicine_name(item["medicine_name"]["S"])
+        ]
+        written = await asyncio.gather(
+            *(_write_name_key(dynamo_db_client, item) for item in stale)
+        )
+        updated += sum(written)
+        if not (start_key := response.get("LastEvaluatedKey")):
+            break
+        scan_kwargs["ExclusiveStartKey"] = start_key
+    return {"scanned": scanned, "updated": updated}
+
+
+async def _write_name_key(dynamo_db_client: DynamoDBClient, item: dict) -> bool:
+    """
+    Sets the normalized name key on a single item. Skips items deleted or
+    renamed since the scan: a rename already wrote its own key.
+    """
+    try:
+        await call_aws(
+            dynamo_db_client.client.update_item,
+            TableName=dynamo_db_client.table_name,
+            Key={"user_sub": item["user_sub"], "medicine_id": item["medicine_id"]},
+            UpdateExpression="SET medicine_name_key = :medicine_name_key",
+            ConditionExpression="attribute_exists(medicine_id) AND medicine_name = :medicine_name",
+            ExpressionAttributeValues={
+                ":medicine_name_key": {
+                    "S": normalize_medicine_name(item["medicine_name"]["S"])
+                },
+                ":medicine_name": item["medicine_name"],
+            },
+        )
+    except dynamo_db_client.client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    print(asyncio.run(backfill_medicine_name_keys(DynamoDBClient())))
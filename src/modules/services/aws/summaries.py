@@ -0,0 +1,116 @@
+"""
+Inventory summary repair.
+
+The write paths keep each user's summary in step with their medicines in
+the same transaction; this tool recounts summaries from the medicine
+records to find and repair drift, e.g. after items were written outside
+the app or before the summary table existed. Run it once after applying
+the Terraform change that adds the summary table:
+
+    python -m src.modules.services.aws.summaries
+    python -m src.modules.services.aws.summaries --check
+    python -m src.modules.services.aws.summaries --user <user_sub> --user <user_sub>
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from src.modules.services.aws.dynamodb_service import DynamoDBClient
+from src.modules.utils.aws_helpers import call_aws
+
+logger = logging.getLogger(__name__)
+
+# Drifted users listed in the result
+MAX_LISTED_USERS = 100
+
+
+async def list_summary_users(dynamo_db_client: DynamoDBClient, page_size: int = 1000) -> set[str]:
+    """
+    Every user with medicines or with a summary. Summaries are included so
+    one left behind by deleted medicines is recounted to zero too.
+    """
+    users = set()
+    async for item in dynamo_db_client.scan_medicines(page_size=page_size, projection=["user_sub"]):
+        users.add(item["user_sub"]["S"])
+    scan_kwargs = {
+        "TableName": dynamo_db_client.summary_table_name,
+        "ProjectionExpression": "user_sub",
+        "Limit": page_size,
+    }
+    while True:
+        response = await call_aws(dynamo_db_client.client.scan, **scan_kwargs)
+        users.update(item["user_sub"]["S"] for item in response.get("Items", []))
+        if not (start_key := response.get("LastEvaluatedKey")):
+            break
+        scan_kwargs["ExclusiveStartKey"] = start_key
+    return users
+
+
+async def rebuild_summaries(
+    dynamo_db_client: DynamoDBClient,
+    user_subs: list[str] | None = None,
+    write: bool = True,
+    concurrency: int = 8,
+) -> dict:
+    """
+    Recounts the summaries of `user_subs` (default: every user), rewriting
+    those that drifted unless `write` is False, `concurrency` users at a time.
+    """
+    if not dynamo_db_client.summary_table_name:
+        raise ValueError("DYNAMO_DB_SUMMARY_TABLE_NAME is not set")
+    started = time.monotonic()
+    users = sorted(user_subs or await list_summary_users(dynamo_db_client))
+    remaining = iter(users)
+    drifted: list[str] = []
+
+    async def recount():
+        # Workers take the next user until none are left
+        for user_sub in remaining:
+            stored, rebuilt = await dynamo_db_client.rebuild_inventory_summary(user_sub, write)
+            if stored is None or not stored.same_totals(rebuilt):
+                drifted.append(user_sub)
+
+    async with asyncio.TaskGroup() as group:
+        for _ in range(min(len(users), max(1, concurrency))):
+            group.create_task(recount())
+
+    drifted.sort()
+    logger.info(
+        {
+            "message": "Inventory summaries recounted",
+            "users": len(users),
+            "drifted": len(drifted),
+            "rewritten": write,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+    )
+    return {
+        "users": len(users),
+        "drifted": len(drifted),
+        "rewritten": len(drifted) if write else 0,
+        "drifted_users": drifted[:MAX_LISTED_USERS],
+    }
+
+
+def main():
+    """Recounts the summaries of the configured tables and prints the result as JSON"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", action="append", dest="users", help="only this user_sub, repeatable")
+    parser.add_argument("--check", action="store_true", help="report drift without rewriting")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    result = asyncio.run(
+        rebuild_summaries(
+            DynamoDBClient(), args.users, write=not args.check, concurrency=args.concurrency
+        )
+    )
+    print(json.dumps(result, indent=2))
+    if args.check and result["drifted"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
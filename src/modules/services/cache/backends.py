@@ -0,0 +1,110 @@
+"""Storage backends for the inventory cache"""
+
+import json
+import sys
+from abc import ABC, abstractmethod
+from typing import Any
+
+from src.modules.services.cache.lru_cache import LRUCache
+
+
+class CacheBackend(ABC):
+    """Interface every inventory cache backend implements"""
+
+    # Whether other processes or hosts read and write the same entries
+    shared = False
+
+    @abstractmethod
+    def get(self, key: str) -> Any | None:
+        """Returns the cached value or None"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        """Stores a value"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Drops a value if present"""
+
+    @abstractmethod
+    def memory_bytes(self) -> int | None:
+        """Returns the approximate memory held by the cache, if known"""
+
+    def stats(self) -> dict:
+        """Returns backend-specific counters"""
+        return {"backend": type(self).__name__, "memory_bytes": self.memory_bytes()}
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Per-process LRU backend with TTL; values are shared, not copied"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self._bytes = 0
+        self._cache = LRUCache(max_size=max_size, ttl=ttl, on_evict=self._release)
+
+    def get(self, key: str) -> Any | None:
+        entry = self._cache.get(key)
+        return None if entry is None else entry[0]
+
+    def set(self, key: str, value: Any):
+        size = _estimate_size(value)
+        self._cache.set(key, (value, size))
+        if key in self._cache:
+            self._bytes += size
+
+    def delete(self, key: str):
+        self._cache.delete(key)
+
+    def memory_bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> dict:
+        return {**super().stats(), "entries": len(self._cache)}
+
+    def _release(self, _key: str, entry: tuple[Any, int]):
+        """Keeps the memory counter in step with evictions"""
+        self._bytes -= entry[1]
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend for a Redis-compatible server. `client` only needs
+    get(key), set(key, value, ex=seconds) and delete(key), so any
+    stand-in exposing those methods works as well.
+    """
+
+    shared = True
+
+    def __init__(self, client, ttl: float, prefix: str = "inventory:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Any | None:
+        payload = self.client.get(self.prefix + key)
+        return None if payload is None else json.loads(payload)
+
+    def set(self, key: str, value: Any):
+        payload = json.dumps(value, separators=(",", ":"))
+        self.client.set(self.prefix + key, payload, ex=max(1, int(self.ttl)))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def memory_bytes(self) -> int | None:
+        info = getattr(self.client, "info", None)
+        if info is None:
+            return None
+        return info("memory").get("used_memory")
+
+
+def _estimate_size(value: Any) -> int:
+    """Cheap recursive size estimate for lists/dicts of strings and numbers"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            size += sys.getsizeof(key) + _estimate_size(inner)
+    elif isinstance(value, (list, tuple)):
+        for inner in value:
+            size += _estimate_size(inner)
+    return size
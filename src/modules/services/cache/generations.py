@@ -0,0 +1,44 @@
+"""Per-user generation counters shared by all worker processes on a host"""
+
+import fcntl
+import mmap
+import os
+import struct
+import zlib
+
+_SLOT = struct.Struct("<Q")
+
+
+class SharedGenerations:
+    """
+    Fixed-size table of counters in a memory-mapped file. Users hash to a
+    slot; every write bumps the slot, so a worker can tell that an entry it
+    cached was changed by another worker. Collisions only cost extra misses.
+    """
+
+    def __init__(self, path: str, slots: int = 65536):
+        self.path = path
+        self.slots = slots
+        size = slots * _SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def _offset(self, user_sub: str) -> int:
+        return (zlib.crc32(user_sub.encode()) % self.slots) * _SLOT.size
+
+    def get(self, user_sub: str) -> int:
+        """Current generation of a user's slot"""
+        return _SLOT.unpack_from(self._map, self._offset(user_sub))[0]
+
+    def increment(self, user_sub: str) -> int:
+        """Bumps a user's slot under a file lock and returns the new generation"""
+        offset = self._offset(user_sub)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            generation = _SLOT.unpack_from(self._map, offset)[0] + 1
+            _SLOT.pack_into(self._map, offset, generation)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return generation
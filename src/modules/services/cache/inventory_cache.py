@@ -0,0 +1,173 @@
+"""Read-through cache of each user's medicine records"""
+
+from src.modules.config.cache_settings import InventoryCacheSettings
+from src.modules.services.cache.backends import (
+    CacheBackend,
+    InMemoryCacheBackend,
+    RedisCacheBackend,
+)
+from src.modules.services.cache.generations import SharedGenerations
+
+
+class InventoryCache:
+    """
+    Caches the raw DynamoDB items of a user's partition keyed by user_sub.
+    Write paths patch entries copy-on-write, so a list handed out by get()
+    is never mutated afterwards. Entries of a shared backend are dropped
+    instead: a read-patch-write there would race with other hosts' writes.
+
+    With `generations`, entries are stored as (generation, items) and only
+    served while the user's shared generation is unchanged, which keeps
+    per-process caches coherent when several workers write.
+    """
+
+    def __init__(
+        self, backend: CacheBackend | None, generations: SharedGenerations | None = None
+    ):
+        self.backend = backend
+        self.generations = generations
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_sub: str) -> list[dict] | None:
+        """Returns the cached items for a user, or None on a miss"""
+        if self.backend is None:
+            return None
+        items = self._read(user_sub)
+        if items is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return items
+
+    def generation(self, user_sub: str) -> int | None:
+        """
+        Snapshot to take before reading DynamoDB and pass to set(), so a
+        write by another worker during the read is not cached as current.
+        """
+        return self.generations.get(user_sub) if self.generations else None
+
+    def set(self, user_sub: str, items: list[dict], generation: int | None = None):
+        """Caches the complete item list for a user"""
+        if self.backend is None:
+            return
+        if self.generations is None:
+            self.backend.set(user_sub, items)
+        else:
+            if generation is None:
+                generation = self.generations.get(user_sub)
+            self.backend.set(user_sub, (generation, items))
+
+    def invalidate(self, user_sub: str):
+        """Drops a user's entry so the next read goes to DynamoDB"""
+        if self.generations is not None:
+            self.generations.increment(user_sub)
+        if self.backend is not None:
+            self.backend.delete(user_sub)
+
+    def upsert_item(self, user_sub: str, item: dict):
+        """
+        Adds or replaces one item in a cached entry, if the user is cached.
+        Concurrent writes of one item can finish out of order, so a cached
+        copy with a higher version is kept.
+        """
+        medicine_id = item["medicine_id"]["S"]
+        version = _version(item)
+
+        def patch(items):
+            kept = []
+            for cached in items:
+                if cached["medicine_id"]["S"] != medicine_id:
+                    kept.append(cached)
+                elif _version(cached) > version:
+                    return items
+            return kept + [item]
+
+        self._patch(user_sub, patch)
+
+    def remove_item(self, user_sub: str, medicine_id: str):
+        """Removes one item from a cached entry, if the user is cached"""
+        self._patch(
+            user_sub,
+            lambda items: [
+                cached for cached in items if cached["medicine_id"]["S"] != medicine_id
+            ],
+        )
+
+    def _read(self, user_sub: str) -> list[dict] | None:
+        """Reads an entry without counting it, dropping it if another worker wrote since"""
+        entry = self.backend.get(user_sub)
+        if entry is None or self.generations is None:
+            return entry
+        generation, items = entry
+        if generation != self.generations.get(user_sub):
+            self.backend.delete(user_sub)
+            return None
+        return items
+
+    def _patch(self, user_sub: str, patch):
+        """Applies this process's own write to a cached entry"""
+        if self.backend is not None and self.backend.shared:
+            self.backend.delete(user_sub)
+            return
+        if self.generations is not None:
+            generation = self.generations.increment(user_sub)
+            entry = self.backend.get(user_sub) if self.backend is not None else None
+            if entry is None:
+                return
+            # Patch only if no other worker wrote since the entry was filled
+            if entry[0] != generation - 1:
+                self.backend.delete(user_sub)
+                return
+            self.backend.set(user_sub, (generation, patch(entry[1])))
+            return
+        if self.backend is None or (items := self.backend.get(user_sub)) is None:
+            return
+        self.backend.set(user_sub, patch(items))
+
+    def stats(self) -> dict:
+        """Returns hit rate and memory counters"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            **(self.backend.stats() if self.backend else {"backend": None}),
+        }
+
+
+def _version(item: dict) -> int:
+    """Version of a raw item, 0 for records written before versioning"""
+    return int(item["version"]["N"]) if "version" in item else 0
+
+
+def build_inventory_cache(settings: InventoryCacheSettings | None = None) -> InventoryCache:
+    """Creates the inventory cache selected by INVENTORY_CACHE_BACKEND"""
+    settings = settings or InventoryCacheSettings()
+    backend_name = settings.inventory_cache_backend.lower()
+    if backend_name == "none":
+        return InventoryCache(None)
+    if backend_name == "redis":
+        try:
+            import redis  # pylint: disable=C0415
+        except ImportError as e:
+            raise RuntimeError(
+                "INVENTORY_CACHE_BACKEND=redis requires the 'redis' package"
+            ) from e
+        client = redis.Redis.from_url(settings.redis_url)
+        return InventoryCache(
+            RedisCacheBackend(client, ttl=settings.inventory_cache_ttl)
+        )
+    # Per-process memory caches need shared generations once there are several workers
+    generations = (
+        SharedGenerations(settings.inventory_cache_generations_path)
+        if settings.inventory_cache_generations_path
+        else None
+    )
+    return InventoryCache(
+        InMemoryCacheBackend(
+            max_size=settings.inventory_cache_max_users,
+            ttl=settings.inventory_cache_ttl,
+        ),
+        generations,
+    )
@@ -0,0 +1,77 @@
+"""In-process LRU cache with per-entry expiry"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    """
+    Bounded LRU cache whose entries expire after a TTL.
+    `on_evict(key, value)` is called whenever an entry leaves the cache.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        on_evict: Callable[[Hashable, Any], None] | None = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Any | None:
+        """Returns a live entry and marks it as recently used"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                self.delete(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """Stores an entry, evicting the least recently used one when full"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        self.delete(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        while len(self._entries) > self.max_size:
+            evicted_key, (_, evicted) = self._entries.popitem(last=False)
+            if self.on_evict:
+                self.on_evict(evicted_key, evicted)
+
+    def delete(self, key: Hashable):
+        """Drops an entry if present"""
+        entry = self._entries.pop(key, None)
+        if entry is not None and self.on_evict:
+            self.on_evict(key, entry[1])
+
+    def clear(self):
+        """Drops every entry"""
+        for key in list(self._entries):
+            self.delete(key)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
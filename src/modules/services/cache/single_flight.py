@@ -0,0 +1,48 @@
+"""Coalescing of concurrent identical async calls"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from src.modules.services.observability.metrics import single_flight_calls
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers arriving while a call
+    for their key is in flight await its result instead of starting their
+    own; the result (or exception) is shared and nothing is cached after.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._flights: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns call()'s result, sharing one execution among concurrent callers"""
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            single_flight_calls.inc(operation=self.name, outcome="coalesced")
+            # Shielded: a cancelled follower must not cancel the leader's call
+            return await asyncio.shield(flight)
+        self.calls += 1
+        single_flight_calls.inc(operation=self.name, outcome="executed")
+        flight = asyncio.ensure_future(call())
+        self._flights[key] = flight
+        try:
+            return await asyncio.shield(flight)
+        finally:
+            if flight.done():
+                self._flights.pop(key, None)
+            else:
+                # The leader was cancelled, keep the entry until the call completes
+                flight.add_done_callback(lambda _: self._flights.pop(key, None))
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> dict:
+        """Returns executed and coalesced call counts"""
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._flights)}
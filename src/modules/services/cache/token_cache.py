@@ -0,0 +1,21 @@
+"""Cache of validated Cognito access tokens"""
+
+import time
+
+from src.modules.services.cache.lru_cache import LRUCache
+from src.modules.utils.aws_helpers import decode_jwt_claims
+
+
+class TokenCache(LRUCache):
+    """
+    Maps access tokens to the user_sub Cognito resolved for them.
+    Entries never outlive the token's own `exp` claim.
+    """
+
+    def remember(self, token: str, user_sub: str):
+        """Caches a validated token until min(ttl, exp)"""
+        expires_at = decode_jwt_claims(token).get("exp")
+        ttl = None
+        if isinstance(expires_at, (int, float)):
+            ttl = expires_at - time.time()
+        self.set(token, user_sub, ttl=ttl)
@@ -0,0 +1,332 @@
+"""
+Reference medicine catalog behind autocomplete and name normalization.
+
+The source is a CSV with a medicine_name and an optional medicine_type
+column. It is compiled once into a flat binary index that every worker maps
+read-only, so the index is held once in the page cache however many
+workers there are, and opening it parses nothing. Layout, little-endian:
+
+    header   magic, entry/token/type counts, source size and mtime
+    entries  (key, name, type) string offsets, sorted by key
+    tokens   (token, postings offset, postings count), sorted by token
+    types    (key, type) string offsets, sorted by key
+    data     length-prefixed UTF-8 strings and u32 postings lists
+
+Keys are normalized names. Tokens are the words of a key after the first;
+a token's postings are the positions of the entries containing it, in key
+order. Keys compare as UTF-8 bytes, which orders them like str does.
+
+Compile ahead of deploying (workers otherwise compile a stale index on
+first use):
+
+    python -m src.modules.services.catalog.medicine_catalog
+"""
+
+import argparse
+import csv
+import heapq
+import logging
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+
+from src.modules.config.catalog_settings import CatalogSettings
+from src.modules.utils.text_helpers import normalize_medicine_name
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MEDCAT01"
+_HEADER = struct.Struct("<8sIIIQq")
+_ENTRY = struct.Struct("<III")
+_TOKEN = struct.Struct("<III")
+_TYPE = struct.Struct("<II")
+_LENGTH = struct.Struct("<H")
+_POSTING = struct.Struct("<I")
+
+# Longer names and types are skipped when compiling
+MAX_FIELD_BYTES = 1024
+
+# Entries and tokens one lookup may scan, which bounds its latency
+MAX_SCAN = 512
+
+
+@dataclass(slots=True, frozen=True)
+class CatalogEntry:
+    """A catalog medicine in its reference spelling"""
+
+    medicine_name: str
+    medicine_type: str
+
+    def to_json(self) -> dict:
+        """Returns the entry as a JSON-ready dict"""
+        return {"medicine_name": self.medicine_name, "medicine_type": self.medicine_type}
+
+
+def index_path_for(settings: CatalogSettings) -> str:
+    """Where the compiled index of the configured catalog lives"""
+    return settings.medicine_catalog_index_path or settings.medicine_catalog_path + ".idx"
+
+
+def build_catalog(source_path: str, index_path: str) -> int:
+    """
+    Compiles the CSV catalog into the index file and returns the number of
+    entries. The first spelling of a name (and of a type) wins.
+    """
+    stat = os.stat(source_path)
+    entries: dict[bytes, tuple[bytes, bytes]] = {}
+    types: dict[bytes, bytes] = {}
+    with open(source_path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        if "medicine_name" not in (reader.fieldnames or ()):
+            raise ValueError(f"{source_path} has no medicine_name column")
+        for row in reader:
+            name = " ".join((row.get("medicine_name") or "").split()).encode()
+            medicine_type = " ".join((row.get("medicine_type") or "").split()).encode()
+            if not name or len(name) > MAX_FIELD_BYTES or len(medicine_type) > MAX_FIELD_BYTES:
+                continue
+            entries.setdefault(normalize_medicine_name(name.decode()).encode(), (name, medicine_type))
+            if medicine_type:
+                types.setdefault(normalize_medicine_name(medicine_type.decode()).encode(), medicine_type)
+
+    keys = sorted(entries)
+    postings: dict[bytes, list[int]] = {}
+    for position, key in enumerate(keys):
+        for token in set(key.split()[1:]):
+            postings.setdefault(token, []).append(position)
+    tokens = sorted(postings)
+    type_keys = sorted(types)
+
+    data_start = (
+        _HEADER.size
+        + len(keys) * _ENTRY.size
+        + len(tokens) * _TOKEN.size
+        + len(type_keys) * _TYPE.size
+    )
+    data = bytearray()
+    offsets: dict[bytes, int] = {}
+
+    def string(value: bytes) -> int:
+        # Equal strings, e.g. types, are stored once
+        offset = offsets.get(value)
+        if offset is None:
+            offset = offsets[value] = data_start + len(data)
+            data.extend(_LENGTH.pack(len(value)))
+            data.extend(value)
+        return offset
+
+    output = bytearray(
+        _HEADER.pack(MAGIC, len(keys), len(tokens), len(type_keys), stat.st_size, stat.st_mtime_ns)
+    )
+    for key in keys:
+        name, medicine_type = entries[key]
+        output += _ENTRY.pack(string(key), string(name), string(medicine_type))
+    for token in tokens:
+        positions = postings[token]
+        token_offset = string(token)
+        output += _TOKEN.pack(token_offset, data_start + len(data), len(positions))
+        data.extend(struct.pack(f"<{len(positions)}I", *positions))
+    for key in type_keys:
+        output += _TYPE.pack(string(key), string(types[key]))
+    output += data
+
+    # Write then rename: several workers may compile at once
+    temporary = f"{index_path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(output)
+    os.replace(temporary, index_path)
+    return len(keys)
+
+
+class MedicineCatalog:
+    """
+    Read-only view of a compiled catalog. The file is mapped rather than
+    read, so workers share its pages, and a lookup only touches the pages
+    its binary searches land on.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        try:
+            (
+                magic,
+                self.entry_count,
+                self.token_count,
+                self.type_count,
+                self.source_size,
+                self.source_mtime_ns,
+            ) = _HEADER.unpack_from(self._map, 0)
+        except struct.error as e:
+            self.close()
+            raise ValueError(f"{path} is not a medicine catalog index") from e
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a medicine catalog index")
+        self._entries = _HEADER.size
+        self._tokens = self._entries + self.entry_count * _ENTRY.size
+        self._types = self._tokens + self.token_count * _TOKEN.size
+
+    def __len__(self) -> int:
+        return self.entry_count
+
+    def close(self):
+        """Unmaps the file"""
+        self._view.release()
+        self._map.close()
+
+    def lookup(self, medicine_name: str) -> CatalogEntry | None:
+        """The entry whose name matches, ignoring case and spacing"""
+        key = normalize_medicine_name(medicine_name).encode()
+        position = self._bisect(self.entry_count, self._key, key)
+        if position < self.entry_count and self._key(position) == key:
+            return self._entry(position)
+        return None
+
+    def canonical_type(self, medicine_type: str) -> str | None:
+        """The catalog's spelling of a type, ignoring case and spacing"""
+        key = normalize_medicine_name(medicine_type).encode()
+        position = self._bisect(self.type_count, self._type_key, key)
+        if position < self.type_count and self._type_key(position) == key:
+            offset = _TYPE.unpack_from(self._map, self._types + position * _TYPE.size)[1]
+            return self._string(offset).decode()
+        return None
+
+    def normalize(
+        self, medicine_name: str | None, medicine_type: str | None
+    ) -> tuple[str | None, str | None]:
+        """A name and type in the catalog's spelling; unknown values are returned as given"""
+        if medicine_name is not None and (entry := self.lookup(medicine_name)) is not None:
+            medicine_name = entry.medicine_name
+        if medicine_type is not None:
+            medicine_type = self.canonical_type(medicine_type) or medicine_type
+        return medicine_name, medicine_type
+
+    def complete(self, query: str, limit: int = 10) -> list[CatalogEntry]:
+        """
+        Up to `limit` entries for a typeahead. Every query word must
+        prefix-match a word of the name, as in the medkit search; names
+        starting with the first word come first, each group in name order.
+        """
+        words = [word.encode() for word in normalize_medicine_name(query).split()]
+        if not words or limit <= 0:
+            return []
+        first, rest = words[0], words[1:]
+        matches: list[int] = []
+        seen: set[int] = set()
+
+        def accept(position: int) -> bool:
+            """Adds a candidate if the other words match; True once the page is full"""
+            if position in seen:
+                return False
+            seen.add(position)
+            if rest:
+                name_words = self._key(position).split()
+                if not all(any(name_word.startswith(word) for name_word in name_words) for word in rest):
+                    return False
+            matches.append(position)
+            return len(matches) >= limit
+
+        start = self._bisect(self.entry_count, self._key, first)
+        for position in range(start, min(start + MAX_SCAN, self.entry_count)):
+            if not self._key(position).startswith(first):
+                break
+            if accept(position):
+                return [self._entry(position) for position in matches]
+
+        # Then names with a later word starting with it, merged into name order
+        start = self._bisect(self.token_count, self._token_key, first)
+        postings = []
+        for index in range(start, min(start + MAX_SCAN, self.token_count)):
+            token_offset, offset, count = _TOKEN.unpack_from(self._map, self._tokens + index * _TOKEN.size)
+            if not self._string(token_offset).startswith(first):
+                break
+            postings.append(_POSTING.iter_unpack(self._view[offset : offset + count * _POSTING.size]))
+        for scanned, (position,) in enumerate(heapq.merge(*postings)):
+            if scanned >= MAX_SCAN or accept(position):
+                break
+        return [self._entry(position) for position in matches]
+
+    def _string(self, offset: int) -> bytes:
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        return self._map[offset + _LENGTH.size : offset + _LENGTH.size + length]
+
+    def _key(self, position: int) -> bytes:
+        return self._string(_ENTRY.unpack_from(self._map, self._entries + position * _ENTRY.size)[0])
+
+    def _token_key(self, index: int) -> bytes:
+        return self._string(_TOKEN.unpack_from(self._map, self._tokens + index * _TOKEN.size)[0])
+
+    def _type_key(self, position: int) -> bytes:
+        return self._string(_TYPE.unpack_from(self._map, self._types + position * _TYPE.size)[0])
+
+    def _entry(self, position: int) -> CatalogEntry:
+        _, name, medicine_type = _ENTRY.unpack_from(self._map, self._entries + position * _ENTRY.size)
+        return CatalogEntry(self._string(name).decode(), self._string(medicine_type).decode())
+
+    @staticmethod
+    def _bisect(count: int, key_at, target: bytes) -> int:
+        """First position whose key is not below `target`"""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if key_at(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+def load_catalog(settings: CatalogSettings | None = None) -> MedicineCatalog | None:
+    """
+    Maps the configured catalog, compiling it first when the index is
+    missing, unreadable or older than the CSV. None when no catalog is set.
+    """
+    settings = settings or CatalogSettings()
+    if not settings.medicine_catalog_path:
+        return None
+    source_path = settings.medicine_catalog_path
+    index_path = index_path_for(settings)
+    stat = os.stat(source_path)
+    if os.path.exists(index_path):
+        try:
+            catalog = MedicineCatalog(index_path)
+        except ValueError:
+            catalog = None
+        if catalog is not None:
+            if (catalog.source_size, catalog.source_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                return catalog
+            catalog.close()
+    started = time.monotonic()
+    entries = build_catalog(source_path, index_path)
+    logger.info(
+        {
+            "message": "Medicine catalog compiled",
+            "entries": entries,
+            "path": index_path,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+    )
+    return MedicineCatalog(index_path)
+
+
+def main():
+    """Compiles the configured (or given) catalog and prints its size"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="catalog CSV, default MEDICINE_CATALOG_PATH")
+    parser.add_argument("--index", help="compiled index, default MEDICINE_CATALOG_INDEX_PATH or <source>.idx")
+    args = parser.parse_args()
+    settings = CatalogSettings()
+    source_path = args.source or settings.medicine_catalog_path
+    if not source_path:
+        raise SystemExit("Set MEDICINE_CATALOG_PATH or pass --source")
+    index_path = args.index or (args.source + ".idx" if args.source else index_path_for(settings))
+    entries = build_catalog(source_path, index_path)
+    print(f"{entries} entries, {os.path.getsize(index_path)} bytes -> {index_path}")
+
+
+if __name__ == "__main__":
+    main()
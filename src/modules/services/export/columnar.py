@@ -0,0 +1,225 @@
+"""
+Compact columnar export format ("PTCOL"), written and read as a stream.
+
+Rows are buffered into row groups; each group stores every column
+separately so values of one kind sit together and compress well:
+
+    file       := MAGIC u32:len header-json row-group* footer
+    row-group  := b"RG" u32:rows (u32:len column)*
+    footer     := b"FT" u32:len footer-json MAGIC
+
+Columns are encoded by type. Strings use a dictionary (distinct values,
+then one varint index per row) unless most values are distinct, in which
+case they are stored plainly. Integers are zigzag varints of the delta to
+the previous row, booleans a bitmap. The footer lists the offset and row
+count of every group, so a reader can seek to one group like in Parquet.
+"""
+
+import json
+import struct
+from typing import BinaryIO, Iterable, Iterator
+
+MAGIC = b"PTCOL1\x00\x00"
+_U32 = struct.Struct("<I")
+
+STRING, INTEGER, BOOLEAN = "string", "int", "bool"
+
+# String column encodings
+_PLAIN, _DICTIONARY = 0, 1
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def _encode_strings(values: list[str]) -> bytes:
+    out = bytearray()
+    distinct: dict[str, int] = {}
+    for value in values:
+        distinct.setdefault(value, len(distinct))
+    if len(distinct) * 2 > len(values):
+        out.append(_PLAIN)
+        for value in values:
+            raw = value.encode()
+            _write_varint(out, len(raw))
+            out += raw
+        return bytes(out)
+    out.append(_DICTIONARY)
+    _write_varint(out, len(distinct))
+    for value in distinct:
+        raw = value.encode()
+        _write_varint(out, len(raw))
+        out += raw
+    for value in values:
+        _write_varint(out, distinct[value])
+    return bytes(out)
+
+
+def _decode_strings(data: bytes, rows: int) -> list[str]:
+    encoding, position = data[0], 1
+    if encoding == _PLAIN:
+        values = []
+        for _ in range(rows):
+            length, position = _read_varint(data, position)
+            values.append(data[position:position + length].decode())
+            position += length
+        return values
+    size, position = _read_varint(data, position)
+    dictionary = []
+    for _ in range(size):
+        length, position = _read_varint(data, position)
+        dictionary.append(data[position:position + length].decode())
+        position += length
+    values = []
+    for _ in range(rows):
+        index, position = _read_varint(data, position)
+        values.append(dictionary[index])
+    return values
+
+
+def _encode_integers(values: list[int]) -> bytes:
+    out = bytearray()
+    previous = 0
+    for value in values:
+        delta = value - previous
+        previous = value
+        _write_varint(out, delta << 1 if delta >= 0 else ((-delta) << 1) - 1)
+    return bytes(out)
+
+
+def _decode_integers(data: bytes, rows: int) -> list[int]:
+    values, position, previous = [], 0, 0
+    for _ in range(rows):
+        zigzag, position = _read_varint(data, position)
+        previous += (zigzag >> 1) ^ -(zigzag & 1)
+        values.append(previous)
+    return values
+
+
+def _encode_booleans(values: list[bool]) -> bytes:
+    out = bytearray((len(values) + 7) // 8)
+    for index, value in enumerate(values):
+        if value:
+            out[index >> 3] |= 1 << (index & 7)
+    return bytes(out)
+
+
+def _decode_booleans(data: bytes, rows: int) -> list[bool]:
+    return [bool(data[index >> 3] & (1 << (index & 7))) for index in range(rows)]
+
+
+_ENCODERS = {STRING: _encode_strings, INTEGER: _encode_integers, BOOLEAN: _encode_booleans}
+_DECODERS = {STRING: _decode_strings, INTEGER: _decode_integers, BOOLEAN: _decode_booleans}
+
+
+class ColumnarWriter:
+    """
+    Incremental writer: add() rows, and collect the bytes returned by
+    start(), add() (whenever a row group fills up) and finish().
+    Only one row group is held in memory at a time.
+    """
+
+    def __init__(self, columns: list[tuple[str, str]], row_group_size: int = 10000):
+        self.columns = columns
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self.offset = 0
+        self.row_groups: list[dict] = []
+        self._buffers: list[list] = [[] for _ in columns]
+
+    def _emit(self, chunk: bytes) -> bytes:
+        self.offset += len(chunk)
+        return chunk
+
+    def start(self) -> bytes:
+        """File header with the schema"""
+        header = json.dumps(
+            {
+                "columns": [{"name": name, "type": kind} for name, kind in self.columns],
+                "row_group_size": self.row_group_size,
+            },
+            separators=(",", ":"),
+        ).encode()
+        return self._emit(MAGIC + _U32.pack(len(header)) + header)
+
+    def add(self, row: tuple) -> bytes:
+        """Buffers one row (values in column order); returns a row group when full"""
+        for buffer, value in zip(self._buffers, row):
+            buffer.append(value)
+        if len(self._buffers[0]) >= self.row_group_size:
+            return self.flush()
+        return b""
+
+    def flush(self) -> bytes:
+        """Encodes the buffered rows as a row group"""
+        rows = len(self._buffers[0])
+        if not rows:
+            return b""
+        parts = [b"RG", _U32.pack(rows)]
+        for (_, kind), buffer in zip(self.columns, self._buffers):
+            encoded = _ENCODERS[kind](buffer)
+            parts += [_U32.pack(len(encoded)), encoded]
+        self.row_groups.append({"offset": self.offset, "rows": rows})
+        self.rows += rows
+        self._buffers = [[] for _ in self.columns]
+        return self._emit(b"".join(parts))
+
+    def finish(self) -> bytes:
+        """Last row group plus the footer"""
+        tail = self.flush()
+        footer = json.dumps(
+            {"rows": self.rows, "row_groups": self.row_groups}, separators=(",", ":")
+        ).encode()
+        return tail + self._emit(b"FT" + _U32.pack(len(footer)) + footer + MAGIC)
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated columnar file")
+    return data
+
+
+def iter_columnar_rows(stream: BinaryIO) -> Iterator[dict]:
+    """Reads a columnar file front to back, yielding rows as dicts"""
+    if _read_exact(stream, len(MAGIC)) != MAGIC:
+        raise ValueError("Not a columnar export file")
+    header = json.loads(_read_exact(stream, _U32.unpack(_read_exact(stream, 4))[0]))
+    columns = [(column["name"], column["type"]) for column in header["columns"]]
+    while True:
+        marker = _read_exact(stream, 2)
+        if marker == b"FT":
+            return
+        if marker != b"RG":
+            raise ValueError("Corrupt columnar file")
+        rows = _U32.unpack(_read_exact(stream, 4))[0]
+        decoded = []
+        for _, kind in columns:
+            size = _U32.unpack(_read_exact(stream, 4))[0]
+            decoded.append(_DECODERS[kind](_read_exact(stream, size), rows))
+        names = [name for name, _ in columns]
+        for values in zip(*decoded):
+            yield dict(zip(names, values))
+
+
+def write_columnar(columns: list[tuple[str, str]], rows: Iterable[tuple], stream: BinaryIO, row_group_size: int = 10000):
+    """Writes rows to a file object in one go"""
+    writer = ColumnarWriter(columns, row_group_size)
+    stream.write(writer.start())
+    for row in rows:
+        stream.write(writer.add(row))
+    stream.write(writer.finish())
@@ -0,0 +1,209 @@
+"""Streaming inventory exports in CSV, NDJSON and the columnar format"""
+
+import csv
+import io
+import json
+import logging
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+from src.modules.models.records.medicine import PUBLIC_FIELDS, Medicine
+from src.modules.services.aws.dynamodb_service import DynamoDBClient
+from src.modules.services.export.columnar import BOOLEAN, INTEGER, STRING, ColumnarWriter
+
+logger = logging.getLogger(__name__)
+
+# Bytes gathered before a chunk is handed to the response
+CHUNK_SIZE = 64 * 1024
+
+# Stored attributes the exported fields are computed from
+EXPORT_PROJECTION = [
+    "medicine_id",
+    "medicine_name",
+    "medicine_type",
+    "quantity",
+    "expiration_date",
+    "version",
+]
+
+COLUMN_TYPES = {
+    "medicine_id": STRING,
+    "medicine_name": STRING,
+    "medicine_type": STRING,
+    "quantity": INTEGER,
+    "expiration_date": STRING,
+    "is_expired": BOOLEAN,
+    "version": INTEGER,
+}
+
+# Leading characters that make spreadsheets evaluate a CSV cell as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "columnar": ("application/vnd.pharmatracker.columnar", "ptcol"),
+}
+
+
+def export_media_type(export_format: str, compressed: bool) -> str:
+    """Content-Type of an export; gzip exports are downloaded as .gz files"""
+    return "application/gzip" if compressed else EXPORT_FORMATS[export_format][0]
+
+
+def export_filename(export_format: str, compressed: bool) -> str:
+    """Download name such as inventory-20240131.csv.gz"""
+    extension = EXPORT_FORMATS[export_format][1] + (".gz" if compressed else "")
+    return f"inventory-{datetime.now(timezone.utc):%Y%m%d}.{extension}"
+
+
+def _rows(page: list[dict]):
+    """Public field values of one page of items, in PUBLIC_FIELDS order"""
+    for item in page:
+        medicine = Medicine.from_dynamodb(item)
+        yield tuple(getattr(medicine, field) for field in PUBLIC_FIELDS)
+
+
+def _csv_cell(value):
+    """Quotes free text that a spreadsheet would run as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def _encode_csv(pages: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(PUBLIC_FIELDS)
+    async for page in pages:
+        writer.writerows(tuple(_csv_cell(value) for value in row) for row in _rows(page))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+async def _encode_ndjson(pages: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+    async for page in pages:
+        yield "".join(
+            encoder.encode(dict(zip(PUBLIC_FIELDS, row))) + "\n" for row in _rows(page)
+        ).encode()
+
+
+async def _encode_columnar(
+    pages: AsyncIterator[list[dict]], row_group_size: int
+) -> AsyncIterator[bytes]:
+    writer = ColumnarWriter(
+        [(field, COLUMN_TYPES[field]) for field in PUBLIC_FIELDS], row_group_size
+    )
+    yield writer.start()
+    async for page in pages:
+        for row in _rows(page):
+            if chunk := writer.add(row):
+                yield chunk
+    yield writer.finish()
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compresses a byte stream into one gzip member as it goes"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+
+async def _rechunk(chunks: AsyncIterator[bytes], size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Coalesces small pieces into ~`size` byte chunks for the transport"""
+    pending = bytearray()
+    async for chunk in chunks:
+        pending += chunk
+        if len(pending) >= size:
+            yield bytes(pending)
+            pending.clear()
+    if pending:
+        yield bytes(pending)
+
+
+async def stream_inventory_export(
+    dynamo_db_client: DynamoDBClient,
+    user_sub: str,
+    export_format: str,
+    compressed: bool = False,
+    page_size: int | None = None,
+    row_group_size: int = 10000,
+) -> AsyncIterator[bytes]:
+    """
+    Yields an export of a user's whole inventory as bytes. Items are read
+    page by page from DynamoDB (bypassing the inventory cache) and encoded
+    as they arrive, so memory stays flat whatever the inventory size.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown export format {export_format!r}, expected one of: "
+            + ", ".join(EXPORT_FORMATS)
+        )
+    started = time.monotonic()
+    rows = 0
+
+    async def pages():
+        nonlocal rows
+        async for page in dynamo_db_client.iter_medicine_pages(
+            user_sub, page_size=page_size, projection=EXPORT_PROJECTION
+        ):
+            rows += len(page)
+            yield page
+
+    if export_format == "csv":
+        chunks = _encode_csv(pages())
+    elif export_format == "ndjson":
+        chunks = _encode_ndjson(pages())
+    else:
+        chunks = _encode_columnar(pages(), row_group_size)
+    if compressed:
+        chunks = _gzip(chunks)
+    sent = 0
+    try:
+        async for chunk in _rechunk(chunks):
+            sent += len(chunk)
+            yield chunk
+    except Exception as e:
+        # Headers are already sent, the client sees a truncated download
+        logger.error({"message": "Inventory export failed", "rows": rows, "error": str(e)})
+        raise
+    logger.info(
+        {
+            "message": "Inventory exported",
+            "format": export_format,
+            "gzip": compressed,
+            "rows": rows,
+            "bytes": sent,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+    )
+
+
+def export_response(
+    dynamo_db_client: DynamoDBClient,
+    user_sub: str,
+    export_format: str,
+    compressed: bool = False,
+) -> StreamingResponse:
+    """Chunked download of a user's inventory; `export_format` must be validated first"""
+    return StreamingResponse(
+        stream_inventory_export(dynamo_db_client, user_sub, export_format, compressed),
+        media_type=export_media_type(export_format, compressed),
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{export_filename(export_format, compressed)}"'
+            ),
+            # Always the current inventory
+            "Cache-Control": "no-store",
+        },
+    )
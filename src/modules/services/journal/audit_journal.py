@@ -0,0 +1,448 @@
+"""
+Append-only audit journal of medicine writes, with point-in-time rebuilds.
+
+Every DynamoDBClient write puts an event holding the medicine as stored
+(its deletion, or for adjustments and dispenses the quantities added) in
+the user's partition of the journal table, in the same TransactWriteItems
+call as the write itself: a write is never committed without its event,
+nor an event without its write. Every
+JOURNAL_SNAPSHOT_EVERY events of a user, a worker stores a compressed
+snapshot of that user's whole inventory; "inventory as of X" is the
+newest snapshot at or before X plus the events after it.
+
+Compaction deletes events and snapshots older than JOURNAL_RETENTION_DAYS,
+keeping the snapshot they lead up to, and keeps one snapshot per day
+before today. Run it daily; run `baseline` once when enabling the journal,
+so inventories from before it have a starting point:
+
+    python -m src.modules.services.journal.audit_journal baseline
+    python -m src.modules.services.journal.audit_journal compact
+    python -m src.modules.services.journal.audit_journal as-of 2026-10-01T00:00:00Z --user <user_sub>
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from src.modules.config.journal_settings import JournalSettings
+from src.modules.models.records.change import MedicineChange
+from src.modules.models.records.journal import (
+    EVENT_PREFIX,
+    KEY_END,
+    SNAPSHOT_PREFIX,
+    InventoryState,
+    JournalEvent,
+    decode_snapshot,
+    encode_snapshot,
+    format_instant,
+    key_instant,
+    snapshot_key,
+)
+from src.modules.services.aws.dynamodb_service import BATCH_WRITE_SIZE, DynamoDBClient
+from src.modules.utils.aws_helpers import call_aws, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Users listed in a compaction result
+MAX_LISTED_USERS = 100
+
+# Sorts before every event and snapshot; records how far compaction went
+COMPACTION_KEY = "c#"
+
+
+class AuditJournal:
+    """
+    Snapshots and rebuilds the inventories journaled by a DynamoDBClient,
+    which writes the events themselves (see DynamoDBClient._transact).
+    """
+
+    def __init__(self, dynamo_db_client: DynamoDBClient, settings: JournalSettings | None = None):
+        self.env = settings or JournalSettings()
+        self.dynamo_db_client = dynamo_db_client
+        self.client = dynamo_db_client.client
+        self.table_name = dynamo_db_client.journal_table_name
+        # user_sub -> events this worker committed since its last snapshot of the user
+        self._since_snapshot: dict[str, int] = {}
+        self._snapshots: dict[str, asyncio.Task] = {}
+        dynamo_db_client.add_listener(self.on_change)
+
+    def on_change(self, change: MedicineChange):
+        """DynamoDBClient listener: snapshots users that reached JOURNAL_SNAPSHOT_EVERY events"""
+        user_sub = change.user_sub
+        count = self._since_snapshot.get(user_sub, 0) + 1
+        if count >= self.env.journal_snapshot_every and user_sub not in self._snapshots:
+            count = 0
+            self._snapshots[user_sub] = asyncio.create_task(
+                self._snapshot_later(user_sub, datetime.now(timezone.utc)),
+                name="audit-journal-snapshot",
+            )
+        self._since_snapshot[user_sub] = count
+
+    async def _write(self, requests: list[dict]) -> list[dict]:
+        """BatchWriteItem with retries of unprocessed items; returns those still unprocessed"""
+        for attempt in range(self.dynamo_db_client.env.batch_write_max_retries + 1):
+            if attempt:
+                await asyncio.sleep(random.uniform(0, 0.05 * 2**attempt))
+            response = await call_aws(
+                self.client.batch_write_item, RequestItems={self.table_name: requests}
+            )
+            requests = response.get("UnprocessedItems", {}).get(self.table_name, [])
+            if not requests:
+                break
+        return requests
+
+    async def _snapshot_later(self, user_sub: str, at: datetime):
+        """Snapshots the inventory as of `at` once the writes in flight then have surely committed"""
+        try:
+            await asyncio.sleep(self.env.journal_snapshot_lag)
+            await self.snapshot(user_sub, at)
+        except Exception as e:  # pylint: disable=W0718
+            logger.warning({"message": "Audit journal snapshot failed", "user_sub": user_sub, "error": str(e)})
+        finally:
+            self._snapshots.pop(user_sub, None)
+
+    async def close(self):
+        """Cancels the pending snapshots"""
+        tasks = list(self._snapshots.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Reading
+
+    async def _key_range(
+        self,
+        user_sub: str,
+        low: str,
+        high: str,
+        forward: bool = True,
+        projection: str | None = None,
+        limit: int | None = None,
+        **query_args,
+    ) -> AsyncIterator[dict]:
+        """Yields the user's journal items with keys between `low` and `high`, inclusive, up to `limit`"""
+        query_kwargs = {
+            "TableName": self.table_name,
+            "KeyConditionExpression": "user_sub = :user_sub AND event_key BETWEEN :low AND :high",
+            "ExpressionAttributeValues": {
+                ":user_sub": {"S": user_sub},
+                ":low": {"S": low},
+                ":high": {"S": high},
+            },
+            "ScanIndexForward": forward,
+            **query_args,
+        }
+        if projection:
+            query_kwargs["ProjectionExpression"] = projection
+        if limit:
+            query_kwargs["Limit"] = limit
+        while True:
+            response = await call_aws(self.client.query, **query_kwargs)
+            for item in response.get("Items", []):
+                yield item
+                if limit and (limit := limit - 1) == 0:
+                    return
+            if not (start_key := response.get("LastEvaluatedKey")):
+                break
+            query_kwargs["ExclusiveStartKey"] = start_key
+
+    async def _snapshot_before(self, user_sub: str, at: datetime) -> tuple[datetime, dict[str, dict]] | None:
+        """The newest complete snapshot at or before `at`, as (time, items); older ones stand in for missing ones"""
+        high = f"{SNAPSHOT_PREFIX}{format_instant(at)}#{KEY_END}"
+        while True:
+            newest = [
+                item
+                async for item in self._key_range(
+                    user_sub, SNAPSHOT_PREFIX, high, forward=False, projection="event_key", limit=1
+                )
+            ]
+            if not newest:
+                return None
+            # Parts are written by one batch each and may show up out of order
+            prefix = newest[0]["event_key"]["S"].rsplit("#", 1)[0]
+            parts = [
+                item
+                async for item in self._key_range(
+                    user_sub, prefix + "#", prefix + "#" + KEY_END, ConsistentRead=True
+                )
+            ]
+            # The newest key came from an eventually consistent query, so
+            # its parts may be gone (compacted) or not all visible yet
+            if parts and len(parts) == int(parts[0]["parts"]["N"]):
+                return key_instant(prefix + "#"), decode_snapshot([part["data"]["B"] for part in parts])
+            # Sorts before every part of the missing or incomplete snapshot
+            high = prefix
+
+    async def inventory_as_of(
+        self, user_sub: str, at: datetime, use_snapshots: bool = True
+    ) -> tuple[InventoryState, dict]:
+        """
+        The user's medicines as they were at `at`, from the newest snapshot
+        at or before it plus the events after it (every event without
+        `use_snapshots`), and how it was rebuilt.
+        """
+        snapshot = await self._snapshot_before(user_sub, at) if use_snapshots else None
+        if snapshot is None:
+            await self._check_retained(user_sub, at)
+        state = InventoryState()
+        low = EVENT_PREFIX
+        if snapshot is not None:
+            state.items = snapshot[1]
+            # Events at the snapshot's time are in it
+            low = f"{EVENT_PREFIX}{format_instant(snapshot[0])}#{KEY_END}"
+        replayed = 0
+        async for item in self._key_range(user_sub, low, f"{EVENT_PREFIX}{format_instant(at)}#{KEY_END}"):
+            state.apply(JournalEvent.from_dynamodb(item))
+            replayed += 1
+        return state, {
+            "as_of": format_instant(at),
+            "snapshot_at": format_instant(snapshot[0]) if snapshot else None,
+            "events_replayed": replayed,
+        }
+
+    async def _check_retained(self, user_sub: str, at: datetime):
+        """Raises ValueError if compaction already deleted events up to `at`"""
+        response = await call_aws(
+            self.client.get_item,
+            TableName=self.table_name,
+            Key={"user_sub": {"S": user_sub}, "event_key": {"S": COMPACTION_KEY}},
+        )
+        if (marker := response.get("Item")) and format_instant(at) <= marker["compacted_until"]["S"]:
+            raise ValueError(f"History up to {marker['compacted_until']['S']} was compacted")
+
+    async def get_events(
+        self,
+        user_sub: str,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        medicine_id: str | None = None,
+        page_size: int = 100,
+        cursor: str | None = None,
+    ):
+        """One page of the user's events between `since` and `until`, oldest first"""
+        try:
+            query_kwargs = {
+                "TableName": self.table_name,
+                "KeyConditionExpression": "user_sub = :user_sub AND event_key BETWEEN :low AND :high",
+                "ExpressionAttributeValues": {
+                    ":user_sub": {"S": user_sub},
+                    ":low": {"S": EVENT_PREFIX + (format_instant(since) if since else "")},
+                    ":high": {"S": EVENT_PREFIX + (f"{format_instant(until)}#{KEY_END}" if until else KEY_END)},
+                },
+                "Limit": page_size,
+            }
+            if medicine_id:
+                # Applied after the read: a page may hold fewer events than page_size.
+                # A dispense journals the lots it drew from in one event
+                query_kwargs["FilterExpression"] = (
+                    "medicine_id = :medicine_id OR attribute_exists(quantities.#medicine_id)"
+                )
+                query_kwargs["ExpressionAttributeNames"] = {"#medicine_id": medicine_id}
+                query_kwargs["ExpressionAttributeValues"][":medicine_id"] = {"S": medicine_id}
+            if start_key := decode_cursor(cursor):
+                query_kwargs["ExclusiveStartKey"] = start_key
+            response = await call_aws(self.client.query, **query_kwargs)
+            return {
+                "items": [JournalEvent.from_dynamodb(item) for item in response.get("Items", [])],
+                "next_cursor": encode_cursor(response.get("LastEvaluatedKey")),
+            }
+        except ValueError as e:
+            return {"error": str(e), "status_code": 400}
+        except Exception as e:
+            return {"error": str(e), "status_code": 500}
+
+    # Snapshots and compaction
+
+    async def snapshot(self, user_sub: str, at: datetime, items: dict[str, dict] | None = None) -> dict:
+        """
+        Stores the user's inventory as of `at` (rebuilt from the journal
+        unless `items` is given) as a snapshot in one or more parts.
+        """
+        if items is None:
+            state, _ = await self.inventory_as_of(user_sub, at)
+            items = state.items
+        parts = encode_snapshot(items)
+        requests = [
+            {
+                "PutRequest": {
+                    "Item": {
+                        "user_sub": {"S": user_sub},
+                        "event_key": {"S": snapshot_key(at, part)},
+                        "parts": {"N": str(len(parts))},
+                        "medicines": {"N": str(len(items))},
+                        "data": {"B": data},
+                    }
+                }
+            }
+            for part, data in enumerate(parts)
+        ]
+        await self._write_all(requests)
+        return {"snapshot_at": format_instant(at), "medicines": len(items), "parts": len(parts)}
+
+    async def baseline(self, user_sub: str) -> dict:
+        """
+        Snapshots the user's current medicines from the table. The snapshot
+        is dated before the read, so writes during it are replayed on top;
+        a replayed record never replaces a newer version.
+        """
+        at = datetime.now(timezone.utc)
+        items = {
+            item["medicine_id"]["S"]: item
+            async for item in self.dynamo_db_client.iter_medicines_by_user_sub(user_sub, consistent=True)
+        }
+        return await self.snapshot(user_sub, at, items)
+
+    async def compact(self, user_sub: str, now: datetime | None = None) -> int:
+        """
+        Deletes the user's events and snapshots older than the retention
+        period, except the snapshot they lead up to, and all but the last
+        snapshot of each day before today. Returns the items deleted.
+        """
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=self.env.journal_retention_days)
+        deletes = []
+        base = await self._snapshot_before(user_sub, cutoff)
+        if base is not None:
+            # Recorded first, so a rebuild never silently misses deleted events
+            await self._write_all(
+                [
+                    {
+                        "PutRequest": {
+                            "Item": {
+                                "user_sub": {"S": user_sub},
+                                "event_key": {"S": COMPACTION_KEY},
+                                "compacted_until": {"S": format_instant(base[0])},
+                            }
+                        }
+                    }
+                ]
+            )
+            # Everything before the base snapshot is covered by it
+            async for item in self._key_range(
+                user_sub, EVENT_PREFIX, f"{EVENT_PREFIX}{format_instant(base[0])}#{KEY_END}", projection="event_key"
+            ):
+                deletes.append(item["event_key"]["S"])
+            async for item in self._key_range(
+                user_sub, SNAPSHOT_PREFIX, f"{SNAPSHOT_PREFIX}{format_instant(base[0])}", projection="event_key"
+            ):
+                deletes.append(item["event_key"]["S"])
+            low = f"{SNAPSHOT_PREFIX}{format_instant(base[0])}#{KEY_END}"
+        else:
+            low = SNAPSHOT_PREFIX
+        # Thin out the snapshots after the base: the last one per day is enough
+        today = format_instant(now)[:10]
+        by_day: dict[str, list[str]] = {}
+        async for item in self._key_range(
+            user_sub, low, f"{SNAPSHOT_PREFIX}{today}", projection="event_key"
+        ):
+            key = item["event_key"]["S"]
+            by_day.setdefault(key[len(SNAPSHOT_PREFIX):][:10], []).append(key)
+        for keys in by_day.values():
+            last = keys[-1].rsplit("#", 1)[0]
+            deletes.extend(key for key in keys if not key.startswith(last + "#"))
+        await self._write_all(
+            [
+                {"DeleteRequest": {"Key": {"user_sub": {"S": user_sub}, "event_key": {"S": key}}}}
+                for key in deletes
+            ]
+        )
+        return len(deletes)
+
+    async def _write_all(self, requests: list[dict]):
+        """Writes requests in batches; raises if some could not be written"""
+        for start in range(0, len(requests), BATCH_WRITE_SIZE):
+            if unprocessed := await self._write(requests[start : start + BATCH_WRITE_SIZE]):
+                raise RuntimeError(f"{len(unprocessed)} journal writes were not processed")
+
+    async def list_users(self, page_size: int = 1000) -> set[str]:
+        """Every user with a journal; reads the whole table"""
+        users = set()
+        scan_kwargs = {"TableName": self.table_name, "ProjectionExpression": "user_sub", "Limit": page_size}
+        while True:
+            response = await call_aws(self.client.scan, **scan_kwargs)
+            users.update(item["user_sub"]["S"] for item in response.get("Items", []))
+            if not (start_key := response.get("LastEvaluatedKey")):
+                break
+            scan_kwargs["ExclusiveStartKey"] = start_key
+        return users
+
+
+async def compact_journals(journal: AuditJournal, user_subs: list[str] | None = None, concurrency: int = 8) -> dict:
+    """Compacts the journals of `user_subs` (default: every user), `concurrency` users at a time"""
+    started = time.monotonic()
+    users = sorted(user_subs or await journal.list_users())
+    remaining = iter(users)
+    deleted: dict[str, int] = {}
+
+    async def compact():
+        # Workers take the next user until none are left
+        for user_sub in remaining:
+            if count := await journal.compact(user_sub):
+                deleted[user_sub] = count
+
+    async with asyncio.TaskGroup() as group:
+        for _ in range(min(len(users), max(1, concurrency))):
+            group.create_task(compact())
+
+    logger.info(
+        {
+            "message": "Audit journals compacted",
+            "users": len(users),
+            "deleted": sum(deleted.values()),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+    )
+    return {
+        "users": len(users),
+        "deleted": sum(deleted.values()),
+        "compacted_users": sorted(deleted)[:MAX_LISTED_USERS],
+    }
+
+
+async def run_command(args) -> dict | list:
+    """Runs one CLI command against the configured tables"""
+    dynamo_db_client = DynamoDBClient()
+    if not dynamo_db_client.journal_table_name:
+        raise SystemExit("DYNAMO_DB_JOURNAL_TABLE_NAME is not set")
+    journal = AuditJournal(dynamo_db_client)
+    if args.command == "compact":
+        return await compact_journals(journal, args.users, args.concurrency)
+    if args.command == "baseline":
+        users = args.users
+        if not users:
+            users = set()
+            async for item in dynamo_db_client.scan_medicines(projection=["user_sub"]):
+                users.add(item["user_sub"]["S"])
+        return {user_sub: await journal.baseline(user_sub) for user_sub in sorted(users)}
+    if not args.users:
+        raise SystemExit("as-of needs --user")
+    at = datetime.fromisoformat(args.at.replace("Z", "+00:00"))
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    results = {}
+    for user_sub in args.users:
+        state, rebuilt = await journal.inventory_as_of(user_sub, at)
+        results[user_sub] = {**rebuilt, "items": [medicine.to_json() for medicine in state.medicines()]}
+    return results
+
+
+def main():
+    """Runs a journal maintenance command and prints the result as JSON"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("compact", "baseline", "as-of"))
+    parser.add_argument("at", nargs="?", help="as-of: ISO 8601 time, UTC unless an offset is given")
+    parser.add_argument("--user", action="append", dest="users", help="only this user_sub, repeatable")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    if args.command == "as-of" and not args.at:
+        parser.error("as-of needs a time")
+    print(json.dumps(asyncio.run(run_command(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Hooks that feed request, AWS and template timings into metrics and spans"""
+
+import time
+
+from fastapi.templating import Jinja2Templates
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.modules.services.observability.metrics import (
+    aws_request_duration,
+    aws_retries,
+    dynamodb_consumed_capacity,
+    http_request_duration,
+    template_render_duration,
+)
+from src.modules.services.observability.tracing import start_span
+
+
+class MetricsMiddleware:
+    """Records per-route latency and opens the root span of each request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        with start_span(
+            f"{scope['method']} {scope['path']}", **{"http.method": scope["method"]}
+        ) as span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # The router stores the matched route on the scope
+                route = (
+                    getattr(scope.get("route"), "path", None)
+                    or scope.get("root_path")
+                    or "unmatched"
+                )
+                http_request_duration.observe(
+                    time.perf_counter() - started,
+                    method=scope["method"],
+                    route=route,
+                    status=status_code,
+                )
+                if span is not None:
+                    span.name = f"{scope['method']} {route}"
+                    span.attributes["http.route"] = route
+                    span.attributes["http.status_code"] = status_code
+                    span.error = status_code >= 500
+
+
+class InstrumentedTemplates(Jinja2Templates):
+    """Jinja2Templates that times rendering per template"""
+
+    def TemplateResponse(self, *args, **kwargs):  # pylint: disable=C0103
+        name = kwargs.get("name") or next(
+            (arg for arg in args if isinstance(arg, str)), ""
+        )
+        started = time.perf_counter()
+        with start_span("render " + name, template=name):
+            response = super().TemplateResponse(*args, **kwargs)
+        template_render_duration.observe(time.perf_counter() - started, template=name)
+        return response
+
+
+def describe_operation(operation) -> tuple[str, str]:
+    """Returns (service, operation) names for a bound boto3 client method"""
+    client = getattr(operation, "__self__", None)
+    meta = getattr(client, "meta", None)
+    service = meta.service_model.service_name if meta else "unknown"
+    return service, getattr(operation, "__name__", "unknown")
+
+
+def record_aws_call(
+    service: str, operation: str, elapsed: float, response: dict | None, outcome: str
+):
+    """Records latency, retries and DynamoDB consumed capacity of one AWS call"""
+    aws_request_duration.observe(elapsed, service=service, operation=operation, outcome=outcome)
+    if not response:
+        return
+    retries = response.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+    if retries:
+        aws_retries.inc(retries, service=service, operation=operation)
+    consumed = response.get("ConsumedCapacity") or []
+    # Single-table operations return a dict, batch/transact ones a list
+    for capacity in consumed if isinstance(consumed, list) else [consumed]:
+        dynamodb_consumed_capacity.inc(
+            capacity.get("CapacityUnits", 0.0),
+            operation=operation,
+            table=capacity.get("TableName", ""),
+        )
+
+
+def enable_consumed_capacity(client):
+    """Asks DynamoDB to report consumed capacity on every operation that supports it"""
+
+    def add_return_consumed_capacity(params, model, **_):
+        if "ReturnConsumedCapacity" in model.input_shape.members:
+            params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+    client.meta.events.register(
+        "provide-client-params.dynamodb",
+        add_return_consumed_capacity,
+        unique_id="pharmatracker-consumed-capacity",
+    )
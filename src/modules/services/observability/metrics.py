@@ -0,0 +1,201 @@
+"""Minimal Prometheus-style metrics registry"""
+
+import bisect
+import math
+from typing import Callable
+
+# Latency buckets in seconds, from cache hits up to slow AWS retries
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    """Escapes a label value for the text exposition format"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    """Renders a Prometheus label set"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter partitioned by label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Adds `amount` to the series selected by `labels`"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[str]:
+        """Renders the exposition lines for every series"""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        """Replaces the value of the series selected by `labels`"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._values[key] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram partitioned by label values"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # label key -> [bucket counts..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels):
+        """Records one observation"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> list[str]:
+        """Renders cumulative buckets, sum and count for every series"""
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders the text exposition format"""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric):
+        """Adds a metric, returning the already registered one on name clashes"""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Registers a callback that refreshes gauges right before each scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Returns every metric in Prometheus text format"""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Latency of HTTP requests by route",
+        ("method", "route", "status"),
+    )
+)
+aws_request_duration = registry.register(
+    Histogram(
+        "aws_request_duration_seconds",
+        "Latency of AWS API calls including retries",
+        ("service", "operation", "outcome"),
+    )
+)
+aws_retries = registry.register(
+    Counter("aws_retries_total", "Retries botocore performed", ("service", "operation"))
+)
+dynamodb_consumed_capacity = registry.register(
+    Counter(
+        "dynamodb_consumed_capacity_units_total",
+        "Capacity units reported by DynamoDB",
+        ("operation", "table"),
+    )
+)
+template_render_duration = registry.register(
+    Histogram(
+        "template_render_duration_seconds",
+        "Time spent rendering Jinja2 templates",
+        ("template",),
+    )
+)
+cache_hit_ratio = registry.register(
+    Gauge("cache_hit_ratio", "Hit rate of the in-process caches", ("cache",))
+)
+cache_entries = registry.register(
+    Gauge("cache_entries", "Entries held by the in-process caches", ("cache",))
+)
+rate_limit_decisions = registry.register(
+    Counter(
+        "rate_limit_decisions_total",
+        "Requests allowed or rejected by the auth rate limiters",
+        ("limiter", "outcome"),
+    )
+)
+single_flight_calls = registry.register(
+    Counter(
+        "single_flight_calls_total",
+        "Upstream calls executed or coalesced onto one already in flight",
+        ("operation", "outcome"),
+    )
+)
+change_feed_events = registry.register(
+    Counter(
+        "change_feed_events_total",
+        "Live update events queued for open streams, or dropped for a resync",
+        ("event", "outcome"),
+    )
+)
+change_feed_connections = registry.register(
+    Gauge("change_feed_connections", "Open live update streams")
+)
+dispense_attempts = registry.register(
+    Counter(
+        "dispense_attempts_total",
+        "FIFO dispense transactions committed, replanned after a conflict, or refused",
+        ("outcome",),
+    )
+)
@@ -0,0 +1,169 @@
+"""Lightweight spans with optional OTLP/JSON export"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from src.modules.config.observability_settings import ObservabilitySettings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Span:
+    """One timed operation within a trace"""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    start_ns: int
+    end_ns: int = 0
+    attributes: dict = field(default_factory=dict)
+    error: bool = False
+
+    def to_otlp(self) -> dict:
+        """Converts the span into the OTLP/JSON span shape"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            **({"parentSpanId": self.parent_span_id} if self.parent_span_id else {}),
+            "name": self.name,
+            "kind": 2 if self.parent_span_id is None else 3,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2 if self.error else 1},
+        }
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class SpanExporter:
+    """
+    Buffers finished spans in a bounded queue and ships them in batches
+    from a daemon thread, so request handling never waits on export.
+    """
+
+    def __init__(self, settings: ObservabilitySettings):
+        self.settings = settings
+        self.dropped = 0
+        self._queue: queue.Queue[Span] = queue.Queue(maxsize=settings.trace_queue_size)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        """True when a file or collector destination is configured"""
+        return bool(self.settings.trace_export_path or self.settings.trace_export_endpoint)
+
+    def export(self, span: Span):
+        """Queues a finished span, dropping it if the queue is full"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True, name="span-exporter")
+            self._thread.start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Ships whatever is queued right now"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._ship(batch)
+
+    def _run(self):
+        """Exporter loop: ship at most once a second"""
+        while True:
+            time.sleep(1.0)
+            try:
+                self.flush()
+            except Exception as e:  # pylint: disable=W0718
+                logger.warning({"message": "Span export failed", "error": str(e)})
+
+    def _ship(self, batch: list[Span]):
+        """Writes one OTLP/JSON export request to the file and/or collector"""
+        payload = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                {
+                                    "key": "service.name",
+                                    "value": {"stringValue": self.settings.service_name},
+                                }
+                            ]
+                        },
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": "pharmatracker"},
+                                "spans": [span.to_otlp() for span in batch],
+                            }
+                        ],
+                    }
+                ]
+            },
+            separators=(",", ":"),
+        )
+        if self.settings.trace_export_path:
+            with open(self.settings.trace_export_path, "a", encoding="utf-8") as file:
+                file.write(payload + "\n")
+        if self.settings.trace_export_endpoint:
+            request = urllib.request.Request(
+                self.settings.trace_export_endpoint,
+                data=payload.encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=5):
+                pass
+
+
+exporter = SpanExporter(ObservabilitySettings())
+
+
+@contextmanager
+def start_span(name: str, **attributes):
+    """
+    Times a block as a child of the current span (or as a new trace).
+    Spans are only materialized when an exporter destination is configured.
+    """
+    if not exporter.enabled:
+        yield None
+        return
+    parent = _current_span.get()
+    span = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+        span_id=os.urandom(8).hex(),
+        parent_span_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException:
+        span.error = True
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_ns = time.time_ns()
+        exporter.export(span)
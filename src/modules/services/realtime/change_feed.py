@@ -0,0 +1,317 @@
+"""Per-user change feed pushed to open medkit pages over Server-Sent Events"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+from src.modules.config.realtime_settings import RealtimeSettings
+from src.modules.models.records.change import DELETE, MedicineChange
+from src.modules.models.records.medicine import Medicine
+from src.modules.services.aws.dynamodb_service import DynamoDBClient
+from src.modules.services.observability.metrics import change_feed_events
+
+logger = logging.getLogger(__name__)
+
+UPSERT = "upsert"
+RESYNC = "resync"
+
+# Milliseconds EventSource waits before reconnecting
+RETRY_MILLISECONDS = 3000
+
+
+def format_event(event: str, data: dict, event_id: str | None = None) -> bytes:
+    """Encodes one SSE message"""
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+RESYNC_EVENT = format_event(RESYNC, {})
+
+
+class Subscription:
+    """
+    One open stream. Events wait in a bounded queue; a reader that falls
+    that far behind loses its backlog and gets a single resync instead,
+    so a slow client never holds more than `size` events or stalls a write.
+    """
+
+    __slots__ = ("user_sub", "queue")
+
+    def __init__(self, user_sub: str, size: int):
+        self.user_sub = user_sub
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(size)
+
+    def offer(self, event: bytes) -> bool:
+        """Queues an event; returns False if the backlog was replaced by a resync"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self._drain()
+            self.queue.put_nowait(RESYNC_EVENT)
+            return False
+
+    def close(self):
+        """Ends the stream after what is already queued, or right away if full"""
+        if self.queue.full():
+            self._drain()
+        self.queue.put_nowait(None)
+
+    def _drain(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class ReplayBuffer:
+    """A user's most recent events, to resume a reconnecting stream without a gap"""
+
+    __slots__ = ("events", "start")
+
+    def __init__(self, size: int, start: int):
+        self.events: deque[tuple[int, bytes]] = deque(maxlen=size)
+        # Lowest sequence number the buffer still covers
+        self.start = start
+
+    def add(self, sequence: int, event: bytes):
+        if len(self.events) == self.events.maxlen:
+            self.start = self.events[1][0] if self.events.maxlen > 1 else sequence
+        self.events.append((sequence, event))
+
+    def since(self, sequence: int) -> list[bytes] | None:
+        """Events after `sequence`, or None if some of them were already dropped"""
+        if sequence + 1 < self.start:
+            return None
+        return [event for number, event in self.events if number > sequence]
+
+
+class ChangeFeed:
+    """
+    Fans DynamoDBClient write events out to each user's open streams. Every
+    change is serialized once and the same bytes are queued for every
+    stream of that user, so an idle stream costs one small queue and a
+    parked coroutine.
+
+    With several workers, a write handled by another process does not reach
+    this one's listeners. When the inventory cache keeps shared generations,
+    a background check compares each watched user's generation with the
+    writes seen here and sends a resync when they differ.
+    """
+
+    def __init__(self, dynamo_db_client: DynamoDBClient, settings: RealtimeSettings | None = None):
+        self.env = settings or RealtimeSettings()
+        self.inventory_cache = dynamo_db_client.inventory_cache
+        # Distinguishes this process's event ids from another worker's
+        self.epoch = os.urandom(4).hex()
+        self._sequence = itertools.count(1)
+        self.last_sequence = 0
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._replay: OrderedDict[str, ReplayBuffer] = OrderedDict()
+        # user_sub -> shared generation accounted for by events sent
+        self._generations: dict[str, int] = {}
+        self._connections = 0
+        self.rejected = 0
+        self.resyncs = 0
+        self.overflows = 0
+        self._poller: asyncio.Task | None = None
+        dynamo_db_client.add_listener(self.on_change)
+
+    @property
+    def connections(self) -> int:
+        return self._connections
+
+    def cursor(self, user_sub: str) -> str:
+        """
+        Event id to resume from for a page rendered now. Starts recording the
+        user's events, so writes between the render and the stream's
+        connection are replayed rather than lost.
+        """
+        self._replay_buffer(user_sub)
+        return f"{self.epoch}-{self.last_sequence}"
+
+    def on_change(self, change: MedicineChange):
+        """DynamoDBClient listener: queues the changed row for the user's streams"""
+        subscribers = self._subscribers.get(change.user_sub)
+        buffer = self._replay.get(change.user_sub)
+        if not subscribers and buffer is None:
+            return
+        sequence = self.last_sequence = next(self._sequence)
+        if change.action == DELETE or change.item is None:
+            event_name, data = DELETE, {"medicine_id": change.medicine_id}
+        else:
+            event_name, data = UPSERT, Medicine.from_dynamodb(change.item).to_json()
+        event = format_event(event_name, data, f"{self.epoch}-{sequence}")
+        if buffer is not None:
+            buffer.add(sequence, event)
+            self._replay.move_to_end(change.user_sub)
+        if not subscribers:
+            return
+        if self._remote_write(change.user_sub, local_writes=1):
+            event = RESYNC_EVENT
+            event_name = RESYNC
+        for subscription in subscribers:
+            queued = subscription.offer(event)
+            if not queued:
+                self.overflows += 1
+            change_feed_events.inc(event=event_name, outcome="queued" if queued else "overflow")
+
+    def subscribe(self, user_sub: str, last_event_id: str | None = None):
+        """
+        Opens a stream for `user_sub`, replaying events after `last_event_id`
+        when they are still buffered. Returns (subscription, replayed events),
+        or an error dict once the connection limits are reached.
+        """
+        subscribers = self._subscribers.get(user_sub, ())
+        if (
+            self._connections >= self.env.change_feed_max_connections
+            or len(subscribers) >= self.env.change_feed_max_connections_per_user
+        ):
+            self.rejected += 1
+            return {"error": "Too many open live update streams", "status_code": 503}
+        subscription = Subscription(user_sub, max(1, self.env.change_feed_queue_size))
+        if not subscribers:
+            generation = self.inventory_cache.generation(user_sub)
+            if generation is not None:
+                self._generations[user_sub] = generation
+                self._start_poller()
+        self._subscribers.setdefault(user_sub, set()).add(subscription)
+        self._connections += 1
+        return subscription, self._resume(user_sub, last_event_id)
+
+    def unsubscribe(self, subscription: Subscription):
+        """Forgets a closed stream"""
+        subscribers = self._subscribers.get(subscription.user_sub)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        self._connections -= 1
+        if not subscribers:
+            del self._subscribers[subscription.user_sub]
+            self._generations.pop(subscription.user_sub, None)
+
+    async def stream(self, subscription: Subscription, replayed: list[bytes]) -> AsyncIterator[bytes]:
+        """
+        Yields the SSE body of one stream: replayed events, then live ones,
+        with a keep-alive comment when idle. Streams end after
+        `change_feed_max_stream_seconds` and the browser reconnects, which
+        re-checks the session and spreads streams across workers.
+        """
+        try:
+            yield f"retry: {RETRY_MILLISECONDS}\n\n".encode()
+            for event in replayed:
+                yield event
+            deadline = time.monotonic() + self.env.change_feed_max_stream_seconds
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), min(self.env.change_feed_heartbeat, remaining)
+                    )
+                except TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            self.unsubscribe(subscription)
+
+    def close(self):
+        """Ends every open stream, e.g. at shutdown so workers can exit"""
+        if self._connections:
+            logger.info({"message": "Closing live update streams", "connections": self._connections})
+        for subscribers in list(self._subscribers.values()):
+            for subscription in subscribers:
+                subscription.close()
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    def stats(self) -> dict:
+        """Returns connection counters"""
+        return {
+            "connections": self._connections,
+            "users": len(self._subscribers),
+            "replay_users": len(self._replay),
+            "rejected": self.rejected,
+            "resyncs": self.resyncs,
+            "overflows": self.overflows,
+        }
+
+    def _replay_buffer(self, user_sub: str) -> ReplayBuffer:
+        buffer = self._replay.get(user_sub)
+        if buffer is None:
+            buffer = self._replay[user_sub] = ReplayBuffer(
+                max(1, self.env.change_feed_replay_events), self.last_sequence + 1
+            )
+            while len(self._replay) > self.env.change_feed_replay_users:
+                self._replay.popitem(last=False)
+        else:
+            self._replay.move_to_end(user_sub)
+        return buffer
+
+    def _resume(self, user_sub: str, last_event_id: str | None) -> list[bytes]:
+        """Events a reconnecting stream missed; a resync if they cannot be replayed"""
+        buffer = self._replay_buffer(user_sub)
+        if not last_event_id:
+            return []
+        epoch, _, sequence = last_event_id.partition("-")
+        events = None
+        if epoch == self.epoch and sequence.isdigit():
+            events = buffer.since(int(sequence))
+        if events is None:
+            # Issued by another worker or a previous process, or too far behind
+            self.resyncs += 1
+            return [RESYNC_EVENT]
+        return events
+
+    def _remote_write(self, user_sub: str, local_writes: int = 0) -> bool:
+        """
+        True if the user's shared generation moved further than the
+        `local_writes` this process just made, i.e. another worker wrote.
+        """
+        known = self._generations.get(user_sub)
+        if known is None:
+            return False
+        generation = self.inventory_cache.generation(user_sub)
+        self._generations[user_sub] = generation
+        # Each local write bumps the generation at most once
+        if generation > known + local_writes:
+            self.resyncs += 1
+            return True
+        return False
+
+    def _start_poller(self):
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(
+                self._poll_generations(), name="change-feed-generations"
+            )
+
+    async def _poll_generations(self):
+        """Sends a resync to users whose inventory another worker changed"""
+        while self._generations:
+            await asyncio.sleep(self.env.change_feed_poll_interval)
+            for user_sub in list(self._generations):
+                if self._remote_write(user_sub):
+                    for subscription in self._subscribers.get(user_sub, ()):
+                        subscription.offer(RESYNC_EVENT)
+                    change_feed_events.inc(event=RESYNC, outcome="queued")
+        self._poller = None
+
+
+def event_stream_response(feed: ChangeFeed, subscription: Subscription, replayed: list[bytes]):
+    """Streaming text/event-stream response for one subscription"""
+    return StreamingResponse(
+        feed.stream(subscription, replayed),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-store",
+            # Reverse proxies must pass events through as they are written
+            "X-Accel-Buffering": "no",
+        },
+    )
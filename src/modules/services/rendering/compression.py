@@ -0,0 +1,48 @@
+"""Response compression that leaves already-compressed bodies alone"""
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+from src.modules.services.rendering.static_files import accepted_encodings
+
+# Bodies that gzip cannot shrink further, e.g. .gz exports and images
+COMPRESSED_MEDIA_TYPES = (
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "image/png",
+    "image/jpeg",
+    "image/webp",
+)
+
+# Bodies that must reach the client as they are written; gzip would hold them back
+STREAMING_MEDIA_TYPES = ("text/event-stream",)
+
+
+class _SelectiveGZipResponder(GZipResponder):
+    async def send_with_gzip(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            media_type = content_type.split(";")[0].strip()
+            if media_type in COMPRESSED_MEDIA_TYPES or media_type in STREAMING_MEDIA_TYPES:
+                # Takes the same pass-through path as a response with its own encoding
+                self.initial_message = message
+                self.content_encoding_set = True
+                return
+        await super().send_with_gzip(message)
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that skips compressed media types and event streams"""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and accepted_encodings(
+            Headers(scope=scope).get("Accept-Encoding", ""), ("gzip",)
+        ):
+            responder = _SelectiveGZipResponder(
+                self.app, self.minimum_size, compresslevel=self.compresslevel
+            )
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
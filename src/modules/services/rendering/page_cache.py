@@ -0,0 +1,78 @@
+"""Full-response cache for pages whose HTML does not depend on the user"""
+
+import hashlib
+from dataclasses import dataclass
+
+from fastapi import Request, Response, status
+
+from src.modules.services.observability.instrumentation import InstrumentedTemplates
+from src.modules.services.rendering.static_files import (
+    accepted_encodings,
+    available_encodings,
+    compress,
+)
+
+
+@dataclass(slots=True)
+class CachedPage:
+    """Rendered body, its ETag and precompressed variants"""
+
+    body: bytes
+    etag: str
+    variants: dict[str, bytes]
+
+
+class PageCache:
+    """
+    Renders a template once per (name, context) and serves the stored bytes
+    with an ETag, answering 304 to matching If-None-Match. Call sites pass
+    fixed contexts, so the number of entries is bounded by the code.
+    """
+
+    def __init__(self, templates: InstrumentedTemplates, enabled: bool = True):
+        self.templates = templates
+        self.enabled = enabled
+        self._pages: dict[tuple, CachedPage] = {}
+
+    def response(self, request: Request, name: str, context: dict | None = None) -> Response:
+        """Returns the cached page, rendering it on first use"""
+        context = context or {}
+        key = (name, tuple(sorted(context.items())))
+        page = self._pages.get(key)
+        if page is None:
+            page = self._render(request, name, context)
+            if self.enabled:
+                self._pages[key] = page
+
+        headers = {
+            "ETag": page.etag,
+            "Cache-Control": "private, no-cache",
+            "Vary": "Accept-Encoding, Cookie",
+        }
+        if_none_match = request.headers.get("if-none-match", "")
+        if page.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""), page.variants)
+        if accepted:
+            return Response(
+                page.variants[accepted[0]],
+                media_type="text/html",
+                headers={**headers, "Content-Encoding": accepted[0]},
+            )
+        return Response(page.body, media_type="text/html", headers=headers)
+
+    def clear(self):
+        """Drops every cached page"""
+        self._pages.clear()
+
+    def _render(self, request: Request, name: str, context: dict) -> CachedPage:
+        """Renders a page and precomputes its ETag and compressed variants"""
+        body = self.templates.TemplateResponse(name, {"request": request, **context}).body
+        etag = '"' + hashlib.sha1(body, usedforsecurity=False).hexdigest() + '"'
+        variants = (
+            {encoding: compress(body, encoding) for encoding, _ in available_encodings()}
+            if self.enabled
+            else {}
+        )
+        return CachedPage(body, etag, variants)
@@ -0,0 +1,186 @@
+"""
+Static file serving with cache headers and precompressed variants.
+
+Writes .gz (and, when the optional `brotli` package is installed, .br)
+files next to compressible assets. Runs at startup in production mode,
+or ahead of time as a build step:
+
+    python -m src.modules.services.rendering.static_files
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import stat
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip variants are always produced
+    brotli = None
+
+STATIC_DIRECTORY = "src/frontend/static"
+
+# One year: fingerprinted URLs change whenever the file does
+IMMUTABLE_MAX_AGE = 31536000
+
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".svg", ".html", ".json", ".txt", ".xml")
+
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_fingerprints: dict[str, str] = {}
+
+
+def static_url(path: str, cached: bool = True) -> str:
+    """
+    Returns the /static URL of an asset with a content fingerprint for cache
+    busting. Fingerprints are computed once unless `cached` is False.
+    """
+    fingerprint = _fingerprints.get(path) if cached else None
+    if fingerprint is None:
+        with open(os.path.join(STATIC_DIRECTORY, path), "rb") as file:
+            fingerprint = hashlib.sha1(file.read(), usedforsecurity=False).hexdigest()[:12]
+        _fingerprints[path] = fingerprint
+    return f"/static/{path}?v={fingerprint}"
+
+
+def available_encodings() -> tuple[tuple[str, str], ...]:
+    """(encoding, file suffix) pairs this process can produce, preferred first"""
+    return tuple(
+        (encoding, suffix) for encoding, suffix in ENCODINGS if encoding != "br" or brotli
+    )
+
+
+def accepted_encodings(accept_encoding: str, encodings) -> list[str]:
+    """
+    The `encodings` an Accept-Encoding header accepts, by the client's
+    q-values and then in the given order. q=0 refuses a coding; `*` stands
+    for every coding the header does not name.
+    """
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *parameters = part.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        # x-gzip is an alias of gzip (RFC 9110)
+        qualities["gzip" if coding == "x-gzip" else coding] = quality
+    default = qualities.get("*", 0.0)
+    ranked = sorted(
+        [
+            (qualities.get(encoding, default), -position, encoding)
+            for position, encoding in enumerate(encodings)
+        ],
+        reverse=True,
+    )
+    return [encoding for quality, _, encoding in ranked if quality > 0]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compresses with maximum effort; only used ahead of serving"""
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def precompress_static(directory: str = STATIC_DIRECTORY) -> int:
+    """Writes missing or stale compressed variants, returning how many were written"""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            data = None
+            for encoding, suffix in available_encodings():
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                if data is None:
+                    with open(path, "rb") as file:
+                        data = file.read()
+                # Write then rename: several workers may precompress at once
+                temporary = f"{target}.{os.getpid()}.tmp"
+                with open(temporary, "wb") as output:
+                    output.write(compress(data, encoding))
+                os.replace(temporary, target)
+                written += 1
+    return written
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves .br/.gz variants to clients accepting them and
+    sets Cache-Control: fingerprinted URLs (?v=) are cached for a year,
+    plain URLs for `max_age` seconds.
+    """
+
+    def __init__(self, *args, max_age: int = 3600, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_age = max_age
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            versioned = b"v=" in scope.get("query_string", b"")
+            response.headers["Cache-Control"] = (
+                f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+                if versioned
+                else f"public, max-age={self.max_age}"
+            )
+        return response
+
+    async def _precompressed_response(self, path: str, scope: Scope) -> Response | None:
+        """Serves a compressed variant if one is accepted and up to date"""
+        if scope["method"] not in ("GET", "HEAD") or not path.endswith(COMPRESSIBLE_SUFFIXES):
+            return None
+        suffixes = dict(ENCODINGS)
+        accepted = [
+            (encoding, suffixes[encoding])
+            for encoding in accepted_encodings(
+                Headers(scope=scope).get("accept-encoding", ""), suffixes
+            )
+        ]
+        if not accepted:
+            return None
+        _, original = await anyio.to_thread.run_sync(self.lookup_path, path)
+        if original is None:
+            return None
+        for encoding, suffix in accepted:
+            full_path, variant = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if (
+                variant is None
+                or not stat.S_ISREG(variant.st_mode)
+                or variant.st_mtime < original.st_mtime
+            ):
+                continue
+            response = self.file_response(full_path, variant, scope)
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if media_type.startswith("text/"):
+                media_type += "; charset=utf-8"
+            response.headers["Content-Type"] = media_type
+            response.headers["Content-Encoding"] = encoding
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
+        return None
+
+
+if __name__ == "__main__":
+    print(f"Wrote {precompress_static()} compressed variants")
@@ -0,0 +1,39 @@
+"""Jinja2 environment setup for production and development rendering"""
+
+from functools import partial
+
+from jinja2 import FileSystemBytecodeCache
+
+from src.modules.config.frontend_settings import FrontendSettings
+from src.modules.services.observability.instrumentation import InstrumentedTemplates
+from src.modules.services.rendering.static_files import static_url
+
+TEMPLATE_DIRECTORY = "src/frontend/templates"
+
+
+def build_templates(settings: FrontendSettings | None = None) -> InstrumentedTemplates:
+    """
+    Production mode skips the per-render freshness check on template files
+    and keeps compiled bytecode on disk so restarts skip recompilation.
+    """
+    settings = settings or FrontendSettings()
+    options = {"auto_reload": not settings.production}
+    if settings.production:
+        options["bytecode_cache"] = (
+            FileSystemBytecodeCache(settings.template_bytecode_cache_dir)
+            if settings.template_bytecode_cache_dir
+            else FileSystemBytecodeCache()
+        )
+    templates = InstrumentedTemplates(directory=TEMPLATE_DIRECTORY, **options)
+    templates.env.globals["static_url"] = (
+        static_url if settings.production else partial(static_url, cached=False)
+    )
+    return templates
+
+
+def precompile_templates(templates: InstrumentedTemplates) -> int:
+    """Loads every template so the first request does not pay for compilation"""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
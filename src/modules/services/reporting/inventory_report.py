@@ -0,0 +1,272 @@
+"""
+Network-wide inventory report for administrators.
+
+Reads the whole table with a parallel, segmented scan and folds every item
+into running totals as it arrives (medicines, quantity and expired share
+per medicine type, plus the number of users), so memory does not grow with
+the table. Read capacity is paced to `REPORT_MAX_READ_UNITS` per second so
+a report does not starve the app's own reads:
+
+    python -m src.modules.services.reporting.inventory_report --segments 32 --concurrency 16
+    python -m src.modules.services.reporting.inventory_report --max-read-units 500
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+
+from src.modules.config.report_settings import ReportSettings
+from src.modules.models.records.medicine import current_month, format_month, parse_month
+from src.modules.services.aws.dynamodb_service import DynamoDBClient
+
+logger = logging.getLogger(__name__)
+
+# Attributes the totals are computed from
+REPORT_PROJECTION = ["user_sub", "medicine_type", "quantity", "expiration_date"]
+
+
+@dataclass(slots=True)
+class TypeTotals:
+    """Running totals of one medicine type"""
+
+    medicines: int = 0
+    quantity: int = 0
+    expired: int = 0
+    expired_quantity: int = 0
+
+    def merge(self, other: "TypeTotals"):
+        """Adds another set of totals to this one"""
+        self.medicines += other.medicines
+        self.quantity += other.quantity
+        self.expired += other.expired
+        self.expired_quantity += other.expired_quantity
+
+    def to_json(self) -> dict:
+        """Returns the totals with the expired share as a JSON-ready dict"""
+        return {
+            "medicines": self.medicines,
+            "quantity": self.quantity,
+            "expired": self.expired,
+            "expired_quantity": self.expired_quantity,
+            "expired_share": round(self.expired / self.medicines, 4) if self.medicines else 0.0,
+        }
+
+
+class InventoryReport:
+    """
+    Streaming aggregate over scanned items. One instance is filled per scan
+    segment and the partial reports are merged at the end.
+
+    A segment reads each user's items back to back, so counting changes of
+    user_sub counts its distinct users without remembering them. A large
+    item collection can still be split across segments, but only at their
+    edges: the first and last user of each segment are kept by name and
+    counted once across segments on merge.
+    """
+
+    def __init__(self, month: int | None = None):
+        self.month = current_month() if month is None else month
+        self.by_type: dict[str, TypeTotals] = {}
+        self.pages = 0
+        self.scanned = 0
+        self.consumed_capacity = 0.0
+        # Users of this segment, counted as changes of user_sub
+        self._runs = 0
+        self._first_user: str | None = None
+        self._last_user: str | None = None
+        # From merged reports: users seen only inside a segment, and edge users
+        self._inner_users = 0
+        self._edge_users: set[str] = set()
+
+    @property
+    def users(self) -> int:
+        """Distinct users across this report and the ones merged into it"""
+        edges = self._edges()
+        return self._inner_users + self._runs - len(edges) + len(self._edge_users | edges)
+
+    def _edges(self) -> set[str]:
+        """First and last user of this report's own segment"""
+        return {user_sub for user_sub in (self._first_user, self._last_user) if user_sub is not None}
+
+    def add_item(self, item: dict):
+        """Folds one scanned DynamoDB item into the totals"""
+        user_sub = item["user_sub"]["S"]
+        if user_sub != self._last_user:
+            if self._first_user is None:
+                self._first_user = user_sub
+            self._last_user = user_sub
+            self._runs += 1
+        medicine_type = item.get("medicine_type", {}).get("S", "")
+        totals = self.by_type.get(medicine_type)
+        if totals is None:
+            totals = self.by_type[medicine_type] = TypeTotals()
+        quantity = int(item.get("quantity", {}).get("N", "0"))
+        totals.medicines += 1
+        totals.quantity += quantity
+        expiration_month = parse_month(item.get("expiration_date", {}).get("S", ""))
+        if expiration_month is not None and expiration_month < self.month:
+            totals.expired += 1
+            totals.expired_quantity += quantity
+
+    def add_page(self, response: dict):
+        """Folds one Scan response into the totals"""
+        self.pages += 1
+        self.scanned += response.get("ScannedCount", 0)
+        self.consumed_capacity += response.get("ConsumedCapacity", {}).get("CapacityUnits", 0.0)
+        for item in response.get("Items", []):
+            self.add_item(item)
+
+    def merge(self, other: "InventoryReport"):
+        """Adds the totals of another segment's report"""
+        edges = other._edges()  # pylint: disable=W0212
+        self._inner_users += other._inner_users + other._runs - len(edges)  # pylint: disable=W0212
+        self._edge_users |= other._edge_users | edges  # pylint: disable=W0212
+        self.pages += other.pages
+        self.scanned += other.scanned
+        self.consumed_capacity += other.consumed_capacity
+        for medicine_type, totals in other.by_type.items():
+            self.by_type.setdefault(medicine_type, TypeTotals()).merge(totals)
+
+    def totals(self) -> TypeTotals:
+        """Totals across all medicine types"""
+        overall = TypeTotals()
+        for totals in self.by_type.values():
+            overall.merge(totals)
+        return overall
+
+    def to_json(self) -> dict:
+        """Returns the report as a JSON-ready dict"""
+        return {
+            "month": format_month(self.month),
+            "users": self.users,
+            "totals": self.totals().to_json(),
+            "by_type": {
+                medicine_type: self.by_type[medicine_type].to_json()
+                for medicine_type in sorted(self.by_type)
+            },
+            "scan": {
+                "pages": self.pages,
+                "scanned": self.scanned,
+                "consumed_capacity": round(self.consumed_capacity, 1),
+            },
+        }
+
+
+class ReadCapacityLimiter:
+    """
+    Paces a scan to an average of `units_per_second` consumed read capacity.
+    A page's cost is only known once it is read, so pages are paid for
+    afterwards and the next page waits while the balance is negative.
+    The balance refills up to one second's worth, which bounds bursts.
+    """
+
+    def __init__(self, units_per_second: float):
+        self.rate = units_per_second
+        self.balance = units_per_second
+        self.updated = time.monotonic()
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.balance = min(self.rate, self.balance + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Waits until the scan may read another page"""
+        if self.rate <= 0:
+            return
+        self._refill()
+        while self.balance <= 0:
+            delay = -self.balance / self.rate
+            self.waited += delay
+            await asyncio.sleep(delay)
+            self._refill()
+
+    def consume(self, units: float):
+        """Charges the capacity a page actually consumed"""
+        if self.rate > 0:
+            self._refill()
+            self.balance -= units
+
+
+async def build_inventory_report(
+    dynamo_db_client: DynamoDBClient,
+    settings: ReportSettings | None = None,
+) -> InventoryReport:
+    """
+    Scans the table in `report_scan_segments` segments, reading up to
+    `report_scan_concurrency` of them at a time, and returns the merged report.
+    Errors propagate and cancel the remaining segments.
+    """
+    env = settings or ReportSettings()
+    started = time.monotonic()
+    segments = max(1, env.report_scan_segments)
+    limiter = ReadCapacityLimiter(env.report_max_read_units)
+    month = current_month()
+    remaining = iter(range(segments))
+    partials: list[InventoryReport] = []
+
+    async def scan_segments():
+        # Workers take the next unread segment until none are left
+        for segment in remaining:
+            partial = InventoryReport(month)
+            partials.append(partial)
+            await limiter.acquire()
+            async for response in dynamo_db_client.scan_medicine_pages(
+                page_size=env.report_scan_page_size,
+                projection=REPORT_PROJECTION,
+                segment=segment if segments > 1 else None,
+                total_segments=segments if segments > 1 else None,
+            ):
+                partial.add_page(response)
+                limiter.consume(response.get("ConsumedCapacity", {}).get("CapacityUnits", 0.0))
+                await limiter.acquire()
+
+    async with asyncio.TaskGroup() as group:
+        for _ in range(min(segments, max(1, env.report_scan_concurrency))):
+            group.create_task(scan_segments())
+
+    report = InventoryReport(month)
+    for partial in partials:
+        report.merge(partial)
+    logger.info(
+        {
+            "message": "Inventory report built",
+            "segments": segments,
+            "medicines": report.scanned,
+            "pages": report.pages,
+            "consumed_capacity": round(report.consumed_capacity, 1),
+            "throttled_seconds": round(limiter.waited, 3),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+    )
+    return report
+
+
+def main():
+    """Builds the report against the configured table and prints it as JSON"""
+    env = ReportSettings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=env.report_scan_segments)
+    parser.add_argument("--concurrency", type=int, default=env.report_scan_concurrency)
+    parser.add_argument("--page-size", type=int, default=env.report_scan_page_size)
+    parser.add_argument(
+        "--max-read-units", type=float, default=env.report_max_read_units,
+        help="average read capacity units per second, 0 for unlimited",
+    )
+    args = parser.parse_args()
+    settings = ReportSettings(
+        report_scan_segments=args.segments,
+        report_scan_concurrency=args.concurrency,
+        report_scan_page_size=args.page_size,
+        report_max_read_units=args.max_read_units,
+    )
+    report = asyncio.run(build_inventory_report(DynamoDBClient(), settings))
+    print(json.dumps(report.to_json(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Sorted-array index over one user's inventory for search, filter and sort"""
+
+from bisect import bisect_left
+from dataclasses import dataclass
+
+from src.modules.models.records.medicine import Medicine, current_month
+from src.modules.utils.text_helpers import normalize_medicine_name
+
+# Accepted sort keys; prefix a key with '-' for descending
+SORT_KEYS = ("name", "type", "quantity", "expiration")
+
+# Sorts beyond the primary key by name, so equal rows keep a stable order
+DEFAULT_SORT = (("name", False),)
+
+# Expiration sort value of items without a parseable month
+_NO_MONTH = 10**9
+
+# Upper bound for prefix ranges in the sorted token arrays
+_PREFIX_END = "\U0010ffff"
+
+
+def parse_sort(spec: str | None) -> tuple[tuple[str, bool], ...]:
+    """Parses 'expiration,-quantity' into ((key, descending), ...)"""
+    if not spec:
+        return DEFAULT_SORT
+    keys = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        key = part.removeprefix("-")
+        if key not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {key}")
+        keys.append((key, part.startswith("-")))
+    if all(key != "name" for key, _ in keys):
+        keys.extend(DEFAULT_SORT)
+    return tuple(keys)
+
+
+@dataclass(slots=True)
+class SearchQuery:
+    """Search, filter and sort criteria for the medkit view and the API"""
+
+    q: str | None = None
+    medicine_type: str | None = None
+    expired_only: bool = False
+    min_quantity: int | None = None
+    max_quantity: int | None = None
+    sort: tuple[tuple[str, bool], ...] = DEFAULT_SORT
+
+
+class InventoryIndex:
+    """
+    Immutable index over a snapshot of a user's items. Name words and types
+    live in sorted (key, position) arrays, so a prefix is two bisects; sort
+    orders are computed once per sort spec and reused across keystrokes.
+    """
+
+    def __init__(self, items: list[dict]):
+        self.medicines = [Medicine.from_dynamodb(item) for item in items]
+        self._names = [normalize_medicine_name(m.medicine_name) for m in self.medicines]
+        self._types = [normalize_medicine_name(m.medicine_type) for m in self.medicines]
+        self._name_tokens = sorted(
+            (token, position)
+            for position, name in enumerate(self._names)
+            for token in set(name.split())
+        )
+        self._type_keys = sorted((key, position) for position, key in enumerate(self._types))
+        # sort spec -> (positions in order, rank of each position)
+        self._orders: dict[tuple[tuple[str, bool], ...], tuple[list[int], list[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.medicines)
+
+    def search(
+        self, query: SearchQuery, offset: int = 0, limit: int | None = None
+    ) -> tuple[list[Medicine], int]:
+        """Returns the requested page of matches and the total match count"""
+        candidates = self._candidates(query)
+        order, rank = self._order(query.sort)
+        if candidates is None:
+            positions = order
+        elif len(candidates) * 8 < len(order):
+            # Few matches: ordering them beats a pass over the whole inventory
+            positions = sorted(candidates, key=rank.__getitem__)
+        else:
+            positions = [position for position in order if position in candidates]
+        month = current_month()
+        end = None if limit is None else offset + limit
+        page = []
+        total = 0
+        for position in positions:
+            medicine = self.medicines[position]
+            if query.expired_only and not (
+                medicine.expiration_month is not None and medicine.expiration_month < month
+            ):
+                continue
+            if query.min_quantity is not None and medicine.quantity < query.min_quantity:
+                continue
+            if query.max_quantity is not None and medicine.quantity > query.max_quantity:
+                continue
+            if offset <= total and (end is None or total < end):
+                page.append(medicine)
+            total += 1
+        return page, total
+
+    def _candidates(self, query: SearchQuery) -> set[int] | None:
+        """Positions matching the text criteria, or None when there are none"""
+        candidates = None
+        if query.q:
+            # Every query word must prefix-match some word of the name
+            for word in normalize_medicine_name(query.q).split():
+                matches = self._prefix_positions(self._name_tokens, word)
+                candidates = matches if candidates is None else candidates & matches
+                if not candidates:
+                    return candidates
+        if query.medicine_type:
+            matches = self._prefix_positions(
+                self._type_keys, normalize_medicine_name(query.medicine_type)
+            )
+            candidates = matches if candidates is None else candidates & matches
+        return candidates
+
+    @staticmethod
+    def _prefix_positions(keys: list[tuple[str, int]], prefix: str) -> set[int]:
+        """Positions whose key starts with `prefix`, via two bisects"""
+        start = bisect_left(keys, (prefix,))
+        end = bisect_left(keys, (prefix + _PREFIX_END,), lo=start)
+        return {position for _, position in keys[start:end]}
+
+    def _order(self, sort: tuple[tuple[str, bool], ...]) -> tuple[list[int], list[int]]:
+        """Positions in the requested order and their ranks, memoized per sort spec"""
+        cached = self._orders.get(sort)
+        if cached is None:
+            order = list(range(len(self.medicines)))
+            # Stable sorts applied from the last key to the first
+            for key, descending in reversed(sort):
+                order.sort(key=self._sort_values(key).__getitem__, reverse=descending)
+            rank = [0] * len(order)
+            for index, position in enumerate(order):
+                rank[position] = index
+            cached = self._orders[sort] = (order, rank)
+        return cached
+
+    def _sort_values(self, key: str) -> list:
+        """Sort values of every position for one sort key"""
+        if key == "name":
+            return self._names
+        if key == "type":
+            return self._types
+        if key == "quantity":
+            return [medicine.quantity for medicine in self.medicines]
+        # Unparseable dates ('N/A') sort after every real month
+        return [
+            _NO_MONTH if medicine.expiration_month is None else medicine.expiration_month
+            for medicine in self.medicines
+        ]
@@ -0,0 +1,54 @@
+"""Per-user search indexes built from the cached inventory"""
+
+from src.modules.config.cache_settings import InventoryCacheSettings
+from src.modules.services.aws.dynamodb_service import DynamoDBClient
+from src.modules.services.cache.lru_cache import LRUCache
+from src.modules.services.search.inventory_index import InventoryIndex, SearchQuery
+
+
+class InventorySearch:
+    """
+    Answers medkit searches from an InventoryIndex per user. The inventory
+    cache replaces a user's item list on every write (copy-on-write), so an
+    index stays valid exactly as long as it was built from the current list.
+    The redis and none cache backends return a fresh list on every read, so
+    with those the index is rebuilt per request.
+    """
+
+    def __init__(
+        self,
+        dynamo_db_client: DynamoDBClient,
+        settings: InventoryCacheSettings | None = None,
+    ):
+        settings = settings or InventoryCacheSettings()
+        self.dynamo_db_client = dynamo_db_client
+        # user_sub -> (item list the index was built from, index)
+        self._indexes = LRUCache(
+            max_size=settings.inventory_cache_max_users, ttl=settings.inventory_cache_ttl
+        )
+
+    async def get_index(self, user_sub: str):
+        """Returns the user's index, rebuilding it if the inventory changed"""
+        items = await self.dynamo_db_client.get_medicines_by_user_sub(user_sub)
+        if isinstance(items, dict):
+            return items
+        entry = self._indexes.get(user_sub)
+        if entry is not None and entry[0] is items:
+            return entry[1]
+        index = InventoryIndex(items)
+        self._indexes.set(user_sub, (items, index))
+        return index
+
+    async def search(
+        self, user_sub: str, query: SearchQuery, offset: int = 0, limit: int | None = None
+    ):
+        """Returns {"items": page of Medicine, "total": match count}"""
+        index = await self.get_index(user_sub)
+        if isinstance(index, dict):
+            return index
+        page, total = index.search(query, offset, limit)
+        return {"items": page, "total": total}
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters of the index cache"""
+        return self._indexes.stats()
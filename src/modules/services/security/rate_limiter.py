@@ -0,0 +1,178 @@
+"""Token bucket rate limiting for the login and registration forms"""
+
+import math
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from src.modules.config.rate_limit_settings import RateLimitSettings
+from src.modules.services.observability.metrics import rate_limit_decisions
+from src.modules.services.security.shared_buckets import SharedBuckets
+
+
+class TokenBucketLimiter:
+    """
+    One token bucket per key, refilled at `per_minute` tokens a minute up
+    to `burst`. Buckets are kept in LRU order and capped at `max_keys`; a
+    dropped key simply starts again with a full bucket. With `shared`, the
+    buckets live in a table shared by every worker on the host instead, so
+    the limit holds whatever the number of workers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_minute: float,
+        burst: int,
+        max_keys: int,
+        shared: SharedBuckets | None = None,
+    ):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self.shared = shared
+        self.allowed = 0
+        self.limited = 0
+        # key -> [tokens, monotonic time of last refill]
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Tracked keys; of every limiter of the table when shared"""
+        return len(self._buckets) if self.shared is None else len(self.shared)
+
+    def wait_time(self, key: str) -> float:
+        """Seconds until `key` has a whole token again, 0.0 if it has one now"""
+        tokens = self._refill(key)[0]
+        if tokens >= 1.0:
+            return 0.0
+        return math.inf if self.rate <= 0 else (1.0 - tokens) / self.rate
+
+    def consume(self, key: str):
+        """Takes one token from `key`'s bucket"""
+        bucket = self._refill(key)
+        bucket[0] -= 1.0
+        if self.shared is not None:
+            self.shared.put(f"{self.name}:{key}", *bucket)
+
+    def record(self, allowed: bool):
+        """Counts one allowed or rejected request"""
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        rate_limit_decisions.inc(
+            limiter=self.name, outcome="allowed" if allowed else "limited"
+        )
+
+    def _refill(self, key: str) -> list[float]:
+        """Returns `key`'s bucket, topped up for the time since its last use"""
+        if self.shared is not None:
+            # Wall-clock time, comparable across processes
+            now = time.time()
+            stored = self.shared.get(f"{self.name}:{key}")
+            if stored is None:
+                return [self.burst, now]
+            tokens, refilled_at = stored
+            return [min(self.burst, tokens + max(0.0, now - refilled_at) * self.rate), now]
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def stats(self) -> dict:
+        """Returns decision counters and the number of tracked keys"""
+        return {"allowed": self.allowed, "limited": self.limited, "keys": len(self)}
+
+
+def allow(checks: list[tuple[TokenBucketLimiter, str]]) -> float:
+    """
+    Takes a token from every (limiter, key) bucket if all of them have one,
+    so a request rejected by the email bucket does not also drain the IP
+    bucket. Returns 0.0 when allowed, else the seconds to wait. Shared
+    buckets are checked and taken from under their table's lock.
+    """
+    shared = next((limiter.shared for limiter, _ in checks if limiter.shared is not None), None)
+    with shared.locked() if shared is not None else nullcontext():
+        waits = [limiter.wait_time(key) for limiter, key in checks]
+        wait = max(waits, default=0.0)
+        for (limiter, key), own_wait in zip(checks, waits):
+            if wait == 0.0:
+                limiter.consume(key)
+                limiter.record(True)
+            elif own_wait > 0.0:
+                # Only the limiters that caused the rejection count it
+                limiter.record(False)
+    return wait
+
+
+class AuthRateLimiter:
+    """Per-IP and per-email limits in front of Cognito sign-in and sign-up"""
+
+    def __init__(self, settings: RateLimitSettings | None = None):
+        self.env = settings or RateLimitSettings()
+        max_keys = self.env.rate_limit_max_keys
+        # One table for the four limiters, shared by the workers of the host
+        shared = (
+            SharedBuckets(self.env.rate_limit_state_path, max_keys)
+            if self.env.rate_limit_state_path
+            else None
+        )
+        self.login_ip = TokenBucketLimiter(
+            "login_ip", self.env.login_ip_per_minute, self.env.login_ip_burst, max_keys, shared
+        )
+        self.login_email = TokenBucketLimiter(
+            "login_email",
+            self.env.login_email_per_minute,
+            self.env.login_email_burst,
+            max_keys,
+            shared,
+        )
+        self.register_ip = TokenBucketLimiter(
+            "register_ip",
+            self.env.register_ip_per_minute,
+            self.env.register_ip_burst,
+            max_keys,
+            shared,
+        )
+        self.register_email = TokenBucketLimiter(
+            "register_email",
+            self.env.register_email_per_minute,
+            self.env.register_email_burst,
+            max_keys,
+            shared,
+        )
+
+    def client_ip(self, request) -> str:
+        """Client address of a request, from X-Forwarded-For only if trusted"""
+        if self.env.rate_limit_trust_forwarded:
+            forwarded = request.headers.get("x-forwarded-for", "")
+            if first := forwarded.split(",")[0].strip():
+                return first
+        return request.client.host if request.client else "unknown"
+
+    def check_login(self, ip: str, email: str) -> float:
+        """Seconds to wait before this login attempt may proceed, 0.0 if allowed"""
+        if not self.env.auth_rate_limit_enabled:
+            return 0.0
+        return allow([(self.login_ip, ip), (self.login_email, email.strip().lower())])
+
+    def check_register(self, ip: str, email: str) -> float:
+        """Seconds to wait before this sign-up may proceed, 0.0 if allowed"""
+        if not self.env.auth_rate_limit_enabled:
+            return 0.0
+        return allow([(self.register_ip, ip), (self.register_email, email.strip().lower())])
+
+    def stats(self) -> dict:
+        """Counters of every limiter"""
+        return {
+            limiter.name: limiter.stats()
+            for limiter in (self.login_ip, self.login_email, self.register_ip, self.register_email)
+        }
@@ -0,0 +1,60 @@
+"""Token buckets shared by all worker processes on a host"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import Iterator
+
+# Key hash (0 = empty), tokens, wall-clock time of the last refill
+_SLOT = struct.Struct("<Qdd")
+
+
+class SharedBuckets:
+    """
+    Fixed-size table of token buckets in a memory-mapped file, so every
+    worker draws from the same buckets. Keys hash to a slot that remembers
+    which key it holds; a key whose slot was taken over by another starts
+    again with a full bucket, like a key dropped from a per-worker LRU.
+    Hold `locked()` around reading and writing back a set of buckets.
+    """
+
+    def __init__(self, path: str, slots: int = 100_000):
+        self.path = path
+        self.slots = slots
+        size = slots * _SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def __len__(self) -> int:
+        """Slots holding a bucket, O(slots)"""
+        return sum(1 for offset in range(0, len(self._map), _SLOT.size) if _SLOT.unpack_from(self._map, offset)[0])
+
+    def _locate(self, key: str) -> tuple[int, int]:
+        """(offset of the key's slot, key hash)"""
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        return (key_hash % self.slots) * _SLOT.size, key_hash
+
+    def get(self, key: str) -> tuple[float, float] | None:
+        """(tokens, time of last refill) of a key's bucket, None if it has none"""
+        offset, key_hash = self._locate(key)
+        stored_hash, tokens, refilled_at = _SLOT.unpack_from(self._map, offset)
+        return (tokens, refilled_at) if stored_hash == key_hash else None
+
+    def put(self, key: str, tokens: float, refilled_at: float):
+        """Stores a key's bucket, replacing whatever its slot held"""
+        offset, key_hash = self._locate(key)
+        _SLOT.pack_into(self._map, offset, key_hash, tokens, refilled_at)
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Exclusive access across processes, under a file lock"""
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
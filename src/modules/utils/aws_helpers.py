@@ -1,8 +1,23 @@
 """Package for AWS helper methods"""
 
+import asyncio
+import json
 import hmac
 import hashlib
 import base64
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from src.modules.config.aws_settings import BaseAwsSettings
+from src.modules.services.observability.instrumentation import (
+    describe_operation,
+    record_aws_call,
+)
+from src.modules.services.observability.tracing import start_span
+
+_executor: ThreadPoolExecutor | None = None
 
 
 def calculate_secret_hash(client_id, client_secret, username):
@@ -15,3 +30,102 @@ def calculate_secret_hash(client_id, client_secret, username):
     ).digest()
     secret_hash = base64.b64encode(dig).decode()
     return secret_hash
+
+
+def decode_jwt_claims(token: str) -> dict:
+    """
+    Decodes the payload of a JWT without verifying its signature.
+    Only used for metadata such as `exp`; Cognito remains the authority.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))
+    except (IndexError, ValueError, AttributeError):
+        return {}
+
+
+def encode_cursor(last_evaluated_key: dict | None) -> str | None:
+    """Encodes a DynamoDB LastEvaluatedKey as an opaque, URL-safe cursor"""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> dict | None:
+    """Decodes a cursor produced by encode_cursor back into an ExclusiveStartKey"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except ValueError as e:
+        raise ValueError("Invalid pagination cursor") from e
+    if not isinstance(key, dict):
+        raise ValueError("Invalid pagination cursor")
+    return key
+
+
+def build_projection(fields: list[str] | None) -> dict:
+    """Builds ProjectionExpression kwargs, aliasing names to dodge reserved words"""
+    if not fields:
+        return {}
+    names = {f"#p{index}": field for index, field in enumerate(fields)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+
+def get_aws_executor(max_workers: int | None = None) -> ThreadPoolExecutor:
+    """
+    Returns the bounded thread pool shared by all AWS clients.
+    `max_workers` only applies when the pool is first created.
+    """
+    global _executor  # pylint: disable=W0603
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max_workers or BaseAwsSettings().aws_max_workers,
+            thread_name_prefix="aws",
+        )
+    return _executor
+
+
+def shutdown_aws_executor():
+    """Waits for in-flight AWS calls and releases the thread pool"""
+    global _executor  # pylint: disable=W0603
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def call_aws(operation, **kwargs):
+    """
+    Runs a blocking boto3 operation on the AWS thread pool
+    so the event loop keeps serving other requests.
+    Every call is timed and traced under its service/operation name.
+    """
+    loop = asyncio.get_running_loop()
+    service, name = describe_operation(operation)
+    started = time.perf_counter()
+    with start_span(f"{service}.{name}", **{"rpc.service": service, "rpc.method": name}):
+        try:
+            response = await loop.run_in_executor(
+                get_aws_executor(), partial(operation, **kwargs)
+            )
+        except Exception as e:
+            elapsed = time.perf_counter() - started
+            record_aws_call(service, name, elapsed, getattr(e, "response", None), "error")
+            raise
+    record_aws_call(service, name, time.perf_counter() - started, response, "ok")
+    return response
+
+
+def _reset_executor_after_fork():
+    """Worker threads do not survive fork; the child builds its own pool"""
+    global _executor  # pylint: disable=W0603
+    _executor = None
+
+
+os.register_at_fork(after_in_child=_reset_executor_after_fork)
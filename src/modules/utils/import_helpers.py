@@ -0,0 +1,76 @@
+"""Package for streaming bulk-import parsers"""
+
+import codecs
+import csv
+import io
+import json
+from typing import BinaryIO, Iterator
+
+IMPORT_FIELDS = ("medicine_name", "medicine_type", "quantity", "expiration_date")
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def iter_import_rows(stream: BinaryIO, filename: str | None) -> Iterator[tuple[int, dict]]:
+    """
+    Yields (row_number, row) pairs from an uploaded CSV or JSON file
+    without loading the whole file into memory.
+    """
+    if (filename or "").lower().endswith((".json", ".jsonl", ".ndjson")):
+        yield from _iter_json_rows(stream)
+    else:
+        yield from _iter_csv_rows(stream)
+
+
+def _iter_csv_rows(stream: BinaryIO) -> Iterator[tuple[int, dict]]:
+    """Reads a CSV file with a header row; row numbers count the header"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {
+                field: (row.get(field) or "").strip() for field in IMPORT_FIELDS
+            }
+    finally:
+        # Leave the underlying upload open for its owner to close
+        text.detach()
+
+
+def _iter_json_rows(stream: BinaryIO) -> Iterator[tuple[int, dict]]:
+    """
+    Reads either a JSON array of objects or newline-delimited objects,
+    decoding one object at a time from a sliding buffer.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    position = 0
+    row_number = 0
+    eof = False
+    while True:
+        # Skip whitespace and array punctuation between objects
+        while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+            position += 1
+        if position == len(buffer):
+            if eof:
+                return
+            chunk = stream.read(_CHUNK_SIZE)
+            eof = not chunk
+            buffer, position = text_decoder.decode(chunk, final=eof), 0
+            continue
+        try:
+            row, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f"Malformed JSON after row {row_number}") from e
+            # Object spans the chunk boundary, read more
+            chunk = stream.read(_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + text_decoder.decode(chunk, final=eof)
+            position = 0
+            continue
+        position = end
+        row_number += 1
+        if not isinstance(row, dict):
+            raise ValueError(f"Row {row_number} is not a JSON object")
+        yield row_number, {field: row.get(field) for field in IMPORT_FIELDS}
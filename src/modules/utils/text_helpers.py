@@ -0,0 +1,13 @@
+"""Package for text normalization helpers"""
+
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_medicine_name(name: str) -> str:
+    """
+    Builds the sort/search key for a medicine name:
+    case-folded with runs of whitespace collapsed.
+    """
+    return _WHITESPACE.sub(" ", name).strip().casefold()
@@ -0,0 +1,57 @@
+"""Package for process and CPU helpers used by the multi-worker server"""
+
+import fcntl
+import math
+import os
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may actually use: the cgroup CPU quota (containers)
+    or the scheduler affinity mask, whichever is smaller.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus or 1, max(1, math.ceil(quota)))
+    return max(1, cpus or 1)
+
+
+def _cgroup_cpu_quota() -> float | None:
+    """Reads the CPU quota from cgroup v2, falling back to v1"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as file:
+            quota, period = file.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", encoding="utf-8") as file:
+            quota = int(file.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", encoding="utf-8") as file:
+            period = int(file.read())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def default_worker_count() -> int:
+    """WEB_CONCURRENCY if set, else one worker per available CPU"""
+    if configured := os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(configured))
+    return available_cpus()
+
+
+def try_lock(path: str):
+    """
+    Takes an exclusive, non-blocking lock on `path`. Returns the open file,
+    which holds the lock until closed or the process exits, or None if
+    another process holds it.
+    """
+    file = open(path, "a+b")  # pylint: disable=R1732
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        file.close()
+        return None
+    return file
@@ -0,0 +1,115 @@
+"""
+Shared fixtures. The tests run against the in-process AWS fake, selected
+here before the app modules read their settings at import time.
+"""
+
+import os
+
+os.environ.update(
+    {
+        "AWS_BACKEND": "fake",
+        "FAKE_AWS_LATENCY": "0",
+        "FAKE_AWS_LATENCY_JITTER": "0",
+        "AWS_REGION": "us-east-1",
+        "APP_CLIENT_ID": "test-client",
+        "APP_CLIENT_SECRET": "test-secret",
+        "DYNAMO_DB_TABLE_NAME": "test-medicines",
+        "DYNAMO_DB_SUMMARY_TABLE_NAME": "test-summaries",
+        "DYNAMO_DB_JOURNAL_TABLE_NAME": "test-journal",
+    }
+)
+
+# pylint: disable=C0413
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.modules import dependencies
+from src.modules.models.inputs.app_inputs import MedicineInput
+from src.modules.services.aws.dynamodb_service import DynamoDBClient
+from src.modules.services.aws.fake.clients import reset_fake_clients
+from tests.helpers import USER_SUB
+
+# (summaries, journal) combinations, each a separate write path
+WRITE_MODES = {
+    "plain": (False, False),
+    "summaries": (True, False),
+    "journal": (False, True),
+    "summaries+journal": (True, True),
+}
+
+
+@pytest.fixture(autouse=True)
+def fake_aws():
+    """Every test starts from empty tables and fresh shared clients"""
+    reset_fake_clients()
+    dependencies.reset()
+    yield
+    dependencies.reset()
+    reset_fake_clients()
+
+
+@pytest.fixture
+def app_client() -> TestClient:
+    """
+    Test client of the app, signed in as a user of the fake user pool
+    (`app_client.user_sub`) with both the session cookie of the HTML
+    routes and the bearer token of the API. Redirects are returned, not
+    followed.
+    """
+    cognito = dependencies.get_cognito_client().client
+    user_sub = cognito.add_user("user@example.com", "correct-horse")
+    token = cognito.issue_token(user_sub)
+    client = TestClient(app, follow_redirects=False)
+    client.cookies.set("session_token", token)
+    client.headers["Authorization"] = f"Bearer {token}"
+    client.user_sub = user_sub
+    return client
+
+
+@pytest.fixture
+def make_client():
+    """
+    Builds DynamoDBClients on the shared fake tables. Each has its own
+    inventory cache, like app workers; summaries and the journal are off
+    unless asked for.
+    """
+
+    def make(summaries: bool = False, journal: bool = False) -> DynamoDBClient:
+        client = DynamoDBClient()
+        if not summaries:
+            client.summary_table_name = None
+        if not journal:
+            client.journal_table_name = None
+        return client
+
+    return make
+
+
+@pytest.fixture(params=list(WRITE_MODES))
+def dynamo_db_client(request, make_client) -> DynamoDBClient:
+    """A client in each write mode"""
+    summaries, journal = WRITE_MODES[request.param]
+    return make_client(summaries=summaries, journal=journal)
+
+
+@pytest.fixture
+def medicine_input():
+    """Builds valid medicine inputs with overridable fields"""
+
+    def build(
+        medicine_name: str = "Paracetamol",
+        medicine_type: str = "Tablet",
+        quantity: int = 10,
+        expiration_date: str = "2099-01",
+        user_sub: str = USER_SUB,
+    ) -> MedicineInput:
+        return MedicineInput(
+            user_sub=user_sub,
+            medicine_name=medicine_name,
+            medicine_type=medicine_type,
+            quantity=quantity,
+            expiration_date=expiration_date,
+        )
+
+    return build
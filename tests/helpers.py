@@ -0,0 +1,14 @@
+"""Constants and assertions shared by the test modules"""
+
+import asyncio
+
+# Owner of the medicines built by the `medicine_input` fixture
+USER_SUB = "user-1"
+
+
+def assert_summary_matches_records(client):
+    """The stored inventory summary equals a recount of the records, if the client keeps one"""
+    if client.summary_table_name:
+        stored, recounted = asyncio.run(client.rebuild_inventory_summary(USER_SUB, write=False))
+        assert stored is not None
+        assert stored.counters() == recounted.counters()
@@ -0,0 +1,45 @@
+"""Tests for GET /api/v1/medicines/expiring"""
+
+from src.modules import dependencies
+from src.modules.models.records.medicine import current_month, format_month
+from src.modules.services.alerts.expiry_alerts import ExpiryAlertEngine
+
+
+def add(app_client, medicine_name: str, expiration_date: str):
+    response = app_client.post(
+        "/api/v1/medicines",
+        json={
+            "medicine_name": medicine_name,
+            "medicine_type": "Tablet",
+            "quantity": 1,
+            "expiration_date": expiration_date,
+        },
+    )
+    assert response.status_code == 201
+
+
+def test_lists_expired_and_soon_expiring_medicines_soonest_first(app_client):
+    this_month = current_month()
+    add(app_client, "Later", format_month(this_month + 2))
+    add(app_client, "Expired", format_month(this_month - 1))
+    add(app_client, "Beyond", format_month(this_month + 3))
+    add(app_client, "Now", format_month(this_month))
+
+    response = app_client.get("/api/v1/medicines/expiring", params={"months": 2})
+
+    assert response.status_code == 200
+    assert [item["medicine_name"] for item in response.json()["items"]] == [
+        "Expired",
+        "Now",
+        "Later",
+    ]
+
+
+def test_does_not_create_the_alert_engine(app_client):
+    add(app_client, "Now", format_month(current_month()))
+
+    app_client.get("/api/v1/medicines/expiring")
+
+    assert dependencies.initialized("expiry_alerts") is None
+    subscribers = [getattr(listener, "__self__", None) for listener in dependencies.get_dynamo_db_client().listeners]
+    assert not any(isinstance(subscriber, ExpiryAlertEngine) for subscriber in subscribers)
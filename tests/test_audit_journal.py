@@ -0,0 +1,227 @@
+"""Tests for audit journal replay and its events committed with each write"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from src.modules.models.inputs.app_inputs import (
+    DispenseInput,
+    QuantityAdjustmentInput,
+    UpdateMedicineInput,
+)
+from src.modules.models.records.change import DELETE, INSERT, UPDATE
+from src.modules.models.records.journal import (
+    ADJUST,
+    InventoryState,
+    JournalEvent,
+    event_key,
+    snapshot_key,
+)
+from src.modules.models.records.medicine import Medicine
+from src.modules.services.journal.audit_journal import AuditJournal
+from tests.helpers import USER_SUB
+
+AT = datetime(2030, 6, 1, tzinfo=timezone.utc)
+
+
+def record(medicine_id: str, version: int, quantity: int = 10) -> dict:
+    return Medicine(
+        user_sub=USER_SUB,
+        medicine_id=medicine_id,
+        medicine_name="Paracetamol",
+        medicine_type="Tablet",
+        quantity=quantity,
+        expiration_date="2099-01",
+        expiration_month=None,
+        version=version,
+    ).to_dynamodb()
+
+
+def event(action: str, medicine_id: str, version: int = 0, quantity: int = 10) -> JournalEvent:
+    item = None if action == DELETE else record(medicine_id, version, quantity)
+    return JournalEvent(USER_SUB, event_key(AT, f"{medicine_id}-{version}"), action, medicine_id, item)
+
+
+def replay(*events: JournalEvent) -> InventoryState:
+    state = InventoryState()
+    for journal_event in events:
+        state.apply(journal_event)
+    return state
+
+
+def quantities(state: InventoryState) -> dict[str, tuple[int, int]]:
+    return {medicine.medicine_id: (medicine.quantity, medicine.version) for medicine in state.medicines()}
+
+
+def test_replay_in_order_keeps_the_last_record():
+    state = replay(event(INSERT, "a", 1, 10), event(UPDATE, "a", 2, 7), event(UPDATE, "a", 3, 4))
+
+    assert quantities(state) == {"a": (4, 3)}
+
+
+def test_replay_out_of_order_keeps_the_highest_version():
+    state = replay(event(UPDATE, "a", 3, 4), event(INSERT, "a", 1, 10), event(UPDATE, "a", 2, 7))
+
+    assert quantities(state) == {"a": (4, 3)}
+
+
+def test_replay_keeps_a_deleted_medicine_deleted():
+    state = replay(event(INSERT, "a", 1), event(DELETE, "a"), event(UPDATE, "a", 2))
+
+    assert not state.items
+    assert state.deleted == {"a"}
+
+
+def test_replay_of_delete_before_its_writes_keeps_it_deleted():
+    state = replay(event(DELETE, "a"), event(INSERT, "a", 1), event(UPDATE, "a", 2))
+
+    assert quantities(state) == {}
+
+
+def adjustment(quantities: dict[str, int]) -> JournalEvent:
+    return JournalEvent(USER_SUB, event_key(AT, "adjust"), ADJUST, next(iter(quantities)), quantities=quantities)
+
+
+def test_replay_adds_adjustments_in_any_order():
+    inserts = (event(INSERT, "a", 1, 10), event(INSERT, "b", 1, 5))
+
+    state = replay(*inserts, adjustment({"a": -3, "b": -5}), adjustment({"a": 4}))
+    reordered = replay(*inserts, adjustment({"a": 4}), adjustment({"a": -3, "b": -5}))
+
+    assert quantities(state) == quantities(reordered) == {"a": (11, 3), "b": (0, 2)}
+
+
+def test_replay_record_after_adjustment_replaces_it():
+    state = replay(event(INSERT, "a", 1, 10), adjustment({"a": -3}), event(UPDATE, "a", 3, 20))
+
+    assert quantities(state) == {"a": (20, 3)}
+
+
+def test_replay_skips_adjustments_of_deleted_medicines():
+    state = replay(event(INSERT, "a", 1), event(DELETE, "a"), adjustment({"a": 2}))
+
+    assert quantities(state) == {}
+
+
+def test_replay_medicines_are_in_medicine_id_order():
+    state = replay(event(INSERT, "c", 1), event(INSERT, "a", 1), event(INSERT, "b", 1))
+
+    assert [medicine.medicine_id for medicine in state.medicines()] == ["a", "b", "c"]
+
+
+def journal_events(journal: AuditJournal) -> list[JournalEvent]:
+    return asyncio.run(journal.get_events(USER_SUB, page_size=1000))["items"]
+
+
+def table_items(client) -> dict[str, dict]:
+    return {
+        item["medicine_id"]["S"]: item
+        for item in asyncio.run(client.get_medicines_by_user_sub(USER_SUB))
+    }
+
+
+def test_each_write_commits_its_event(make_client, medicine_input):
+    client = make_client(summaries=True, journal=True)
+    journal = AuditJournal(client)
+    medicine_id = asyncio.run(client.insert_medicine(medicine_input(quantity=10)))["medicine_id"]
+    asyncio.run(
+        client.edit_medicine(
+            UpdateMedicineInput(user_sub=USER_SUB, medicine_id=medicine_id, quantity=7, version=1)
+        )
+    )
+    asyncio.run(
+        client.adjust_quantity(QuantityAdjustmentInput(user_sub=USER_SUB, medicine_id=medicine_id, delta=-2))
+    )
+
+    events = journal_events(journal)
+
+    assert [(journal_event.action, journal_event.medicine_id) for journal_event in events] == [
+        (INSERT, medicine_id),
+        (UPDATE, medicine_id),
+        (ADJUST, medicine_id),
+    ]
+    assert events[1].item["quantity"] == {"N": "7"}
+    assert events[2].item is None
+    assert events[2].quantities == {medicine_id: -2}
+
+
+def test_dispense_journals_its_draws_in_one_event(make_client, medicine_input):
+    client = make_client(journal=True)
+    journal = AuditJournal(client)
+    first = asyncio.run(client.insert_medicine(medicine_input(quantity=3, expiration_date="2098-01")))
+    second = asyncio.run(client.insert_medicine(medicine_input(quantity=10, expiration_date="2099-01")))
+    first, second = first["medicine_id"], second["medicine_id"]
+
+    asyncio.run(
+        client.dispense_fifo(
+            DispenseInput(user_sub=USER_SUB, medicine_name="Paracetamol", medicine_type="Tablet", quantity=5)
+        )
+    )
+
+    dispensed = journal_events(journal)[-1]
+    assert (dispensed.action, dispensed.quantities) == (ADJUST, {first: -3, second: -2})
+    page = asyncio.run(journal.get_events(USER_SUB, medicine_id=second))
+    assert [journal_event.action for journal_event in page["items"]] == [INSERT, ADJUST]
+
+
+def test_refused_write_commits_no_event(make_client, medicine_input):
+    client = make_client(journal=True)
+    journal = AuditJournal(client)
+    medicine_id = asyncio.run(client.insert_medicine(medicine_input()))["medicine_id"]
+    asyncio.run(
+        client.edit_medicine(
+            UpdateMedicineInput(user_sub=USER_SUB, medicine_id=medicine_id, quantity=7, version=1)
+        )
+    )
+
+    response = asyncio.run(
+        client.edit_medicine(
+            UpdateMedicineInput(user_sub=USER_SUB, medicine_id=medicine_id, quantity=3, version=1)
+        )
+    )
+
+    assert response["status_code"] == 409
+    assert len(journal_events(journal)) == 2
+
+
+def test_inventory_as_of_now_matches_the_table(make_client, medicine_input):
+    client = make_client(journal=True)
+    journal = AuditJournal(client)
+    kept = asyncio.run(client.insert_medicine(medicine_input(quantity=10)))["medicine_id"]
+    dropped = asyncio.run(client.insert_medicine(medicine_input(quantity=5)))["medicine_id"]
+    asyncio.run(
+        client.adjust_quantity(QuantityAdjustmentInput(user_sub=USER_SUB, medicine_id=kept, delta=3))
+    )
+    asyncio.run(client.delete_medicine(USER_SUB, dropped))
+
+    state, _ = asyncio.run(journal.inventory_as_of(USER_SUB, datetime.now(timezone.utc)))
+
+    assert state.items == table_items(client)
+    assert state.deleted == {dropped}
+
+
+def test_inventory_as_of_skips_an_incomplete_snapshot(make_client, medicine_input):
+    client = make_client(journal=True)
+    journal = AuditJournal(client)
+    medicine_id = asyncio.run(client.insert_medicine(medicine_input(quantity=10)))["medicine_id"]
+    complete_at = datetime.now(timezone.utc)
+    asyncio.run(journal.snapshot(USER_SUB, complete_at))
+    asyncio.run(
+        client.adjust_quantity(QuantityAdjustmentInput(user_sub=USER_SUB, medicine_id=medicine_id, delta=5))
+    )
+    # A newer snapshot of two parts with only the first one written
+    client.client.put_item(
+        TableName=client.journal_table_name,
+        Item={
+            "user_sub": {"S": USER_SUB},
+            "event_key": {"S": snapshot_key(complete_at + timedelta(milliseconds=1), 0)},
+            "parts": {"N": "2"},
+            "medicines": {"N": "1"},
+            "data": {"B": b"partial"},
+        },
+    )
+
+    later = datetime.now(timezone.utc) + timedelta(seconds=1)
+    state, rebuilt = asyncio.run(journal.inventory_as_of(USER_SUB, later))
+
+    assert rebuilt["snapshot_at"] == complete_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    assert Medicine.from_dynamodb(state.items[medicine_id]).quantity == 15
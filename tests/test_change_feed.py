@@ -0,0 +1,209 @@
+"""Tests for the live update streams in src/modules/services/realtime/change_feed.py"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.main import app
+from src.modules import dependencies
+from src.modules.config.realtime_settings import RealtimeSettings
+from src.modules.services.cache.backends import InMemoryCacheBackend
+from src.modules.services.cache.generations import SharedGenerations
+from src.modules.services.cache.inventory_cache import InventoryCache
+from src.modules.services.realtime.change_feed import RESYNC_EVENT, ChangeFeed
+from tests.helpers import USER_SUB
+
+
+def settings(**overrides) -> RealtimeSettings:
+    return RealtimeSettings(
+        **{
+            "change_feed_queue_size": 64,
+            "change_feed_max_connections": 100,
+            "change_feed_max_connections_per_user": 5,
+            "change_feed_replay_events": 64,
+            "change_feed_replay_users": 100,
+            "change_feed_heartbeat": 15,
+            "change_feed_max_stream_seconds": 60,
+            "change_feed_poll_interval": 0.01,
+            **overrides,
+        }
+    )
+
+
+def parse(event: bytes) -> tuple[str | None, str, dict]:
+    """(id, event name, data) of one SSE message"""
+    fields = dict(line.split(": ", 1) for line in event.decode().strip().split("\n"))
+    return fields.get("id"), fields["event"], json.loads(fields["data"])
+
+
+def queued(subscription) -> list[bytes]:
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_writes_reach_only_their_users_streams(make_client, medicine_input):
+    async def scenario():
+        client = make_client()
+        feed = ChangeFeed(client, settings())
+        subscription, replayed = feed.subscribe(USER_SUB)
+        other, _ = feed.subscribe("user-2")
+        medicine_id = (await client.insert_medicine(medicine_input(quantity=4)))["medicine_id"]
+        await client.insert_medicine(medicine_input(user_sub="user-3"))
+        await client.delete_medicine(USER_SUB, medicine_id)
+        return feed, replayed, [parse(event) for event in queued(subscription)], queued(other)
+
+    feed, replayed, events, other_events = asyncio.run(scenario())
+
+    assert replayed == []
+    assert [name for _, name, _ in events] == ["upsert", "delete"]
+    assert events[0][2]["quantity"] == 4
+    assert events[1][2] == {"medicine_id": events[0][2]["medicine_id"]}
+    assert [event_id for event_id, _, _ in events] == [f"{feed.epoch}-1", f"{feed.epoch}-2"]
+    assert other_events == []
+
+
+def test_slow_reader_gets_one_resync_instead_of_its_backlog(make_client, medicine_input):
+    async def scenario():
+        client = make_client()
+        feed = ChangeFeed(client, settings(change_feed_queue_size=2))
+        subscription, _ = feed.subscribe(USER_SUB)
+        for _ in range(3):
+            await client.insert_medicine(medicine_input())
+        return feed, queued(subscription)
+
+    feed, events = asyncio.run(scenario())
+
+    assert events == [RESYNC_EVENT]
+    assert feed.overflows == 1
+
+
+def test_reconnect_replays_the_events_after_its_cursor(make_client, medicine_input):
+    async def scenario():
+        client = make_client()
+        feed = ChangeFeed(client, settings())
+        # Rendered page, then writes before its stream connects
+        cursor = feed.cursor(USER_SUB)
+        for name in ("Ibuprofen", "Aspirin"):
+            await client.insert_medicine(medicine_input(medicine_name=name))
+        _, replayed = feed.subscribe(USER_SUB, cursor)
+        return replayed
+
+    replayed = asyncio.run(scenario())
+
+    assert [parse(event)[2]["medicine_name"] for event in replayed] == ["Ibuprofen", "Aspirin"]
+
+
+@pytest.mark.parametrize("stale_cursor", ["another-epoch", "too-far-behind"])
+def test_reconnect_that_cannot_be_replayed_resyncs(make_client, medicine_input, stale_cursor):
+    async def scenario():
+        client = make_client()
+        feed = ChangeFeed(client, settings(change_feed_replay_events=2))
+        cursor = feed.cursor(USER_SUB)
+        if stale_cursor == "another-epoch":
+            cursor = "0000-" + cursor.partition("-")[2]
+        for _ in range(3):
+            await client.insert_medicine(medicine_input())
+        _, replayed = feed.subscribe(USER_SUB, cursor)
+        return feed, replayed
+
+    feed, replayed = asyncio.run(scenario())
+
+    assert replayed == [RESYNC_EVENT]
+    assert feed.resyncs == 1
+
+
+def test_connections_beyond_the_per_user_limit_are_refused(make_client):
+    async def scenario():
+        feed = ChangeFeed(make_client(), settings(change_feed_max_connections_per_user=1))
+        first = feed.subscribe(USER_SUB)
+        refused = feed.subscribe(USER_SUB)
+        feed.unsubscribe(first[0])
+        return feed, refused, feed.subscribe(USER_SUB)
+
+    feed, refused, after_close = asyncio.run(scenario())
+
+    assert refused["status_code"] == 503
+    assert feed.rejected == 1
+    assert not isinstance(after_close, dict)
+
+
+def test_stream_yields_replayed_then_live_events_until_closed(make_client, medicine_input):
+    async def scenario():
+        client = make_client()
+        feed = ChangeFeed(client, settings())
+        subscription, _ = feed.subscribe(USER_SUB)
+        chunks = []
+
+        async def read():
+            async for chunk in feed.stream(subscription, [RESYNC_EVENT]):
+                chunks.append(chunk)
+
+        reader = asyncio.create_task(read())
+        await client.insert_medicine(medicine_input())
+        feed.close()
+        await reader
+        return feed, chunks
+
+    feed, chunks = asyncio.run(scenario())
+
+    assert chunks[0].startswith(b"retry: ")
+    assert chunks[1] == RESYNC_EVENT
+    assert parse(chunks[2])[1] == "upsert"
+    assert feed.stats()["connections"] == 0
+
+
+def test_write_by_another_worker_sends_a_resync(make_client, medicine_input, tmp_path):
+    """Two clients on one generations file stand in for two workers"""
+    path = str(tmp_path / "generations")
+
+    def worker():
+        client = make_client()
+        client.inventory_cache = InventoryCache(
+            InMemoryCacheBackend(max_size=100, ttl=60), SharedGenerations(path)
+        )
+        return client
+
+    async def scenario():
+        local, remote = worker(), worker()
+        feed = ChangeFeed(local, settings())
+        subscription, _ = feed.subscribe(USER_SUB)
+        await remote.insert_medicine(medicine_input())
+        polled = await asyncio.wait_for(subscription.queue.get(), 1)
+        # A local write cannot be sent as a patch over a remote one not yet seen
+        await remote.insert_medicine(medicine_input())
+        await local.insert_medicine(medicine_input())
+        patched = subscription.queue.get_nowait()
+        feed.close()
+        return polled, patched
+
+    polled, patched = asyncio.run(scenario())
+
+    assert polled == RESYNC_EVENT
+    assert patched == RESYNC_EVENT
+
+
+def test_events_route_streams_a_resync_for_a_foreign_event_id(app_client, monkeypatch):
+    feed = ChangeFeed(
+        dependencies.get_dynamo_db_client(), settings(change_feed_max_stream_seconds=0.05)
+    )
+    monkeypatch.setitem(app.dependency_overrides, dependencies.get_change_feed, lambda: feed)
+
+    response = app_client.get("/medkit/events", headers={"Last-Event-ID": "0000-12"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-store"
+    assert RESYNC_EVENT.decode() in response.text
+
+
+def test_events_route_answers_503_beyond_the_connection_limit(app_client, monkeypatch):
+    feed = ChangeFeed(dependencies.get_dynamo_db_client(), settings(change_feed_max_connections=0))
+    monkeypatch.setitem(app.dependency_overrides, dependencies.get_change_feed, lambda: feed)
+
+    response = app_client.get("/medkit/events")
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
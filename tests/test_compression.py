@@ -0,0 +1,110 @@
+"""Tests for Accept-Encoding negotiation in src/modules/services/rendering"""
+
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from src.main import templates
+from src.modules.services.rendering.compression import SelectiveGZipMiddleware
+from src.modules.services.rendering.page_cache import PageCache
+from src.modules.services.rendering.static_files import (
+    CachedStaticFiles,
+    accepted_encodings,
+    available_encodings,
+    precompress_static,
+)
+
+ENCODINGS = ("br", "gzip")
+
+
+@pytest.mark.parametrize(
+    "header, accepted",
+    [
+        ("", []),
+        ("gzip", ["gzip"]),
+        ("gzip, deflate, br", ["br", "gzip"]),
+        ("gzip;q=0", []),
+        ("br;q=0, gzip", ["gzip"]),
+        ("gzip;q=0.5, br;q=0.8", ["br", "gzip"]),
+        ("br;q=0.2, gzip", ["gzip", "br"]),
+        ("*", ["br", "gzip"]),
+        ("*;q=0, gzip", ["gzip"]),
+        ("br;q=0, *", ["gzip"]),
+        ("identity", []),
+        ("x-gzip", ["gzip"]),
+        ("GZIP ; Q=1.0", ["gzip"]),
+        ("gzip;q=bogus", []),
+    ],
+)
+def test_accepted_encodings(header, accepted):
+    assert accepted_encodings(header, ENCODINGS) == accepted
+
+
+def request(accept_encoding: str) -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/about", "headers": headers})
+
+
+@pytest.mark.parametrize("header", ["gzip", "gzip;q=0", "br;q=0, gzip;q=0", "*"])
+def test_page_cache_serves_only_an_accepted_variant(header):
+    response = PageCache(templates).response(request(header), "about.html")
+
+    accepted = accepted_encodings(header, dict(available_encodings()))
+    assert response.headers.get("content-encoding") == (accepted[0] if accepted else None)
+    if not accepted:
+        assert b"<html" in response.body.lower()
+
+
+@pytest.fixture
+def static_client(tmp_path) -> TestClient:
+    (tmp_path / "app.js").write_text("console.log('medkit');\n" * 100)
+    precompress_static(str(tmp_path))
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=str(tmp_path)))
+    return TestClient(app)
+
+
+def test_static_files_serve_the_gzip_variant(static_client):
+    response = static_client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "console.log" in response.text
+
+
+def test_static_files_skip_a_refused_gzip(static_client):
+    response = static_client.get("/static/app.js", headers={"Accept-Encoding": "gzip;q=0"})
+
+    assert "content-encoding" not in response.headers
+    assert "console.log" in response.text
+
+
+@pytest.fixture
+def gzip_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(SelectiveGZipMiddleware, minimum_size=100)
+
+    @app.get("/report")
+    def report():
+        return PlainTextResponse("medicine,quantity\n" * 100)
+
+    return TestClient(app)
+
+
+def test_middleware_compresses_for_gzip(gzip_client):
+    response = gzip_client.get("/report", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+
+
+@pytest.mark.parametrize("header", ["gzip;q=0", "br", "identity"])
+def test_middleware_leaves_the_body_alone_unless_gzip_is_accepted(gzip_client, header):
+    response = gzip_client.get("/report", headers={"Accept-Encoding": header})
+
+    assert "content-encoding" not in response.headers
+    assert response.content == b"medicine,quantity\n" * 100
+    with pytest.raises(gzip.BadGzipFile):
+        gzip.decompress(response.content)
@@ -0,0 +1,223 @@
+"""Tests for FIFO planning over stock lots and DynamoDBClient.dispense_fifo"""
+
+# pylint: disable=W0212
+
+import asyncio
+
+from src.modules.models.inputs.app_inputs import DispenseInput, QuantityAdjustmentInput
+from src.modules.models.records.lot import plan_fifo
+from src.modules.models.records.medicine import Medicine, parse_month
+from src.modules.services.observability.metrics import dispense_attempts
+from tests.helpers import USER_SUB, assert_summary_matches_records
+
+MONTH = parse_month("2030-06")
+
+
+def lot(medicine_id: str, quantity: int, expiration_date: str) -> Medicine:
+    return Medicine(
+        user_sub=USER_SUB,
+        medicine_id=medicine_id,
+        medicine_name="Paracetamol",
+        medicine_type="Tablet",
+        quantity=quantity,
+        expiration_date=expiration_date,
+        expiration_month=parse_month(expiration_date),
+        version=1,
+    )
+
+
+def taken(plan) -> list[tuple[str, int]]:
+    return [(medicine.medicine_id, units) for medicine, units in plan]
+
+
+def test_plan_takes_earliest_expiry_first():
+    lots = [lot("late", 10, "2031-01"), lot("early", 4, "2030-08"), lot("mid", 5, "2030-10")]
+
+    assert taken(plan_fifo(lots, 7, MONTH)) == [("early", 4), ("mid", 3)]
+
+
+def test_plan_skips_expired_and_drained_lots():
+    lots = [
+        lot("expired", 50, "2030-05"),
+        lot("drained", 0, "2030-06"),
+        lot("partial", 2, "2030-07"),
+        lot("full", 10, "2030-09"),
+    ]
+
+    assert taken(plan_fifo(lots, 5, MONTH)) == [("partial", 2), ("full", 3)]
+
+
+def test_plan_dispenses_lots_expiring_this_month():
+    assert taken(plan_fifo([lot("now", 3, "2030-06")], 3, MONTH)) == [("now", 3)]
+
+
+def test_plan_puts_lots_without_expiry_last():
+    lots = [lot("undated", 10, "N/A"), lot("dated", 2, "2035-01")]
+
+    assert taken(plan_fifo(lots, 4, MONTH)) == [("dated", 2), ("undated", 2)]
+
+
+def test_plan_refuses_when_only_expired_stock_would_cover():
+    lots = [lot("expired", 50, "2030-05"), lot("partial", 2, "2030-07")]
+
+    assert plan_fifo(lots, 5, MONTH) is None
+
+
+def insert_lots(client, medicine_input, lots: dict[str, tuple[int, str]]) -> dict[str, str]:
+    """Inserts lots given as name -> (quantity, expiration date); returns name -> medicine_id"""
+    return {
+        name: asyncio.run(
+            client.insert_medicine(medicine_input(quantity=quantity, expiration_date=expiration_date))
+        )["medicine_id"]
+        for name, (quantity, expiration_date) in lots.items()
+    }
+
+
+def dispense(client, quantity: int) -> dict:
+    return asyncio.run(
+        client.dispense_fifo(
+            DispenseInput(
+                user_sub=USER_SUB,
+                medicine_name="paracetamol ",
+                medicine_type="Tablet",
+                quantity=quantity,
+            )
+        )
+    )
+
+
+def quantities(client, ids: dict[str, str]) -> dict[str, int]:
+    return {
+        name: Medicine.from_dynamodb(asyncio.run(client._read_medicine(USER_SUB, medicine_id))).quantity
+        for name, medicine_id in ids.items()
+    }
+
+
+def test_dispense_skips_expired_lot_and_drains_partial_one(dynamo_db_client, medicine_input):
+    ids = insert_lots(
+        dynamo_db_client,
+        medicine_input,
+        {"expired": (10, "2000-01"), "partial": (3, "2098-01"), "full": (10, "2099-01")},
+    )
+
+    response = dispense(dynamo_db_client, 5)
+
+    assert response["dispensed"] == 5
+    assert [(draw["medicine_id"], draw["taken"], draw["remaining"]) for draw in response["lots"]] == [
+        (ids["partial"], 3, 0),
+        (ids["full"], 2, 8),
+    ]
+    assert quantities(dynamo_db_client, ids) == {"expired": 10, "partial": 0, "full": 8}
+    assert_summary_matches_records(dynamo_db_client)
+
+
+def test_dispense_refuses_more_than_unexpired_stock(dynamo_db_client, medicine_input):
+    ids = insert_lots(
+        dynamo_db_client, medicine_input, {"expired": (10, "2000-01"), "full": (4, "2099-01")}
+    )
+
+    response = dispense(dynamo_db_client, 5)
+
+    assert response == {"error": "Not enough stock, 4 available", "status_code": 409}
+    assert quantities(dynamo_db_client, ids) == {"expired": 10, "full": 4}
+
+
+def test_dispense_of_unknown_medicine_returns_404(dynamo_db_client):
+    assert dispense(dynamo_db_client, 1)["status_code"] == 404
+
+
+def test_dispense_replans_after_a_lot_ran_short(dynamo_db_client, make_client, medicine_input):
+    ids = insert_lots(
+        dynamo_db_client, medicine_input, {"first": (3, "2098-01"), "second": (10, "2099-01")}
+    )
+    # Cache the lots, then let another worker drain the first one behind the cache
+    asyncio.run(dynamo_db_client.get_medicines_by_user_sub(USER_SUB))
+    other = make_client(
+        summaries=bool(dynamo_db_client.summary_table_name),
+        journal=bool(dynamo_db_client.journal_table_name),
+    )
+    asyncio.run(
+        other.adjust_quantity(
+            QuantityAdjustmentInput(user_sub=USER_SUB, medicine_id=ids["first"], delta=-2)
+        )
+    )
+    conflicts = dispense_attempts._values.get(("conflict",), 0)
+
+    # Planned on the cache as 3 + 2; the first lot only holds 1 now
+    response = dispense(dynamo_db_client, 5)
+
+    assert dispense_attempts._values.get(("conflict",), 0) == conflicts + 1
+    assert response["dispensed"] == 5
+    assert [(draw["medicine_id"], draw["taken"], draw["remaining"]) for draw in response["lots"]] == [
+        (ids["first"], 1, 0),
+        (ids["second"], 4, 6),
+    ]
+    assert quantities(dynamo_db_client, ids) == {"first": 0, "second": 6}
+    cached = {
+        item["medicine_id"]["S"]: Medicine.from_dynamodb(item).quantity
+        for item in dynamo_db_client.inventory_cache.get(USER_SUB)
+    }
+    assert cached == {ids["first"]: 0, ids["second"]: 6}
+    assert_summary_matches_records(dynamo_db_client)
+
+
+def test_dispense_refuses_on_fresh_read_after_stale_cache(dynamo_db_client, make_client, medicine_input):
+    ids = insert_lots(dynamo_db_client, medicine_input, {"only": (5, "2099-01")})
+    asyncio.run(dynamo_db_client.get_medicines_by_user_sub(USER_SUB))
+    other = make_client(
+        summaries=bool(dynamo_db_client.summary_table_name),
+        journal=bool(dynamo_db_client.journal_table_name),
+    )
+    asyncio.run(
+        other.adjust_quantity(
+            QuantityAdjustmentInput(user_sub=USER_SUB, medicine_id=ids["only"], delta=-4)
+        )
+    )
+
+    # Stale cache says 5; the fresh read after the conflict refuses
+    response = dispense(dynamo_db_client, 3)
+
+    assert response == {"error": "Not enough stock, 1 available", "status_code": 409}
+    assert quantities(dynamo_db_client, ids) == {"only": 1}
+
+
+def test_dispense_gives_up_after_max_attempts(dynamo_db_client, make_client, medicine_input):
+    ids = insert_lots(dynamo_db_client, medicine_input, {"only": (5, "2099-01")})
+    asyncio.run(dynamo_db_client.get_medicines_by_user_sub(USER_SUB))
+    other = make_client(
+        summaries=bool(dynamo_db_client.summary_table_name),
+        journal=bool(dynamo_db_client.journal_table_name),
+    )
+    asyncio.run(
+        other.adjust_quantity(
+            QuantityAdjustmentInput(user_sub=USER_SUB, medicine_id=ids["only"], delta=-1)
+        )
+    )
+    dynamo_db_client.env.dispense_max_attempts = 1
+
+    # Planned on the cached 5 units; the lot runs short and there is no second attempt
+    response = dispense(dynamo_db_client, 5)
+
+    assert response == {
+        "error": "Stock is being dispensed on another terminal, retry",
+        "status_code": 409,
+    }
+    assert quantities(dynamo_db_client, ids) == {"only": 4}
+
+
+def test_concurrent_dispenses_from_one_lot_all_commit(dynamo_db_client, medicine_input):
+    ids = insert_lots(dynamo_db_client, medicine_input, {"only": (20, "2099-01")})
+    dispense_input = DispenseInput(
+        user_sub=USER_SUB, medicine_name="Paracetamol", medicine_type="Tablet", quantity=1
+    )
+
+    async def dispense_all():
+        return await asyncio.gather(
+            *(dynamo_db_client.dispense_fifo(dispense_input) for _ in range(20))
+        )
+
+    responses = asyncio.run(dispense_all())
+
+    assert [response.get("dispensed") for response in responses] == [1] * 20
+    assert quantities(dynamo_db_client, ids) == {"only": 0}
+    assert_summary_matches_records(dynamo_db_client)
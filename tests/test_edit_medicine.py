@@ -0,0 +1,101 @@
+"""Tests for versioned edits in DynamoDBClient.edit_medicine"""
+
+# pylint: disable=W0212
+
+import asyncio
+
+from src.modules.models.inputs.app_inputs import UpdateMedicineInput
+from src.modules.models.records.medicine import Medicine
+from tests.helpers import USER_SUB
+
+CONFLICT = "Medicine was changed on another terminal, reload and retry"
+
+
+def insert(client, medicine_input) -> str:
+    response = asyncio.run(client.insert_medicine(medicine_input()))
+    assert "error" not in response
+    return response["medicine_id"]
+
+
+def edit(client, medicine_id: str, **fields) -> dict:
+    return asyncio.run(
+        client.edit_medicine(
+            UpdateMedicineInput(user_sub=USER_SUB, medicine_id=medicine_id, **fields)
+        )
+    )
+
+
+def stored(client, medicine_id: str) -> Medicine:
+    return Medicine.from_dynamodb(asyncio.run(client._read_medicine(USER_SUB, medicine_id)))
+
+
+def test_edit_at_current_version_bumps_it(dynamo_db_client, medicine_input):
+    medicine_id = insert(dynamo_db_client, medicine_input)
+
+    response = edit(dynamo_db_client, medicine_id, quantity=7, version=1)
+
+    assert "error" not in response
+    medicine = stored(dynamo_db_client, medicine_id)
+    assert (medicine.quantity, medicine.version) == (7, 2)
+
+
+def test_edit_at_old_version_returns_409(dynamo_db_client, medicine_input):
+    medicine_id = insert(dynamo_db_client, medicine_input)
+    edit(dynamo_db_client, medicine_id, quantity=7, version=1)
+
+    response = edit(dynamo_db_client, medicine_id, quantity=3, version=1)
+
+    assert response["status_code"] == 409
+    assert response["error"] == CONFLICT
+    assert Medicine.from_dynamodb(response["Item"]).version == 2
+    medicine = stored(dynamo_db_client, medicine_id)
+    assert (medicine.quantity, medicine.version) == (7, 2)
+
+
+def test_edit_from_stale_cache_returns_409_and_refreshes_it(
+    dynamo_db_client, make_client, medicine_input
+):
+    medicine_id = insert(dynamo_db_client, medicine_input)
+    # Cache the inventory, as listing it in the app does
+    asyncio.run(dynamo_db_client.get_medicines_by_user_sub(USER_SUB))
+    # Another worker, with its own cache, edits the medicine first
+    other = make_client(
+        summaries=bool(dynamo_db_client.summary_table_name),
+        journal=bool(dynamo_db_client.journal_table_name),
+    )
+    assert "error" not in edit(other, medicine_id, quantity=7, version=1)
+
+    # The first worker's cache still holds version 1, the version the client saw
+    assert dynamo_db_client._cached_medicine(USER_SUB, medicine_id)["version"]["N"] == "1"
+    response = edit(dynamo_db_client, medicine_id, quantity=3, version=1)
+
+    assert response["status_code"] == 409
+    assert response["error"] == CONFLICT
+    cached = Medicine.from_dynamodb(dynamo_db_client._cached_medicine(USER_SUB, medicine_id))
+    assert (cached.quantity, cached.version) == (7, 2)
+    assert stored(dynamo_db_client, medicine_id).quantity == 7
+
+
+def test_edit_of_deleted_medicine_returns_404(dynamo_db_client, make_client, medicine_input):
+    medicine_id = insert(dynamo_db_client, medicine_input)
+    other = make_client(
+        summaries=bool(dynamo_db_client.summary_table_name),
+        journal=bool(dynamo_db_client.journal_table_name),
+    )
+    asyncio.run(other.delete_medicine(USER_SUB, medicine_id))
+
+    response = edit(dynamo_db_client, medicine_id, quantity=3, version=1)
+
+    assert response["status_code"] == 404
+    assert asyncio.run(dynamo_db_client._read_medicine(USER_SUB, medicine_id)) is None
+
+
+def test_edit_without_version_overwrites(dynamo_db_client, medicine_input):
+    medicine_id = insert(dynamo_db_client, medicine_input)
+    edit(dynamo_db_client, medicine_id, quantity=7, version=1)
+
+    response = edit(dynamo_db_client, medicine_id, quantity=3)
+
+    assert "error" not in response
+    medicine = stored(dynamo_db_client, medicine_id)
+    assert (medicine.quantity, medicine.version) == (3, 3)
@@ -0,0 +1,29 @@
+"""Tests for the expiry alert settings and the digest schedule state"""
+
+import pytest
+from pydantic import ValidationError
+
+from src.modules.config.alert_settings import ExpiryAlertSettings
+from src.modules.services.alerts.expiry_alerts import ExpiryAlertEngine
+
+
+def test_state_path_must_be_absolute():
+    with pytest.raises(ValidationError, match="absolute path"):
+        ExpiryAlertSettings(expiry_alert_state_path="expiry_digest_state")
+
+
+def test_enabled_alerts_require_a_state_path():
+    with pytest.raises(ValidationError, match="required"):
+        ExpiryAlertSettings(expiry_alerts_enabled=True, expiry_alert_state_path=None)
+
+
+def test_last_digest_survives_a_new_engine(make_client, tmp_path):
+    settings = ExpiryAlertSettings(
+        expiry_alerts_enabled=True, expiry_alert_state_path=str(tmp_path / "expiry_digest_state")
+    )
+    engine = ExpiryAlertEngine(make_client(), settings)
+    assert engine.last_digest() is None
+
+    engine._record_digest(1_700_000_000.5)  # pylint: disable=W0212
+
+    assert ExpiryAlertEngine(make_client(), settings).last_digest() == 1_700_000_000.5
@@ -0,0 +1,153 @@
+"""Tests for batched imports: DynamoDBClient.batch_insert_medicines and /import_medicines"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.modules import dependencies
+from src.modules.services.aws.dynamodb_service import BATCH_WRITE_SIZE
+from tests.helpers import USER_SUB, assert_summary_matches_records
+
+
+def stored_names(client, user_sub: str = USER_SUB) -> list[str]:
+    items = client.client.scan(TableName=client.table_name)["Items"]
+    return sorted(item["medicine_name"]["S"] for item in items if item["user_sub"]["S"] == user_sub)
+
+
+def inputs(medicine_input, count: int) -> list:
+    return [medicine_input(medicine_name=f"Medicine {n:02d}") for n in range(count)]
+
+
+@pytest.fixture
+def throttle(make_client, monkeypatch):
+    """
+    A client without summaries or the journal, whose BatchWriteItem calls
+    leave the requests `unprocessed(call, requests)` picks unprocessed
+    """
+
+    def build(unprocessed):
+        client = make_client()
+        monkeypatch.setattr(client.env, "batch_write_max_retries", 2)
+        write = client.client.batch_write_item
+        calls = []
+
+        def batch_write_item(**kwargs):
+            requests = kwargs["RequestItems"][client.table_name]
+            left = unprocessed(len(calls), requests)
+            calls.append(len(requests))
+            processed = [request for request in requests if request not in left]
+            response = write(RequestItems={client.table_name: processed})
+            return {**response, "UnprocessedItems": {client.table_name: left} if left else {}}
+
+        monkeypatch.setattr(client.client, "batch_write_item", batch_write_item)
+        client.calls = calls
+        return client
+
+    return build
+
+
+def test_batch_writes_every_input(dynamo_db_client, medicine_input):
+    response = asyncio.run(dynamo_db_client.batch_insert_medicines(inputs(medicine_input, 25)))
+
+    assert response == {"written": 25, "failed": []}
+    assert stored_names(dynamo_db_client) == [f"Medicine {n:02d}" for n in range(25)]
+    assert_summary_matches_records(dynamo_db_client)
+
+
+def test_batch_over_the_write_size_is_refused(dynamo_db_client, medicine_input):
+    response = asyncio.run(
+        dynamo_db_client.batch_insert_medicines(inputs(medicine_input, BATCH_WRITE_SIZE + 1))
+    )
+
+    assert response["status_code"] == 422
+    assert stored_names(dynamo_db_client) == []
+
+
+def test_batch_retries_unprocessed_items(throttle, medicine_input):
+    client = throttle(lambda call, requests: requests[::2] if call == 0 else [])
+
+    response = asyncio.run(client.batch_insert_medicines(inputs(medicine_input, 10)))
+
+    assert response == {"written": 10, "failed": []}
+    assert client.calls == [10, 5]
+    assert len(stored_names(client)) == 10
+
+
+def test_batch_reports_items_left_after_the_last_retry(throttle, medicine_input):
+    def medicine_03(call, requests):  # pylint: disable=W0613
+        return [
+            request
+            for request in requests
+            if request["PutRequest"]["Item"]["medicine_name"]["S"] == "Medicine 03"
+        ]
+
+    client = throttle(medicine_03)
+
+    response = asyncio.run(client.batch_insert_medicines(inputs(medicine_input, 5)))
+
+    assert response == {"written": 4, "failed": [3]}
+    # The first attempt and batch_write_max_retries retries
+    assert client.calls == [5, 1, 1]
+    assert "Medicine 03" not in stored_names(client)
+
+
+def upload(app_client, filename: str, content: str):
+    return app_client.post("/import_medicines", files={"file": (filename, content.encode())})
+
+
+def test_import_csv_reports_invalid_rows_and_writes_the_rest(app_client):
+    rows = [f"Medicine {n:03d},Tablet,{n + 1},2099-01" for n in range(60)]
+    rows[10] = "Medicine 010,Tablet,lots,2099-01"
+    rows[41] = "Medicine 041,Tablet,1,next year"
+    csv = "medicine_name,medicine_type,quantity,expiration_date\n" + "\n".join(rows) + "\n"
+
+    response = upload(app_client, "medicines.csv", csv)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["imported"], report["failed"]) == (58, 2)
+    # CSV row numbers count the header
+    assert [error["row"] for error in report["errors"]] == [12, 43]
+    client = dependencies.get_dynamo_db_client()
+    assert len(stored_names(client, app_client.user_sub)) == 58
+
+
+def test_import_json_rows(app_client):
+    rows = [
+        {
+            "medicine_name": f"Medicine {n}",
+            "medicine_type": "Syrup",
+            "quantity": 1,
+            "expiration_date": "2099-01",
+        }
+        for n in range(30)
+    ]
+
+    response = upload(app_client, "medicines.json", json.dumps(rows))
+
+    assert response.json() == {"imported": 30, "failed": 0, "errors": []}
+
+
+def test_import_reports_rows_whose_batch_failed(app_client, monkeypatch):
+    client = dependencies.get_dynamo_db_client()
+
+    async def failing_batch(medicine_inputs):  # pylint: disable=W0613
+        return {"error": "Service unavailable", "status_code": 500}
+
+    monkeypatch.setattr(client, "batch_insert_medicines", failing_batch)
+    rows = "".join(f"Medicine {n},Tablet,1,2099-01\n" for n in range(3))
+    csv = "medicine_name,medicine_type,quantity,expiration_date\n" + rows
+
+    response = upload(app_client, "medicines.csv", csv)
+
+    report = response.json()
+    assert (report["imported"], report["failed"]) == (0, 3)
+    assert {error["error"] for error in report["errors"]} == {"Service unavailable"}
+
+
+def test_import_of_malformed_json_returns_422(app_client):
+    response = upload(app_client, "medicines.json", '[{"medicine_name": "Paracetamol"')
+
+    assert response.status_code == 422
+    assert response.json()["errors"][0]["row"] is None
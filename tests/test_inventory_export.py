@@ -0,0 +1,112 @@
+"""Tests for the streaming exports in src/modules/services/export/inventory_export.py"""
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from src.modules.models.records.medicine import PUBLIC_FIELDS
+from src.modules.services.export.columnar import iter_columnar_rows
+from src.modules.services.export.inventory_export import stream_inventory_export
+from tests.helpers import USER_SUB
+
+NAMES = ["Aspirin", "=HYPERLINK(\"http://evil\")", "+1 Tablet", "-Ibuprofen", "@SUM(A1)", "Zinc"]
+
+
+@pytest.fixture
+def inventory(make_client, medicine_input):
+    """A client whose user holds one medicine per name in NAMES, by medicine_id"""
+    client = make_client()
+    for quantity, name in enumerate(NAMES, start=1):
+        asyncio.run(client.insert_medicine(medicine_input(medicine_name=name, quantity=quantity)))
+    return client
+
+
+def export(client, export_format: str, compressed: bool = False, **options) -> bytes:
+    async def collect():
+        return b"".join(
+            [
+                chunk
+                async for chunk in stream_inventory_export(
+                    client, USER_SUB, export_format, compressed, **options
+                )
+            ]
+        )
+
+    return asyncio.run(collect())
+
+
+def test_csv_quotes_cells_a_spreadsheet_would_run(inventory):
+    rows = list(csv.DictReader(io.StringIO(export(inventory, "csv").decode())))
+
+    assert {row["medicine_name"] for row in rows} == {
+        "Aspirin",
+        "'=HYPERLINK(\"http://evil\")",
+        "'+1 Tablet",
+        "'-Ibuprofen",
+        "'@SUM(A1)",
+        "Zinc",
+    }
+    # Numbers are not free text and keep their sign
+    assert sorted(int(row["quantity"]) for row in rows) == [1, 2, 3, 4, 5, 6]
+
+
+def test_csv_spans_every_page(inventory):
+    text = export(inventory, "csv", page_size=2).decode()
+
+    assert text.splitlines()[0] == ",".join(PUBLIC_FIELDS)
+    assert len(text.splitlines()) == len(NAMES) + 1
+
+
+def test_ndjson_keeps_names_verbatim(inventory):
+    rows = [json.loads(line) for line in export(inventory, "ndjson", page_size=4).splitlines()]
+
+    assert sorted(row["medicine_name"] for row in rows) == sorted(NAMES)
+    assert all(list(row) == list(PUBLIC_FIELDS) for row in rows)
+
+
+def test_columnar_round_trips_across_row_groups(inventory):
+    data = export(inventory, "columnar", page_size=2, row_group_size=4)
+
+    rows = list(iter_columnar_rows(io.BytesIO(data)))
+
+    assert sorted(row["medicine_name"] for row in rows) == sorted(NAMES)
+    assert sorted(row["quantity"] for row in rows) == [1, 2, 3, 4, 5, 6]
+    assert {row["is_expired"] for row in rows} == {False}
+
+
+@pytest.mark.parametrize("export_format", ["csv", "ndjson", "columnar"])
+def test_gzip_export_decompresses_to_the_plain_one(inventory, export_format):
+    compressed = export(inventory, export_format, compressed=True, page_size=2)
+
+    assert compressed[:2] == b"\x1f\x8b"
+    assert gzip.decompress(compressed) == export(inventory, export_format, page_size=2)
+
+
+def test_unknown_format_is_refused(inventory):
+    with pytest.raises(ValueError, match="Unknown export format"):
+        export(inventory, "xlsx")
+
+
+def test_export_route_downloads_a_gzip_file(app_client, make_client, medicine_input):
+    client = make_client()
+    asyncio.run(client.insert_medicine(medicine_input(user_sub=app_client.user_sub)))
+
+    response = app_client.get("/export", params={"format": "csv", "gzip": "true"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith('.csv.gz"')
+    assert response.headers["cache-control"] == "no-store"
+    # Not compressed a second time by the middleware
+    assert "content-encoding" not in response.headers
+    assert "Paracetamol" in gzip.decompress(response.content).decode()
+
+
+def test_api_export_refuses_an_unknown_format(app_client):
+    response = app_client.get("/api/v1/medicines/export", params={"format": "xlsx"})
+
+    assert response.status_code == 422
@@ -0,0 +1,142 @@
+"""Tests for the inventory summary counters and their upkeep on writes"""
+
+import asyncio
+
+import pytest
+
+from src.modules.models.inputs.app_inputs import QuantityAdjustmentInput, UpdateMedicineInput
+from src.modules.models.records.medicine import Medicine, parse_month
+from src.modules.models.records.summary import InventorySummary, summary_deltas
+from tests.helpers import USER_SUB, assert_summary_matches_records
+
+
+def medicine(medicine_type: str = "Tablet", quantity: int = 10, expiration_date: str = "2030-05"):
+    return Medicine(
+        user_sub=USER_SUB,
+        medicine_id="m1",
+        medicine_name="Paracetamol",
+        medicine_type=medicine_type,
+        quantity=quantity,
+        expiration_date=expiration_date,
+        expiration_month=parse_month(expiration_date),
+        version=1,
+    )
+
+
+def test_insert_delta_counts_the_medicine_in():
+    assert summary_deltas(USER_SUB, None, medicine()) == {
+        "medicine_count": 1,
+        "total_quantity": 10,
+        "type_count#Tablet": 1,
+        "type_quantity#Tablet": 10,
+        "expiry_month#2030-05": 1,
+    }
+
+
+def test_delete_delta_counts_the_medicine_out():
+    assert summary_deltas(USER_SUB, medicine(), None) == {
+        "medicine_count": -1,
+        "total_quantity": -10,
+        "type_count#Tablet": -1,
+        "type_quantity#Tablet": -10,
+        "expiry_month#2030-05": -1,
+    }
+
+
+def test_quantity_edit_delta_only_moves_quantities():
+    assert summary_deltas(USER_SUB, medicine(quantity=10), medicine(quantity=4)) == {
+        "total_quantity": -6,
+        "type_quantity#Tablet": -6,
+    }
+
+
+def test_type_change_delta_moves_the_medicine_between_types():
+    old = medicine(medicine_type="Tablet", quantity=10)
+    new = medicine(medicine_type="Syrup", quantity=12)
+
+    assert summary_deltas(USER_SUB, old, new) == {
+        "total_quantity": 2,
+        "type_count#Tablet": -1,
+        "type_quantity#Tablet": -10,
+        "type_count#Syrup": 1,
+        "type_quantity#Syrup": 12,
+    }
+
+
+def test_expiry_edit_delta_moves_the_medicine_between_months():
+    old = medicine(expiration_date="2030-05")
+    new = medicine(expiration_date="2031-01")
+
+    assert summary_deltas(USER_SUB, old, new) == {
+        "expiry_month#2030-05": -1,
+        "expiry_month#2031-01": 1,
+    }
+
+
+def test_unchanged_medicine_has_no_delta():
+    assert summary_deltas(USER_SUB, medicine(), medicine()) == {}
+
+
+def test_summary_round_trips_through_dynamodb():
+    summary = InventorySummary.from_medicines(
+        USER_SUB, [medicine(), medicine(medicine_type="Syrup", quantity=3, expiration_date="N/A")]
+    )
+    summary.version = 4
+
+    restored = InventorySummary.from_dynamodb(summary.to_dynamodb())
+
+    assert restored == summary
+
+
+@pytest.fixture(params=[False, True], ids=["summaries", "summaries+journal"])
+def summary_client(request, make_client):
+    """A client keeping summaries, with and without the audit journal"""
+    return make_client(summaries=True, journal=request.param)
+
+
+def test_writes_keep_the_stored_summary_exact(summary_client, medicine_input):
+    client = summary_client
+    first = asyncio.run(client.insert_medicine(medicine_input(quantity=10)))["medicine_id"]
+    second = asyncio.run(
+        client.insert_medicine(
+            medicine_input(medicine_name="Ibuprofen", quantity=5, expiration_date="2000-01")
+        )
+    )["medicine_id"]
+    assert_summary_matches_records(client)
+
+    # Edit of a counted field, then a type change, then an uncounted field
+    for fields in ({"quantity": 4}, {"medicine_type": "Syrup"}, {"medicine_name": "Panadol"}):
+        response = asyncio.run(
+            client.edit_medicine(
+                UpdateMedicineInput(user_sub=USER_SUB, medicine_id=first, **fields)
+            )
+        )
+        assert "error" not in response
+        assert_summary_matches_records(client)
+
+    asyncio.run(
+        client.adjust_quantity(
+            QuantityAdjustmentInput(user_sub=USER_SUB, medicine_id=second, delta=-2)
+        )
+    )
+    assert_summary_matches_records(client)
+
+    asyncio.run(client.delete_medicine(USER_SUB, second))
+    assert_summary_matches_records(client)
+
+    summary = asyncio.run(client.get_inventory_summary(USER_SUB))
+    assert summary.counters() == {
+        "medicine_count": 1,
+        "total_quantity": 4,
+        "type_count#Syrup": 1,
+        "type_quantity#Syrup": 4,
+        "expiry_month#2099-01": 1,
+    }
+
+
+def test_deleting_a_missing_medicine_leaves_the_summary(summary_client, medicine_input):
+    asyncio.run(summary_client.insert_medicine(medicine_input()))
+
+    asyncio.run(summary_client.delete_medicine(USER_SUB, "missing"))
+
+    assert_summary_matches_records(summary_client)
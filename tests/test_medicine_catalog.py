@@ -0,0 +1,143 @@
+"""Tests for catalog autocomplete in src/modules/services/catalog/medicine_catalog.py"""
+
+import os
+
+import pytest
+
+import src.main
+from src.main import app
+from src.modules import dependencies
+from src.modules.config.catalog_settings import CatalogSettings
+from src.modules.services.catalog import medicine_catalog
+from src.modules.services.catalog.medicine_catalog import (
+    MedicineCatalog,
+    build_catalog,
+    load_catalog,
+)
+
+CATALOG = """medicine_name,medicine_type
+Paracetamol,Tablet
+Paracetamol  Extra,tablet
+Ibuprofen Forte,Tablet
+Amoxicillin,Capsule
+Acetylsalicylic Acid,Tablet
+Children's Paracetamol,Syrup
+PARACETAMOL,Syrup
+Vitamin C Effervescent,Effervescent Tablet
+"""
+
+
+@pytest.fixture
+def catalog_path(tmp_path) -> str:
+    path = tmp_path / "catalog.csv"
+    path.write_text(CATALOG)
+    return str(path)
+
+
+@pytest.fixture
+def catalog(catalog_path):
+    build_catalog(catalog_path, catalog_path + ".idx")
+    catalog = MedicineCatalog(catalog_path + ".idx")
+    yield catalog
+    catalog.close()
+
+
+def names(entries) -> list[str]:
+    return [entry.medicine_name for entry in entries]
+
+
+def test_build_keeps_the_first_spelling_of_each_name(catalog):
+    assert len(catalog) == 7
+    assert catalog.lookup("  paracetamol ").medicine_type == "Tablet"
+    # Spacing is collapsed in the stored spelling
+    assert catalog.lookup("paracetamol extra").medicine_name == "Paracetamol Extra"
+
+
+def test_complete_puts_names_starting_with_the_query_first(catalog):
+    assert names(catalog.complete("para")) == [
+        "Paracetamol",
+        "Paracetamol Extra",
+        "Children's Paracetamol",
+    ]
+
+
+def test_complete_matches_every_word_as_a_prefix(catalog):
+    assert names(catalog.complete("para ext")) == ["Paracetamol Extra"]
+    assert names(catalog.complete("acid acetyl")) == ["Acetylsalicylic Acid"]
+    assert catalog.complete("para syrup") == []
+
+
+def test_complete_ignores_case_and_spacing(catalog):
+    assert names(catalog.complete("  IBU   for")) == ["Ibuprofen Forte"]
+
+
+def test_complete_stops_at_the_limit(catalog):
+    assert names(catalog.complete("para", limit=2)) == ["Paracetamol", "Paracetamol Extra"]
+    assert catalog.complete("para", limit=0) == []
+    assert catalog.complete("   ") == []
+
+
+def test_complete_scans_a_bounded_number_of_entries(catalog_path, monkeypatch):
+    rows = "".join(f"Para {n:04d},Tablet\n" for n in range(50))
+    with open(catalog_path, "a", encoding="utf-8") as file:
+        file.write(rows + "Para Zinc,Tablet\n")
+    build_catalog(catalog_path, catalog_path + ".idx")
+    monkeypatch.setattr(medicine_catalog, "MAX_SCAN", 10)
+    catalog = MedicineCatalog(catalog_path + ".idx")
+
+    # The match past the scan budget is not found
+    assert catalog.complete("para zinc") == []
+    catalog.close()
+
+
+def test_normalize_respells_known_names_and_types(catalog):
+    assert catalog.normalize("amoxicillin", "capsule") == ("Amoxicillin", "Capsule")
+    assert catalog.normalize("Unknown", "drops") == ("Unknown", "drops")
+
+
+def test_load_recompiles_a_stale_index(catalog_path):
+    settings = CatalogSettings(medicine_catalog_path=catalog_path, medicine_catalog_index_path=None)
+    load_catalog(settings).close()
+    with open(catalog_path, "a", encoding="utf-8") as file:
+        file.write("Zinc Sulfate,Tablet\n")
+    later = os.path.getmtime(catalog_path) + 10
+    os.utime(catalog_path, (later, later))
+
+    catalog = load_catalog(settings)
+
+    assert names(catalog.complete("zinc")) == ["Zinc Sulfate"]
+    catalog.close()
+
+
+def test_load_without_a_catalog_returns_none():
+    assert load_catalog(CatalogSettings(medicine_catalog_path=None)) is None
+
+
+def test_api_autocomplete(app_client, catalog, monkeypatch):
+    monkeypatch.setitem(
+        app.dependency_overrides, dependencies.get_medicine_catalog, lambda: catalog
+    )
+
+    response = app_client.get("/api/v1/catalog/autocomplete", params={"q": "para", "limit": 1})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": [{"medicine_name": "Paracetamol", "medicine_type": "Tablet"}]
+    }
+    assert response.headers["cache-control"] == "private, max-age=300"
+
+
+def test_api_autocomplete_without_a_catalog_returns_404(app_client, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, dependencies.get_medicine_catalog, lambda: None)
+
+    response = app_client.get("/api/v1/catalog/autocomplete", params={"q": "para"})
+
+    assert response.status_code == 404
+
+
+def test_form_autocomplete(app_client, catalog, monkeypatch):
+    monkeypatch.setattr(src.main, "get_medicine_catalog", lambda: catalog)
+
+    response = app_client.get("/catalog/autocomplete", params={"q": "amox"})
+
+    assert [item["medicine_name"] for item in response.json()["items"]] == ["Amoxicillin"]
@@ -0,0 +1,66 @@
+"""Tests for the medkit form routes in src/main.py"""
+
+from src.modules import dependencies
+
+
+def add(app_client, **fields):
+    form = {
+        "medicine_name": "Paracetamol",
+        "medicine_type": "Tablet",
+        "quantity": "10",
+        "expiration_date": "2099-01",
+        **fields,
+    }
+    return app_client.post("/add_medicine", data=form)
+
+
+def stored_ids(app_client) -> list[str]:
+    client = dependencies.get_dynamo_db_client()
+    return [item["medicine_id"]["S"] for item in client.client.scan(TableName=client.table_name)["Items"]]
+
+
+def test_add_medicine_redirects_to_the_medkit(app_client):
+    response = add(app_client)
+
+    assert response.status_code == 303
+    assert response.headers["location"] == "/medkit"
+    assert len(stored_ids(app_client)) == 1
+
+
+def test_add_medicine_renders_a_failed_write(app_client, monkeypatch):
+    async def failing_insert(medicine_input):  # pylint: disable=W0613
+        return {"error": "Transaction cancelled", "status_code": 500}
+
+    monkeypatch.setattr(dependencies.get_dynamo_db_client(), "insert_medicine", failing_insert)
+
+    response = add(app_client)
+
+    assert response.status_code == 500
+    assert "Transaction cancelled" in response.text
+    assert stored_ids(app_client) == []
+
+
+def test_delete_medicine_redirects_to_the_medkit(app_client):
+    add(app_client)
+    (medicine_id,) = stored_ids(app_client)
+
+    response = app_client.post("/delete_medicine", data={"medicine_id": medicine_id})
+
+    assert response.status_code == 303
+    assert stored_ids(app_client) == []
+
+
+def test_delete_medicine_renders_a_failed_write(app_client, monkeypatch):
+    add(app_client)
+    (medicine_id,) = stored_ids(app_client)
+
+    async def conflicting_delete(user_sub, medicine_id):  # pylint: disable=W0613
+        return {"error": "Medicine is being changed on another terminal, retry", "status_code": 409}
+
+    monkeypatch.setattr(dependencies.get_dynamo_db_client(), "delete_medicine", conflicting_delete)
+
+    response = app_client.post("/delete_medicine", data={"medicine_id": medicine_id})
+
+    assert response.status_code == 409
+    assert "being changed on another terminal" in response.text
+    assert stored_ids(app_client) == [medicine_id]
@@ -0,0 +1,89 @@
+"""Tests for the auth rate limits in src/modules/services/security/rate_limiter.py"""
+
+import pytest
+
+from src.main import app
+from src.modules.config.rate_limit_settings import RateLimitSettings
+from src.modules.dependencies import get_auth_rate_limiter
+from src.modules.services.security.rate_limiter import AuthRateLimiter
+
+
+def settings(**overrides) -> RateLimitSettings:
+    """Small limits, refilling too slowly to matter within a test"""
+    return RateLimitSettings(
+        **{
+            "auth_rate_limit_enabled": True,
+            "login_ip_per_minute": 0.01,
+            "login_ip_burst": 3,
+            "login_email_per_minute": 0.01,
+            "login_email_burst": 2,
+            "rate_limit_state_path": None,
+            "rate_limit_trust_forwarded": False,
+            **overrides,
+        }
+    )
+
+
+@pytest.fixture
+def use_limiter(app_client, monkeypatch):
+    """Serves the app with the given AuthRateLimiter"""
+
+    def use(limiter: AuthRateLimiter):
+        monkeypatch.setitem(app.dependency_overrides, get_auth_rate_limiter, lambda: limiter)
+        return limiter
+
+    return use
+
+
+def login(app_client, email="user@example.com", password="wrong-password", **headers):
+    return app_client.post("/submit-login", data={"email": email, "password": password}, headers=headers)
+
+
+def test_login_answers_429_once_the_email_bucket_is_empty(app_client, use_limiter):
+    limiter = use_limiter(AuthRateLimiter(settings()))
+
+    assert [login(app_client).status_code for _ in range(2)] == [401, 401]
+    response = login(app_client)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert limiter.login_email.stats()["limited"] == 1
+    # A rejected attempt does not drain the IP bucket
+    assert login(app_client, email="other@example.com").status_code == 401
+
+
+def test_forwarded_for_is_ignored_unless_trusted(app_client, use_limiter):
+    use_limiter(AuthRateLimiter(settings(login_email_burst=100)))
+
+    statuses = [
+        login(app_client, **{"X-Forwarded-For": f"203.0.113.{n}"}).status_code for n in range(4)
+    ]
+
+    # Every attempt came from the test client's own address
+    assert statuses == [401, 401, 401, 429]
+
+
+def test_forwarded_for_keys_the_ip_bucket_when_trusted(app_client, use_limiter):
+    limiter = use_limiter(AuthRateLimiter(settings(login_email_burst=100, rate_limit_trust_forwarded=True)))
+
+    statuses = [
+        login(app_client, **{"X-Forwarded-For": f"203.0.113.{n}, 10.0.0.1"}).status_code
+        for n in range(4)
+    ]
+
+    assert statuses == [401, 401, 401, 401]
+    assert limiter.login_ip.stats()["keys"] == 4
+
+
+def test_workers_share_buckets_through_the_state_file(tmp_path):
+    path = str(tmp_path / "rate-limits")
+    workers = [AuthRateLimiter(settings(rate_limit_state_path=path)) for _ in range(2)]
+
+    waits = [workers[n % 2].check_login("198.51.100.7", "user@example.com") for n in range(3)]
+
+    # The email burst of 2 holds across both workers, not 2 per worker
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] > 0.0
+    assert AuthRateLimiter(settings(rate_limit_state_path=path)).check_login(
+        "198.51.100.7", "USER@example.com "
+    ) > 0.0
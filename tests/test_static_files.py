@@ -0,0 +1,123 @@
+"""Tests for static asset caching in src/modules/services/rendering/static_files.py"""
+
+import hashlib
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.modules.services.rendering import static_files
+from src.modules.services.rendering.static_files import (
+    IMMUTABLE_MAX_AGE,
+    CachedStaticFiles,
+    precompress_static,
+    static_url,
+)
+
+SCRIPT = "document.title = 'Medkit';\n" * 100
+
+
+@pytest.fixture
+def static_directory(tmp_path, monkeypatch):
+    """A static directory with a script and an image, used by static_url"""
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_text(SCRIPT)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(2000))
+    monkeypatch.setattr(static_files, "STATIC_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(static_files, "_fingerprints", {})
+    return tmp_path
+
+
+@pytest.fixture
+def static_client(static_directory) -> TestClient:
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=str(static_directory), max_age=600))
+    return TestClient(app)
+
+
+def test_static_url_fingerprints_the_content(static_directory):
+    fingerprint = hashlib.sha1(SCRIPT.encode()).hexdigest()[:12]
+
+    assert static_url("js/app.js") == f"/static/js/app.js?v={fingerprint}"
+
+
+def test_static_url_reads_changes_only_when_uncached(static_directory):
+    first = static_url("js/app.js")
+    (static_directory / "js" / "app.js").write_text(SCRIPT + "// changed\n")
+
+    assert static_url("js/app.js") == first
+    assert static_url("js/app.js", cached=False) != first
+
+
+def test_fingerprinted_url_is_cached_for_a_year(static_client):
+    response = static_client.get(static_url("js/app.js"))
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+
+
+def test_plain_url_is_cached_for_max_age(static_client):
+    response = static_client.get("/static/js/app.js")
+
+    assert response.headers["cache-control"] == "public, max-age=600"
+
+
+def test_revalidation_answers_304_with_cache_headers(static_client):
+    etag = static_client.get("/static/js/app.js").headers["etag"]
+
+    response = static_client.get("/static/js/app.js", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == "public, max-age=600"
+
+
+def test_missing_file_is_not_cached(static_client):
+    response = static_client.get("/static/js/missing.js?v=0123456789ab")
+
+    assert response.status_code == 404
+    assert "cache-control" not in response.headers
+
+
+def test_precompress_writes_only_missing_or_stale_variants(static_directory):
+    expected = len(static_files.available_encodings())
+
+    assert precompress_static(str(static_directory)) == expected
+    assert precompress_static(str(static_directory)) == 0
+    source = static_directory / "js" / "app.js"
+    later = os.path.getmtime(str(source) + ".gz") + 10
+    os.utime(source, (later, later))
+    assert precompress_static(str(static_directory)) == expected
+    # Images are not compressible
+    assert not (static_directory / "logo.png.gz").exists()
+
+
+def test_precompressed_variant_keeps_the_original_content_type(static_directory, static_client):
+    precompress_static(str(static_directory))
+
+    response = static_client.get("/static/js/app.js", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith(("text/javascript", "application/javascript"))
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == SCRIPT
+
+
+def test_stale_variant_is_not_served(static_directory, static_client):
+    precompress_static(str(static_directory))
+    source = static_directory / "js" / "app.js"
+    source.write_text(SCRIPT + "// changed\n")
+    later = os.path.getmtime(str(source) + ".gz") + 10
+    os.utime(source, (later, later))
+
+    response = static_client.get("/static/js/app.js", headers={"Accept-Encoding": "gzip"})
+
+    # The current file, whatever encoding it travels in
+    assert response.text.endswith("// changed\n")
+
+
+def test_app_serves_its_stylesheet_as_immutable(app_client):
+    response = app_client.get(static_url("css/styles.css"))
+
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]